@@ -16,8 +16,9 @@ namespace PowerlineSystem
         /// </summary>
         /// <param name="lasFilePath">LAS文件路径</param>
         /// <param name="outputDirectory">输出目录</param>
+        /// <param name="binary">是否输出二进制OFF（OFF BINARY，相对原点的float32坐标），可用 ReadBinaryOffVertices 直接读取</param>
         /// <returns>转换后的OFF文件路径，失败返回null</returns>
-        public static string ConvertLasToOff(string lasFilePath, string outputDirectory = null)
+        public static string ConvertLasToOff(string lasFilePath, string outputDirectory = null, bool binary = false)
         {
             // 1. 基础验证
             if (string.IsNullOrEmpty(lasFilePath))
@@ -141,14 +142,18 @@ namespace PowerlineSystem
                     return null;
                 }
 
-                // 8. 修改las2off.py脚本中的文件名
-                ModifyLas2offScript(las2offScriptPath, Path.GetFileName(lasFilePath), fileName + ".off");
+                // 8. 通过命令行参数传入输入/输出文件名（使用实际复制出的临时文件名）
+                string las2offArguments = $"\"{Path.GetFileName(tempLasPath)}\" -o \"{fileName}.off\"";
+                if (binary)
+                {
+                    las2offArguments += " --binary";
+                }
 
                 // 9. 执行Python转换脚本
                 ProcessStartInfo startInfo = new ProcessStartInfo()
                 {
                     FileName = "python",
-                    Arguments = $"-u \"{las2offScriptPath}\"", // -u 确保输出不缓冲
+                    Arguments = $"-u \"{las2offScriptPath}\" {las2offArguments}", // -u 确保输出不缓冲
                     UseShellExecute = false,
                     RedirectStandardOutput = true,
                     RedirectStandardError = true,
@@ -332,41 +337,99 @@ namespace PowerlineSystem
         }
 
         /// <summary>
-        /// 修改las2off.py脚本中的文件名
+        /// 读取las2off.py --binary 输出的二进制OFF的顶点
+        /// 格式为 Geomview 的 OFF BINARY：文本行"OFF BINARY"，随后为大端 int32 的顶点/面/边数和大端 float32 坐标。
+        /// las2off.py 在文件头后加一行注释"# origin x y z"，坐标为相对该原点的值（float32 无法精确表示大地坐标）
         /// </summary>
-        /// <param name="scriptPath">脚本路径</param>
-        /// <param name="inputFileName">输入文件名</param>
-        /// <param name="outputFileName">输出文件名</param>
-        private static void ModifyLas2offScript(string scriptPath, string inputFileName, string outputFileName)
+        /// <param name="offFilePath">OFF文件路径</param>
+        /// <param name="origin">坐标原点（绝对坐标 = 顶点 + 原点），没有原点注释时为0</param>
+        /// <returns>相对原点的顶点坐标，不是二进制OFF或读取失败返回null</returns>
+        public static Vector3[] ReadBinaryOffVertices(string offFilePath, out double[] origin)
         {
+            origin = new double[3];
             try
             {
-                // 读取原始脚本内容
-                string scriptContent = File.ReadAllText(scriptPath, Encoding.UTF8);
-                
-                // 替换文件名 - 使用正则表达式匹配任何引号内的文件名
-                scriptContent = System.Text.RegularExpressions.Regex.Replace(
-                    scriptContent, 
-                    @"INPUT_FILE\s*=\s*""[^""]*""", 
-                    $"INPUT_FILE = \"{inputFileName}\""
-                );
-                scriptContent = System.Text.RegularExpressions.Regex.Replace(
-                    scriptContent, 
-                    @"OUTPUT_FILE\s*=\s*""[^""]*""", 
-                    $"OUTPUT_FILE = \"{outputFileName}\""
-                );
-                
-                // 写回文件
-                File.WriteAllText(scriptPath, scriptContent, Encoding.UTF8);
-                
-                UnityEngine.Debug.Log($"✅ 已修改las2off脚本: {inputFileName} -> {outputFileName}");
+                using (var stream = File.OpenRead(offFilePath))
+                using (var reader = new BinaryReader(stream))
+                {
+                    byte[] header = reader.ReadBytes(BinaryOffHeader.Length);
+                    if (Encoding.ASCII.GetString(header) != BinaryOffHeader)
+                    {
+                        return null;
+                    }
+
+                    // 文件头后的注释行
+                    int next;
+                    while ((next = stream.ReadByte()) == '#')
+                    {
+                        var comment = new StringBuilder();
+                        int c;
+                        while ((c = stream.ReadByte()) != -1 && c != '\n')
+                        {
+                            comment.Append((char)c);
+                        }
+                        string[] parts = comment.ToString().Split(new[] { ' ' }, System.StringSplitOptions.RemoveEmptyEntries);
+                        if (parts.Length == 4 && parts[0] == "origin")
+                        {
+                            for (int axis = 0; axis < 3; axis++)
+                            {
+                                origin[axis] = double.Parse(parts[axis + 1], System.Globalization.CultureInfo.InvariantCulture);
+                            }
+                        }
+                    }
+                    if (next != -1)
+                    {
+                        stream.Position -= 1;
+                    }
+
+                    byte[] counts = reader.ReadBytes(12);
+                    int vertexCount = ReadInt32BigEndian(counts, 0);
+                    var vertices = new Vector3[vertexCount];
+
+                    // 按块读入再转换字节序，避免逐个浮点数调用 ReadBytes
+                    const int chunkVertices = 65536;
+                    for (int start = 0; start < vertexCount; start += chunkVertices)
+                    {
+                        int count = Mathf.Min(chunkVertices, vertexCount - start);
+                        int length = count * 12;
+                        byte[] block = reader.ReadBytes(length);
+                        if (block.Length != length)
+                        {
+                            UnityEngine.Debug.LogError($"二进制OFF文件不完整: {offFilePath}");
+                            return null;
+                        }
+                        if (System.BitConverter.IsLittleEndian)
+                        {
+                            for (int b = 0; b < length; b += 4)
+                            {
+                                System.Array.Reverse(block, b, 4);
+                            }
+                        }
+                        for (int i = 0; i < count; i++)
+                        {
+                            int b = i * 12;
+                            vertices[start + i] = new Vector3(System.BitConverter.ToSingle(block, b),
+                                                              System.BitConverter.ToSingle(block, b + 4),
+                                                              System.BitConverter.ToSingle(block, b + 8));
+                        }
+                    }
+                    return vertices;
+                }
             }
             catch (System.Exception ex)
             {
-                UnityEngine.Debug.LogError($"❌ 修改las2off脚本失败: {ex.Message}");
+                UnityEngine.Debug.LogError($"❌ 读取二进制OFF失败: {ex.Message}");
+                return null;
             }
         }
 
+        private const string BinaryOffHeader = "OFF BINARY\n";
+
+        private static int ReadInt32BigEndian(byte[] buffer, int offset)
+        {
+            return (buffer[offset] << 24) | (buffer[offset + 1] << 16) | (buffer[offset + 2] << 8) | buffer[offset + 3];
+        }
+
         /// <summary>
         /// 检查Python和laspy依赖是否可用
         /// </summary>
@@ -615,7 +615,8 @@ namespace PowerlineSystem
             ProcessStartInfo startInfo = new ProcessStartInfo()
             {
                 FileName = workingPythonCmd,
-                Arguments = $"-u \"{scriptPath}\" \"{selectedLasFilePath}\"",
+                // jsonl 进度事件由 ParseJsonlProgress 解析，标准输出只包含JSON行
+                Arguments = $"-u \"{scriptPath}\" \"{selectedLasFilePath}\" --progress-format jsonl",
                 UseShellExecute = false,
                 RedirectStandardOutput = true,
                 RedirectStandardError = true,
@@ -1292,6 +1293,64 @@ namespace PowerlineSystem
             return tqdmFeatures >= 2; // 至少包含2个特征才认为是tqdm输出
         }
         
+        /// <summary>
+        /// --progress-format jsonl 模式下的单行进度事件
+        /// </summary>
+        [Serializable]
+        private class JsonlProgressEvent
+        {
+            public string @event;
+            public string stage;
+            public int done;
+            public int total;
+            public float eta_s;
+            public float rss_mb;
+            public bool success;
+        }
+        
+        // jsonl 进度事件中的流水线阶段顺序（与 Extractor4.extract 的追踪阶段一致）
+        private static readonly string[] JsonlStageOrder =
+        {
+            "cache_lookup", "read", "segmentation", "dbscan", "separate", "split",
+            "merge", "length_filter", "transform", "final_filter", "write_outputs"
+        };
+        
+        // 阶段内部的细分进度所属的流水线阶段
+        private static readonly Dictionary<string, string> JsonlSubStageParent = new Dictionary<string, string>
+        {
+            { "linearity", "segmentation" }
+        };
+        
+        /// <summary>
+        /// 解析 jsonl 进度事件，返回总体进度百分比；不是进度事件时返回-1
+        /// </summary>
+        private float ParseJsonlProgress(string output)
+        {
+            JsonlProgressEvent evt;
+            try
+            {
+                evt = JsonUtility.FromJson<JsonlProgressEvent>(output);
+            }
+            catch (System.Exception e)
+            {
+                Debug.LogWarning($"解析JSON进度事件失败: {e.Message}");
+                return -1;
+            }
+            
+            if (evt == null) return -1;
+            if (evt.@event == "result") return evt.success ? 100f : -1;
+            if (evt.@event != "progress" || string.IsNullOrEmpty(evt.stage)) return -1;
+            
+            string stage = evt.stage;
+            if (JsonlSubStageParent.TryGetValue(stage, out string parent)) stage = parent;
+            int index = Array.IndexOf(JsonlStageOrder, stage);
+            if (index < 0) return -1;
+            
+            // total 为 null 时 JsonUtility 解析为0，视为阶段刚开始
+            float fraction = evt.total > 0 ? Mathf.Clamp01((float)evt.done / evt.total) : 0f;
+            return (index + fraction) / JsonlStageOrder.Length * 100f;
+        }
+        
         /// <summary>
         /// 从Python输出中解析进度信息
         /// </summary>
@@ -1299,6 +1358,12 @@ namespace PowerlineSystem
         {
             if (string.IsNullOrEmpty(output)) return -1;
             
+            // 解析 --progress-format jsonl 输出的结构化事件
+            if (output.StartsWith("{\"event\""))
+            {
+                return ParseJsonlProgress(output);
+            }
+            
             // 解析tqdm进度条 "计算线性特征: 50%|████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████                    | 500/1000 [00:30<00:30,  16.67it/s]"
             if (output.Contains("%|"))
             {
@@ -0,0 +1,188 @@
+using UnityEngine;
+using System.IO;
+using System.Text;
+
+namespace PowerlineSystem
+{
+    /// <summary>
+    /// 电力线二进制几何容器（.plg）读取器
+    /// 格式定义见 StreamingAssets/extract/line_geometry.py：文件头、线表、拟合表、float32点块、附加JSON，全部为小端
+    /// </summary>
+    public static class PowerlineGeometryReader
+    {
+        const uint Magic = 0x42474C50; // "PLGB"
+        const int SupportedVersion = 1;
+        const int LineRecordSize = 80;
+        const int FitRecordSize = 56;
+
+        /// <summary>
+        /// 拟合方法，编码与 line_geometry.FIT_METHODS 一致（从1开始）
+        /// </summary>
+        public enum FitMethod : byte
+        {
+            Catenary = 1,
+            Parabola = 2,
+            Polynomial3 = 3,
+            Linear = 4
+        }
+
+        public class FitRecord
+        {
+            public FitMethod method;
+            public bool success;
+            /// <summary>参数顺序同 Generator：悬链线 (a, h, v)，抛物线 (a, b, c)，三次多项式系数，直线 (slope, intercept)</summary>
+            public double[] parameters;
+            public double rmse;
+            public double rSquared;
+        }
+
+        public class LineRecord
+        {
+            public int id;
+            /// <summary>提取时的原始点数</summary>
+            public int pointCount;
+            /// <summary>绝对坐标（float64），x/y/z 与LAS一致</summary>
+            public double[] endpoint1;
+            public double[] endpoint2;
+            public Color32 color;
+            /// <summary>相对 GeometryData.origin 的点坐标，由拟合JSON转换的文件为空数组</summary>
+            public Vector3[] points;
+            public FitRecord[] fits;
+        }
+
+        public class GeometryData
+        {
+            public int version;
+            public double[] origin;
+            public LineRecord[] lines;
+            /// <summary>附加信息的JSON文本（可为空字符串）</summary>
+            public string extrasJson;
+        }
+
+        /// <summary>
+        /// 读取.plg文件
+        /// </summary>
+        /// <param name="filePath">.plg文件路径</param>
+        /// <returns>读取结果，失败返回null</returns>
+        public static GeometryData Read(string filePath)
+        {
+            if (string.IsNullOrEmpty(filePath) || !File.Exists(filePath))
+            {
+                UnityEngine.Debug.LogError($"几何容器文件不存在: {filePath}");
+                return null;
+            }
+
+            try
+            {
+                using (var stream = File.OpenRead(filePath))
+                using (var reader = new BinaryReader(stream, Encoding.UTF8))
+                {
+                    return Read(reader);
+                }
+            }
+            catch (System.Exception e)
+            {
+                UnityEngine.Debug.LogError($"读取几何容器失败: {filePath}\n{e.Message}");
+                return null;
+            }
+        }
+
+        static GeometryData Read(BinaryReader reader)
+        {
+            // 文件头
+            if (reader.ReadUInt32() != Magic)
+                throw new InvalidDataException("不是电力线几何容器（魔数不符）");
+            int version = reader.ReadUInt16();
+            if (version > SupportedVersion)
+                throw new InvalidDataException($"格式版本 {version} 高于支持的版本 {SupportedVersion}");
+            reader.ReadUInt16(); // header_size
+            int lineCount = (int)reader.ReadUInt32();
+            int fitCount = (int)reader.ReadUInt32();
+            long pointCount = (long)reader.ReadUInt64();
+            var origin = ReadDoubles(reader, 3);
+            long linesOffset = (long)reader.ReadUInt64();
+            long fitsOffset = (long)reader.ReadUInt64();
+            long pointsOffset = (long)reader.ReadUInt64();
+            long extrasOffset = (long)reader.ReadUInt64();
+            int extrasLength = (int)reader.ReadUInt64();
+
+            // 拟合表
+            reader.BaseStream.Position = fitsOffset;
+            var fits = new FitRecord[fitCount];
+            for (int i = 0; i < fitCount; i++)
+            {
+                var fit = new FitRecord();
+                fit.method = (FitMethod)reader.ReadByte();
+                fit.success = reader.ReadByte() != 0;
+                int paramCount = reader.ReadByte();
+                reader.ReadByte();
+                reader.ReadUInt32(); // line_index
+                var values = ReadDoubles(reader, 4);
+                fit.parameters = new double[paramCount];
+                System.Array.Copy(values, fit.parameters, paramCount);
+                fit.rmse = reader.ReadDouble();
+                fit.rSquared = reader.ReadDouble();
+                fits[i] = fit;
+            }
+
+            // 线表
+            var lines = new LineRecord[lineCount];
+            var pointOffsets = new long[lineCount];
+            for (int i = 0; i < lineCount; i++)
+            {
+                reader.BaseStream.Position = linesOffset + (long)i * LineRecordSize;
+                var line = new LineRecord();
+                line.id = reader.ReadInt32();
+                line.pointCount = (int)reader.ReadUInt32();
+                pointOffsets[i] = (long)reader.ReadUInt64();
+                line.points = new Vector3[reader.ReadUInt32()];
+                int fitFirst = (int)reader.ReadUInt32();
+                int lineFitCount = (int)reader.ReadUInt32();
+                line.color = new Color32(reader.ReadByte(), reader.ReadByte(), reader.ReadByte(), 255);
+                reader.ReadByte();
+                line.endpoint1 = ReadDoubles(reader, 3);
+                line.endpoint2 = ReadDoubles(reader, 3);
+                line.fits = new FitRecord[lineFitCount];
+                System.Array.Copy(fits, fitFirst, line.fits, 0, lineFitCount);
+                lines[i] = line;
+            }
+
+            // 点块：每条线的点连续存放，一次读入该线的全部字节再转换
+            for (int i = 0; i < lineCount; i++)
+            {
+                var points = lines[i].points;
+                if (points.Length == 0)
+                    continue;
+                reader.BaseStream.Position = pointsOffset + pointOffsets[i] * 12;
+                byte[] block = reader.ReadBytes(points.Length * 12);
+                for (int p = 0; p < points.Length; p++)
+                {
+                    int b = p * 12;
+                    points[p] = new Vector3(System.BitConverter.ToSingle(block, b),
+                                            System.BitConverter.ToSingle(block, b + 4),
+                                            System.BitConverter.ToSingle(block, b + 8));
+                }
+            }
+
+            string extrasJson = "";
+            if (extrasLength > 0)
+            {
+                reader.BaseStream.Position = extrasOffset;
+                extrasJson = Encoding.UTF8.GetString(reader.ReadBytes(extrasLength));
+            }
+
+            if (pointsOffset + pointCount * 12 > reader.BaseStream.Length)
+                throw new InvalidDataException("点块长度超出文件长度，文件可能不完整");
+
+            return new GeometryData { version = version, origin = origin, lines = lines, extrasJson = extrasJson };
+        }
+
+        static double[] ReadDoubles(BinaryReader reader, int count)
+        {
+            var values = new double[count];
+            for (int i = 0; i < count; i++)
+                values[i] = reader.ReadDouble();
+            return values;
+        }
+    }
+}
@@ -99,6 +99,8 @@ namespace PowerlineSystem
         private Vector3 boundsMin;
         private Vector3 boundsMax;
         private Vector3 boundsCenter;
+        // 网格顶点以此为中心（与 points 同一坐标系）；二进制OFF的 points 相对文件原点，bounds 为加回原点后的坐标
+        private Vector3 meshCenter;
         
         // 性能监控
         private int renderedPoints = 0;
@@ -397,6 +399,7 @@ namespace PowerlineSystem
             
             // 计算边界中心
             boundsCenter = (boundsMin + boundsMax) * 0.5f;
+            meshCenter = boundsCenter;
             
             // 简化颜色处理 - 直接使用统一颜色，跳过复杂的颜色计算
             Color uniformColor = new Color(0.5f, 0.7f, 1f, opacity);
@@ -425,6 +428,14 @@ namespace PowerlineSystem
         {
             loadingStatus = "解析点云数据...";
             
+            // las2off.py --binary 输出的二进制OFF直接按float32读取，不经文本解析
+            Vector3[] binaryVertices = LasToOffConverter.ReadBinaryOffVertices(filePath, out double[] binaryOrigin);
+            if (binaryVertices != null)
+            {
+                ReadOFFVertices(binaryVertices, binaryOrigin);
+                yield break;
+            }
+            
             using (StreamReader reader = new StreamReader(filePath))
             {
                 // 读取文件头
@@ -493,6 +504,7 @@ namespace PowerlineSystem
                 
                 // 计算边界中心
                 boundsCenter = (boundsMin + boundsMax) * 0.5f;
+                meshCenter = boundsCenter;
                 
                 // 应用偏移
                 if (pointCloudOffset != Vector3.zero)
@@ -508,6 +520,48 @@ namespace PowerlineSystem
             Debug.Log($"点云边界: Min={boundsMin}, Max={boundsMax}, Center={boundsCenter}");
         }
         
+        void ReadOFFVertices(Vector3[] vertices, double[] origin)
+        {
+            totalPoints = vertices.Length;
+            points = new Vector3[totalPoints];
+            colors = new Color[totalPoints];
+            Vector3 localMin = Vector3.positiveInfinity;
+            Vector3 localMax = Vector3.negativeInfinity;
+            
+            Color defaultColor = new Color(0.5f, 0.7f, 1f, opacity); // 二进制OFF不含颜色，使用默认蓝色
+            for (int i = 0; i < totalPoints; i++)
+            {
+                Vector3 v = vertices[i] * scale;
+                points[i] = invertYZ ? new Vector3(v.x, v.z, v.y) : v;
+                localMin = Vector3.Min(localMin, points[i]);
+                localMax = Vector3.Max(localMax, points[i]);
+                colors[i] = defaultColor;
+            }
+            
+            // 顶点相对文件原点，网格以相对坐标的中心构建以保留float精度；边界加回原点，与文本OFF一致
+            meshCenter = (localMin + localMax) * 0.5f;
+            Vector3 originOffset = new Vector3((float)(origin[0] * scale), (float)(origin[1] * scale), (float)(origin[2] * scale));
+            if (invertYZ)
+            {
+                originOffset = new Vector3(originOffset.x, originOffset.z, originOffset.y);
+            }
+            boundsMin = localMin + originOffset;
+            boundsMax = localMax + originOffset;
+            boundsCenter = meshCenter + originOffset;
+            
+            // 应用偏移
+            if (pointCloudOffset != Vector3.zero)
+            {
+                for (int i = 0; i < totalPoints; i++)
+                {
+                    points[i] += pointCloudOffset;
+                }
+            }
+            
+            Debug.Log($"二进制点云数据读取完成: {totalPoints} 个点");
+            Debug.Log($"点云边界: Min={boundsMin}, Max={boundsMax}, Center={boundsCenter}");
+        }
+        
         IEnumerator CreatePointCloudMeshes()
         {
             loadingStatus = "创建点云网格...";
@@ -570,7 +624,7 @@ namespace PowerlineSystem
             // 批量处理顶点数据
             for (int i = 0; i < pointCount; i++)
             {
-                vertices[i] = points[startIndex + i] - boundsCenter; // 相对于中心的位置
+                vertices[i] = points[startIndex + i] - meshCenter; // 相对于中心的位置
                 vertexColors[i] = colors[startIndex + i];
                 indices[i] = i;
             }
@@ -1,19 +1,34 @@
-import open3d as o3d
 import numpy as np
 import laspy
 import os
-from tqdm import tqdm
-import cv2
-from sklearn.cluster import DBSCAN, MeanShift, estimate_bandwidth
-from sklearn.decomposition import PCA
-from sklearn.linear_model import RANSACRegressor
-import matplotlib.pyplot as plt
-from scipy.spatial import KDTree
 import time
 import copy
 import json
 import multiprocessing
 
+from stage_cache import StageCache, STAGES, pack_lines, unpack_lines
+from result_cache import ResultCache
+from perf_trace import PerfTrace
+from progress import ProgressReporter, PROGRESS_FORMATS
+from lazy_imports import lazy_module, preload
+import corridor_tiling
+import incremental
+import out_of_core
+import cost_model
+import prefetch
+import param_sweep
+import chunked_reader
+import las_io
+import point_sidecar
+from line_geometry import write_line_geometry, line_geometry_name
+
+# 无界面核心只在启动时导入 numpy 和 laspy；open3d 在第一次使用时加载，
+# sklearn/scipy/cv2/matplotlib 在用到它们的方法内部导入
+o3d = lazy_module('open3d')
+
+# 提取结果缓存键的一部分：改变输出的算法或输出格式调整时递增，使已缓存的结果失效
+EXTRACTOR_VERSION = '4.2'
+
 
 class PowerLineExtractor:
     """
@@ -22,7 +37,7 @@ class PowerLineExtractor:
     """
 
     def __init__(self, threshold=0.81, radius=1.5, height_min=0, height_max=20, eps=1.5, min_samples=5, 
-                 enable_visualization=True):
+                 enable_visualization=True, progress=None, coord_dtype='float32'):
         """
         初始化电力线提取器
         
@@ -33,6 +48,8 @@ class PowerLineExtractor:
         :param eps: DBSCAN邻域半径
         :param min_samples: DBSCAN最小样本数
         :param enable_visualization: 是否启用可视化
+        :param progress: 进度汇报器（ProgressReporter），None则使用 text 模式（tqdm）
+        :param coord_dtype: 局部坐标的存储类型，'float32'（精度不足时自动退回float64）或 'float64'
         """
         self.threshold = threshold
         self.radius = radius
@@ -41,11 +58,37 @@ class PowerLineExtractor:
         self.eps = eps
         self.min_samples = min_samples
         self.enable_visualization = enable_visualization
+        # 提取结束时总会显示最终结果窗口；基准和校验脚本在子进程中运行时关闭
+        self.show_final_result = True
+        self.progress = progress or ProgressReporter()
+        self.coord_dtype = coord_dtype
+        # 为True时电力线点云输出为压缩的LAZ（见 las_io）
+        self.compress_output = False
+        # 为True时另外输出二进制几何容器 <文件名>_powerlines.plg（见 line_geometry）
+        self.line_geometry_output = False
+
+        # 读取时减去文件原点（XY取整到米，Z保持绝对高程以便高程滤波），之后各阶段都在局部坐标系中计算
+        self.coordinate_origin = np.zeros(3)
         
         # 添加缓存机制
         self._direction_cache = {}  # 缓存主方向计算结果
         self._endpoint_cache = {}   # 缓存端点计算结果
         self._radius_cache = {}    # 缓存动态半径计算结果
+
+        # 常驻服务注入的跨请求缓存（为None时每次从磁盘读取/使用磁盘阶段缓存）
+        self.stage_cache = None    # StageCache 实例
+        self.cloud_cache = None    # 提供 get(file_path, loader) 的点云缓存
+        # 调用方已读取的共享点云（las_io.LoadedCloud），与输入文件相同时不再读取文件
+        self.shared_cloud = None
+        # 为True时经由输入文件旁的二进制旁路缓存（point_sidecar）读取，缓存无效时生成
+        self.use_sidecar = False
+        self.result_cache = None   # ResultCache 实例，None时按需在默认目录创建
+
+        # 时间预算规划（cost_model.plan）给出的线性度采样步长；None时按点数分档
+        self.linearity_sample_step = None
+
+        # 分块读取（_load_high_points）保留下来的点在输入文件中的原始序号，用于追溯来源
+        self.last_source_indices = None
         
         # 并行计算设置
         self.n_jobs = min(multiprocessing.cpu_count(), 8)  # 最多使用8个核心
@@ -61,33 +104,142 @@ class PowerLineExtractor:
         读取点云文件，支持.las格式
 
         :param file_path: 文件路径
-        :return: open3d点云对象
+        :return: open3d点云对象（局部坐标，原点见 coordinate_origin）
         """
-        las_data = laspy.read(file_path)
-        x = np.array(las_data.x)
-        y = np.array(las_data.y)
-        z = np.array(las_data.z)
-        points = np.column_stack((x, y, z))
+        points = self._load_local_xyz(file_path)
         cloud = o3d.geometry.PointCloud()
         cloud.points = o3d.utility.Vector3dVector(points)
         return cloud
 
-    def _save_point_cloud(self, cloud, file_path):
+    def _load_local_xyz(self, file_path):
+        """
+        读取局部坐标（经由常驻服务的点云缓存时直接复用），并把 coordinate_origin 设为该文件的原点
+
+        :param file_path: 文件路径
+        :return: (N, 3) 局部坐标数组
+        """
+        self.coordinate_origin, _ = self._file_frame(file_path)
+        if self.cloud_cache is not None:
+            return self.cloud_cache.get(file_path, self._read_xyz)
+        return self._read_xyz(file_path)
+
+    def _sidecar_for(self, file_path, origin, dtype, fields=()):
+        """
+        启用旁路缓存时返回该文件有效的旁路缓存（无效时生成），未启用或无法生成时返回None
+        """
+        if not self.use_sidecar:
+            return None
+        return point_sidecar.load_sidecar(file_path, origin, dtype, fields)
+
+    def _shared_for(self, file_path):
+        """
+        返回与该文件对应的共享点云（las_io.LoadedCloud），没有时返回None
+        """
+        if self.shared_cloud is not None and self.shared_cloud.matches(file_path):
+            return self.shared_cloud
+        return None
+
+    def _load_high_points(self, file_path, fields=()):
+        """
+        分块读取高程带之外的点（读取时滤波，见 chunked_reader），并把 coordinate_origin 设为该文件的原点。
+        保留点的原始序号同时记录在 last_source_indices 中
+
+        经由常驻服务的点云缓存且不需要附加字段时，从缓存的完整坐标中筛选；
+        有共享点云时从其坐标中筛选（chunked_reader.filter_loaded），
+        启用旁路缓存时从内存映射的局部坐标中筛选（chunked_reader.filter_local），均不再读取文件
+
+        :param file_path: 文件路径
+        :param fields: 需要同时读取的附加字段名，如 ('classification', 'return_number')
+        :return: (局部坐标 (M, 3), 原始序号 (M,), {字段名: 数组}, 文件总点数)
+        """
+        origin, dtype = self._file_frame(file_path)
+        self.coordinate_origin = origin
+        shared = self._shared_for(file_path)
+        use_cloud_cache = self.cloud_cache is not None and not fields
+        sidecar = None if use_cloud_cache or shared is not None else self._sidecar_for(file_path, origin, dtype, fields)
+        if use_cloud_cache:
+            points = self.cloud_cache.get(file_path, self._read_xyz)
+            keep = np.ones(len(points), dtype=bool)
+            keep[self._height_band_indices(points)] = False
+            indices = np.flatnonzero(keep)
+            high, extra, total = points[indices], {}, len(points)
+        elif shared is not None:
+            high, indices, extra, total = chunked_reader.filter_loaded(
+                shared, self.height_min, self.height_max, origin=origin, dtype=dtype, fields=fields)
+        elif sidecar is not None:
+            high, indices, extra, total = chunked_reader.filter_local(
+                sidecar.xyz, self.height_min, self.height_max, {name: sidecar.fields[name] for name in fields})
+        else:
+            high, indices, extra, total = chunked_reader.read_filtered(
+                file_path, self.height_min, self.height_max, origin=origin, dtype=dtype, fields=fields)
+        self.last_source_indices = indices
+        return high, indices, extra, total
+
+    def _file_frame(self, file_path):
+        """
+        根据LAS文件头确定局部坐标系（规则见 las_io.local_frame）：原点为XY最小值向下取整到米（Z为0），
+        float32在该范围内的分辨率低于LAS坐标精度时退回float64
+
+        :param file_path: 文件路径
+        :return: (原点 (3,), 坐标存储类型)
+        """
+        shared = self._shared_for(file_path)
+        if shared is not None and shared.loaded:
+            header = shared
+        else:
+            with las_io.open_las(file_path) as reader:
+                header = reader.header
+        return las_io.local_frame(header, self.coord_dtype)
+
+    def _read_xyz(self, file_path):
+        """
+        读取LAS文件的坐标，减去文件原点后按局部坐标存储，返回 (N, 3) 数组
+
+        :param file_path: 文件路径
+        :return: 局部坐标数组（float32或float64，见 _file_frame）
+        """
+        origin, dtype = self._file_frame(file_path)
+        shared = self._shared_for(file_path)
+        if shared is not None:
+            view = shared.local_view(origin, dtype)
+            if view is not None:
+                return view
+            xyz = shared.xyz
+            points = np.empty((len(xyz), 3), dtype=dtype)
+            for axis in range(3):
+                points[:, axis] = xyz[:, axis] - origin[axis]
+            return points
+        sidecar = self._sidecar_for(file_path, origin, dtype)
+        if sidecar is not None:
+            return sidecar.xyz
+        las_data = las_io.read_las(file_path)
+        points = np.empty((len(las_data.points), 3), dtype=dtype)
+        # 逐列在float64下减去原点再转换，避免同时持有完整的float64副本
+        points[:, 0] = las_data.x - origin[0]
+        points[:, 1] = las_data.y - origin[1]
+        points[:, 2] = las_data.z - origin[2]
+        return points
+
+    def _save_point_cloud(self, cloud, file_path, origin=None):
         """
         保存点云文件
 
         :param cloud: open3d点云对象
         :param file_path: 保存路径
+        :param origin: 点云所在局部坐标系的原点，写出时加回得到原始坐标；None表示不平移
         """
         points = np.asarray(cloud.points)
+        if origin is not None:
+            points = points + origin
         header = laspy.LasHeader(point_format=0, version="1.2")
-        header.offsets = np.array([0, 0, 0])
+        # 偏移取点云最小值（向下取整到米），加回原点后的大地坐标按0.001比例也不会溢出
+        header.offsets = np.floor(points.min(axis=0)) if len(points) else np.zeros(3)
         header.scales = np.array([0.001, 0.001, 0.001])
         las_data = laspy.LasData(header)
         las_data.x = points[:, 0]
         las_data.y = points[:, 1]
         las_data.z = points[:, 2]
-        las_data.write(file_path)
+        las_io.write_las(las_data, file_path)
 
     def _pass_through(self, cloud, limit_min=None, limit_max=None):
         """
@@ -98,15 +250,27 @@ class PowerLineExtractor:
         :param limit_max: 高程最大值，如果为None则使用实例变量
         :return: 高程较低点，高程较高点
         """
+        ind = self._height_band_indices(np.asarray(cloud.points), limit_min, limit_max)
+        low_cloud = cloud.select_by_index(ind)
+        high_cloud = cloud.select_by_index(ind, invert=True)
+        return low_cloud, high_cloud
+
+    def _height_band_indices(self, points, limit_min=None, limit_max=None):
+        """
+        返回高程位于 [limit_min, limit_max] 内的点索引
+
+        :param points: 点坐标数组
+        :param limit_min: 高程最小值，如果为None则使用实例变量
+        :param limit_max: 高程最大值，如果为None则使用实例变量
+        :return: 索引数组
+        """
         if limit_min is None:
             limit_min = self.height_min
         if limit_max is None:
             limit_max = self.height_max
-        points = np.asarray(cloud.points)
-        ind = np.where((points[:, 2] >= limit_min) & (points[:, 2] <= limit_max))[0]
-        low_cloud = cloud.select_by_index(ind)
-        high_cloud = cloud.select_by_index(ind, invert=True)
-        return low_cloud, high_cloud
+        # float32局部坐标先提升为float64再比较，与open3d点云（float64）上的结果一致
+        z = np.asarray(points[:, 2], dtype=np.float64)
+        return np.where((z >= limit_min) & (z <= limit_max))[0]
 
     def _pca_compute(self, data, sort=True):
         """
@@ -216,179 +380,151 @@ class PowerLineExtractor:
         if threshold is None:
             threshold = self.threshold
         low, high = self._pass_through(power_line_cloud, self.height_min, self.height_max)
+        linear = self._compute_linear_features(high, use_dynamic_params)
+        return self._select_line_points(low, high, linear, threshold, use_dynamic_params)
+
+    def _compute_linear_features(self, high, use_dynamic_params=True):
+        """
+        计算每个点的线性度特征 (l1 - l2) / l1
+
+        :param high: 参与计算的点云（高程带之外的点）
+        :param use_dynamic_params: 是否使用动态邻域半径
+        :return: 线性度数组，与high中的点一一对应
+        """
         points = np.asarray(high.points)
         kdtree = o3d.geometry.KDTreeFlann(high)
-        num_points = len(high.points)
-        linear = []
+        num_points = len(points)
 
         if use_dynamic_params:
             print("使用动态参数模式，提升复杂地形识别效果...")
-            
-            # 优化采样策略：根据点云密度自适应调整采样率
-            if num_points > 8000:
-                print(f"激进加速模式：大幅减少计算，共{num_points}个点")
-                
-                # 自适应采样率：点越多，采样率越低
-                if num_points > 10000000:  # 超过1000万点
-                    sample_ratio = 0.1  # 只计算10%
-                elif num_points > 5000000:  # 超过500万点
-                    sample_ratio = 0.15  # 只计算15%
-                else:
-                    sample_ratio = 0.2  # 只计算20%
-                
-                sample_step = int(1 / sample_ratio)
-                print(f"自适应采样：每{sample_step}个点计算一次（采样率: {sample_ratio*100:.0f}%）")
-                
-                # 预分配数组
-                linear = np.zeros(num_points)
-                
-                # 计算采样点的线性特征
-                sample_indices = list(range(0, num_points, sample_step))
-                sample_values = []
-                
-                for i in tqdm(sample_indices, desc="动态参数采样计算", ncols=100):
-                    # 使用动态半径
-                    dynamic_radius = self._calculate_dynamic_radius_by_terrain(
-                        high.points[i], points, kdtree, base_radius=self.radius
-                    )
-                    
-                    k, idx, _ = kdtree.search_radius_vector_3d(high.points[i], dynamic_radius)
-                    if len(idx) >= 3:
-                        neighbors = points[idx, :]
-                        w = self._pca_compute(neighbors)
-                        l1, l2 = w[0], w[1]
-                        L = np.divide((l1 - l2), l1, out=np.zeros_like((l1 - l2)), where=l1 != 0)
-                        sample_values.append(L)
-                    else:
-                        sample_values.append(0.0)
-                
-                # 使用线性插值填充未计算的点
-                for i in range(len(sample_indices) - 1):
-                    start_idx = sample_indices[i]
-                    end_idx = sample_indices[i + 1]
-                    start_val = sample_values[i]
-                    end_val = sample_values[i + 1]
-                    
-                    # 线性插值
-                    for j in range(start_idx, end_idx):
-                        if end_idx > start_idx:
-                            t = (j - start_idx) / (end_idx - start_idx)
-                            linear[j] = start_val * (1 - t) + end_val * t
-                        else:
-                            linear[j] = start_val
-                
-                # 处理最后一个采样点之后的部分
-                if sample_indices:
-                    last_idx = sample_indices[-1]
-                    last_val = sample_values[-1]
-                    linear[last_idx:] = last_val
-                
-                # 转换为list格式（保持原接口）
-                linear = list(linear)
-            else:
-                # 标准逐点计算，使用动态半径
-                linear = []
-                for i in tqdm(range(num_points), desc="动态参数标准计算", ncols=100):
-                    # 使用动态半径
-                    dynamic_radius = self._calculate_dynamic_radius_by_terrain(
-                        high.points[i], points, kdtree, base_radius=self.radius
-                    )
-                    
-                    k, idx, _ = kdtree.search_radius_vector_3d(high.points[i], dynamic_radius)
-                    if len(idx) >= 3:
-                        neighbors = points[idx, :]
-                        w = self._pca_compute(neighbors)
-                        l1, l2 = w[0], w[1]
-                        L = np.divide((l1 - l2), l1, out=np.zeros_like((l1 - l2)), where=l1 != 0)
-                        linear.append(L)
-                    else:
-                        linear.append(0.0)
-
-            linear = np.array(linear)
-            
-            # 使用动态阈值
-            dynamic_threshold = self._calculate_dynamic_threshold_by_percentile(linear)
-            print(f"动态阈值: {dynamic_threshold:.3f} (原阈值: {threshold:.3f})")
-            
-            idx = np.where(linear > dynamic_threshold)[0]
-            line_cloud_ = high.select_by_index(idx)
-            out_line_cloud_ = high.select_by_index(idx, invert=True) + low
-            return line_cloud_, out_line_cloud_
         else:
             # 原始固定参数模式（保持向后兼容）
             print("使用固定参数模式...")
-            
-            # 优化采样策略：根据点云密度自适应调整采样率
-            if num_points > 8000:
-                print(f"激进加速模式：大幅减少计算，共{num_points}个点")
-                
-                # 自适应采样率：点越多，采样率越低
-                if num_points > 10000000:  # 超过1000万点
-                    sample_ratio = 0.1  # 只计算10%
-                elif num_points > 5000000:  # 超过500万点
-                    sample_ratio = 0.15  # 只计算15%
-                else:
-                    sample_ratio = 0.2  # 只计算20%
-                
-                sample_step = int(1 / sample_ratio)
-                print(f"自适应采样：每{sample_step}个点计算一次（采样率: {sample_ratio*100:.0f}%）")
-                
-                # 预分配数组
-                linear = np.zeros(num_points)
-                
-                # 计算采样点的线性特征
-                sample_indices = list(range(0, num_points, sample_step))
-                sample_values = []
-                
-                for i in tqdm(sample_indices, desc="采样计算", ncols=100):
-                    k, idx, _ = kdtree.search_radius_vector_3d(high.points[i], self.radius)
-                    if len(idx) >= 3:
-                        neighbors = points[idx, :]
-                        w = self._pca_compute(neighbors)
-                        l1, l2 = w[0], w[1]
-                        L = np.divide((l1 - l2), l1, out=np.zeros_like((l1 - l2)), where=l1 != 0)
-                        sample_values.append(L)
-                    else:
-                        sample_values.append(0.0)
-                
-                # 使用线性插值填充未计算的点
-                for i in range(len(sample_indices) - 1):
-                    start_idx = sample_indices[i]
-                    end_idx = sample_indices[i + 1]
-                    start_val = sample_values[i]
-                    end_val = sample_values[i + 1]
-                    
-                    # 线性插值
-                    for j in range(start_idx, end_idx):
-                        if end_idx > start_idx:
-                            t = (j - start_idx) / (end_idx - start_idx)
-                            linear[j] = start_val * (1 - t) + end_val * t
-                        else:
-                            linear[j] = start_val
-                
-                # 处理最后一个采样点之后的部分
-                if sample_indices:
-                    last_idx = sample_indices[-1]
-                    last_val = sample_values[-1]
-                    linear[last_idx:] = last_val
-                
-                # 转换为list格式（保持原接口）
-                linear = list(linear)
 
-            linear = np.array(linear)
+        sample_step = self._linearity_sample_step(num_points, use_dynamic_params)
+        if sample_step is None:
+            return np.array([])
+
+        if sample_step == 1:
+            # 标准逐点计算，使用动态半径
+            linear = [self._point_linearity(points[i], points, kdtree, use_dynamic_params)
+                      for i in self.progress.iter(range(num_points), "linearity", desc="动态参数标准计算")]
+            return np.array(linear)
+
+        # 计算采样点的线性特征
+        sample_indices = np.arange(0, num_points, sample_step)
+        desc = "动态参数采样计算" if use_dynamic_params else "采样计算"
+        sample_values = [self._point_linearity(points[i], points, kdtree, use_dynamic_params)
+                         for i in self.progress.iter(sample_indices, "linearity", desc=desc)]
+
+        # 使用线性插值填充未计算的点
+        return self._interpolate_linearity(num_points, sample_indices, sample_values)
+
+    def _linearity_sample_step(self, num_points, use_dynamic_params=True):
+        """
+        线性度计算的采样步长：点越多，采样率越低
+
+        :param num_points: 参与计算的点数
+        :param use_dynamic_params: 是否使用动态参数
+        :return: 采样步长；1 表示逐点计算，None 表示不计算（固定参数模式下的小点云）。
+                 设置了 linearity_sample_step（时间预算规划）时使用该步长
+        """
+        if num_points <= 8000 and not use_dynamic_params:
+            return None
+        if self.linearity_sample_step is not None:
+            print(f"按时间预算规划：每{self.linearity_sample_step}个点计算一次"
+                  f"（采样率: {100 / self.linearity_sample_step:.0f}%），共{num_points}个点")
+            return self.linearity_sample_step
+        if num_points <= 8000:
+            return 1
+
+        print(f"激进加速模式：大幅减少计算，共{num_points}个点")
+        if num_points > 10000000:  # 超过1000万点
+            sample_ratio = 0.1  # 只计算10%
+        elif num_points > 5000000:  # 超过500万点
+            sample_ratio = 0.15  # 只计算15%
+        else:
+            sample_ratio = 0.2  # 只计算20%
+
+        sample_step = int(1 / sample_ratio)
+        print(f"自适应采样：每{sample_step}个点计算一次（采样率: {sample_ratio*100:.0f}%）")
+        return sample_step
+
+    def _point_linearity(self, point, points, kdtree, use_dynamic_params=True):
+        """
+        计算单个点邻域的线性度
+
+        :param point: 查询点
+        :param points: 构建kdtree的全部点
+        :param kdtree: KD树对象
+        :param use_dynamic_params: 是否使用动态半径
+        :return: 线性度
+        """
+        radius = self.radius
+        if use_dynamic_params:
+            radius = self._calculate_dynamic_radius_by_terrain(point, points, kdtree, base_radius=self.radius)
+
+        k, idx, _ = kdtree.search_radius_vector_3d(point, radius)
+        if len(idx) < 3:
+            return 0.0
+        w = self._pca_compute(points[idx, :])
+        l1, l2 = w[0], w[1]
+        return np.divide((l1 - l2), l1, out=np.zeros_like((l1 - l2)), where=l1 != 0)
+
+    def _interpolate_linearity(self, num_points, sample_indices, sample_values):
+        """
+        在相邻采样点之间线性插值，最后一个采样点之后沿用其值
+
+        :param num_points: 总点数
+        :param sample_indices: 递增的采样点序号
+        :param sample_values: 采样点的线性度
+        :return: 长度为num_points的线性度数组
+        """
+        sample_indices = np.asarray(sample_indices)
+        sample_values = np.asarray(sample_values, dtype=np.float64)
+        linear = np.zeros(num_points)
+        if len(sample_indices) == 0:
+            return linear
+
+        last_idx = sample_indices[-1]
+        j = np.arange(sample_indices[0], last_idx)
+        seg = np.searchsorted(sample_indices, j, side='right') - 1
+        start_idx = sample_indices[seg]
+        t = (j - start_idx) / (sample_indices[seg + 1] - start_idx)
+        linear[j] = sample_values[seg] * (1 - t) + sample_values[seg + 1] * t
+        linear[last_idx:] = sample_values[-1]
+        return linear
+
+    def _select_line_points(self, low, high, linear, threshold, use_dynamic_params=True):
+        """
+        根据线性度阈值划分线点云与非线点云
+
+        :param low: 高程带内的点云
+        :param high: 参与线性度计算的点云
+        :param linear: 线性度数组
+        :param threshold: 固定阈值（动态模式下仅用于打印对比）
+        :param use_dynamic_params: 是否使用基于百分位数的动态阈值
+        :return: 线点云和线之外的点云
+        """
+        if use_dynamic_params:
+            dynamic_threshold = self._calculate_dynamic_threshold_by_percentile(linear)
+            print(f"动态阈值: {dynamic_threshold:.3f} (原阈值: {threshold:.3f})")
+            idx = np.where(linear > dynamic_threshold)[0]
+        else:
             idx = np.where(linear > threshold)[0]
-            line_cloud_ = high.select_by_index(idx)
-            out_line_cloud_ = high.select_by_index(idx, invert=True) + low
-            return line_cloud_, out_line_cloud_
+        line_cloud_ = high.select_by_index(idx)
+        out_line_cloud_ = high.select_by_index(idx, invert=True) + low
+        return line_cloud_, out_line_cloud_
 
-    def _dbscan_clustering(self, points, eps=None, min_samples=None):
+    def _dbscan_clustering(self, points, eps=None, min_samples=None, return_core=False):
         """
         使用DBSCAN算法对点云进行聚类，使用算法优化提升性能
 
         :param points: 输入点云
         :param eps: 邻域半径，如果为None则使用实例变量
         :param min_samples: 最小样本数，如果为None则使用实例变量
-        :return: 聚类后的标签
+        :param return_core: 是否同时返回核心点掩码（分块提取拼接接缝时使用）
+        :return: 聚类后的标签；return_core为True时返回 (标签, 核心点掩码)
         """
         if eps is None:
             eps = self.eps
@@ -398,6 +534,8 @@ class PowerLineExtractor:
         num_points = len(points)
         print(f"开始DBSCAN聚类，点数: {num_points}, eps: {eps}, min_samples: {min_samples}")
         
+        from sklearn.cluster import DBSCAN
+
         # 使用优化的DBSCAN算法，不进行采样，保证数据完整性
         clustering = DBSCAN(
             eps=eps, 
@@ -415,6 +553,10 @@ class PowerLineExtractor:
         n_noise = list(labels).count(-1)
         
         print(f"DBSCAN聚类完成: {n_clusters}个聚类, {n_noise}个噪声点")
+        if return_core:
+            core_mask = np.zeros(num_points, dtype=bool)
+            core_mask[clustering.core_sample_indices_] = True
+            return labels, core_mask
         return labels
 
     def _hough_transform(self, points_2d, img_shape=(1000, 1000), threshold=100):
@@ -426,6 +568,8 @@ class PowerLineExtractor:
         :param threshold: 霍夫变换阈值
         :return: 检测到的直线参数
         """
+        import cv2
+
         img = np.zeros(img_shape, dtype=np.uint8)
         for point in points_2d:
             x, y = int(point[0]), int(point[1])
@@ -554,6 +698,8 @@ class PowerLineExtractor:
         # 将点云投影到垂直于主方向的平面上
         projected_points, (v1, v2) = self._project_points_to_plane(points, main_direction)
 
+        from sklearn.cluster import DBSCAN
+
         # 在投影平面上使用DBSCAN聚类
         projection_labels = DBSCAN(eps=eps_projection, min_samples=min_samples_projection).fit(projected_points).labels_
         unique_labels = np.unique(projection_labels)
@@ -643,7 +789,7 @@ class PowerLineExtractor:
         filtered_clouds = []
         length_info = []
 
-        for i, cloud in tqdm(enumerate(power_line_clouds), desc="Filtering power lines by length", ncols=100):
+        for i, cloud in self.progress.iter(enumerate(power_line_clouds), "length_filter", total=len(power_line_clouds), desc="Filtering power lines by length"):
             if length_method == 'projection':
                 length = self._calculate_power_line_length(cloud)
             else:  # path method
@@ -865,6 +1011,8 @@ class PowerLineExtractor:
         X = power_line_points[:, :2]  # x, y坐标
         y = power_line_points[:, 2]  # z坐标
 
+        from sklearn.linear_model import RANSACRegressor
+
         try:
             ransac = RANSACRegressor().fit(X, y)
             return ransac
@@ -994,11 +1142,14 @@ class PowerLineExtractor:
 
         # 计算全局平移向量（只平移x,y坐标，z坐标保持不变）
         global_translation_vector = np.array([global_reference_point[0], global_reference_point[1], 0])
+        # worker.py 用它把原始坐标系中的地形点变换到与电力线相同的坐标系，因此加回局部坐标原点
+        self.last_translation_vector = global_translation_vector + self.coordinate_origin
+        absolute_reference_point = global_reference_point + self.coordinate_origin
 
         print(
-            f"全局参考点: ({global_reference_point[0]:.2f}, {global_reference_point[1]:.2f}, {global_reference_point[2]:.2f})")
+            f"全局参考点: ({absolute_reference_point[0]:.2f}, {absolute_reference_point[1]:.2f}, {absolute_reference_point[2]:.2f})")
         print(
-            f"全局平移向量: [{global_translation_vector[0]:.2f}, {global_translation_vector[1]:.2f}, {global_translation_vector[2]:.2f}]")
+            f"全局平移向量: [{self.last_translation_vector[0]:.2f}, {self.last_translation_vector[1]:.2f}, {self.last_translation_vector[2]:.2f}]")
 
         # 对所有电力线应用相同的全局变换
         transformed_clouds = []
@@ -1081,623 +1232,251 @@ class PowerLineExtractor:
         print("所有电力线共用一个坐标系")
         return True
 
-    def _merge_broken_lines(self, power_line_clouds, distance_threshold=2.0, angle_threshold_deg=20):
+    def _line_end_info(self, points, end_fraction=0.1, min_end_points=5):
+        """
+        计算单条线的排序点、端点、外向方向和端部坡度（只做一次PCA）
+
+        :param points: 线点云坐标
+        :param end_fraction: 用于估计端部坡度的点数比例
+        :param min_end_points: 估计端部坡度的最少点数
+        :return: 信息字典
+        """
+        main_dir = self._get_main_direction(points)
+        main_dir = main_dir / (np.linalg.norm(main_dir) + 1e-12)
+        projections = np.dot(points - np.mean(points, axis=0), main_dir)
+        order = np.argsort(projections)
+        sorted_points = points[order]
+        sorted_proj = projections[order]
+
+        # 端部坡度：沿外向方向每前进1米的高度变化
+        k = max(min_end_points, int(len(points) * end_fraction))
+        k = min(k, len(points))
+        slopes = []
+        for sl, sign in ((slice(0, k), -1.0), (slice(len(points) - k, len(points)), 1.0)):
+            proj = sorted_proj[sl]
+            z = sorted_points[sl, 2]
+            if len(proj) >= 2 and np.ptp(proj) > 1e-6:
+                slopes.append(sign * np.polyfit(proj, z, 1)[0])
+            else:
+                slopes.append(0.0)
+
+        return {
+            'points': sorted_points,
+            'direction': main_dir,
+            # 端点顺序：0为起点，1为终点；外向方向分别为 -dir 和 +dir
+            'endpoints': (sorted_points[0], sorted_points[-1]),
+            'outward': (-main_dir, main_dir),
+            'slopes': (slopes[0], slopes[1]),
+        }
+
+    def _stitch_lines_by_endpoint_matching(self, power_line_clouds, max_gap=30.0, max_angle_deg=15.0,
+                                           max_height_diff=3.0, distance_weight=1.0, angle_weight=1.0,
+                                           height_weight=1.0):
         """
-        自动拼接断裂的线段：端点距离+方向一致性
+        单次全局线段拼接：基于端点候选图的贪心最优匹配
+
+        所有线段的端点放入KD树，半径查询得到候选边；边代价由端点间距、方向一致性和高度连续性组成。
+        候选边按代价排序后贪心选取，每个端点最多连接一次，并用并查集避免成环，最后按链拼接点云。
+        每条候选边的代价记录在 self.last_stitch_edges 中（线号为 power_line_clouds 中的序号），便于调试。
 
         :param power_line_clouds: 电力线点云列表
-        :param distance_threshold: 端点距离阈值（米）
-        :param angle_threshold_deg: 方向夹角阈值（度）
+        :param max_gap: 端点最大间距（米）
+        :param max_angle_deg: 方向夹角阈值（度），同时约束两线主方向夹角和间隙方向与外向方向的夹角
+        :param max_height_diff: 端点最大高差（米）
+        :param distance_weight: 间距代价权重
+        :param angle_weight: 方向代价权重
+        :param height_weight: 高度连续性代价权重
         :return: 拼接后的电力线点云列表
         """
-        import math
-        merged = [False] * len(power_line_clouds)
-        lines = []
-        # 先提取每条线的端点和主方向
-        endpoints = []
-        directions = []
-        for cloud in power_line_clouds:
+        self.last_stitch_edges = []
+        if len(power_line_clouds) <= 1:
+            return list(power_line_clouds)
+
+        # 预计算每条线的端点信息（每条线只做一次PCA）
+        # source_index 记录每条参与匹配的线在输入列表中的序号，调试记录中的线号均为输入序号
+        infos = []
+        clouds = []
+        source_index = []
+        passthrough = []
+        for index, cloud in enumerate(power_line_clouds):
             points = np.asarray(cloud.points)
             if len(points) < 2:
-                endpoints.append((points[0], points[0]))
-                directions.append(np.array([1,0,0]))
+                passthrough.append(cloud)
                 continue
-            # 按主方向排序
-            main_dir = self._get_main_direction(points)
-            center = np.mean(points, axis=0)
-            projections = np.dot(points - center, main_dir)
-            idx_sort = np.argsort(projections)
-            sorted_points = points[idx_sort]
-            start, end = sorted_points[0], sorted_points[-1]
-            endpoints.append((start, end))
-            directions.append(main_dir)
-            lines.append(sorted_points)
-
-        # 标记已合并
-        used = [False] * len(lines)
-        merged_lines = []
-        for i in range(len(lines)):
-            if used[i]:
+            infos.append(self._line_end_info(points))
+            clouds.append(cloud)
+            source_index.append(index)
+
+        n = len(infos)
+        if n <= 1:
+            return list(power_line_clouds)
+
+        # 端点编号：2*i 为第i条线的起点，2*i+1 为终点
+        endpoint_xyz = np.array([infos[e // 2]['endpoints'][e % 2] for e in range(2 * n)])
+        from scipy.spatial import KDTree
+        pairs = KDTree(endpoint_xyz).query_pairs(max_gap, output_type='ndarray')
+
+        cos_limit = np.cos(np.radians(max_angle_deg))
+        edges = []
+        for a, b in pairs:
+            line_a, end_a = divmod(int(a), 2)
+            line_b, end_b = divmod(int(b), 2)
+            if line_a == line_b:
                 continue
-            cur_line = lines[i]
-            cur_dir = directions[i]
-            cur_start, cur_end = endpoints[i]
-            changed = True
-            while changed:
-                changed = False
-                for j in range(len(lines)):
-                    if i == j or used[j]:
-                        continue
-                    other_line = lines[j]
-                    other_dir = directions[j]
-                    other_start, other_end = endpoints[j]
-                    # 计算端点距离
-                    dist_end2start = np.linalg.norm(cur_end - other_start)
-                    dist_end2end = np.linalg.norm(cur_end - other_end)
-                    dist_start2start = np.linalg.norm(cur_start - other_start)
-                    dist_start2end = np.linalg.norm(cur_start - other_end)
-                    # 计算方向夹角
-                    angle = lambda v1, v2: np.degrees(np.arccos(np.clip(np.dot(v1, v2) / (np.linalg.norm(v1)*np.linalg.norm(v2)), -1, 1)))
-                    # 只考虑end->start拼接
-                    if dist_end2start < distance_threshold and angle(cur_dir, other_dir) < angle_threshold_deg:
-                        # 插值补点
-                        if dist_end2start > 2.0:
-                            num_interp = int(dist_end2start // 1.0)
-                            interp_points = [cur_end + (other_start - cur_end) * (k / (num_interp + 1)) for k in range(1, num_interp + 1)]
-                            cur_line = np.vstack([cur_line, interp_points, other_line])
-                        else:
-                            cur_line = np.vstack([cur_line, other_line])
-                        cur_end = other_end
-                        cur_dir = self._get_main_direction(cur_line)
-                        used[j] = True
-                        changed = True
-                        break
-                    # 也可以考虑end->end, start->start, start->end
-                    elif dist_end2end < distance_threshold and angle(cur_dir, -other_dir) < angle_threshold_deg:
-                        # 反转other_line
-                        if dist_end2end > 2.0:
-                            num_interp = int(dist_end2end // 1.0)
-                            interp_points = [cur_end + (other_end - cur_end) * (k / (num_interp + 1)) for k in range(1, num_interp + 1)]
-                            cur_line = np.vstack([cur_line, interp_points, other_line[::-1]])
-                        else:
-                            cur_line = np.vstack([cur_line, other_line[::-1]])
-                        cur_end = other_start
-                        cur_dir = self._get_main_direction(cur_line)
-                        used[j] = True
-                        changed = True
-                        break
-                    elif dist_start2start < distance_threshold and angle(-cur_dir, other_dir) < angle_threshold_deg:
-                        # 反转cur_line
-                        if dist_start2start > 2.0:
-                            num_interp = int(dist_start2start // 1.0)
-                            interp_points = [cur_start + (other_start - cur_start) * (k / (num_interp + 1)) for k in range(1, num_interp + 1)]
-                            cur_line = np.vstack([cur_line[::-1], interp_points, other_line])
-                        else:
-                            cur_line = np.vstack([cur_line[::-1], other_line])
-                        cur_start = other_end
-                        cur_dir = self._get_main_direction(cur_line)
-                        used[j] = True
-                        changed = True
-                        break
-                    elif dist_start2end < distance_threshold and angle(-cur_dir, -other_dir) < angle_threshold_deg:
-                        # 反转cur_line和other_line
-                        if dist_start2end > 2.0:
-                            num_interp = int(dist_start2end // 1.0)
-                            interp_points = [cur_start + (other_end - cur_start) * (k / (num_interp + 1)) for k in range(1, num_interp + 1)]
-                            cur_line = np.vstack([cur_line[::-1], interp_points, other_line[::-1]])
-                        else:
-                            cur_line = np.vstack([cur_line[::-1], other_line[::-1]])
-                        cur_start = other_start
-                        cur_dir = self._get_main_direction(cur_line)
-                        used[j] = True
-                        changed = True
-                        break
-            used[i] = True
-            # 合并后生成新的点云对象
-            merged_cloud = o3d.geometry.PointCloud()
-            merged_cloud.points = o3d.utility.Vector3dVector(cur_line)
-            merged_lines.append(merged_cloud)
-        return merged_lines
+            info_a, info_b = infos[line_a], infos[line_b]
 
-    def _iterative_merge_broken_lines(self, power_line_clouds, initial_distance=2.0, initial_angle=15, max_rounds=3, distance_step=1.0, angle_step=5):
-        """
-        智能断裂线段合并，基于空间线性聚类理论
-        :param power_line_clouds: 电力线点云列表
-        :param initial_distance: 初始端点距离阈值
-        :param initial_angle: 初始方向夹角阈值  
-        :param max_rounds: 最大迭代轮数
-        :param distance_step: 每轮距离阈值递增
-        :param angle_step: 每轮角度阈值递增
-        :return: 拼接后的电力线点云列表
-        """
-        import time
-        start_time = time.time()
-        print(f"开始智能合并断裂线段，共{len(power_line_clouds)}条...")
-        
-        merged_lines = power_line_clouds
-        
-        # 第一步：基于共线性的预合并
-        step1_start = time.time()
-        merged_lines = self._collinearity_based_merge(merged_lines)
-        step1_time = time.time() - step1_start
-        print(f"共线性预合并完成，耗时{step1_time:.2f}秒")
-        
-        # # 第二步：多轮渐进式合并
-        # step2_start = time.time()
-        # for round in range(max_rounds):
-        #     distance = initial_distance + round * distance_step
-        #     angle = initial_angle + round * angle_step
-        #     before = len(merged_lines)
-            
-        #     # 使用改进的合并策略
-        #     round_start = time.time()
-        #     merged_lines = self._enhanced_merge_broken_lines(merged_lines, 
-        #                                                    distance_threshold=distance, 
-        #                                                    angle_threshold_deg=angle,
-        #                                                    round_num=round)
-        #     round_time = time.time() - round_start
-        #     after = len(merged_lines)
-        #     print(f"[合并轮次 {round+1}] 距离阈值: {distance:.1f}m, 角度阈值: {angle}°，线段数: {before} → {after}，耗时{round_time:.2f}秒")
-            
-        #     # 如果连续两轮无变化，提前退出
-        #     if after == before and round > 0:
-        #         print(f"第{round+1}轮无变化，合并完成")
-        #         break
-        # step2_time = time.time() - step2_start
-        
-        # # 第三步：基于距离统计的最终整理
-        # step3_start = time.time()
-        # merged_lines = self._statistical_distance_refinement(merged_lines)
-        # step3_time = time.time() - step3_start
-        
-        # # 第四步：针对明显断裂的长线段进行二次合并
-        # step4_start = time.time()
-        # final_merged_lines = self._secondary_merge_for_long_lines(merged_lines)
-        # step4_time = time.time() - step4_start
-        
-        # total_time = time.time() - start_time
-        # print(f"断裂线段合并完成，最终保留{len(final_merged_lines)}条电力线")
-        # print(f"时间统计 - 共线性预合并: {step1_time:.2f}s，渐进式合并: {step2_time:.2f}s，距离整理: {step3_time:.2f}s，二次合并: {step4_time:.2f}s，总耗时: {total_time:.2f}s")
-        # return final_merged_lines
-        return merged_lines
-    
-    def _collinearity_based_merge(self, power_line_clouds, max_distance=50.0, angle_threshold_deg=15.0, prefer_closest=False):
-        """
-        基于共线性的预合并：合并明显共线的短线段（优化版本）
-        
-        :param power_line_clouds: 电力线点云列表
-        :param max_distance: 最大合并距离阈值
-        :param angle_threshold_deg: 角度阈值（度）
-        :param prefer_closest: 是否优先合并距离最近的线段（True=二次合并模式，False=常规合并模式）
-        """
-        if len(power_line_clouds) <= 1:
-            return power_line_clouds
-            
-        merged = []
-        used = [False] * len(power_line_clouds)
-        
-        # 预计算所有线段的端点和方向（避免重复计算）
-        line_info = []
-        for i, cloud in enumerate(power_line_clouds):
-            points = np.asarray(cloud.points)
-            if len(points) < 2:
-                line_info.append({
-                    'start': points[0] if len(points) > 0 else np.array([0, 0, 0]),
-                    'end': points[0] if len(points) > 0 else np.array([0, 0, 0]),
-                    'direction': np.array([1, 0, 0]),
-                    'valid': False
-                })
+            # 两线主方向夹角（与方向符号无关）
+            cos_dir = abs(float(np.dot(info_a['direction'], info_b['direction'])))
+            if cos_dir < cos_limit:
                 continue
-            
-            start_point = points[0]
-            end_point = points[-1]
-            direction = self._get_main_direction(points)
-            
-            line_info.append({
-                'start': start_point,
-                'end': end_point,
-                'direction': direction,
-                'valid': True
+            angle_deg = float(np.degrees(np.arccos(np.clip(cos_dir, 0.0, 1.0))))
+
+            # 间隙方向必须沿着两端的外向方向（排除并行导线之间的横向连接）
+            gap_vec = endpoint_xyz[b] - endpoint_xyz[a]
+            gap = float(np.linalg.norm(gap_vec))
+            if gap > 1e-6:
+                gap_dir = gap_vec / gap
+                cos_a = float(np.dot(info_a['outward'][end_a], gap_dir))
+                cos_b = float(np.dot(info_b['outward'][end_b], -gap_dir))
+                if gap > 1.0 and (cos_a < cos_limit or cos_b < cos_limit):
+                    continue
+                angle_deg = max(angle_deg, float(np.degrees(np.arccos(np.clip(min(cos_a, cos_b), -1.0, 1.0)))))
+
+            # 高度连续性：端点高差 + 端部坡度突变（连续导线两侧外向坡度互为相反数）
+            height_diff = abs(float(endpoint_xyz[a][2] - endpoint_xyz[b][2]))
+            if height_diff > max_height_diff:
+                continue
+            slope_break = abs(info_a['slopes'][end_a] + info_b['slopes'][end_b])
+
+            cost = (distance_weight * gap / max_gap
+                    + angle_weight * angle_deg / max_angle_deg
+                    + height_weight * (height_diff / max_height_diff + slope_break))
+            edges.append((cost, line_a, end_a, line_b, end_b, gap, angle_deg, height_diff, slope_break))
+
+        # 贪心匹配：按代价升序，每个端点度数<=1，并查集防止成环
+        edges.sort(key=lambda e: e[0])
+        parent = list(range(n))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        partner = {}
+        for cost, line_a, end_a, line_b, end_b, gap, angle_deg, height_diff, slope_break in edges:
+            ep_a, ep_b = 2 * line_a + end_a, 2 * line_b + end_b
+            accepted = False
+            if ep_a not in partner and ep_b not in partner:
+                root_a, root_b = find(line_a), find(line_b)
+                if root_a != root_b:
+                    parent[root_a] = root_b
+                    partner[ep_a] = ep_b
+                    partner[ep_b] = ep_a
+                    accepted = True
+            self.last_stitch_edges.append({
+                'line_a': source_index[line_a], 'end_a': 'start' if end_a == 0 else 'end',
+                'line_b': source_index[line_b], 'end_b': 'start' if end_b == 0 else 'end',
+                'gap': gap, 'angle_deg': angle_deg, 'height_diff': height_diff,
+                'slope_break': slope_break, 'cost': cost, 'accepted': accepted,
             })
-        
-        # print("共线性预合并...")
-        for i, cloud_i in enumerate(tqdm(power_line_clouds, desc="共线性检查", ncols=100)):
-            if used[i]:
+
+        # 沿链遍历：从有自由端的线开始，依次拼接
+        visited = [False] * n
+        stitched = []
+        for i in range(n):
+            if visited[i]:
                 continue
-                
-            if not line_info[i]['valid']:
-                merged.append(cloud_i)
-                used[i] = True
+            # 找到链头：沿起点方向回溯到自由端
+            head, head_end = i, 0
+            while 2 * head + head_end in partner:
+                nxt = partner[2 * head + head_end]
+                nxt_line, nxt_end = divmod(nxt, 2)
+                if nxt_line == i:
+                    break
+                head, head_end = nxt_line, 1 - nxt_end
+
+            chain = []
+            line, entry_end = head, head_end
+            while True:
+                visited[line] = True
+                points = infos[line]['points']
+                chain.append(points if entry_end == 0 else points[::-1])
+                exit_ep = 2 * line + (1 - entry_end)
+                if exit_ep not in partner:
+                    break
+                line, entry_end = divmod(partner[exit_ep], 2)
+
+            if len(chain) == 1:
+                stitched.append(clouds[head])
                 continue
-                
-            start_i = line_info[i]['start']
-            end_i = line_info[i]['end']
-            dir_i = line_info[i]['direction']
-            
-            if prefer_closest:
-                # 二次合并模式：查找共线的线段，并记录距离信息，优先合并最近的
-                collinear_candidates = []
-                for j, cloud_j in enumerate(power_line_clouds):
-                    if used[j] or i == j or not line_info[j]['valid']:
-                        continue
-                        
-                    start_j = line_info[j]['start']
-                    end_j = line_info[j]['end']
-                    
-                    # 向量化计算端点距离
-                    endpoints1 = np.array([start_i, end_i])
-                    endpoints2 = np.array([start_j, end_j])
-                    distances = np.linalg.norm(endpoints1[:, np.newaxis, :] - endpoints2[np.newaxis, :, :], axis=2)
-                    min_dist = float(np.min(distances))
-                    
-                    # 只有端点距离满足条件才检查角度共线性
-                    if min_dist <= max_distance:
-                        # 检查角度是否共线
-                        cos_angle = np.abs(np.dot(dir_i, line_info[j]['direction']))
-                        angle_deg = np.degrees(np.arccos(np.clip(cos_angle, 0, 1)))
-                        
-                        if angle_deg < angle_threshold_deg:
-                            collinear_candidates.append((j, min_dist))
-                
-                # 如果有多个共线候选，按距离排序，优先合并距离最近的
-                if collinear_candidates:
-                    # 按距离排序，距离近的优先
-                    collinear_candidates.sort(key=lambda x: x[1])
-                    
-                    # 只选择距离最近的一条进行合并
-                    best_match_idx = collinear_candidates[0][0]
-                    collinear_group = [i, best_match_idx]
-                    
-                    all_points = []
-                    for idx in collinear_group:
-                        all_points.extend(np.asarray(power_line_clouds[idx].points))
-                        used[idx] = True
-                    
-                    # 创建合并后的点云
-                    merged_cloud = o3d.geometry.PointCloud()
-                    merged_cloud.points = o3d.utility.Vector3dVector(np.array(all_points))
-                    merged.append(merged_cloud)
-                    
-                    # 输出合并信息
-                    min_distance = collinear_candidates[0][1]
-                    # print(f"  合并线段 {i} 和 {best_match_idx}，距离: {min_distance:.2f}m（共有{len(collinear_candidates)}个候选）")
-                else:
-                    merged.append(cloud_i)
-                    used[i] = True
-            else:
-                # 常规合并模式：查找所有共线的线段并全部合并
-                collinear_group = [i]
-                for j, cloud_j in enumerate(power_line_clouds):
-                    if used[j] or i == j or not line_info[j]['valid']:
-                        continue
-                        
-                    start_j = line_info[j]['start']
-                    end_j = line_info[j]['end']
-                    
-                    # 向量化计算端点距离
-                    endpoints1 = np.array([start_i, end_i])
-                    endpoints2 = np.array([start_j, end_j])
-                    distances = np.linalg.norm(endpoints1[:, np.newaxis, :] - endpoints2[np.newaxis, :, :], axis=2)
-                    min_dist = float(np.min(distances))
-                    
-                    # 检查距离和角度
-                    if min_dist <= max_distance:
-                        cos_angle = np.abs(np.dot(dir_i, line_info[j]['direction']))
-                        angle_deg = np.degrees(np.arccos(np.clip(cos_angle, 0, 1)))
-                        
-                        if angle_deg < angle_threshold_deg:
-                            collinear_group.append(j)
-                
-                # 合并共线线段
-                if len(collinear_group) > 1:
-                    all_points = []
-                    for idx in collinear_group:
-                        all_points.extend(np.asarray(power_line_clouds[idx].points))
-                        used[idx] = True
-                    
-                    # 创建合并后的点云
-                    merged_cloud = o3d.geometry.PointCloud()
-                    merged_cloud.points = o3d.utility.Vector3dVector(np.array(all_points))
-                    merged.append(merged_cloud)
-                else:
-                    merged.append(cloud_i)
-                    used[i] = True
-        
-        return merged
+            merged_cloud = o3d.geometry.PointCloud()
+            merged_cloud.points = o3d.utility.Vector3dVector(np.vstack(chain))
+            stitched.append(merged_cloud)
 
-    def _are_collinear(self, points1, points2, threshold=0.5, max_distance=30.0, angle_threshold_deg=20.0):
-        """
-        检查两组点是否共线且距离合理（优化版本）
-        
-        :param points1: 第一组点
-        :param points2: 第二组点
-        :param threshold: 共线性阈值
-        :param max_distance: 最大距离阈值
-        :param angle_threshold_deg: 角度阈值（度）
-        """
-        # 首先进行快速距离检查（避免不必要的方向计算）
-        start1, end1 = points1[0], points1[-1]
-        start2, end2 = points2[0], points2[-1]
-        
-        # 向量化计算所有端点间距离
-        endpoints1 = np.array([start1, end1])
-        endpoints2 = np.array([start2, end2])
-        
-        # 计算所有端点组合的距离
-        distances = np.linalg.norm(endpoints1[:, np.newaxis, :] - endpoints2[np.newaxis, :, :], axis=2)
-        min_dist = float(np.min(distances))
-        
-        # 如果距离太远，直接返回False
-        if min_dist > max_distance:
-            return False
-        
-        # 获取两条线的主方向（使用缓存）
-        dir1 = self._get_main_direction(points1)
-        dir2 = self._get_main_direction(points2)
-        
-        # 计算方向夹角（使用向量化操作）
-        cos_angle = np.abs(np.dot(dir1, dir2))
-        angle_deg = np.degrees(np.arccos(np.clip(cos_angle, 0, 1)))
-        
-        return angle_deg < angle_threshold_deg  # 方向夹角小于阈值认为共线
-    
-    def _enhanced_merge_broken_lines(self, power_line_clouds, distance_threshold, angle_threshold_deg, round_num):
-        """
-        增强的断裂线段合并，使用改进策略
-        """
-        # 第一轮使用较严格的标准，后续轮次逐渐放宽
-        if round_num == 0:
-            # 严格合并：只合并明显断裂的线段
-            return self._merge_broken_lines(power_line_clouds, distance_threshold, angle_threshold_deg)
-        else:
-            # 宽松合并：考虑更多可能的连接
-            return self._flexible_merge_broken_lines(power_line_clouds, distance_threshold, angle_threshold_deg)
-    
-    def _flexible_merge_broken_lines(self, power_line_clouds, distance_threshold, angle_threshold_deg):
-        """
-        灵活的断裂线段合并，允许更多连接可能性
-        """
-        if len(power_line_clouds) <= 1:
-            return power_line_clouds
-        
-        # 使用原有的合并逻辑，但稍微放宽参数
-        return self._merge_broken_lines(power_line_clouds, 
-                                      distance_threshold * 1.2, 
-                                      angle_threshold_deg * 1.3)
-    
-    def _statistical_distance_refinement(self, power_line_clouds):
+        n_accepted = sum(1 for e in self.last_stitch_edges if e['accepted'])
+        print(f"端点匹配拼接: 候选边{len(self.last_stitch_edges)}条，接受{n_accepted}条，{n}条 → {len(stitched)}条")
+        return stitched + passthrough
+
+    def _align_parallel_lines(self, power_line_clouds, direction_angle_threshold=8):
         """
-        基于距离统计的最终整理
+        温和的端点对齐，让并行电力线看起来更整齐
+        :param power_line_clouds: 电力线点云列表
+        :param direction_angle_threshold: 主方向夹角阈值（度）
+        :return: 端点对齐后的电力线点云列表
         """
-        if len(power_line_clouds) <= 2:
-            return power_line_clouds
-        
-        # 计算所有线段间的最小距离
-        distances = []
-        for i in range(len(power_line_clouds)):
-            for j in range(i+1, len(power_line_clouds)):
-                points_i = np.asarray(power_line_clouds[i].points)
-                points_j = np.asarray(power_line_clouds[j].points)
-                
-                min_dist = float('inf')
-                for p1 in [points_i[0], points_i[-1]]:
-                    for p2 in [points_j[0], points_j[-1]]:
-                        dist = np.linalg.norm(p1 - p2)
-                        min_dist = min(min_dist, dist)
-                distances.append(min_dist)
-        
-        if not distances:
-            return power_line_clouds
-        
-        # 使用统计方法确定合并阈值
-        mean_dist = np.mean(distances)
-        std_dist = np.std(distances)
-        adaptive_threshold = mean_dist - 0.5 * std_dist
+        # print(f"正在进行端点对齐，共{len(power_line_clouds)}条电力线...")
         
-        if adaptive_threshold > 0 and adaptive_threshold < 3.0:
-            # 使用自适应阈值进行最终合并
-            return self._merge_broken_lines(power_line_clouds, 
-                                          float(adaptive_threshold), 
-                                          angle_threshold_deg=10)
-        else:
-            return power_line_clouds
-    
-    def _secondary_merge_for_long_lines(self, power_line_clouds):
-        """
-        针对明显断裂的长线段进行二次合并（更激进但保持谨慎）
-        """
         if len(power_line_clouds) <= 1:
             return power_line_clouds
-        
-        # print(f"开始二次合并，当前{len(power_line_clouds)}条线段...")
-        
-        # 第一步：识别潜在的长线段（基于长度和方向一致性）
-        long_line_candidates = self._identify_long_line_candidates(power_line_clouds)
-        
-        # 第二步：对长线段候选进行更激进的合并
-        merged_lines = self._aggressive_merge_candidates(power_line_clouds, long_line_candidates)
-        
-        # # print(f"二次合并完成：{len(power_line_clouds)}条 → {len(merged_lines)}条")
-        return merged_lines
-    
-    def _identify_long_line_candidates(self, power_line_clouds):
-        """
-        识别潜在的长线段候选（基于长度和空间分布）
-        """
-        candidates = []
-        
-        # 计算每条线的基本信息
+            
+        # 1. 计算每条线的主方向和端点
         line_info = []
-        # print("分析候选长线段...")
-        for i, cloud in enumerate(tqdm(power_line_clouds, desc="分析线段", ncols=100)):
+        for i, cloud in enumerate(power_line_clouds):
             points = np.asarray(cloud.points)
-            if len(points) < 5:
+            if len(points) < 3:
+                line_info.append(None)
                 continue
                 
-            length = self._calculate_power_line_length(cloud)
-            direction = self._get_main_direction(points)
-            center = np.mean(points, axis=0)
-            
+            main_dir = self._get_main_direction(points)
+            # 统一方向（避免方向相反的情况）
+            if main_dir[0] < 0:
+                main_dir = -main_dir
+                
             # 计算端点
-            projections = np.dot(points - center, direction)
+            center = np.mean(points, axis=0)
+            projections = np.dot(points - center, main_dir)
             min_idx = np.argmin(projections)
             max_idx = np.argmax(projections)
             start_point = points[min_idx]
             end_point = points[max_idx]
             
             line_info.append({
-                'index': i,
-                'length': length,
-                'direction': direction,
-                'center': center,
+                'points': points,
+                'direction': main_dir,
                 'start': start_point,
                 'end': end_point,
-                'points': points
+                'center': center
             })
         
-        # 按长度排序，优先处理较长的线段
-        line_info.sort(key=lambda x: x['length'], reverse=True)
+        # 2. 按方向分组（只有方向非常接近的才分组）
+        groups = []
+        used = [False] * len(line_info)
         
-        # 寻找可能断裂的长线段
-        used = set()
-        for info in line_info:
-            if info['index'] in used or info['length'] < 20:  # 只考虑长度>=20米的线段
+        for i, info_i in enumerate(line_info):
+            if used[i] or info_i is None:
                 continue
                 
-            # 寻找与当前线段方向一致且距离较近的其他线段
-            candidate_group = [info['index']]
+            group = [i]
+            used[i] = True
             
-            for other_info in line_info:
-                if (other_info['index'] in used or 
-                    other_info['index'] == info['index'] or 
-                    other_info['length'] < 10):  # 其他线段至少10米
+            for j, info_j in enumerate(line_info):
+                if used[j] or info_j is None or i == j:
                     continue
-                
-                # 检查方向一致性（允许更大的角度差异）
+                    
+                # 计算方向夹角
                 angle = np.degrees(np.arccos(np.clip(
-                    np.abs(np.dot(info['direction'], other_info['direction'])), 0, 1)))
-                
-                if angle > 15:  # 方向差异不能超过15度
-                    continue
-                
-                # 检查空间距离（端点之间的最近距离）
-                min_dist = float('inf')
-                for p1 in [info['start'], info['end']]:
-                    for p2 in [other_info['start'], other_info['end']]:
-                        dist = np.linalg.norm(p1 - p2)
-                        min_dist = min(min_dist, dist)
-                
-                if min_dist < 5.0:  # 端点距离小于5米
-                    candidate_group.append(other_info['index'])
-            
-            if len(candidate_group) > 1:
-                candidates.append(candidate_group)
-                used.update(candidate_group)
-        
-        return candidates
-    
-    def _aggressive_merge_candidates(self, power_line_clouds, candidates):
-        """
-        对长线段候选进行更激进的合并
-        """
-        merged_lines = []
-        used = set()
-        
-        # print("合并候选线段组...")
-        for candidate_group in tqdm(candidates, desc="合并候选组", ncols=100):
-            if len(candidate_group) <= 1:
-                continue
-                
-            # 合并候选组中的所有线段
-            all_points = []
-            for idx in candidate_group:
-                if idx < len(power_line_clouds):
-                    points = np.asarray(power_line_clouds[idx].points)
-                    all_points.extend(points)
-                    used.add(idx)
-            
-            if all_points:
-                # 按主方向排序所有点
-                all_points = np.array(all_points)
-                main_dir = self._get_main_direction(all_points)
-                center = np.mean(all_points, axis=0)
-                projections = np.dot(all_points - center, main_dir)
-                sorted_indices = np.argsort(projections)
-                sorted_points = all_points[sorted_indices]
-                
-                # 创建合并后的点云
-                merged_cloud = o3d.geometry.PointCloud()
-                merged_cloud.points = o3d.utility.Vector3dVector(sorted_points)
-                merged_lines.append(merged_cloud)
-                
-                # print(f"合并了{len(candidate_group)}条线段，总长度: {self._calculate_power_line_length(merged_cloud):.1f}米")
-        
-        # 添加未参与合并的线段
-        for i, cloud in enumerate(power_line_clouds):
-            if i not in used:
-                merged_lines.append(cloud)
-        
-        return merged_lines
-
-    def _align_parallel_lines(self, power_line_clouds, direction_angle_threshold=8):
-        """
-        温和的端点对齐，让并行电力线看起来更整齐
-        :param power_line_clouds: 电力线点云列表
-        :param direction_angle_threshold: 主方向夹角阈值（度）
-        :return: 端点对齐后的电力线点云列表
-        """
-        # print(f"正在进行端点对齐，共{len(power_line_clouds)}条电力线...")
-        
-        if len(power_line_clouds) <= 1:
-            return power_line_clouds
-            
-        # 1. 计算每条线的主方向和端点
-        line_info = []
-        for i, cloud in enumerate(power_line_clouds):
-            points = np.asarray(cloud.points)
-            if len(points) < 3:
-                line_info.append(None)
-                continue
-                
-            main_dir = self._get_main_direction(points)
-            # 统一方向（避免方向相反的情况）
-            if main_dir[0] < 0:
-                main_dir = -main_dir
-                
-            # 计算端点
-            center = np.mean(points, axis=0)
-            projections = np.dot(points - center, main_dir)
-            min_idx = np.argmin(projections)
-            max_idx = np.argmax(projections)
-            start_point = points[min_idx]
-            end_point = points[max_idx]
-            
-            line_info.append({
-                'points': points,
-                'direction': main_dir,
-                'start': start_point,
-                'end': end_point,
-                'center': center
-            })
-        
-        # 2. 按方向分组（只有方向非常接近的才分组）
-        groups = []
-        used = [False] * len(line_info)
-        
-        for i, info_i in enumerate(line_info):
-            if used[i] or info_i is None:
-                continue
-                
-            group = [i]
-            used[i] = True
-            
-            for j, info_j in enumerate(line_info):
-                if used[j] or info_j is None or i == j:
-                    continue
-                    
-                # 计算方向夹角
-                angle = np.degrees(np.arccos(np.clip(
-                    np.dot(info_i['direction'], info_j['direction']), -1, 1)))
+                    np.dot(info_i['direction'], info_j['direction']), -1, 1)))
                 
                 # 只有方向非常接近的才分组
                 if angle < direction_angle_threshold:
@@ -1772,6 +1551,131 @@ class PowerLineExtractor:
         # print(f"端点对齐完成，保持了所有{len(aligned_lines)}条电力线")
         return aligned_lines
 
+    def _count_points(self, clouds):
+        """
+        统计点云列表的总点数
+        """
+        return int(sum(len(cloud.points) for cloud in clouds))
+
+    def _pack_clouds(self, clouds):
+        """
+        将点云列表打包为可写入缓存的数组字典
+        """
+        return pack_lines([np.asarray(cloud.points) for cloud in clouds])
+
+    def _unpack_clouds(self, arrays):
+        """
+        从缓存数组字典还原点云列表
+        """
+        clouds = []
+        for points in unpack_lines(arrays):
+            cloud = o3d.geometry.PointCloud()
+            cloud.points = o3d.utility.Vector3dVector(points)
+            clouds.append(cloud)
+        return clouds
+
+    def _run_cached_stage(self, cache, stage_keys, resume_idx, resume_arrays, stage, compute, encode, decode):
+        """
+        执行一个可缓存的阶段：位于已缓存前缀内则直接读取，否则计算并写入缓存
+
+        续算起点（resume_idx 阶段）的输出在查找缓存时已经读出（resume_arrays），不会再因读取失败而
+        在被跳过阶段留下的空输入上重新计算；更浅的阶段读取失败时其输入都是实际计算得到的，可以安全地重新计算。
+
+        :param cache: StageCache对象，None表示不使用缓存
+        :param stage_keys: 各阶段的缓存键
+        :param resume_idx: 已缓存的最深阶段序号，-1表示无缓存
+        :param resume_arrays: 该阶段已读出的数组字典
+        :param stage: 阶段名
+        :param compute: 计算该阶段输出的函数
+        :param encode: 输出 -> 数组字典
+        :param decode: 数组字典 -> 输出
+        :return: 阶段输出
+        """
+        stage_idx = STAGES.index(stage)
+        if cache is not None and stage_idx == resume_idx:
+            print(f"[缓存] 阶段 '{stage}' 从缓存读取")
+            return decode(resume_arrays)
+        if cache is not None and resume_idx > stage_idx:
+            arrays = cache.load(stage, stage_keys[stage])
+            if arrays is not None:
+                print(f"[缓存] 阶段 '{stage}' 从缓存读取")
+                return decode(arrays)
+        result = compute()
+        if cache is not None:
+            cache.save(stage, stage_keys[stage], encode(result))
+        return result
+
+    def _sampling_params(self):
+        """
+        采样步长由时间预算规划指定时参与缓存键（默认分档时不加入，已有缓存键保持不变）
+        """
+        if self.linearity_sample_step is None:
+            return {}
+        return {'linearity_sample_step': int(self.linearity_sample_step)}
+
+    def _result_cache_key(self, cache, input_file, extract_params):
+        """
+        整次提取结果的缓存键：输入内容哈希 + 提取器版本 + 构造参数与 extract() 参数
+
+        :param cache: ResultCache对象
+        :param input_file: 输入文件路径
+        :param extract_params: 影响输出的 extract() 参数字典
+        """
+        params = {'threshold': self.threshold, 'radius': self.radius, 'height_min': self.height_min,
+                  'height_max': self.height_max, 'eps': self.eps, 'min_samples': self.min_samples,
+                  'coord_dtype': self.coord_dtype}
+        params.update(self._sampling_params())
+        if self.compress_output:
+            params['compress_output'] = True
+        if self.line_geometry_output:
+            params['line_geometry'] = True
+        params.update(extract_params)
+        return cache.key(input_file, 'extract', EXTRACTOR_VERSION, params)
+
+    @staticmethod
+    def _output_names(input_file, compress=False, line_geometry=False):
+        """
+        返回 {输出名: 当前目录下的输出文件名}；compress=True 时电力线点云为 .laz，
+        line_geometry=True 时包含二进制几何容器
+        """
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
+        names = {'powerline_las': las_io.powerline_las_name(input_file, compress),
+                 'powerline_endpoints': f"{base_name}_powerline_endpoints.json"}
+        if line_geometry:
+            names['line_geometry'] = line_geometry_name(input_file)
+        return names
+
+    def _restore_result(self, cache, key, input_file):
+        """
+        结果缓存命中时把电力线LAS与端点JSON复制到当前目录，并还原平移向量和电力线点云
+
+        :return: 变换后的电力线点云列表；未命中返回None
+        """
+        manifest = cache.restore(key, self._output_names(input_file, self.compress_output, self.line_geometry_output))
+        if manifest is None:
+            return None
+        with np.load(cache.file_path(key, 'lines'), allow_pickle=False) as data:
+            lines = self._unpack_clouds({name: data[name] for name in data.files})
+        self.last_translation_vector = np.asarray(manifest['metadata']['translation_vector'], dtype=np.float64)
+        return lines
+
+    def _store_result(self, cache, key, input_file, final_power_lines):
+        """
+        将本次提取的输出文件、电力线点云和平移向量写入结果缓存
+        """
+        import tempfile
+
+        files = self._output_names(input_file, self.compress_output, self.line_geometry_output)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            lines_path = os.path.join(tmp_dir, 'lines.npz')
+            np.savez(lines_path, **self._pack_clouds(final_power_lines))
+            files['lines'] = lines_path
+            cache.store(key, files, {
+                'input_file': os.path.basename(input_file),
+                'line_count': len(final_power_lines),
+                'translation_vector': np.asarray(self.last_translation_vector, dtype=np.float64).tolist(),
+            })
+
     def _safe_visualize(self, geometries, window_name="Point Cloud", width=1200, height=800):
         """
         安全的可视化函数，处理可视化模块不可用的情况
@@ -1796,117 +1700,84 @@ class PowerLineExtractor:
             import traceback
             traceback.print_exc()
 
-    def extract(self, input_file, save_line_cloud=None, save_out_cloud=None,
-                min_line_points=50, min_line_length=10.0, length_method='projection',
-                reference_point_method='center', visualize_steps=None, use_dynamic_params=True):
+    def _clusters_from_labels(self, points, labels):
         """
-        完整的电力线提取和可视化流程
+        步骤3：按DBSCAN标签拆分点云，每个聚类着不同颜色（噪声点丢弃）
 
-        :param input_file: 输入文件路径
-        :param save_line_cloud: 保存线点云的文件路径（可选）
-        :param save_out_cloud: 保存非线点云的文件路径（可选）
-        :param min_line_points: 聚类筛选的最小点数阈值，默认50
-        :param min_line_length: 最小电力线长度阈值，默认10.0米
-        :param length_method: 计算长度的方法，'projection'或'path'
-        :param reference_point_method: 坐标变换的全局参考点选择方法
-        :param visualize_steps: 是否在每步后进行可视化，None表示使用类属性enable_visualization
-        :return: 变换后的电力线点云列表
+        :param points: 线点坐标 (N, 3)
+        :param labels: 与points一一对应的聚类标签
+        :return: 聚类点云列表
         """
-        # 记录程序开始时间
-        import time
-        program_start_time = time.time()
-        
-        # 确定是否开启可视化
-        if visualize_steps is None:
-            visualize_steps = self.enable_visualization
-        
-        print("=" * 60)
-        print("开始电力线提取流程")
-        print(f"可视化模式: {'开启' if visualize_steps else '关闭'}")
-        print(f"开始时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        print("=" * 60)
-        
-        # 步骤1: 读取点云数据
-        print("\n步骤1：读取原始点云...")
-        step1_start = time.time()
-        point_cloud = self._read_point_cloud(input_file)
-        step1_time = time.time() - step1_start
-        print(f"原始点云包含 {len(point_cloud.points)} 个点，耗时{step1_time:.2f}秒")
-        
-        # 步骤2: 线性特征提取
-        print("\n步骤2：计算线性特征并分割...")
-        step2_start = time.time()
-        line_cloud, out_line_cloud = self._power_line_segmentation(point_cloud, use_dynamic_params=use_dynamic_params)
-        step2_time = time.time() - step2_start
-        print(f"线性特征点云: {len(line_cloud.points)} 个点")
-        print(f"非线性特征点云: {len(out_line_cloud.points)} 个点，耗时{step2_time:.2f}秒")
-        
-        # 步骤3: DBSCAN聚类
-        print("\n步骤3：DBSCAN聚类分组...")
-        step3_start = time.time()
-        points = np.asarray(line_cloud.points)
-        labels = self._dbscan_clustering(points)
-        step3_time = time.time() - step3_start
-        unique_labels = set(labels)
-        single_line_clouds = []
-        
         # 为每个聚类创建不同颜色的点云
-        colors = [[1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 0], [1, 0, 1], 
+        colors = [[1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 0], [1, 0, 1],
                   [0, 1, 1], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5], [1, 0.5, 0]]
-        
-        for i, label in enumerate(unique_labels):
+
+        cluster_clouds = []
+        for i, label in enumerate(set(labels)):
             if label == -1:  # 跳过噪声点
                 continue
-            single_line_points = points[labels == label]
-            
-            # 移除点数过滤，保留所有聚类
-            # if len(single_line_points) < min_line_points:
-            #     continue
-                
             single_line_cloud = o3d.geometry.PointCloud()
-            single_line_cloud.points = o3d.utility.Vector3dVector(single_line_points)
-            color = colors[i % len(colors)]
-            single_line_cloud.paint_uniform_color(color)
-            single_line_clouds.append(single_line_cloud)
-        
-        print(f"DBSCAN聚类得到 {len(single_line_clouds)} 个有效聚类，耗时{step3_time:.2f}秒")
-        
-        # 步骤4: 分离每个簇中的单独电力线
-        print("\n步骤4：分离单独电力线...")
-        step4_start = time.time()
-        individual_power_lines = []
-        for cluster_cloud in single_line_clouds:
-            individual_lines = self._separate_individual_power_lines(cluster_cloud)
-            individual_power_lines.extend(individual_lines)
-        
-        step4_time = time.time() - step4_start
-        print(f"分离得到 {len(individual_power_lines)} 条单独电力线，耗时{step4_time:.2f}秒")
-        
-        # 步骤5: 根据高度极大值点进一步分割电力线
-        print("\n步骤5：基于高度峰值分割...")
-        step5_start = time.time()
-        refined_power_lines = []
-        for line_cloud in individual_power_lines:
+            single_line_cloud.points = o3d.utility.Vector3dVector(points[labels == label])
+            single_line_cloud.paint_uniform_color(colors[i % len(colors)])
+            cluster_clouds.append(single_line_cloud)
+        return cluster_clouds
+
+    def _separate_clusters(self, cluster_clouds):
+        """
+        步骤4：将每个聚类分离为单独的电力线
+
+        :param cluster_clouds: DBSCAN聚类得到的点云列表
+        :return: 单独电力线点云列表
+        """
+        lines = []
+        for cluster_cloud in cluster_clouds:
+            lines.extend(self._separate_individual_power_lines(cluster_cloud))
+        return lines
+
+    def _split_all_by_peaks(self, power_line_clouds):
+        """
+        步骤5：根据高度极大值点进一步分割每条电力线
+
+        :param power_line_clouds: 电力线点云列表
+        :return: 分割后的线段列表
+        """
+        segments = []
+        for single_cloud in power_line_clouds:
             # 🚀 加速峰值分割参数
-            segments = self._split_power_line_by_peaks(line_cloud,
-                                                       prominence=0.8,     # 提高突出度，减少分割
-                                                       min_segment_points=30,  # 提高最小点数，减少碎片
-                                                       plot_debug=False)
-            refined_power_lines.extend(segments)
-        
-        step5_time = time.time() - step5_start
-        print(f"峰值分割得到 {len(refined_power_lines)} 个线段，耗时{step5_time:.2f}秒")
-        
-        # 步骤6: 智能断裂线段合并
-        print("\n步骤6：智能断裂线段合并...")
+            segments.extend(self._split_power_line_by_peaks(single_cloud,
+                                                            prominence=0.8,     # 提高突出度，减少分割
+                                                            min_segment_points=30,  # 提高最小点数，减少碎片
+                                                            plot_debug=False))
+        return segments
+
+    def _finalize_power_lines(self, refined_power_lines, input_file, trace, min_line_length=10.0,
+                              length_method='projection', reference_point_method='center', cached_stage=None,
+                              min_final_points=100, show_result=True):
+        """
+        步骤6-10：端点匹配拼接、长度筛选、坐标变换、最终过滤，并写出电力线LAS与端点JSON。
+        整体提取与分块提取共用这一段全局流程。
+
+        :param refined_power_lines: 峰值分割后的线段列表
+        :param input_file: 输入文件路径（用于生成输出文件名）
+        :param trace: 性能追踪器
+        :param min_line_length: 最小长度阈值
+        :param length_method: 长度计算方法
+        :param reference_point_method: 坐标变换参考点
+        :param cached_stage: 可选的阶段缓存包装函数，用于缓存合并结果
+        :param min_final_points: 最终过滤保留的最少点数（降采样的预览结果使用更小的值）
+        :param show_result: 是否显示最终结果窗口（还受 show_final_result 控制）
+        :return: (最终电力线列表, 合并后的带颜色点云或None)
+        """
+        # 步骤6: 断裂线段拼接（单次全局端点匹配，替代多轮合并）
+        print("\n步骤6：端点匹配拼接断裂线段...")
         step6_start = time.time()
-        # 🚀 高速模式参数 - 大幅加速智能合并
-        merged_power_lines = self._iterative_merge_broken_lines(refined_power_lines, 
-                                                               initial_distance=1.8, 
-                                                               initial_angle=15, 
-                                                               max_rounds=1, 
-                                                               distance_step=0.8, 
-                                                               angle_step=8)
+        trace.start('merge', input_points=self._count_points(refined_power_lines))
+        stitch = lambda: self._stitch_lines_by_endpoint_matching(refined_power_lines)
+        if cached_stage is not None:
+            merged_power_lines = cached_stage('merge', stitch, self._pack_clouds, self._unpack_clouds)
+        else:
+            merged_power_lines = stitch()
+        trace.stop('merge', output_points=self._count_points(merged_power_lines), lines=len(merged_power_lines))
         step6_time = time.time() - step6_start
         print(f"合并后得到 {len(merged_power_lines)} 条电力线，耗时{step6_time:.2f}秒")
         
@@ -1923,13 +1794,17 @@ class PowerLineExtractor:
         
         # 步骤9: 长度筛选
         print("\n步骤9：长度筛选...")
+        trace.start('length_filter', input_points=self._count_points(aligned_power_lines))
         filtered_power_lines, length_info = self._filter_power_lines_by_length(
             aligned_power_lines, min_length=min_line_length, length_method=length_method
         )
+        trace.stop('length_filter', output_points=self._count_points(filtered_power_lines),
+                   lines=len(filtered_power_lines))
         print(f"长度筛选后保留 {len(filtered_power_lines)} 条电力线")
 
         # 步骤10: 坐标变换
         print("\n步骤10：坐标变换...")
+        trace.start('transform', input_points=self._count_points(filtered_power_lines))
         transformed_power_lines, transform_infos = self._transform_all_power_lines(
             filtered_power_lines, reference_point_method=reference_point_method
         )
@@ -1937,6 +1812,8 @@ class PowerLineExtractor:
 
         # 验证坐标变换的正确性
         self._verify_coordinate_transformation(filtered_power_lines, transformed_power_lines, transform_infos)
+        trace.stop('transform', output_points=self._count_points(transformed_power_lines),
+                   lines=len(transformed_power_lines))
 
         # 跳过步骤11：不进行最终主干线拼接，直接使用坐标变换结果
         print("\n跳过步骤11：不进行最终主干线拼接...")
@@ -1945,8 +1822,9 @@ class PowerLineExtractor:
 
         # 最终过滤：移除点数过少的杂质对象
         print("\n最终过滤：移除点数过少的杂质对象...")
-        min_points_threshold = 100  # 最少100个点
+        min_points_threshold = min_final_points  # 默认最少100个点
         filtered_final_lines = []
+        trace.start('final_filter', input_points=self._count_points(final_power_lines))
         
         # print(f"过滤前对象统计:")
         for i, cloud in enumerate(final_power_lines):
@@ -1963,28 +1841,31 @@ class PowerLineExtractor:
         
         # 更新最终结果
         final_power_lines = filtered_final_lines
+        trace.stop('final_filter', output_points=self._count_points(final_power_lines),
+                   lines=len(final_power_lines))
 
         # 为最终结果着色
         final_colored_power_lines = self._visualize_separate_power_lines(final_power_lines)
         
         # 显示最终结果（无论可视化开关如何都显示）
-        if final_colored_power_lines:
+        if final_colored_power_lines and self.show_final_result and show_result:
             # print("\n显示最终提取结果")
             self._safe_visualize(final_colored_power_lines, "最终结果: 电力线提取完成")
         
         # 合并所有变换后的电力线为一个点云用于保存
+        trace.start('write_outputs', input_points=self._count_points(final_power_lines))
+        final_cloud = None
         if final_power_lines:
             all_points = np.vstack([np.asarray(cloud.points) for cloud in final_power_lines])
             all_colors = np.vstack([np.asarray(cloud.colors) for cloud in final_colored_power_lines])
-            line_cloud.points = o3d.utility.Vector3dVector(all_points)
-            line_cloud.colors = o3d.utility.Vector3dVector(all_colors)
+            final_cloud = o3d.geometry.PointCloud()
+            final_cloud.points = o3d.utility.Vector3dVector(all_points)
+            final_cloud.colors = o3d.utility.Vector3dVector(all_colors)
 
         # 保存最终提取的电力线点云文件
         if final_power_lines:
-            import os
             # 生成输出文件名
-            base_name = os.path.splitext(os.path.basename(input_file))[0]
-            final_output_file = f"{base_name}_extracted_powerlines.las"
+            final_output_file = las_io.powerline_las_name(input_file, self.compress_output)
             
             print(f"\n保存最终提取结果到: {final_output_file}")
             
@@ -2004,32 +1885,12 @@ class PowerLineExtractor:
             las_data.green = (all_colors[:, 1] * 65535).astype(np.uint16)
             las_data.blue = (all_colors[:, 2] * 65535).astype(np.uint16)
             
-            las_data.write(final_output_file)
+            las_io.write_las(las_data, final_output_file)
             print(f"最终提取结果保存成功，包含 {len(all_points)} 个点")
 
-        if save_line_cloud:
-            self._save_point_cloud(line_cloud, save_line_cloud)
-        if save_out_cloud:
-            self._save_point_cloud(out_line_cloud, save_out_cloud)
-
-        # 新增：递归合并短线段，确保所有电力线长度≥20米
-        print("\n递归合并短线段，确保所有电力线长度≥20米...")
-        final_power_lines = self._merge_short_neighbor_lines(final_power_lines, min_length=200.0, visualize=visualize_steps)
-        print(f"递归合并后剩余 {len(final_power_lines)} 条电力线")
-        if visualize_steps and final_power_lines:
-            colored_final_lines = self._visualize_separate_power_lines(final_power_lines)
-            # print("显示递归合并后的电力线")
-            self._safe_visualize(colored_final_lines, "递归合并后的电力线")
-
-        # 计算总体运行时间
-        program_end_time = time.time()
-        total_runtime = program_end_time - program_start_time
-        
-        print(f"\n电力线提取完成！最终得到 {len(final_power_lines)} 条有效电力线")
-        print(f"总耗时: {total_runtime:.2f}秒")
-
         # 返回最终拼接后的电力线前，输出首尾端点到json
         output_json = []
+        line_blocks, line_colors = [], []
         for idx, cloud in enumerate(final_power_lines):
             points = np.asarray(cloud.points)
             if len(points) == 0:
@@ -2048,11 +1909,301 @@ class PowerLineExtractor:
                 "end": end_point,
                 "count": len(points)
             })
+            line_blocks.append(points)
+            line_colors.append(np.asarray(final_colored_power_lines[idx].colors)[0])
         base_name = os.path.splitext(os.path.basename(input_file))[0]
         json_file = f"{base_name}_powerline_endpoints.json"
         with open(json_file, "w", encoding="utf-8") as f:
             json.dump(output_json, f, ensure_ascii=False, indent=2)
         # print(f"首尾端点已输出到: {json_file}")
+        if self.line_geometry_output:
+            # 与端点JSON相同的首尾端点，另含每条线的颜色和点块，供Unity直接按偏移读取
+            write_line_geometry(line_geometry_name(input_file), line_blocks,
+                                endpoints=[(item['start'], item['end']) for item in output_json],
+                                ids=[item['index'] for item in output_json],
+                                colors=np.array(line_colors).reshape(-1, 3),
+                                extras={'file_path': os.path.basename(input_file)})
+        trace.stop('write_outputs', lines=len(output_json))
+
+        return final_power_lines, final_cloud
+
+    def plan_for_budget(self, input_file, time_budget, max_workers=None, use_dynamic_params=True,
+                        recalibrate=False, model_path=None, trace=None):
+        """
+        按时间预算规划线性度采样步长、计算后端和进程数，并把采样步长设置到 linearity_sample_step
+
+        :param input_file: 输入LAS文件路径
+        :param time_budget: 时间预算（秒）
+        :param max_workers: 进程数上限，None表示CPU核心数
+        :param use_dynamic_params: 是否使用动态参数
+        :param recalibrate: 是否忽略已缓存的标定结果重新标定
+        :param model_path: 标定结果缓存文件，None表示默认路径
+        :param trace: 性能追踪（PerfTrace），规划耗时记为 'plan' 阶段
+        :return: 规划字典（见 cost_model.CostModel.plan），backend 为 'tiled' 时含 tile_size
+        """
+        if trace is not None:
+            trace.start('plan')
+        plan_start = time.perf_counter()
+        model = cost_model.load_or_calibrate(self, model_path=model_path, recalibrate=recalibrate)
+        high, _, _, total = self._load_high_points(input_file)
+        neighbors = cost_model.estimate_neighbors(high, self.radius)
+        # 规划本身（首次运行时含标定）已用掉的时间从预算中扣除
+        remaining = max(time_budget - (time.perf_counter() - plan_start), 0.0)
+        plan = model.plan(total, len(high), neighbors, remaining, max_workers=max_workers)
+        plan['time_budget_s'] = float(time_budget)
+        if plan['backend'] == 'tiled':
+            # 每个进程约两个分块，便于负载均衡；分块边长不小于重叠宽度的4倍
+            axes = corridor_tiling._principal_axes(high[:, :2])
+            extent = float(np.ptp(high[:, :2] @ axes[0])) if len(high) else 0.0
+            overlap = corridor_tiling.default_overlap(self.radius, self.eps, use_dynamic_params)
+            plan['tile_size'] = float(max(100.0, 4 * overlap, np.ceil(extent / (2 * plan['workers']))))
+        self.linearity_sample_step = plan['sample_step']
+        if trace is not None:
+            trace.stop('plan', input_points=total, **{k: v for k, v in plan.items() if k != 'predicted'},
+                       predicted_total_s=plan['predicted']['total'])
+
+        print(f"时间预算规划: 预算 {time_budget:.0f} 秒，{plan['n_points']} 点（高程带外 {plan['n_high']}，"
+              f"平均邻居 {plan['neighbors']:.1f}）")
+        print(f"  - 采样: 每{plan['sample_step']}个点计算一次（采样率: {plan['sample_rate'] * 100:.0f}%）")
+        print(f"  - 后端: {plan['backend']}，进程数 {plan['workers']}"
+              + (f"，分块边长 {plan['tile_size']:.0f} 米" if 'tile_size' in plan else ''))
+        print(f"  - 预测耗时: {plan['predicted']['total']:.1f} 秒"
+              + ('' if plan['within_budget'] else '（最快方案仍超出预算）'))
+        del high
+        return plan
+
+    def extract(self, input_file, save_line_cloud=None, save_out_cloud=None,
+                min_line_points=50, min_line_length=10.0, length_method='projection',
+                reference_point_method='center', visualize_steps=None, use_dynamic_params=True,
+                use_cache=False, cache_dir=None, trace=None, use_result_cache=False, result_cache_dir=None,
+                full_hash=False):
+        """
+        完整的电力线提取和可视化流程
+
+        :param input_file: 输入文件路径
+        :param save_line_cloud: 保存线点云的文件路径（可选）
+        :param save_out_cloud: 保存非线点云的文件路径（可选）
+        :param min_line_points: 聚类筛选的最小点数阈值，默认50
+        :param min_line_length: 最小电力线长度阈值，默认10.0米
+        :param length_method: 计算长度的方法，'projection'或'path'
+        :param reference_point_method: 坐标变换的全局参考点选择方法
+        :param visualize_steps: 是否在每步后进行可视化，None表示使用类属性enable_visualization
+        :param use_dynamic_params: 是否使用动态参数
+        :param use_cache: 是否启用阶段检查点缓存
+        :param cache_dir: 阶段缓存目录，None表示使用默认用户缓存目录
+        :param trace: PerfTrace对象，None表示新建并在输出目录写入 <name>_perf_trace.json
+        :param use_result_cache: 是否启用结果缓存，命中时直接复制缓存的输出文件，不做任何计算
+        :param result_cache_dir: 结果缓存目录，None表示使用默认用户缓存目录
+        :param full_hash: 结果缓存键是否使用全文件哈希（默认只哈希LAS头部和抽样数据块）
+        :return: 变换后的电力线点云列表
+        """
+        # 记录程序开始时间
+        import time
+        program_start_time = time.time()
+        
+        # 确定是否开启可视化
+        if visualize_steps is None:
+            visualize_steps = self.enable_visualization
+        
+        print("=" * 60)
+        print("开始电力线提取流程")
+        print(f"可视化模式: {'开启' if visualize_steps else '关闭'}")
+        print(f"开始时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        print("=" * 60)
+        
+        # 分阶段性能追踪（墙钟/CPU时间、内存峰值、点数和线数）
+        own_trace = trace is None
+        if own_trace:
+            trace = PerfTrace('extract', progress=self.progress)
+        self.last_trace = trace
+
+        # 结果缓存：键只取决于输入内容和参数，命中时复制输出文件后直接返回；
+        # 额外保存线/非线点云的调用需要中间结果，不走结果缓存
+        result_cache, result_key = None, None
+        if use_result_cache and not (save_line_cloud or save_out_cloud):
+            trace.start('result_cache_lookup')
+            result_cache = self.result_cache or ResultCache(result_cache_dir, full_hash=full_hash)
+            result_key = self._result_cache_key(result_cache, input_file, {
+                'min_line_length': min_line_length, 'length_method': length_method,
+                'reference_point_method': reference_point_method, 'use_dynamic_params': use_dynamic_params})
+            cached_lines = self._restore_result(result_cache, result_key, input_file)
+            trace.stop('result_cache_lookup', hit=cached_lines is not None, key=result_key,
+                       lines=len(cached_lines) if cached_lines is not None else None)
+            if cached_lines is not None:
+                print(f"结果缓存命中 ({result_key[:12]})，已复制 {len(cached_lines)} 条电力线的输出文件")
+                if own_trace:
+                    base_name = os.path.splitext(os.path.basename(input_file))[0]
+                    trace.write(f"{base_name}_perf_trace.json")
+                    trace.close()
+                return cached_lines
+
+        # 局部坐标原点只取决于文件头；从缓存续算时跳过读取，也要在坐标变换前设好
+        self.coordinate_origin, _ = self._file_frame(input_file)
+
+        # 阶段检查点缓存：键由输入文件内容哈希与各阶段参数链式派生，命中最深的有效前缀后只计算其后的阶段
+        cache, stage_keys, resume_idx, resume_arrays = None, {}, -1, None
+        if use_cache:
+            trace.start('cache_lookup')
+            cache = self.stage_cache or StageCache(cache_dir)
+            stage_keys = cache.chain_keys(input_file, [
+                ('linearity', {'height_min': self.height_min, 'height_max': self.height_max,
+                               'coord_dtype': self.coord_dtype, 'radius': self.radius,
+                               'use_dynamic_params': use_dynamic_params, **self._sampling_params()}),
+                ('dbscan', {'threshold': self.threshold, 'use_dynamic_params': use_dynamic_params,
+                            'eps': self.eps, 'min_samples': self.min_samples}),
+                ('separate', {'eps_projection': 0.5, 'min_samples_projection': 5}),
+                ('split', {'prominence': 0.8, 'min_segment_points': 30}),
+                ('merge', {'method': 'endpoint_matching'}),
+            ])
+            resume_stage, resume_arrays = cache.load_latest(stage_keys)
+            if resume_stage is not None:
+                resume_idx = STAGES.index(resume_stage)
+                print(f"阶段缓存命中，从阶段 '{resume_stage}' 之后继续计算")
+            trace.stop('cache_lookup', resume_stage=resume_stage)
+
+        def cached_stage(stage, compute, encode, decode):
+            return self._run_cached_stage(cache, stage_keys, resume_idx, resume_arrays, stage, compute, encode,
+                                          decode)
+
+        line_cloud = o3d.geometry.PointCloud()
+        out_line_cloud = None
+        step1_time = step2_time = step3_time = step4_time = step5_time = 0.0
+
+        # 步骤1-2只在需要重新聚类或需要保存非线点云时执行
+        need_segmentation = resume_idx < STAGES.index('separate') or bool(save_out_cloud)
+
+        # 步骤1: 读取点云数据；不需要保存非线点云时只读取高程带之外的点（读取时滤波）
+        chunked_read = need_segmentation and not save_out_cloud
+        if chunked_read:
+            print("\n步骤1：分块读取原始点云（读取时高程滤波）...")
+            step1_start = time.time()
+            trace.start('read')
+            high_points, _, _, total_points = self._load_high_points(input_file)
+            high = o3d.geometry.PointCloud()
+            high.points = o3d.utility.Vector3dVector(high_points)
+            del high_points
+            trace.stop('read', input_points=total_points, output_points=len(high.points))
+            step1_time = time.time() - step1_start
+            print(f"原始点云包含 {total_points} 个点，高程带之外 {len(high.points)} 个，耗时{step1_time:.2f}秒")
+        elif need_segmentation:
+            print("\n步骤1：读取原始点云...")
+            step1_start = time.time()
+            trace.start('read')
+            point_cloud = self._read_point_cloud(input_file)
+            trace.stop('read', output_points=len(point_cloud.points))
+            step1_time = time.time() - step1_start
+            print(f"原始点云包含 {len(point_cloud.points)} 个点，耗时{step1_time:.2f}秒")
+        else:
+            print("\n步骤1-2：缓存命中，跳过读取与线性特征计算")
+
+        # 步骤2: 线性特征提取
+        if need_segmentation:
+            print("\n步骤2：计算线性特征并分割...")
+            step2_start = time.time()
+            if chunked_read:
+                trace.start('segmentation', input_points=len(high.points))
+                low = o3d.geometry.PointCloud()
+            else:
+                trace.start('segmentation', input_points=len(point_cloud.points))
+                band_idx = self._height_band_indices(np.asarray(point_cloud.points))
+                low = point_cloud.select_by_index(band_idx)
+                high = point_cloud.select_by_index(band_idx, invert=True)
+            linear = cached_stage(
+                'linearity',
+                lambda: self._compute_linear_features(high, use_dynamic_params),
+                lambda values: {'linear': values},
+                lambda arrays: arrays['linear'])
+            line_cloud, out_line_cloud = self._select_line_points(low, high, linear, self.threshold,
+                                                                  use_dynamic_params)
+            trace.stop('segmentation', output_points=len(line_cloud.points))
+            step2_time = time.time() - step2_start
+            print(f"线性特征点云: {len(line_cloud.points)} 个点")
+            print(f"非线性特征点云: {len(out_line_cloud.points)} 个点，耗时{step2_time:.2f}秒")
+
+        # 步骤3: DBSCAN聚类
+        single_line_clouds = []
+        if resume_idx < STAGES.index('separate'):
+            print("\n步骤3：DBSCAN聚类分组...")
+            step3_start = time.time()
+            points = np.asarray(line_cloud.points)
+            trace.start('dbscan', input_points=len(points))
+            labels = cached_stage(
+                'dbscan',
+                lambda: self._dbscan_clustering(points),
+                lambda values: {'labels': values},
+                lambda arrays: arrays['labels'])
+            step3_time = time.time() - step3_start
+            trace.stop('dbscan', output_points=int(np.count_nonzero(labels != -1)),
+                       clusters=len(set(labels) - {-1}))
+            single_line_clouds = self._clusters_from_labels(points, labels)
+            print(f"DBSCAN聚类得到 {len(single_line_clouds)} 个有效聚类，耗时{step3_time:.2f}秒")
+
+        # 步骤4: 分离每个簇中的单独电力线
+        individual_power_lines = []
+        if resume_idx < STAGES.index('split'):
+            print("\n步骤4：分离单独电力线...")
+            step4_start = time.time()
+
+            trace.start('separate', input_points=self._count_points(single_line_clouds))
+            individual_power_lines = cached_stage('separate',
+                                                  lambda: self._separate_clusters(single_line_clouds),
+                                                  self._pack_clouds, self._unpack_clouds)
+            trace.stop('separate', output_points=self._count_points(individual_power_lines),
+                       lines=len(individual_power_lines))
+            step4_time = time.time() - step4_start
+            print(f"分离得到 {len(individual_power_lines)} 条单独电力线，耗时{step4_time:.2f}秒")
+
+        # 步骤5: 根据高度极大值点进一步分割电力线
+        refined_power_lines = []
+        if resume_idx < STAGES.index('merge'):
+            print("\n步骤5：基于高度峰值分割...")
+            step5_start = time.time()
+
+            trace.start('split', input_points=self._count_points(individual_power_lines))
+            refined_power_lines = cached_stage('split',
+                                               lambda: self._split_all_by_peaks(individual_power_lines),
+                                               self._pack_clouds, self._unpack_clouds)
+            trace.stop('split', output_points=self._count_points(refined_power_lines),
+                       lines=len(refined_power_lines))
+            step5_time = time.time() - step5_start
+            print(f"峰值分割得到 {len(refined_power_lines)} 个线段，耗时{step5_time:.2f}秒")
+
+        final_power_lines, final_cloud = self._finalize_power_lines(
+            refined_power_lines, input_file, trace,
+            min_line_length=min_line_length,
+            length_method=length_method,
+            reference_point_method=reference_point_method,
+            cached_stage=cached_stage)
+        # 有最终结果时保存坐标变换后的点云（与电力线LAS相同坐标系），否则保存局部坐标的线性特征点云
+        line_cloud_origin = self.coordinate_origin
+        if final_cloud is not None:
+            line_cloud = final_cloud
+            line_cloud_origin = None
+
+        if save_line_cloud:
+            self._save_point_cloud(line_cloud, save_line_cloud, origin=line_cloud_origin)
+        if save_out_cloud:
+            self._save_point_cloud(out_line_cloud, save_out_cloud, origin=self.coordinate_origin)
+
+        # 没有提取到电力线时没有平移向量，不写入结果缓存
+        if result_cache is not None and final_power_lines:
+            trace.start('result_cache_store')
+            self._store_result(result_cache, result_key, input_file, final_power_lines)
+            trace.stop('result_cache_store', lines=len(final_power_lines))
+
+        # 计算总体运行时间
+        program_end_time = time.time()
+        total_runtime = program_end_time - program_start_time
+        
+        print(f"\n电力线提取完成！最终得到 {len(final_power_lines)} 条有效电力线")
+        print(f"总耗时: {total_runtime:.2f}秒")
+
+        # 独立运行时将性能追踪写到输出文件旁边；由worker传入时由调用方统一输出
+        if own_trace:
+            base_name = os.path.splitext(os.path.basename(input_file))[0]
+            trace_file = trace.write(f"{base_name}_perf_trace.json")
+            trace.close()
+            print(f"性能追踪已输出到: {trace_file}")
         
         # 清理缓存以释放内存
         self._clear_caches()
@@ -2060,6 +2211,683 @@ class PowerLineExtractor:
         # 返回最终拼接后的电力线
         return final_power_lines
 
+    def extract_tiled(self, input_file, tile_size=500.0, tile_overlap=None, tile_layout='corridor',
+                      tile_workers=1, min_line_length=10.0, length_method='projection',
+                      reference_point_method='center', use_dynamic_params=True, trace=None):
+        """
+        分块电力线提取：线性度与DBSCAN按走廊分块（可多进程）计算并在接缝处拼接，
+        之后的分离、分割、合并和输出与 extract() 相同，结果与整体运行一致
+
+        :param input_file: 输入文件路径
+        :param tile_size: 分块核心区边长（米）
+        :param tile_overlap: 重叠宽度（米），None表示按邻域半径和eps自动计算
+        :param tile_layout: 'corridor' 沿走廊主方向切段，'grid' 方形网格
+        :param tile_workers: 分块并行进程数，1表示在当前进程中逐块计算
+        :param min_line_length: 最小电力线长度阈值
+        :param length_method: 计算长度的方法，'projection'或'path'
+        :param reference_point_method: 坐标变换的全局参考点选择方法
+        :param use_dynamic_params: 是否使用动态参数
+        :param trace: PerfTrace对象，None表示新建并在输出目录写入 <name>_perf_trace.json
+        :return: 变换后的电力线点云列表
+        """
+        program_start_time = time.time()
+        if tile_overlap is None:
+            tile_overlap = corridor_tiling.default_overlap(self.radius, self.eps, use_dynamic_params)
+        elif tile_overlap < corridor_tiling.default_overlap(self.radius, self.eps, use_dynamic_params, margin=0.0):
+            print(f"警告：重叠宽度 {tile_overlap} 小于邻域半径或 2*eps，接缝处结果可能与整体运行不同")
+
+        print("=" * 60)
+        print("开始分块电力线提取流程")
+        print(f"分块: {tile_layout} 布局, 边长 {tile_size} 米, 重叠 {tile_overlap:.2f} 米, 进程数 {tile_workers}")
+        print("=" * 60)
+
+        own_trace = trace is None
+        if own_trace:
+            trace = PerfTrace('extract', progress=self.progress)
+        self.last_trace = trace
+        params = dict(threshold=self.threshold, radius=self.radius, height_min=self.height_min,
+                      height_max=self.height_max, eps=self.eps, min_samples=self.min_samples)
+
+        # 步骤1: 读取点云并划分分块
+        print("\n步骤1：读取原始点云并划分分块...")
+        trace.start('read')
+        points = self._load_local_xyz(input_file)
+        trace.stop('read', output_points=len(points), coord_dtype=points.dtype.name)
+
+        trace.start('tile_layout', input_points=len(points))
+        high_mask = np.ones(len(points), dtype=bool)
+        high_mask[self._height_band_indices(points)] = False
+        high_idx = np.flatnonzero(high_mask)
+        layout = corridor_tiling.build_layout(points[high_idx], tile_size, tile_overlap, tile_layout)
+        high_uv = layout.to_frame(points[high_idx])
+        high_owner = layout.owner(high_uv)
+        trace.stop('tile_layout', output_points=len(high_idx), tiles=layout.n_tiles)
+        print(f"高程带外点 {len(high_idx)} 个，划分为 {layout.n_tiles} 个分块")
+
+        # 步骤2: 分块计算采样点线性度，全局插值与阈值
+        print("\n步骤2：分块计算线性特征...")
+        trace.start('tile_linearity', input_points=len(high_idx))
+        sample_step = self._linearity_sample_step(len(high_idx), use_dynamic_params)
+        sample_ranks = np.arange(0, len(high_idx), sample_step) if sample_step else np.empty(0, dtype=np.int64)
+        sample_values = np.zeros(len(sample_ranks))
+        tasks, task_slots = [], []
+        for tile in range(layout.n_tiles):
+            members = np.flatnonzero(layout.extended_mask(high_uv, tile))
+            owned = np.flatnonzero(high_owner[sample_ranks] == tile)
+            if len(owned) == 0:
+                continue
+            query_local = np.searchsorted(members, sample_ranks[owned])
+            tasks.append((params, points[high_idx[members]], query_local, use_dynamic_params))
+            task_slots.append(owned)
+        values = corridor_tiling.run_tile_tasks(corridor_tiling.tile_linearity_task, tasks, tile_workers,
+                                                self.progress, 'tile_linearity')
+        for owned, tile_values in zip(task_slots, values):
+            sample_values[owned] = tile_values
+        trace.stop('tile_linearity', output_points=len(sample_ranks), tiles=len(tasks))
+
+        trace.start('tile_threshold', input_points=len(high_idx))
+        if sample_step is None:
+            linear = np.array([])
+        elif sample_step == 1:
+            linear = sample_values
+        else:
+            linear = self._interpolate_linearity(len(high_idx), sample_ranks, sample_values)
+        if use_dynamic_params:
+            line_threshold = self._calculate_dynamic_threshold_by_percentile(linear)
+            print(f"动态阈值: {line_threshold:.3f} (原阈值: {self.threshold:.3f})")
+        else:
+            line_threshold = self.threshold
+        line_ranks = np.where(linear > line_threshold)[0]
+        line_points = points[high_idx[line_ranks]].astype(np.float64)
+        trace.stop('tile_threshold', output_points=len(line_points))
+        print(f"线性特征点云: {len(line_points)} 个点")
+
+        # 步骤3: 分块DBSCAN并在接缝处拼接
+        print("\n步骤3：分块DBSCAN聚类并拼接接缝...")
+        trace.start('tile_dbscan', input_points=len(line_points))
+        line_uv = high_uv[line_ranks]
+        line_owner = high_owner[line_ranks]
+        tile_members = [np.flatnonzero(layout.extended_mask(line_uv, tile)) for tile in range(layout.n_tiles)]
+        tasks = [(params, line_points[members]) for members in tile_members]
+        results = corridor_tiling.run_tile_tasks(corridor_tiling.tile_dbscan_task, tasks, tile_workers,
+                                                 self.progress, 'tile_dbscan')
+        trace.stop('tile_dbscan', output_points=len(line_points), tiles=len(tasks))
+
+        trace.start('seam_stitch', input_points=len(line_points))
+        labels, unions = corridor_tiling.stitch_tile_labels(
+            line_points, tile_members, [r[0] for r in results], [r[1] for r in results], line_owner, self.eps)
+        trace.stop('seam_stitch', output_points=int(np.count_nonzero(labels != -1)),
+                   clusters=len(set(labels) - {-1}), seam_unions=unions)
+        single_line_clouds = self._clusters_from_labels(line_points, labels)
+        print(f"DBSCAN聚类得到 {len(single_line_clouds)} 个有效聚类，跨接缝合并 {unions} 次")
+
+        return self._finish_from_clusters(single_line_clouds, input_file, trace, own_trace, program_start_time,
+                                          min_line_length, length_method, reference_point_method)
+
+    def extract_incremental(self, input_file, state_dir, tile_size=500.0, tile_overlap=None,
+                            tile_layout='corridor', tile_workers=1, full_rebuild=False, tower_csv=None,
+                            min_line_length=10.0, length_method='projection', reference_point_method='center',
+                            use_dynamic_params=True, trace=None):
+        """
+        增量电力线提取：沿用状态目录中的分块布局和各分块结果，只在点集变化的分块及其邻域
+        重新计算线性度、在线点变化的分块重新DBSCAN，之后全局拼接接缝并原地更新输出文件。
+        状态不存在或参数变化时全部计算并建立新状态。
+
+        :param input_file: 输入文件路径（重飞或延长后的完整走廊）
+        :param state_dir: 增量状态目录
+        :param tile_size: 分块核心区边长（米），仅在建立新状态时使用
+        :param tile_overlap: 重叠宽度（米），None表示按邻域半径和eps自动计算
+        :param tile_layout: 'corridor' 或 'grid'，仅在建立新状态时使用
+        :param tile_workers: 分块并行进程数
+        :param full_rebuild: 沿用布局和原点但重新计算所有分块（用于校验增量结果）
+        :param tower_csv: 电力塔CSV输出路径，None表示不更新电力塔CSV
+        :param min_line_length: 最小电力线长度阈值
+        :param length_method: 计算长度的方法，'projection'或'path'
+        :param reference_point_method: 坐标变换的全局参考点选择方法
+        :param use_dynamic_params: 是否使用动态参数
+        :param trace: PerfTrace对象，None表示新建并在输出目录写入 <name>_perf_trace.json
+        :return: 变换后的电力线点云列表
+        """
+        program_start_time = time.time()
+        if tile_overlap is None:
+            tile_overlap = corridor_tiling.default_overlap(self.radius, self.eps, use_dynamic_params)
+
+        print("=" * 60)
+        print("开始增量电力线提取流程")
+        print(f"状态目录: {state_dir}")
+        print("=" * 60)
+
+        own_trace = trace is None
+        if own_trace:
+            trace = PerfTrace('extract_incremental', progress=self.progress)
+        self.last_trace = trace
+
+        params = dict(threshold=self.threshold, radius=self.radius, height_min=self.height_min,
+                      height_max=self.height_max, eps=self.eps, min_samples=self.min_samples)
+        state_params = dict(params, tile_size=tile_size, tile_overlap=tile_overlap, tile_layout=tile_layout,
+                            use_dynamic_params=use_dynamic_params, extractor_version=EXTRACTOR_VERSION)
+        state = incremental.IncrementalState(state_dir)
+        compatible = state.compatible(state_params)
+        if state.data is not None and not compatible:
+            print("已有状态的版本或参数不同，全部重新计算")
+
+        # 步骤1: 在状态的局部坐标系中读取点云；增量模式按float64存储，保证签名与规范顺序逐位稳定
+        print("\n步骤1：读取原始点云并匹配分块...")
+        trace.start('read')
+        origin = np.asarray(state.data['origin']) if compatible else self._file_frame(input_file)[0]
+        self.coordinate_origin = origin
+        las_data = las_io.read_las(input_file)
+        points = np.column_stack([np.asarray(las_data.x) - origin[0], np.asarray(las_data.y) - origin[1],
+                                  np.asarray(las_data.z) - origin[2]])
+        del las_data
+        trace.stop('read', output_points=len(points))
+
+        trace.start('tile_layout', input_points=len(points))
+        high_mask = np.ones(len(points), dtype=bool)
+        high_mask[self._height_band_indices(points)] = False
+        high = points[high_mask]
+        del points
+        if compatible:
+            layout = corridor_tiling.extend_layout(corridor_tiling.TileLayout.from_dict(state.data['layout']),
+                                                   high, tile_size)
+        else:
+            layout = corridor_tiling.build_layout(high, tile_size, tile_overlap, tile_layout)
+        sample_step = self._linearity_sample_step(len(high), use_dynamic_params)
+        if not compatible:
+            state.reset(state_params, origin, layout.to_dict(), sample_step)
+        elif state.data['sample_step'] != sample_step:
+            print(f"采样步长由 {state.data['sample_step']} 变为 {sample_step}，全部重新计算")
+            state.reset(state_params, origin, layout.to_dict(), sample_step)
+        else:
+            state.data['layout'] = layout.to_dict()
+
+        uv = layout.to_frame(high)
+        owner = layout.owner(uv)
+        tile_ids = [layout.tile_id(tile) for tile in range(layout.n_tiles)]
+        state.prune(set(tile_ids))
+
+        # 每个分块核心区内的点按规范顺序排列并计算签名，与上次记录比较
+        core_sorted, signatures, changed = [], [], set()
+        for tile in range(layout.n_tiles):
+            core = np.flatnonzero(owner == tile)
+            core = core[incremental.canonical_order(high[core])]
+            signature = incremental.point_signature(high[core])
+            record = state.tile_record(tile_ids[tile])
+            core_sorted.append(core)
+            signatures.append(signature)
+            if full_rebuild or record is None or record['signature'] != signature:
+                changed.add(tile)
+        recompute = incremental.halo_tiles(layout, changed)
+        # 未变化分块的上次结果：邻域分块也读取，线点集合不变时可沿用其DBSCAN结果
+        cached = {}
+        for tile in range(layout.n_tiles):
+            if tile not in changed:
+                cached[tile] = state.load_tile(tile_ids[tile])
+                if cached[tile] is None:
+                    recompute.add(tile)
+        trace.stop('tile_layout', output_points=len(high), tiles=layout.n_tiles, changed_tiles=len(changed),
+                   recompute_tiles=len(recompute))
+        print(f"高程带外点 {len(high)} 个，{layout.n_tiles} 个分块中 {len(changed)} 个发生变化，"
+              f"连同邻域共 {len(recompute)} 个分块重新计算线性度")
+
+        # 步骤2: 变化分块及其邻域按规范顺序采样计算线性度，其余分块沿用上次结果
+        print("\n步骤2：增量计算线性特征...")
+        trace.start('tile_linearity', input_points=int(sum(len(core_sorted[t]) for t in recompute)))
+        tile_linear = [None] * layout.n_tiles
+        tasks, task_tiles = [], []
+        for tile in range(layout.n_tiles):
+            core = core_sorted[tile]
+            if tile not in recompute:
+                tile_linear[tile] = cached[tile]['linear']
+                continue
+            if sample_step is None or len(core) == 0:
+                tile_linear[tile] = np.zeros(len(core))
+                continue
+            extended = np.flatnonzero(layout.extended_mask(uv, tile))
+            extended = extended[incremental.canonical_order(high[extended])]
+            lookup = np.argsort(extended)
+            queries = core[np.arange(0, len(core), sample_step)]
+            query_local = lookup[np.searchsorted(extended[lookup], queries)]
+            tasks.append((params, high[extended], query_local, use_dynamic_params))
+            task_tiles.append(tile)
+        values = corridor_tiling.run_tile_tasks(corridor_tiling.tile_linearity_task, tasks, tile_workers,
+                                                self.progress, 'tile_linearity')
+        for tile, sample_values in zip(task_tiles, values):
+            sample_positions = np.arange(0, len(core_sorted[tile]), sample_step)
+            if sample_step == 1:
+                tile_linear[tile] = sample_values
+            else:
+                tile_linear[tile] = self._interpolate_linearity(len(core_sorted[tile]), sample_positions,
+                                                                sample_values)
+        trace.stop('tile_linearity', tiles=len(tasks), reused_tiles=layout.n_tiles - len(recompute))
+
+        trace.start('tile_threshold', input_points=len(high))
+        linear = np.concatenate(tile_linear) if tile_linear else np.array([])
+        if use_dynamic_params:
+            line_threshold = self._calculate_dynamic_threshold_by_percentile(linear)
+            print(f"动态阈值: {line_threshold:.3f} (原阈值: {self.threshold:.3f})")
+        else:
+            line_threshold = self.threshold
+        # 线点的全局顺序：分块编号，分块内按规范顺序
+        line_idx = np.concatenate([core_sorted[tile][tile_linear[tile] > line_threshold]
+                                   for tile in range(layout.n_tiles)] or [np.empty(0, dtype=np.int64)])
+        line_points = high[line_idx]
+        line_uv = uv[line_idx]
+        line_owner = owner[line_idx]
+        trace.stop('tile_threshold', output_points=len(line_points))
+        print(f"线性特征点云: {len(line_points)} 个点")
+
+        # 步骤3: 核心区+重叠区内线点集合变化的分块重新DBSCAN，然后全局拼接接缝
+        print("\n步骤3：增量DBSCAN聚类并拼接接缝...")
+        trace.start('tile_dbscan', input_points=len(line_points))
+        tile_members, line_checksums = [], []
+        labels_list, core_list = [None] * layout.n_tiles, [None] * layout.n_tiles
+        tasks, task_tiles = [], []
+        for tile in range(layout.n_tiles):
+            members = np.flatnonzero(layout.extended_mask(line_uv, tile))
+            checksum = incremental.point_signature(line_points[members])['checksum']
+            tile_members.append(members)
+            line_checksums.append(checksum)
+            record = state.tile_record(tile_ids[tile])
+            previous = cached.get(tile)
+            if (record is not None and record.get('line_checksum') == checksum
+                    and previous is not None and 'labels' in previous):
+                labels_list[tile], core_list[tile] = previous['labels'], previous['core']
+            else:
+                tasks.append((params, line_points[members]))
+                task_tiles.append(tile)
+        results = corridor_tiling.run_tile_tasks(corridor_tiling.tile_dbscan_task, tasks, tile_workers,
+                                                 self.progress, 'tile_dbscan')
+        for tile, (tile_labels, tile_core) in zip(task_tiles, results):
+            labels_list[tile], core_list[tile] = tile_labels, tile_core
+        trace.stop('tile_dbscan', output_points=len(line_points), tiles=len(tasks),
+                   reused_tiles=layout.n_tiles - len(tasks))
+        print(f"{len(tasks)} 个分块重新聚类，{layout.n_tiles - len(tasks)} 个分块沿用上次结果")
+
+        # 更新状态：只写回有变化的分块
+        trace.start('state_save')
+        updated = recompute | set(task_tiles)
+        for tile in updated:
+            state.save_tile(tile_ids[tile],
+                            {'signature': signatures[tile], 'line_checksum': line_checksums[tile]},
+                            {'linear': tile_linear[tile], 'labels': labels_list[tile], 'core': core_list[tile]})
+        state.save()
+        trace.stop('state_save', tiles=len(updated))
+
+        trace.start('seam_stitch', input_points=len(line_points))
+        labels, unions = corridor_tiling.stitch_tile_labels(
+            line_points, tile_members, labels_list, core_list, line_owner, self.eps)
+        trace.stop('seam_stitch', output_points=int(np.count_nonzero(labels != -1)),
+                   clusters=len(set(labels) - {-1}), seam_unions=unions)
+        single_line_clouds = self._clusters_from_labels(line_points, labels)
+        print(f"DBSCAN聚类得到 {len(single_line_clouds)} 个有效聚类，跨接缝合并 {unions} 次")
+
+        final_power_lines = self._finish_from_clusters(single_line_clouds, input_file, trace, False,
+                                                       program_start_time, min_line_length, length_method,
+                                                       reference_point_method)
+
+        # 原地更新电力塔CSV（端点JSON未变化时直接命中结果缓存）
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
+        if tower_csv:
+            from extract_tower_coordinates import extract_tower_coordinates_cached
+            trace.start('towers', input_points=len(final_power_lines))
+            stats = extract_tower_coordinates_cached(f"{base_name}_powerline_endpoints.json", tower_csv)
+            trace.stop('towers', towers=stats['total_towers'])
+            print(f"电力塔CSV已更新: {tower_csv}")
+
+        if own_trace:
+            trace_file = trace.write(f"{base_name}_perf_trace.json")
+            trace.close()
+            print(f"性能追踪已输出到: {trace_file}")
+        return final_power_lines
+
+    @staticmethod
+    def _voxel_representatives(points, voxel_size):
+        """
+        体素降采样：每个体素保留序号最小的原始点，返回其序号（递增）
+
+        :param points: (N, 3) 坐标
+        :param voxel_size: 体素边长（米）
+        :return: 代表点序号
+        """
+        if len(points) == 0:
+            return np.empty(0, dtype=np.int64)
+        keys = np.floor(np.asarray(points, dtype=np.float64) / voxel_size).astype(np.int64)
+        keys -= keys.min(axis=0)
+        _, first = np.unique(keys, axis=0, return_index=True)
+        return np.sort(first)
+
+    def extract_two_pass(self, input_file, preview_voxel=0.5, corridor_buffer=None, min_line_length=10.0,
+                         length_method='projection', reference_point_method='center', use_dynamic_params=True,
+                         trace=None):
+        """
+        两遍提取：第一遍在体素降采样的点上快速定位电力线并立即写出预览端点JSON和LAS；
+        第二遍只在预览电力线周围的缓冲区内按全分辨率计算线性度和DBSCAN，写出最终结果
+
+        :param input_file: 输入文件路径
+        :param preview_voxel: 第一遍降采样的体素边长（米）
+        :param corridor_buffer: 第二遍缓冲区半径（米），None表示 max(邻域半径, 2*eps) + 1 + 体素边长
+        :param min_line_length: 最小电力线长度阈值
+        :param length_method: 计算长度的方法，'projection'或'path'
+        :param reference_point_method: 坐标变换的全局参考点选择方法
+        :param use_dynamic_params: 是否使用动态参数
+        :param trace: PerfTrace对象，None表示新建并在输出目录写入 <name>_perf_trace.json
+        :return: 变换后的电力线点云列表
+        """
+        from scipy.spatial import cKDTree
+
+        program_start_time = time.time()
+        max_radius = corridor_tiling.max_linearity_radius(self.radius, use_dynamic_params)
+        if corridor_buffer is None:
+            corridor_buffer = corridor_tiling.default_overlap(self.radius, self.eps, use_dynamic_params) + preview_voxel
+
+        print("=" * 60)
+        print("开始两遍电力线提取流程")
+        print(f"预览体素: {preview_voxel} 米, 缓冲区半径: {corridor_buffer:.2f} 米")
+        print("=" * 60)
+
+        own_trace = trace is None
+        if own_trace:
+            trace = PerfTrace('extract_two_pass', progress=self.progress)
+        self.last_trace = trace
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
+
+        # 步骤1: 读取点云并做高程滤波
+        print("\n步骤1：读取原始点云...")
+        trace.start('read')
+        points = self._load_local_xyz(input_file)
+        high_mask = np.ones(len(points), dtype=bool)
+        high_mask[self._height_band_indices(points)] = False
+        high = points[high_mask]
+        del points
+        trace.stop('read', output_points=len(high))
+
+        # 第一遍: 降采样点上的完整流程，结果写为 <name>_preview_*
+        print(f"\n第一遍：{preview_voxel} 米体素降采样预览...")
+        trace.start('preview', input_points=len(high))
+        preview_trace = PerfTrace('preview', trace_malloc=False, progress=self.progress)
+        down = high[self._voxel_representatives(high, preview_voxel)].astype(np.float64)
+        down_cloud = o3d.geometry.PointCloud()
+        down_cloud.points = o3d.utility.Vector3dVector(down)
+        linear = self._compute_linear_features(down_cloud, use_dynamic_params)
+        if use_dynamic_params:
+            line_threshold = self._calculate_dynamic_threshold_by_percentile(linear)
+        else:
+            line_threshold = self.threshold
+        down_line = down[np.flatnonzero(linear > line_threshold)]
+        # 降采样后沿线的点距约为体素边长，核心点判定所需的邻居数随之减少
+        preview_min_samples = max(3, min(self.min_samples, int(np.ceil(self.eps / preview_voxel))))
+        labels = (self._dbscan_clustering(down_line, min_samples=preview_min_samples) if len(down_line)
+                  else np.empty(0, dtype=np.int64))
+        preview_clusters = self._clusters_from_labels(down_line, labels)
+        corridor_points = down_line[labels != -1]
+        preview_lines, _ = self._finalize_power_lines(
+            self._split_all_by_peaks(self._separate_clusters(preview_clusters)),
+            f"{base_name}_preview.las", preview_trace,
+            min_line_length=min_line_length, length_method=length_method,
+            reference_point_method=reference_point_method, min_final_points=10, show_result=False)
+        preview_files = {'endpoints_json': os.path.abspath(f"{base_name}_preview_powerline_endpoints.json"),
+                         'las': os.path.abspath(f"{base_name}_preview_extracted_powerlines.las")}
+        trace.stop('preview', output_points=len(down), lines=len(preview_lines),
+                   corridor_points=len(corridor_points), line_threshold=float(line_threshold))
+        self.progress.preview(line_count=len(preview_lines),
+                              elapsed_s=round(time.time() - program_start_time, 2), output_files=preview_files)
+        print(f"预览结果: {len(preview_lines)} 条电力线，耗时 {time.time() - program_start_time:.2f} 秒")
+        print(f"  - 端点JSON: {preview_files['endpoints_json']}")
+
+        # 第二遍: 缓冲区内的全分辨率线性度；邻域取自 缓冲区+最大邻域半径
+        print("\n第二遍：预览电力线缓冲区内的全分辨率计算...")
+        trace.start('corridor_select', input_points=len(high))
+        if len(corridor_points):
+            distance, _ = cKDTree(corridor_points).query(high, distance_upper_bound=corridor_buffer + max_radius)
+        else:
+            distance = np.full(len(high), np.inf)
+        region = np.flatnonzero(np.isfinite(distance))
+        region_points = high[region].astype(np.float64)
+        query = np.flatnonzero(distance[region] <= corridor_buffer)
+        trace.stop('corridor_select', output_points=len(query), region_points=len(region))
+        print(f"缓冲区内 {len(query)} 个点（占高程带外点的 {len(query) / max(len(high), 1) * 100:.1f}%）")
+
+        trace.start('corridor_linearity', input_points=len(query))
+        linear = np.zeros(len(query))
+        sample_step = self._linearity_sample_step(len(query), use_dynamic_params)
+        if len(query) and sample_step is not None:
+            region_cloud = o3d.geometry.PointCloud()
+            region_cloud.points = o3d.utility.Vector3dVector(region_points)
+            kdtree = o3d.geometry.KDTreeFlann(region_cloud)
+            sample_indices = np.arange(0, len(query), sample_step)
+            sample_values = [self._point_linearity(region_points[query[i]], region_points, kdtree, use_dynamic_params)
+                             for i in self.progress.iter(sample_indices, "linearity", desc="缓冲区线性度")]
+            if sample_step == 1:
+                linear = np.asarray(sample_values)
+            else:
+                linear = self._interpolate_linearity(len(query), sample_indices, sample_values)
+        trace.stop('corridor_linearity', output_points=len(query))
+
+        # 缓冲区内几乎全是电力线点，百分位阈值会偏高，因此沿用第一遍在整个场景上得到的阈值
+        trace.start('dbscan', input_points=len(query))
+        line_points = region_points[query[linear > line_threshold]]
+        print(f"线性特征点云: {len(line_points)} 个点 (阈值 {line_threshold:.3f})")
+        labels = self._dbscan_clustering(line_points) if len(line_points) else np.empty(0, dtype=np.int64)
+        single_line_clouds = self._clusters_from_labels(line_points, labels)
+        trace.stop('dbscan', output_points=int(np.count_nonzero(labels != -1)), clusters=len(single_line_clouds))
+        print(f"DBSCAN聚类得到 {len(single_line_clouds)} 个有效聚类")
+
+        return self._finish_from_clusters(single_line_clouds, input_file, trace, own_trace, program_start_time,
+                                          min_line_length, length_method, reference_point_method)
+
+    def _finish_from_clusters(self, single_line_clouds, input_file, trace, own_trace, program_start_time,
+                              min_line_length=10.0, length_method='projection', reference_point_method='center'):
+        """
+        分块/有界内存流程的步骤4-10：与整体流程相同的分离、分割、合并与输出
+
+        :param single_line_clouds: 聚类点云列表
+        :param input_file: 输入文件路径
+        :param trace: 性能追踪器
+        :param own_trace: trace是否由本流程创建（是则写出 <name>_perf_trace.json）
+        :param program_start_time: 流程开始时间
+        :return: 最终电力线列表
+        """
+        print("\n步骤4：分离单独电力线...")
+        trace.start('separate', input_points=self._count_points(single_line_clouds))
+        individual_power_lines = self._separate_clusters(single_line_clouds)
+        trace.stop('separate', output_points=self._count_points(individual_power_lines),
+                   lines=len(individual_power_lines))
+
+        print("\n步骤5：基于高度峰值分割...")
+        trace.start('split', input_points=self._count_points(individual_power_lines))
+        refined_power_lines = self._split_all_by_peaks(individual_power_lines)
+        trace.stop('split', output_points=self._count_points(refined_power_lines),
+                   lines=len(refined_power_lines))
+
+        final_power_lines, _ = self._finalize_power_lines(
+            refined_power_lines, input_file, trace,
+            min_line_length=min_line_length,
+            length_method=length_method,
+            reference_point_method=reference_point_method)
+
+        total_runtime = time.time() - program_start_time
+        print(f"\n电力线提取完成！最终得到 {len(final_power_lines)} 条有效电力线")
+        print(f"总耗时: {total_runtime:.2f}秒")
+
+        if own_trace:
+            base_name = os.path.splitext(os.path.basename(input_file))[0]
+            trace_file = trace.write(f"{base_name}_perf_trace.json")
+            trace.close()
+            print(f"性能追踪已输出到: {trace_file}")
+
+        self._clear_caches()
+        return final_power_lines
+
+    def extract_bounded(self, input_file, max_memory, tile_overlap=None, scratch_dir=None,
+                        min_line_length=10.0, length_method='projection', reference_point_method='center',
+                        use_dynamic_params=True, trace=None, prefetch_depth=2):
+        """
+        有界内存电力线提取：分块读取点云到磁盘暂存数组，按预算切分空间块逐块计算线性度，
+        插值和阈值按序号流式完成；线点之后的阶段与分块提取相同，结果与整体运行一致。
+        读取线程预读后续的LAS块和空间块，写出线程写回暂存数组，与计算重叠进行
+
+        :param input_file: 输入文件路径
+        :param max_memory: 进程常驻内存上限（字节，或 '8G'、'4096' 等字符串，纯数字为MB）
+        :param tile_overlap: 块重叠宽度（米），None表示按邻域半径和eps自动计算
+        :param scratch_dir: 暂存目录的父目录，None表示系统临时目录
+        :param min_line_length: 最小电力线长度阈值
+        :param length_method: 计算长度的方法，'projection'或'path'
+        :param reference_point_method: 坐标变换的全局参考点选择方法
+        :param use_dynamic_params: 是否使用动态参数
+        :param trace: PerfTrace对象，None表示新建并在输出目录写入 <name>_perf_trace.json
+        :param prefetch_depth: 预读/写出队列长度，0表示读取、计算和写出串行进行
+        :return: 变换后的电力线点云列表
+        """
+        program_start_time = time.time()
+        if isinstance(max_memory, str):
+            max_memory = out_of_core.parse_memory_size(max_memory)
+        # 重量级依赖先导入，使预算扣除的基础占用包含它们
+        preload()
+        budget = out_of_core.MemoryBudget(max_memory)
+        if tile_overlap is None:
+            tile_overlap = corridor_tiling.default_overlap(self.radius, self.eps, use_dynamic_params)
+        # 预读队列中的块同样驻留内存：读取块按在途块数均分份额，计算块为每个预读区域预留暂存窗口
+        in_flight = prefetch_depth + 1
+        chunk_points = budget.points(out_of_core.READ_BYTES_PER_POINT, share=0.25 / in_flight,
+                                     minimum=50000, maximum=2000000)
+        block_points = budget.points(3 * in_flight * out_of_core.SCRATCH_BYTES_PER_POINT
+                                     + out_of_core.BLOCK_BYTES_PER_POINT, share=0.6)
+
+        print("=" * 60)
+        print("开始有界内存电力线提取流程")
+        print(f"内存预算 {budget.max_bytes / 2**20:.0f} MB（进程基础占用 {budget.baseline / 2**20:.0f} MB），"
+              f"读取块 {chunk_points} 点，计算块上限 {block_points} 点")
+        print("=" * 60)
+
+        own_trace = trace is None
+        if own_trace:
+            trace = PerfTrace('extract', progress=self.progress)
+        self.last_trace = trace
+        params = dict(threshold=self.threshold, radius=self.radius, height_min=self.height_min,
+                      height_max=self.height_max, eps=self.eps, min_samples=self.min_samples)
+
+        with out_of_core.ScratchSpace(scratch_dir) as scratch:
+            # 步骤1: 分块读取，只暂存高程带外的点
+            print("\n步骤1：分块读取点云到暂存数组...")
+            trace.start('read')
+            self.coordinate_origin, coord_dtype = self._file_frame(input_file)
+            xyz, n_high, n_total, stats = out_of_core.spool_high_points(
+                input_file, self.height_min, self.height_max, scratch, chunk_points,
+                origin=self.coordinate_origin, dtype=coord_dtype, progress=self.progress,
+                prefetch_depth=prefetch_depth)
+            pipeline, summary = prefetch.summarize(stats['pipeline'])
+            trace.stop('read', output_points=n_high, input_total=n_total, coord_dtype=np.dtype(coord_dtype).name,
+                       pipeline=pipeline, **budget.to_dict())
+            print(f"读取流水线 - {summary}")
+            print(f"原始点云包含 {n_total} 个点，高程带外点 {n_high} 个")
+
+            trace.start('block_plan', input_points=n_high)
+            layout = out_of_core.plan_blocks(xyz, n_high, stats, tile_overlap, block_points, chunk_points)
+            blocked_xyz, blocked_rank, offsets = out_of_core.sort_into_blocks(
+                xyz, n_high, layout, scratch, chunk_points)
+            trace.stop('block_plan', output_points=n_high, tiles=layout.n_tiles,
+                       max_block_points=int(np.diff(offsets).max()) if n_high else 0)
+            print(f"按走廊方向划分为 {layout.n_tiles} 个空间块")
+
+            # 步骤2: 逐块计算采样点线性度
+            print("\n步骤2：逐块计算线性特征...")
+            trace.start('block_linearity', input_points=n_high)
+            sample_step = self._linearity_sample_step(n_high, use_dynamic_params)
+            n_samples = len(range(0, n_high, sample_step)) if sample_step else 0
+            samples = scratch.array('samples', max(n_samples, 1), 1, np.float64)
+
+            def load_blocks():
+                # 读取线程：映射并筛选下一个空间块的 核心区+重叠区
+                for tile in range(layout.n_tiles):
+                    own = blocked_rank.read(offsets[tile], offsets[tile + 1])[:, 0]
+                    own = np.sort(own[own % sample_step == 0])
+                    if len(own) == 0:
+                        yield None
+                        continue
+                    points, ranks = out_of_core.load_block_region(blocked_xyz, blocked_rank, offsets, layout, tile)
+                    yield points, ranks, own
+
+            blocks = prefetch.Prefetcher(load_blocks() if n_samples else iter(()), prefetch_depth, 'block_read')
+            writer = prefetch.BackgroundWriter(prefetch_depth, 'sample_write')
+            try:
+                for block in self.progress.iter(blocks, 'block_linearity', total=layout.n_tiles if n_samples else 0,
+                                                desc='逐块线性度'):
+                    if block is None:
+                        continue
+                    points, ranks, own = block
+                    values = corridor_tiling.tile_linearity_task(
+                        params, points, np.searchsorted(ranks, own), use_dynamic_params)
+                    writer.submit(samples.scatter, own // sample_step, values)
+                    del points, ranks, block
+                writer.close()
+            finally:
+                blocks.close()
+                writer.abort()
+            pipeline, summary = prefetch.summarize([(blocks.stats, 'consumer'), (writer.stats, 'producer')])
+            trace.stop('block_linearity', output_points=n_samples, tiles=layout.n_tiles, pipeline=pipeline)
+            print(f"逐块计算流水线 - {summary}")
+
+            # 步骤2b: 流式插值、百分位阈值和线点选择
+            trace.start('line_threshold', input_points=n_high)
+
+            def linear_chunks():
+                for start, stop in out_of_core.iter_ranges(n_high if n_samples else 0, chunk_points):
+                    yield out_of_core.interpolate_chunk(samples, n_samples, sample_step, start, stop)
+
+            if use_dynamic_params:
+                percentile_value, n_valid = out_of_core.streaming_percentile(linear_chunks, 90)
+                if n_valid < 10:
+                    line_threshold = 0.6
+                else:
+                    line_threshold = np.clip(percentile_value, 0.6, 0.9)
+                print(f"动态阈值: {line_threshold:.3f} (原阈值: {self.threshold:.3f})")
+            else:
+                line_threshold = self.threshold
+
+            def threshold_chunks():
+                # 读取线程：插值下一段的线性度并映射对应的坐标窗口
+                for (start, stop), linear in zip(out_of_core.iter_ranges(n_high if n_samples else 0, chunk_points),
+                                                 linear_chunks()):
+                    yield start, linear, xyz.read(start, stop)
+
+            line_ranks = []
+            line_points = []
+            selection = prefetch.Prefetcher(threshold_chunks(), prefetch_depth, 'threshold_read')
+            try:
+                for start, linear, points in selection:
+                    selected = np.where(linear > line_threshold)[0]
+                    if len(selected):
+                        line_ranks.append(start + selected)
+                        line_points.append(points[selected])
+            finally:
+                selection.close()
+            line_ranks = np.concatenate(line_ranks) if line_ranks else np.empty(0, dtype=np.int64)
+            line_points = np.concatenate(line_points).astype(np.float64) if line_points else np.empty((0, 3))
+            pipeline, _ = prefetch.summarize([(selection.stats, 'consumer')])
+            trace.stop('line_threshold', output_points=len(line_points), pipeline=pipeline)
+            print(f"线性特征点云: {len(line_points)} 个点")
+
+        # 步骤3: 线点按同一空间块DBSCAN并拼接接缝
+        print("\n步骤3：分块DBSCAN聚类并拼接接缝...")
+        trace.start('tile_dbscan', input_points=len(line_points))
+        line_uv = layout.to_frame(line_points)
+        line_owner = layout.owner(line_uv)
+        tile_members = [np.flatnonzero(layout.extended_mask(line_uv, tile)) for tile in range(layout.n_tiles)]
+        results = [corridor_tiling.tile_dbscan_task(params, line_points[members]) for members in tile_members]
+        trace.stop('tile_dbscan', output_points=len(line_points), tiles=layout.n_tiles)
+
+        trace.start('seam_stitch', input_points=len(line_points))
+        labels, unions = corridor_tiling.stitch_tile_labels(
+            line_points, tile_members, [r[0] for r in results], [r[1] for r in results], line_owner, self.eps)
+        trace.stop('seam_stitch', output_points=int(np.count_nonzero(labels != -1)),
+                   clusters=len(set(labels) - {-1}), seam_unions=unions)
+        single_line_clouds = self._clusters_from_labels(line_points, labels)
+        print(f"DBSCAN聚类得到 {len(single_line_clouds)} 个有效聚类，跨接缝合并 {unions} 次")
+
+        return self._finish_from_clusters(single_line_clouds, input_file, trace, own_trace, program_start_time,
+                                          min_line_length, length_method, reference_point_method)
+
     def compare_dynamic_vs_fixed_params(self, input_file, save_comparison=True):
         """
         对比动态参数和固定参数的效果
@@ -2131,12 +2959,12 @@ class PowerLineExtractor:
             
             # 保存固定参数结果
             fixed_output = f"{base_name}_fixed_params.las"
-            self._save_point_cloud(fixed_line_cloud, fixed_output)
+            self._save_point_cloud(fixed_line_cloud, fixed_output, origin=self.coordinate_origin)
             print(f"固定参数结果保存到: {fixed_output}")
             
             # 保存动态参数结果
             dynamic_output = f"{base_name}_dynamic_params.las"
-            self._save_point_cloud(dynamic_line_cloud, dynamic_output)
+            self._save_point_cloud(dynamic_line_cloud, dynamic_output, origin=self.coordinate_origin)
             print(f"动态参数结果保存到: {dynamic_output}")
         
         # 返回对比结果
@@ -2160,71 +2988,28 @@ class PowerLineExtractor:
         
         return comparison_result
 
-    def _merge_short_neighbor_lines(self, power_line_clouds, min_length=20.0, visualize=True):
-        """
-        合并所有物理距离上相邻且长度低于min_length的电力线，直到所有线段长度都不低于min_length
+    def sweep_params(self, input_file, thresholds=None, radii=None, eps_values=None, min_samples_values=None,
+                     use_dynamic_params=True, workers=1, min_line_points=50, separate=False, trace=None):
         """
-        import copy
-        import numpy as np
-        import open3d as o3d
-        clouds = copy.deepcopy(power_line_clouds)
-        merged_flags = [False] * len(clouds)
-        result_lines = []
-        while True:
-            changed = False
-            for i, cloud in enumerate(clouds):
-                if merged_flags[i]:
-                    continue
-                points_i = np.asarray(cloud.points)
-                if len(points_i) == 0:
-                    merged_flags[i] = True
-                    continue
-                length_i = self._calculate_power_line_length(cloud)
-                if length_i >= min_length:
-                    result_lines.append(cloud)
-                    merged_flags[i] = True
-                    continue
-                # 找最近的线段
-                min_dist = float('inf')
-                min_j = -1
-                for j, cloud_j in enumerate(clouds):
-                    if i == j or merged_flags[j]:
-                        continue
-                    points_j = np.asarray(cloud_j.points)
-                    if len(points_j) == 0:
-                        continue
-                    length_j = self._calculate_power_line_length(cloud_j)
-                    if length_j >= min_length:
-                        continue
-                    # 计算端点距离
-                    d = min(
-                        np.linalg.norm(points_i[0] - points_j[0]),
-                        np.linalg.norm(points_i[0] - points_j[-1]),
-                        np.linalg.norm(points_i[-1] - points_j[0]),
-                        np.linalg.norm(points_i[-1] - points_j[-1])
-                    )
-                    if d < min_dist:
-                        min_dist = d
-                        min_j = j
-                if min_j != -1 and min_dist < min_length:
-                    # 合并i和min_j
-                    merged_points = np.vstack([points_i, np.asarray(clouds[min_j].points)])
-                    merged_cloud = o3d.geometry.PointCloud()
-                    merged_cloud.points = o3d.utility.Vector3dVector(merged_points)
-                    clouds[i] = merged_cloud
-                    merged_flags[min_j] = True
-                    changed = True
-            if not changed:
-                break
-        # 收集剩余未合并的线段
-        for i, flag in enumerate(merged_flags):
-            if not flag:
-                result_lines.append(clouds[i])
-        # 可视化
-        if visualize and result_lines:
-            colored_lines = self._visualize_separate_power_lines(result_lines)
-            self._safe_visualize(colored_lines, "最终短线段递归合并后电力线")
-        return result_lines
+        在 threshold / radius / eps / min_samples 网格上评估线特征提取与聚类，
+        邻域、线性度和DBSCAN距离图在各组配置之间共享（见 param_sweep.sweep）
+
+        :param input_file: 输入文件路径
+        :param thresholds: 线特征阈值列表（仅固定参数模式起作用），None表示当前阈值
+        :param radii: 邻域半径列表，None表示当前半径
+        :param eps_values: DBSCAN邻域半径列表，None表示当前eps
+        :param min_samples_values: DBSCAN最小样本数列表，None表示当前min_samples
+        :param use_dynamic_params: 是否使用动态参数
+        :param workers: 聚类并行进程数
+        :param min_line_points: 统计保留聚类数时的最小点数
+        :param separate: 是否对每组配置继续做分离和峰值分割并统计线数
+        :param trace: 性能追踪（PerfTrace，可选）
+        :return: (每组配置一行的字典列表, 汇总字典)
+        """
+        return param_sweep.sweep(self, input_file, thresholds=thresholds, radii=radii, eps_values=eps_values,
+                                 min_samples_values=min_samples_values, use_dynamic_params=use_dynamic_params,
+                                 workers=workers, min_line_points=min_line_points, separate=separate,
+                                 trace=trace)
 
 
 if __name__ == '__main__':
@@ -2246,62 +3031,224 @@ if __name__ == '__main__':
     parser.add_argument('--reference_point_method', choices=['center', 'min_z', 'max_z', 'start', 'end'], default='center', help='坐标变换参考点 (默认: center)')
     parser.add_argument('--enable_visualization', action='store_true', help='启用可视化')
     parser.add_argument('--use_dynamic_params', action='store_true', default=True, help='启用动态参数 (默认: True)')
+    parser.add_argument('--no_cache', action='store_true', help='不使用阶段检查点缓存，全部重新计算')
+    parser.add_argument('--cache_dir', default=None, help='阶段检查点缓存目录 (默认: ~/.cache/powerline_extractor/stages)')
+    parser.add_argument('--no_result_cache', action='store_true', help='不使用结果缓存，即使输入与参数完全相同也重新提取')
+    parser.add_argument('--result_cache_dir', default=None, help='结果缓存目录 (默认: ~/.cache/powerline_extractor/results)')
+    parser.add_argument('--full_hash', action='store_true', help='结果缓存键使用全文件哈希（默认只哈希LAS头部和抽样数据块）')
+    parser.add_argument('--profile_stages', default=None, help='用cProfile包裹的阶段，逗号分隔或all (例如: segmentation,dbscan)')
+    parser.add_argument('--profile_dir', default='.', help='.prof文件输出目录 (默认: 当前目录)')
+    parser.add_argument('--trace_malloc', action='store_true',
+                        help='用tracemalloc记录各阶段的Python分配峰值（拦截每次分配，明显变慢，仅用于诊断）')
+    parser.add_argument('--tile_size', type=float, default=None,
+                        help='分块提取的分块边长（米），不设置则整体提取 (例如: 500)')
+    parser.add_argument('--tile_overlap', type=float, default=None,
+                        help='分块重叠宽度（米） (默认: 按邻域半径和eps自动计算)')
+    parser.add_argument('--tile_layout', choices=corridor_tiling.TILE_LAYOUTS, default='corridor',
+                        help='分块布局：corridor沿走廊主方向切段，grid为方形网格 (默认: corridor)')
+    parser.add_argument('--tile_workers', type=int, default=1, help='分块并行进程数 (默认: 1)')
+    parser.add_argument('--coord_dtype', choices=['float32', 'float64'], default='float32',
+                        help='局部坐标存储类型，float32在精度不足时自动退回float64 (默认: float32)')
+    parser.add_argument('--sidecar_cache', action='store_true',
+                        help='经由输入文件旁的二进制旁路缓存（<文件名>.sidecar）读取，缓存无效时生成')
+    parser.add_argument('--compress_output', action='store_true',
+                        help='电力线点云输出为压缩的LAZ（需要 lazrs）')
+    parser.add_argument('--line_geometry', action='store_true',
+                        help='另外输出二进制几何容器 <文件名>_powerlines.plg（线表、端点、颜色和float32点块）')
+    parser.add_argument('--max-memory', dest='max_memory', default=None,
+                        help='有界内存模式的常驻内存上限，纯数字为MB，支持K/M/G后缀 (例如: 8G)；设置后分块读取并逐块计算')
+    parser.add_argument('--prefetch_depth', type=int, default=2,
+                        help='有界内存模式的预读/写出队列长度，0表示读取、计算和写出串行进行 (默认: 2)')
+    parser.add_argument('--scratch_dir', default=None, help='有界内存模式的暂存目录 (默认: 系统临时目录)')
+    parser.add_argument('--incremental_state', default=None,
+                        help='增量提取的状态目录：只重新计算点集变化的分块及其邻域 (默认: 不启用)')
+    parser.add_argument('--full_rebuild', action='store_true', help='增量模式下沿用布局但重新计算所有分块')
+    parser.add_argument('--tower_csv', default=None, help='增量模式下同时原地更新的电力塔CSV路径')
+    parser.add_argument('--two_pass', action='store_true',
+                        help='两遍提取：先在降采样点上输出预览，再只在预览电力线缓冲区内全分辨率计算')
+    parser.add_argument('--preview_voxel', type=float, default=0.5, help='两遍提取预览的体素边长（米） (默认: 0.5)')
+    parser.add_argument('--corridor_buffer', type=float, default=None,
+                        help='两遍提取第二遍的缓冲区半径（米） (默认: 按邻域半径、eps和体素边长自动计算)')
+    parser.add_argument('--time-budget', dest='time_budget', default=None,
+                        help='时间预算（如 120s、2m），按本机标定的成本模型选择采样率、后端和进程数')
+    parser.add_argument('--recalibrate', action='store_true', help='忽略已缓存的成本模型标定，重新标定')
+    parser.add_argument('--progress-format', dest='progress_format', choices=PROGRESS_FORMATS, default='text',
+                        help='进度输出格式：text为进度条和文本，jsonl为每行一个JSON事件 (默认: text)')
+    parser.add_argument('--progress-interval-ms', dest='progress_interval_ms', type=int, default=250,
+                        help='jsonl模式下进度事件的最小间隔毫秒数 (默认: 250)')
     
     args = parser.parse_args()
+    reporter = ProgressReporter(args.progress_format, interval_ms=args.progress_interval_ms)
     
-    # 检查输入文件是否存在
+    # 检查输入文件是否存在（jsonl 模式下只输出终止事件，标准输出保持为纯JSON行）
     if not os.path.exists(args.input_file):
-        print(f"错误：输入文件不存在: {args.input_file}")
+        if reporter.structured:
+            reporter.result(False, error=f"输入文件不存在: {args.input_file}")
+        else:
+            print(f"错误：输入文件不存在: {args.input_file}")
         sys.exit(1)
     
-    print(f"开始处理文件: {args.input_file}")
-    print(f"参数配置:")
-    print(f"  - 线特征阈值: {args.threshold}")
-    print(f"  - 邻域搜索半径: {args.radius}")
-    print(f"  - 高程范围: [{args.height_min}, {args.height_max}]")
-    print(f"  - DBSCAN参数: eps={args.eps}, min_samples={args.min_samples}")
-    print(f"  - 最小点数: {args.min_line_points}")
-    print(f"  - 最小长度: {args.min_line_length}")
-    print(f"  - 长度计算方法: {args.length_method}")
-    print(f"  - 参考点方法: {args.reference_point_method}")
-    print(f"  - 可视化: {'启用' if args.enable_visualization else '禁用'}")
-    print(f"  - 动态参数: {'启用' if args.use_dynamic_params else '禁用'}")
-    
-    # 创建电力线提取器
-    extractor = PowerLineExtractor(
-        threshold=args.threshold,
-        radius=args.radius,
-        height_min=args.height_min,
-        height_max=args.height_max,
-        eps=args.eps,
-        min_samples=args.min_samples,
-        enable_visualization=args.enable_visualization
-    )
-
-    # 执行电力线提取
-    try:
-        individual_power_lines = extractor.extract(
-            args.input_file,
-            min_line_points=args.min_line_points,
-            min_line_length=args.min_line_length,
-            length_method=args.length_method,
-            reference_point_method=args.reference_point_method,
-            visualize_steps=args.enable_visualization,
-            use_dynamic_params=args.use_dynamic_params
+    # jsonl 模式下屏蔽自由文本输出，标准输出只包含JSON事件
+    with reporter.quiet():
+        print(f"开始处理文件: {args.input_file}")
+        print(f"参数配置:")
+        print(f"  - 线特征阈值: {args.threshold}")
+        print(f"  - 邻域搜索半径: {args.radius}")
+        print(f"  - 高程范围: [{args.height_min}, {args.height_max}]")
+        print(f"  - DBSCAN参数: eps={args.eps}, min_samples={args.min_samples}")
+        print(f"  - 最小点数: {args.min_line_points}")
+        print(f"  - 最小长度: {args.min_line_length}")
+        print(f"  - 长度计算方法: {args.length_method}")
+        print(f"  - 参考点方法: {args.reference_point_method}")
+        print(f"  - 可视化: {'启用' if args.enable_visualization else '禁用'}")
+        print(f"  - 动态参数: {'启用' if args.use_dynamic_params else '禁用'}")
+        print(f"  - 阶段缓存: {'禁用' if args.no_cache else '启用'}")
+        print(f"  - 结果缓存: {'禁用' if args.no_result_cache else ('启用 (全文件哈希)' if args.full_hash else '启用')}")
+        
+        # 创建电力线提取器
+        extractor = PowerLineExtractor(
+            threshold=args.threshold,
+            radius=args.radius,
+            height_min=args.height_min,
+            height_max=args.height_max,
+            eps=args.eps,
+            min_samples=args.min_samples,
+            enable_visualization=args.enable_visualization,
+            progress=reporter,
+            coord_dtype=args.coord_dtype
         )
-        
-        print(f"\n电力线提取完成！")
-        print(f"成功提取 {len(individual_power_lines)} 条电力线")
-        
-        # 生成输出文件名
-        base_name = os.path.splitext(os.path.basename(args.input_file))[0]
-        json_file = f"{base_name}_powerline_endpoints.json"
-        las_file = f"{base_name}_extracted_powerlines.las"
-        
-        print(f"输出文件:")
-        print(f"  - 端点JSON: {json_file}")
-        print(f"  - 提取点云: {las_file}")
-        
-    except Exception as e:
-        print(f"错误：电力线提取失败: {str(e)}")
-        sys.exit(1)
+        extractor.compress_output = args.compress_output
+        extractor.line_geometry_output = args.line_geometry
+        extractor.use_sidecar = args.sidecar_cache
+
+        # 性能追踪（结束后写入 <name>_perf_trace.json）
+        perf_trace = PerfTrace('extract', trace_malloc=args.trace_malloc, profile_stages=args.profile_stages,
+                               profile_dir=args.profile_dir, progress=reporter)
+
+        # 执行电力线提取
+        try:
+            plan = None
+            if args.time_budget:
+                plan = extractor.plan_for_budget(
+                    args.input_file,
+                    cost_model.parse_duration(args.time_budget),
+                    use_dynamic_params=args.use_dynamic_params,
+                    recalibrate=args.recalibrate,
+                    trace=perf_trace
+                )
+                # 规划的进程数用于分块/增量流程；未指定其他流程时由规划决定是否分块
+                args.tile_workers = max(args.tile_workers, plan['workers'])
+                explicit_mode = args.incremental_state or args.two_pass or args.max_memory or args.tile_size
+                if plan['backend'] == 'tiled' and not explicit_mode:
+                    args.tile_size = plan['tile_size']
+
+            if args.incremental_state:
+                print(f"  - 增量提取: 状态目录 {args.incremental_state}")
+                individual_power_lines = extractor.extract_incremental(
+                    args.input_file,
+                    args.incremental_state,
+                    tile_size=args.tile_size or 500.0,
+                    tile_overlap=args.tile_overlap,
+                    tile_layout=args.tile_layout,
+                    tile_workers=args.tile_workers,
+                    full_rebuild=args.full_rebuild,
+                    tower_csv=args.tower_csv,
+                    min_line_length=args.min_line_length,
+                    length_method=args.length_method,
+                    reference_point_method=args.reference_point_method,
+                    use_dynamic_params=args.use_dynamic_params,
+                    trace=perf_trace
+                )
+            elif args.two_pass:
+                print(f"  - 两遍提取: 预览体素 {args.preview_voxel} 米")
+                individual_power_lines = extractor.extract_two_pass(
+                    args.input_file,
+                    preview_voxel=args.preview_voxel,
+                    corridor_buffer=args.corridor_buffer,
+                    min_line_length=args.min_line_length,
+                    length_method=args.length_method,
+                    reference_point_method=args.reference_point_method,
+                    use_dynamic_params=args.use_dynamic_params,
+                    trace=perf_trace
+                )
+            elif args.max_memory:
+                print(f"  - 有界内存: 上限 {args.max_memory}")
+                individual_power_lines = extractor.extract_bounded(
+                    args.input_file,
+                    max_memory=args.max_memory,
+                    tile_overlap=args.tile_overlap,
+                    scratch_dir=args.scratch_dir,
+                    min_line_length=args.min_line_length,
+                    length_method=args.length_method,
+                    reference_point_method=args.reference_point_method,
+                    use_dynamic_params=args.use_dynamic_params,
+                    trace=perf_trace,
+                    prefetch_depth=args.prefetch_depth
+                )
+            elif args.tile_size:
+                print(f"  - 分块提取: {args.tile_layout} 布局, 边长 {args.tile_size} 米, 进程数 {args.tile_workers}")
+                individual_power_lines = extractor.extract_tiled(
+                    args.input_file,
+                    tile_size=args.tile_size,
+                    tile_overlap=args.tile_overlap,
+                    tile_layout=args.tile_layout,
+                    tile_workers=args.tile_workers,
+                    min_line_length=args.min_line_length,
+                    length_method=args.length_method,
+                    reference_point_method=args.reference_point_method,
+                    use_dynamic_params=args.use_dynamic_params,
+                    trace=perf_trace
+                )
+            else:
+                individual_power_lines = extractor.extract(
+                    args.input_file,
+                    min_line_points=args.min_line_points,
+                    min_line_length=args.min_line_length,
+                    length_method=args.length_method,
+                    reference_point_method=args.reference_point_method,
+                    visualize_steps=args.enable_visualization,
+                    use_dynamic_params=args.use_dynamic_params,
+                    use_cache=not args.no_cache,
+                    cache_dir=args.cache_dir,
+                    trace=perf_trace,
+                    use_result_cache=not args.no_result_cache,
+                    result_cache_dir=args.result_cache_dir,
+                    full_hash=args.full_hash
+                )
+            
+            print(f"\n电力线提取完成！")
+            print(f"成功提取 {len(individual_power_lines)} 条电力线")
+            
+            # 生成输出文件名
+            base_name = os.path.splitext(os.path.basename(args.input_file))[0]
+            json_file = f"{base_name}_powerline_endpoints.json"
+            las_file = las_io.powerline_las_name(args.input_file, args.compress_output)
+            trace_file = perf_trace.write(f"{base_name}_perf_trace.json")
+            if plan is not None:
+                cost_model.compare_plan(plan, perf_trace.to_dict(), input_file=os.path.abspath(args.input_file))
+            
+            print(f"输出文件:")
+            print(f"  - 端点JSON: {json_file}")
+            print(f"  - 提取点云: {las_file}")
+            if args.line_geometry:
+                print(f"  - 几何容器: {line_geometry_name(args.input_file)}")
+            print(f"  - 性能追踪: {trace_file}")
+            
+        except Exception as e:
+            print(f"错误：电力线提取失败: {str(e)}")
+            reporter.result(False, error=f"电力线提取失败: {str(e)}")
+            sys.exit(1)
+        finally:
+            perf_trace.close()
+
+    reporter.result(
+        True,
+        line_count=len(individual_power_lines),
+        total_wall_s=perf_trace.to_dict()['total_wall_s'],
+        output_files={
+            'endpoints_json': os.path.abspath(json_file),
+            'las': os.path.abspath(las_file),
+            **({'line_geometry': os.path.abspath(line_geometry_name(args.input_file))} if args.line_geometry else {}),
+            'perf_trace': os.path.abspath(trace_file),
+        }
+    )
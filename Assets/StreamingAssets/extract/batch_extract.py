@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+"""
+批量提取 - batch_extract.py
+
+对一个目录或若干通配符匹配到的LAS/LAZ文件批量执行电力线提取（或完整的 worker 流程）：
+1.  按内存预算调度进程池：每个文件按点数估算峰值内存，同时运行的文件估算之和不超过预算；
+2.  按文件大小从大到小调度，避免最大的文件最后才开始而拖长总耗时；
+3.  工作进程常驻，只在启动时导入一次依赖并预热 Numba 核函数；
+4.  每个文件的输出和日志写入输出目录，并生成一份汇总清单（耗时、失败原因）；
+5.  可断点续跑：清单中参数一致、输入未变化且输出文件仍存在的文件会被跳过。
+
+使用方法:
+    python batch_extract.py /data/flight_0612 --output_dir out --memory_budget_mb 16000
+    python batch_extract.py "/data/strips/*.las" --mode worker --height_max 60
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures.process import BrokenProcessPool
+
+from las_io import open_las, powerline_las_name
+from perf_trace import peak_rss_bytes
+from progress import ProgressReporter, PROGRESS_FORMATS
+
+MANIFEST_NAME = 'batch_manifest.json'
+LAS_EXTENSIONS = ('.las', '.laz')
+
+# 峰值内存估算：工作进程基础开销 + 每点开销（坐标、open3d 副本、线性特征、邻域查询等）
+WORKER_BASE_MB = 400
+DEFAULT_BYTES_PER_POINT = 400
+
+
+def find_inputs(patterns):
+    """
+    将目录或通配符展开为去重后的LAS/LAZ文件列表。
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern)
+        files.extend(os.path.abspath(p) for p in candidates
+                     if os.path.isfile(p) and p.lower().endswith(LAS_EXTENSIONS))
+    return sorted(set(files))
+
+
+def estimate_memory_mb(file_path, bytes_per_point=DEFAULT_BYTES_PER_POINT):
+    """
+    根据LAS头中的点数估算处理该文件的峰值内存（MB），返回 (点数, 估算MB)。
+    """
+    with open_las(file_path) as reader:
+        point_count = int(reader.header.point_count)
+    return point_count, WORKER_BASE_MB + point_count * bytes_per_point / (1024 * 1024)
+
+
+def expected_outputs(file_path, mode, compress=False):
+    """
+    返回输出目录中该文件应生成的输出文件名；compress=True 时电力线点云为 .laz。
+    """
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    outputs = {
+        'endpoints_json': f"{base_name}_powerline_endpoints.json",
+        'las': powerline_las_name(file_path, compress),
+    }
+    if mode == 'worker':
+        outputs['heightmap'] = f"{base_name}.raw"
+        outputs['metadata'] = f"{base_name}_metadata.json"
+    else:
+        outputs['perf_trace'] = f"{base_name}_perf_trace.json"
+    return outputs
+
+
+def params_hash(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def file_signature(file_path):
+    stat = os.stat(file_path)
+    return {'size_bytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(output_dir, manifest):
+    # 先写临时文件再替换，中途中断也不会留下损坏的清单
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(entry, file_path, run_hash, output_dir):
+    """
+    清单中的记录是否仍然有效：成功完成、参数一致、输入未变化且输出文件都存在。
+    """
+    if not entry or entry.get('status') not in ('done', 'skipped') or entry.get('params_hash') != run_hash:
+        return False
+    signature = file_signature(file_path)
+    if entry.get('size_bytes') != signature['size_bytes'] or entry.get('mtime_ns') != signature['mtime_ns']:
+        return False
+    return all(os.path.exists(os.path.join(output_dir, name)) for name in entry.get('outputs', {}).values())
+
+
+# ==============================================================================
+#  工作进程
+# ==============================================================================
+
+def _init_worker(output_dir):
+    """
+    进程池初始化：切换到输出目录，导入并预热所有依赖，之后该进程处理的每个文件都无需冷启动。
+    """
+    os.chdir(output_dir)
+    from lazy_imports import preload
+    from terrain_generator import warmup_numba_kernels
+    preload()
+    warmup_numba_kernels()
+
+
+def _process_file(file_path, mode, params):
+    """
+    在工作进程中处理一个文件，文本输出写入 <文件名>_batch.log，返回结果字典。
+    """
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    log_path = f"{base_name}_batch.log"
+    start = time.perf_counter()
+    result = {'input': file_path, 'pid': os.getpid(), 'log': log_path}
+
+    with open(log_path, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        # 进度以JSON事件写入日志，避免多个进程的进度条交错输出到终端
+        reporter = ProgressReporter('jsonl', interval_ms=1000, stream=log)
+        try:
+            if mode == 'worker':
+                result['line_count'] = _run_worker_mode(file_path, base_name, params, reporter)
+            else:
+                result['line_count'] = _run_extract_mode(file_path, params, reporter)
+            result['status'] = 'done'
+        except Exception as e:
+            traceback.print_exc(file=log)
+            result['status'] = 'failed'
+            result['error'] = f"{type(e).__name__}: {e}"
+
+    result['wall_s'] = round(time.perf_counter() - start, 3)
+    peak = peak_rss_bytes()
+    result['worker_peak_rss_mb'] = None if peak is None else round(peak / (1024 * 1024), 1)
+    return result
+
+
+def _run_extract_mode(file_path, params, reporter):
+    from Extractor4 import PowerLineExtractor
+    extractor = PowerLineExtractor(
+        threshold=params['threshold'],
+        radius=params['radius'],
+        height_min=params['height_min'],
+        height_max=params['height_max'],
+        eps=params['eps'],
+        min_samples=params['min_samples'],
+        enable_visualization=False,
+        progress=reporter
+    )
+    extractor.compress_output = params.get('compress_output', False)
+    lines = extractor.extract(
+        file_path,
+        min_line_points=params['min_line_points'],
+        min_line_length=params['min_line_length'],
+        visualize_steps=False,
+        use_cache=params['use_cache'],
+        cache_dir=params['cache_dir']
+    )
+    return len(lines)
+
+
+def _run_worker_mode(file_path, base_name, params, reporter):
+    from worker import build_parser, run_worker
+    argv = [
+        '--input', file_path,
+        '--output_raw', f"{base_name}.raw",
+        '--output_json', f"{base_name}_metadata.json",
+        '--terrain_res', str(params['terrain_res']),
+        '--thinning_res', str(params['thinning_res']),
+        '--pl_height_min', str(params['height_min']),
+        '--pl_height_max', str(params['height_max']),
+        '--pl_eps', str(params['eps']),
+        '--pl_min_samples', str(params['min_samples']),
+        '--pl_min_line_length', str(params['min_line_length']),
+    ]
+    if params.get('compress_output'):
+        argv.append('--compress_output')
+    if not params['use_cache']:
+        argv.append('--no_cache')
+    if params['cache_dir']:
+        argv.extend(['--cache_dir', params['cache_dir']])
+    metadata = run_worker(build_parser().parse_args(argv), reporter)
+    return metadata['powerline_metadata']['line_count']
+
+
+# ==============================================================================
+#  调度
+# ==============================================================================
+
+def run_batch(inputs, output_dir, mode, params, memory_budget_mb, max_workers=None,
+              bytes_per_point=DEFAULT_BYTES_PER_POINT, force=False, reporter=None):
+    """
+    按内存预算调度批处理，返回汇总清单。
+    """
+    reporter = reporter or ProgressReporter()
+    os.makedirs(output_dir, exist_ok=True)
+    output_dir = os.path.abspath(output_dir)
+    run_hash = params_hash({'mode': mode, **params})
+    previous = {} if force else {e['input']: e for e in (load_manifest(output_dir) or {}).get('files', [])}
+
+    entries = {}
+    jobs = []
+    for file_path in inputs:
+        entry = {'input': file_path, 'params_hash': run_hash, **file_signature(file_path)}
+        if is_up_to_date(previous.get(file_path), file_path, run_hash, output_dir):
+            entry.update(previous[file_path])
+            entry['status'] = 'skipped'
+        else:
+            try:
+                entry['points'], entry['estimated_mb'] = estimate_memory_mb(file_path, bytes_per_point)
+                entry['status'] = 'pending'
+                jobs.append(entry)
+            except Exception as e:
+                entry.update({'status': 'failed', 'error': f"无法读取LAS头: {e}"})
+        entries[file_path] = entry
+
+    # 大文件优先：总耗时由最长的任务决定，最大的文件越早开始越好
+    jobs.sort(key=lambda e: e['size_bytes'], reverse=True)
+
+    budget_mb = float(memory_budget_mb)
+    cpu_limit = max_workers or os.cpu_count() or 1
+    smallest = min((e['estimated_mb'] for e in jobs), default=budget_mb)
+    workers = max(1, min(cpu_limit, len(jobs), int(budget_mb // smallest))) if jobs else 0
+
+    manifest = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'mode': mode,
+        'params': params,
+        'params_hash': run_hash,
+        'memory_budget_mb': budget_mb,
+        'workers': workers,
+        'files': list(entries.values()),
+    }
+    skipped = sum(1 for e in entries.values() if e['status'] == 'skipped')
+    print(f"共 {len(inputs)} 个文件：待处理 {len(jobs)}，已是最新 {skipped}，进程数 {workers}，内存预算 {budget_mb:.0f} MB")
+    write_manifest(output_dir, manifest)
+
+    batch_start = time.perf_counter()
+    done_count = 0
+    pending = list(jobs)
+    running = {}
+    in_flight_mb = 0.0
+    pool = None
+    try:
+        while pending or running:
+            if pool is None and pending:
+                pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers, initializer=_init_worker, initargs=(output_dir,))
+
+            # 按预算放行：从大到小取出能放进剩余预算的文件；没有任务在运行时至少放行一个，避免超大文件饿死
+            index = 0
+            while index < len(pending) and len(running) < workers:
+                entry = pending[index]
+                if running and in_flight_mb + entry['estimated_mb'] > budget_mb:
+                    index += 1
+                    continue
+                pending.pop(index)
+                entry['status'] = 'running'
+                future = pool.submit(_process_file, entry['input'], mode, params)
+                running[future] = entry
+                in_flight_mb += entry['estimated_mb']
+
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            broken = False
+            for future in finished:
+                entry = running.pop(future)
+                in_flight_mb -= entry['estimated_mb']
+                try:
+                    entry.update(future.result())
+                except BrokenProcessPool as e:
+                    # 工作进程异常退出（通常是内存不足）时，进程池中所有在途任务都会失败；
+                    # 记录失败后重建进程池，继续处理其余文件
+                    entry.update({'status': 'failed', 'error': f"工作进程异常退出（可能内存不足）: {e}"})
+                    broken = True
+                if entry['status'] == 'done':
+                    entry['outputs'] = expected_outputs(entry['input'], mode, params.get('compress_output', False))
+                done_count += 1
+                print(f"[{done_count}/{len(jobs)}] {os.path.basename(entry['input'])}: {entry['status']}"
+                      f"，耗时 {entry.get('wall_s', 0):.1f} 秒"
+                      + (f"，{entry['line_count']} 条电力线" if entry['status'] == 'done' else f"，{entry.get('error')}"))
+                reporter.update('batch', done_count, len(jobs))
+                write_manifest(output_dir, manifest)
+            if broken and not running:
+                pool.shutdown(wait=False)
+                pool = None
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    failed = [e for e in entries.values() if e['status'] == 'failed']
+    manifest['total_wall_s'] = round(time.perf_counter() - batch_start, 3)
+    manifest['summary'] = {
+        'total': len(inputs),
+        'done': sum(1 for e in entries.values() if e['status'] == 'done'),
+        'skipped': skipped,
+        'failed': len(failed),
+    }
+    write_manifest(output_dir, manifest)
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='批量电力线提取（进程池 + 内存预算调度）')
+    parser.add_argument('inputs', nargs='+', help='输入目录或通配符（如 "/data/*.las"）')
+    parser.add_argument('--output_dir', default='batch_output', help='输出目录 (默认: batch_output)')
+    parser.add_argument('--mode', choices=['extract', 'worker'], default='extract',
+                        help='extract 只提取电力线；worker 同时生成地形高度图 (默认: extract)')
+    parser.add_argument('--memory_budget_mb', type=float, default=8192, help='所有工作进程的总内存预算MB (默认: 8192)')
+    parser.add_argument('--max_workers', type=int, default=None, help='最大进程数 (默认: CPU核心数)')
+    parser.add_argument('--bytes_per_point', type=float, default=DEFAULT_BYTES_PER_POINT,
+                        help=f'每点峰值内存估算字节数 (默认: {DEFAULT_BYTES_PER_POINT})')
+    parser.add_argument('--force', action='store_true', help='忽略清单，重新处理所有文件')
+    # 提取参数（与 Extractor4.py 的命令行默认值一致）
+    parser.add_argument('--threshold', type=float, default=0.8, help='线特征阈值 (默认: 0.8)')
+    parser.add_argument('--radius', type=float, default=2.0, help='邻域搜索半径 (默认: 2.0)')
+    parser.add_argument('--height_min', type=float, default=0, help='最小高程 (默认: 0)')
+    parser.add_argument('--height_max', type=float, default=60, help='最大高程 (默认: 60)')
+    parser.add_argument('--eps', type=float, default=1.8, help='DBSCAN邻域半径 (默认: 1.8)')
+    parser.add_argument('--min_samples', type=int, default=7, help='DBSCAN最小样本数 (默认: 7)')
+    parser.add_argument('--min_line_points', type=int, default=50, help='最小点数阈值 (默认: 50)')
+    parser.add_argument('--min_line_length', type=float, default=30.0, help='最小长度阈值 (默认: 30.0)')
+    parser.add_argument('--terrain_res', type=float, default=1.0, help='worker 模式高度图分辨率 (默认: 1.0)')
+    parser.add_argument('--thinning_res', type=float, default=0.5, help='worker 模式地形精简分辨率 (默认: 0.5)')
+    parser.add_argument('--no_cache', action='store_true', help='不使用阶段检查点缓存')
+    parser.add_argument('--cache_dir', default=None, help='阶段检查点缓存目录')
+    parser.add_argument('--compress_output', action='store_true', help='电力线点云输出为压缩的LAZ（需要 lazrs）')
+    parser.add_argument('--progress-format', dest='progress_format', choices=PROGRESS_FORMATS, default='text',
+                        help='进度输出格式 (默认: text)')
+    args = parser.parse_args()
+
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        print(f"错误：没有找到LAS/LAZ文件: {args.inputs}")
+        sys.exit(1)
+
+    params = {
+        'threshold': args.threshold,
+        'radius': args.radius,
+        'height_min': args.height_min,
+        'height_max': args.height_max,
+        'eps': args.eps,
+        'min_samples': args.min_samples,
+        'min_line_points': args.min_line_points,
+        'min_line_length': args.min_line_length,
+        'use_cache': not args.no_cache,
+        'cache_dir': os.path.abspath(args.cache_dir) if args.cache_dir else None,
+    }
+    # 只在输出LAZ时加入，已有清单中LAS输出的参数哈希保持不变
+    if args.compress_output:
+        params['compress_output'] = True
+    if args.mode == 'worker':
+        params.update({'terrain_res': args.terrain_res, 'thinning_res': args.thinning_res})
+
+    reporter = ProgressReporter(args.progress_format)
+    with reporter.quiet():
+        manifest = run_batch(inputs, args.output_dir, args.mode, params, args.memory_budget_mb,
+                             max_workers=args.max_workers, bytes_per_point=args.bytes_per_point,
+                             force=args.force, reporter=reporter)
+        summary = manifest['summary']
+        print(f"\n批处理完成：成功 {summary['done']}，跳过 {summary['skipped']}，失败 {summary['failed']}，"
+              f"总耗时 {manifest.get('total_wall_s', 0):.1f} 秒")
+        print(f"清单: {os.path.join(os.path.abspath(args.output_dir), MANIFEST_NAME)}")
+    reporter.result(summary['failed'] == 0, manifest=os.path.join(os.path.abspath(args.output_dir), MANIFEST_NAME),
+                    **summary)
+    sys.exit(1 if summary['failed'] else 0)
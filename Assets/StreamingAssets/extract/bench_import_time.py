@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+导入耗时基准 - bench_import_time.py
+
+在全新的子进程中执行 `python -X importtime -c "import <模块>"`，解析每个模块的累计导入耗时，
+与预算比较，并检查无界面核心是否意外导入了重量级依赖（open3d、cv2、matplotlib、sklearn、tqdm）。
+任一模块超出预算或加载了禁止的依赖时以非零状态码退出，可用于持续跟踪启动开销。
+
+使用方法:
+    python bench_import_time.py
+    python bench_import_time.py --modules Extractor4 worker --repeat 7 --output import_time.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# 各入口模块的冷启动导入预算（毫秒，取多次运行的中位数）
+IMPORT_BUDGETS_MS = {
+    'Extractor4': 250,
+    'worker': 600,
+    'terrain_generator': 500,
+    'stage_cache': 150,
+}
+
+# 这些依赖只应在第一次使用时加载，不允许出现在入口模块的导入链中
+HEAVY_MODULES = ('open3d', 'cv2', 'matplotlib', 'sklearn', 'tqdm')
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(stderr_text):
+    """
+    解析 -X importtime 的输出，返回 [(模块名, 自身微秒, 累计微秒, 嵌套深度), ...]
+    """
+    records = []
+    for line in stderr_text.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line.split('|', 2)
+            self_us = int(self_us.split(':')[-1])
+            cumulative_us = int(cumulative_us)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        records.append((name.strip(), self_us, cumulative_us, depth))
+    return records
+
+
+def measure_module(module, python=sys.executable):
+    """
+    在新进程中导入一次模块，返回 (导入记录, 进程墙钟秒数)。
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SCRIPT_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    start = time.perf_counter()
+    proc = subprocess.run([python, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=SCRIPT_DIR, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr), wall
+
+
+def bench_module(module, repeat=5, top=10, budget_ms=None):
+    """
+    多次测量一个模块的冷启动导入耗时，返回结果字典。
+    """
+    cumulative_ms, walls = [], []
+    records = []
+    for _ in range(repeat):
+        records, wall = measure_module(module)
+        target = [r for r in records if r[0] == module]
+        cumulative_ms.append(target[-1][2] / 1000.0 if target else float('nan'))
+        walls.append(wall)
+
+    loaded = {r[0] for r in records}
+    heavy_loaded = sorted(m for m in loaded if m in HEAVY_MODULES)
+    # 最慢的直接/间接依赖（按累计耗时，只取顶层包，避免子模块重复计数）
+    top_level = [r for r in records if '.' not in r[0] and r[0] != module]
+    slowest = sorted(top_level, key=lambda r: r[2], reverse=True)[:top]
+
+    median_ms = statistics.median(cumulative_ms)
+    result = {
+        'module': module,
+        'median_ms': round(median_ms, 1),
+        'min_ms': round(min(cumulative_ms), 1),
+        'max_ms': round(max(cumulative_ms), 1),
+        'process_wall_ms': round(statistics.median(walls) * 1000.0, 1),
+        'budget_ms': budget_ms,
+        'within_budget': budget_ms is None or median_ms <= budget_ms,
+        'heavy_modules_loaded': heavy_loaded,
+        'slowest_imports': [{'module': r[0], 'cumulative_ms': round(r[2] / 1000.0, 1)} for r in slowest],
+    }
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='入口模块冷启动导入耗时基准')
+    parser.add_argument('--modules', nargs='+', default=['Extractor4', 'worker'],
+                        help='要测量的模块 (默认: Extractor4 worker)')
+    parser.add_argument('--repeat', type=int, default=5, help='每个模块的测量次数，取中位数 (默认: 5)')
+    parser.add_argument('--top', type=int, default=10, help='列出最慢的依赖个数 (默认: 10)')
+    parser.add_argument('--budget_ms', type=float, default=None,
+                        help='统一的预算毫秒数，覆盖内置预算')
+    parser.add_argument('--output', default=None, help='结果JSON输出路径')
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    for module in args.modules:
+        budget = args.budget_ms if args.budget_ms is not None else IMPORT_BUDGETS_MS.get(module)
+        result = bench_module(module, repeat=args.repeat, top=args.top, budget_ms=budget)
+        results.append(result)
+
+        status = '通过' if result['within_budget'] else '超出预算'
+        budget_text = f"{budget:.0f} ms" if budget is not None else '无'
+        print(f"\n{module}: 中位数 {result['median_ms']:.1f} ms "
+              f"(最小 {result['min_ms']:.1f} / 最大 {result['max_ms']:.1f})，"
+              f"进程总耗时 {result['process_wall_ms']:.1f} ms，预算 {budget_text} -> {status}")
+        if result['heavy_modules_loaded']:
+            print(f"  警告：导入链中包含重量级依赖: {', '.join(result['heavy_modules_loaded'])}")
+        print("  最慢的依赖:")
+        for item in result['slowest_imports']:
+            print(f"    {item['module']:<24} {item['cumulative_ms']:>8.1f} ms")
+        failed = failed or not result['within_budget'] or bool(result['heavy_modules_loaded'])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'python': sys.version.split()[0],
+                'results': results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.output}")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+LAS/LAZ 读取吞吐量基准 - bench_laz.py
+
+把输入点云分别写成未压缩的LAS和压缩的LAZ（记录写出耗时和压缩比），
+然后在同一份数据上比较读取吞吐量（文件MB/s 与 点/s）：
+- las            未压缩LAS
+- laz_parallel   LAZ，lazrs 多线程后端（LazrsParallel，按块并行解压）
+- laz_single     LAZ，lazrs 单线程后端（Lazrs）
+每种格式分别测量整体读取（laspy.read）和分块读取（chunk_iterator，与 chunked_reader 相同的读取方式）。
+每项先读取一次预热（文件进入页缓存），再取 --repeat 次中的最短时间；
+同时核对各格式解码出的整数坐标一致。多线程后端的线程数可用环境变量 RAYON_NUM_THREADS 限制。
+
+使用方法:
+    python bench_laz.py input.las
+    python bench_laz.py input.laz --repeat 5 --chunk_points 500000 --output laz_bench.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import las_io
+
+DEFAULT_CHUNK_POINTS = 1000000
+READ_MODES = ('full', 'chunked')
+
+
+def prepare_copies(input_file, work_dir):
+    """
+    在 work_dir 中写出输入点云的LAS和LAZ副本
+
+    :return: ({'las': 路径, 'laz': 路径}, {'las': 写出秒数, 'laz': 写出秒数})
+    """
+    las_data = las_io.read_las(input_file)
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    paths, write_s = {}, {}
+    for fmt in ('las', 'laz'):
+        paths[fmt] = os.path.join(work_dir, f"{base_name}.{fmt}")
+        start = time.perf_counter()
+        las_io.write_las(las_data, paths[fmt])
+        write_s[fmt] = time.perf_counter() - start
+    return paths, write_s
+
+
+def _checksum(x, y, z):
+    return int(np.sum(x, dtype=np.int64) ^ np.sum(y, dtype=np.int64) * 3 ^ np.sum(z, dtype=np.int64) * 7)
+
+
+def read_full(path, backend):
+    """
+    laspy.read 整体读取并解码坐标，返回 (点数, 整数坐标校验和)
+    """
+    import laspy
+
+    las_data = laspy.read(path, laz_backend=backend) if backend is not None else laspy.read(path)
+    return len(las_data.points), _checksum(las_data.X, las_data.Y, las_data.Z)
+
+
+def read_chunked(path, backend, chunk_points=DEFAULT_CHUNK_POINTS):
+    """
+    chunk_iterator 分块读取并解码坐标，返回 (点数, 整数坐标校验和)
+    """
+    import laspy
+
+    count, checksum = 0, 0
+    with laspy.open(path, laz_backend=backend) as reader:
+        for chunk in reader.chunk_iterator(chunk_points):
+            checksum ^= _checksum(chunk.X, chunk.Y, chunk.Z) * (count + 1)
+            count += len(chunk)
+    return count, checksum
+
+
+def time_read(fn, repeat):
+    """
+    预热一次后返回 (最短秒数, 点数, 校验和)
+    """
+    count, checksum = fn()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best, count, checksum
+
+
+def run_bench(input_file, work_dir, repeat=3, chunk_points=DEFAULT_CHUNK_POINTS, modes=READ_MODES):
+    """
+    执行全部读取测量
+
+    :return: 结果字典（文件信息 + 每个 格式/后端/读取方式 的吞吐量）
+    """
+    import laspy
+
+    paths, write_s = prepare_copies(input_file, work_dir)
+    sizes = {fmt: os.path.getsize(path) for fmt, path in paths.items()}
+    cases = [('las', 'las', None)]
+    for name, backend in (('laz_parallel', laspy.LazBackend.LazrsParallel), ('laz_single', laspy.LazBackend.Lazrs)):
+        if backend.is_available():
+            cases.append((name, 'laz', backend))
+        else:
+            print(f"跳过 {name}: 后端 {backend.name} 不可用")
+
+    rows = []
+    reference = {}
+    for mode in modes:
+        for name, fmt, backend in cases:
+            if mode == 'full':
+                fn = lambda: read_full(paths[fmt], backend)
+            else:
+                fn = lambda: read_chunked(paths[fmt], backend, chunk_points)
+            seconds, count, checksum = time_read(fn, repeat)
+            reference.setdefault(mode, checksum)
+            rows.append({
+                'case': name,
+                'mode': mode,
+                'file_mb': round(sizes[fmt] / 2 ** 20, 2),
+                'seconds': round(seconds, 4),
+                'mb_per_s': round(sizes[fmt] / 2 ** 20 / seconds, 1),
+                'points_per_s': round(count / seconds),
+                'points': count,
+                'matches_las': checksum == reference[mode],
+            })
+            print(f"{name:<13} {mode:<8} {rows[-1]['file_mb']:>9.2f} MB {seconds:>8.3f} 秒 "
+                  f"{rows[-1]['mb_per_s']:>9.1f} MB/s {rows[-1]['points_per_s'] / 1e6:>8.2f} M点/s"
+                  f"{'' if rows[-1]['matches_las'] else '  坐标与LAS不一致!'}")
+
+    return {
+        'input_file': os.path.abspath(input_file),
+        'cpu_count': os.cpu_count(),
+        'rayon_num_threads': os.environ.get('RAYON_NUM_THREADS'),
+        'chunk_points': chunk_points,
+        'repeat': repeat,
+        'las_mb': round(sizes['las'] / 2 ** 20, 2),
+        'laz_mb': round(sizes['laz'] / 2 ** 20, 2),
+        'compression_ratio': round(sizes['las'] / sizes['laz'], 2),
+        'write_s': {fmt: round(s, 3) for fmt, s in write_s.items()},
+        'reads': rows,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='LAS 与 LAZ（lazrs 单线程/多线程）读取吞吐量比较')
+    parser.add_argument('input_file', help='输入的LAS/LAZ文件路径')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数，取最短时间 (默认: 3)')
+    parser.add_argument('--chunk_points', type=int, default=DEFAULT_CHUNK_POINTS,
+                        help=f'分块读取的每块点数 (默认: {DEFAULT_CHUNK_POINTS})')
+    parser.add_argument('--modes', nargs='+', choices=READ_MODES, default=list(READ_MODES),
+                        help='读取方式 (默认: full chunked)')
+    parser.add_argument('--work_dir', default=None, help='LAS/LAZ副本的存放目录 (默认: 临时目录，结束后删除)')
+    parser.add_argument('--output', default=None, help='结果JSON路径（可选）')
+    args = parser.parse_args()
+
+    if las_io.laz_backend() is None:
+        print("错误：没有可用的LAZ后端，请安装: pip install lazrs")
+        sys.exit(1)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='bench_laz_')
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        result = run_bench(args.input_file, work_dir, repeat=args.repeat,
+                           chunk_points=args.chunk_points, modes=args.modes)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\nLAS {result['las_mb']} MB，LAZ {result['laz_mb']} MB，压缩比 {result['compression_ratio']}；"
+          f"写出耗时 LAS {result['write_s']['las']} 秒，LAZ {result['write_s']['laz']} 秒")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到: {args.output}")
+    sys.exit(0 if all(row['matches_las'] for row in result['reads']) else 1)
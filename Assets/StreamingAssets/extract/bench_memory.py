@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+内存峰值基准 - bench_memory.py
+
+在独立子进程中以有界内存模式（--max-memory）运行电力线提取，由父进程测量子进程的
+常驻内存峰值并与配置的上限比较；任一上限被突破时以非零状态码退出。
+可选地同时测量整体模式作为对照。
+
+使用方法:
+    python bench_memory.py input.las --limits 512 1024 --height_max 15
+    python bench_memory.py input.las --limits 2G --monolithic --output memory_bench.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_measured(cmd, cwd, log_file):
+    """
+    运行子进程并返回 (退出码, 常驻内存峰值字节数, 墙钟秒数)；子进程输出写入 log_file
+    """
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=log_file, stderr=subprocess.STDOUT)
+
+    if hasattr(os, 'wait4'):
+        # POSIX：内核记录的子进程 ru_maxrss（Linux 单位为KB，macOS 为字节）
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        peak = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+        return proc.returncode, peak, time.perf_counter() - start
+
+    # Windows：轮询 psutil 的 peak_wset
+    import psutil
+    child = psutil.Process(proc.pid)
+    peak = 0
+    while proc.poll() is None:
+        try:
+            info = child.memory_info()
+            peak = max(peak, getattr(info, 'peak_wset', info.rss))
+        except psutil.Error:
+            break
+        time.sleep(0.05)
+    proc.wait()
+    return proc.returncode, peak, time.perf_counter() - start
+
+
+def child_main(args):
+    """
+    子进程：执行一次提取（不弹出结果窗口）
+    """
+    sys.path.insert(0, SCRIPT_DIR)
+    from Extractor4 import PowerLineExtractor
+
+    extractor = PowerLineExtractor(threshold=args.threshold, radius=args.radius, height_min=args.height_min,
+                                   height_max=args.height_max, eps=args.eps, min_samples=args.min_samples,
+                                   enable_visualization=False)
+    extractor.show_final_result = False
+    if args.max_memory:
+        extractor.extract_bounded(args.input_file, max_memory=args.max_memory,
+                                  min_line_length=args.min_line_length)
+    else:
+        extractor.extract(args.input_file, min_line_length=args.min_line_length, visualize_steps=False)
+
+
+def bench_limit(args, limit):
+    """
+    以给定上限（None表示整体模式）运行一次，返回结果字典
+    """
+    from out_of_core import parse_memory_size
+
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', os.path.abspath(args.input_file),
+           '--threshold', str(args.threshold), '--radius', str(args.radius),
+           '--height_min', str(args.height_min), '--height_max', str(args.height_max),
+           '--eps', str(args.eps), '--min_samples', str(args.min_samples),
+           '--min_line_length', str(args.min_line_length)]
+    if limit is not None:
+        cmd += ['--max-memory', limit]
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_path = os.path.join(work_dir, 'bench.log')
+        with open(log_path, 'w', encoding='utf-8') as log_file:
+            code, peak, wall = run_measured(cmd, work_dir, log_file)
+        if code != 0:
+            with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+                print(f.read()[-2000:])
+        lines = None
+        base_name = os.path.splitext(os.path.basename(args.input_file))[0]
+        endpoints = os.path.join(work_dir, f"{base_name}_powerline_endpoints.json")
+        if os.path.exists(endpoints):
+            with open(endpoints, 'r', encoding='utf-8') as f:
+                lines = len(json.load(f))
+
+    limit_bytes = parse_memory_size(limit) if limit is not None else None
+    return {
+        'mode': 'bounded' if limit is not None else 'monolithic',
+        'limit_mb': round(limit_bytes / 2**20, 1) if limit_bytes else None,
+        'peak_rss_mb': round(peak / 2**20, 1),
+        'wall_s': round(wall, 2),
+        'exit_code': code,
+        'line_count': lines,
+        'within_limit': code == 0 and (limit_bytes is None or peak <= limit_bytes),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='有界内存模式的常驻内存峰值基准')
+    parser.add_argument('input_file', help='输入的LAS文件路径')
+    parser.add_argument('--limits', nargs='+', default=['1024'],
+                        help='要测量的内存上限，纯数字为MB，支持K/M/G后缀 (默认: 1024)')
+    parser.add_argument('--monolithic', action='store_true', help='同时测量整体模式作为对照')
+    parser.add_argument('--threshold', type=float, default=0.8, help='线特征阈值 (默认: 0.8)')
+    parser.add_argument('--radius', type=float, default=2.0, help='邻域搜索半径 (默认: 2.0)')
+    parser.add_argument('--height_min', type=float, default=0, help='最小高程 (默认: 0)')
+    parser.add_argument('--height_max', type=float, default=60, help='最大高程 (默认: 60)')
+    parser.add_argument('--eps', type=float, default=1.8, help='DBSCAN邻域半径 (默认: 1.8)')
+    parser.add_argument('--min_samples', type=int, default=7, help='DBSCAN最小样本数 (默认: 7)')
+    parser.add_argument('--min_line_length', type=float, default=30.0, help='最小长度阈值 (默认: 30.0)')
+    parser.add_argument('--output', default=None, help='结果JSON输出路径')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--max-memory', dest='max_memory', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args)
+        sys.exit(0)
+
+    sys.path.insert(0, SCRIPT_DIR)
+    runs = ([None] if args.monolithic else []) + list(args.limits)
+    results = []
+    for limit in runs:
+        result = bench_limit(args, limit)
+        results.append(result)
+        limit_text = f"{result['limit_mb']:.0f} MB" if result['limit_mb'] else '无'
+        status = '通过' if result['within_limit'] else ('失败' if result['exit_code'] else '超出上限')
+        print(f"{result['mode']:<10} 上限 {limit_text:>9}  峰值 {result['peak_rss_mb']:>8.1f} MB  "
+              f"耗时 {result['wall_s']:>7.2f} s  电力线 {result['line_count']}  -> {status}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'input_file': os.path.abspath(args.input_file),
+                'input_size_mb': round(os.path.getsize(args.input_file) / 2**20, 1),
+                'results': results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.output}")
+
+    sys.exit(0 if all(r['within_limit'] for r in results) else 1)
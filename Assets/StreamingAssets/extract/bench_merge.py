@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+线段合并函数微基准 - bench_merge.py
+
+合并函数（_stitch_lines_by_endpoint_matching、_align_parallel_lines）的超线性开销只在碎片很多时才显现，
+在完整的 extract() 中也难以单独剖析。本脚本：
+1.  生成可控的合成碎片集：若干组平行导线（束），每根导线按给定间隙断成长度不一的碎片，
+    导线方向和碎片方向带有随机偏角；
+2.  在 n = 10 … 20k 个碎片上单独计时每个合并函数（小规模重复取最短时间）；
+3.  对 log(时间) - log(n) 做最小二乘，得到经验复杂度指数；
+4.  与基线指数比较，任一函数的指数超过 基线 + 容差 时以非零状态码退出。
+
+预计耗时超过 --max_seconds 的规模会被跳过（按已测得的指数外推），因此 O(n²) 以上的函数
+不会卡住整个基准。
+
+使用方法:
+    python bench_merge.py --update_baseline
+    python bench_merge.py --sizes 10 100 1k 10k 20k --functions stitch_lines_by_endpoint_matching
+    python bench_merge.py --exponent_tolerance 0.1 --output merge_bench.json
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(SCRIPT_DIR, 'merge_bench_baseline.json')
+DEFAULT_SIZES = ('10', '30', '100', '300', '1k', '3k', '10k', '20k')
+
+
+def _stitch_lines_by_endpoint_matching(extractor, clouds):
+    return extractor._stitch_lines_by_endpoint_matching(clouds)
+
+
+def _align_parallel_lines(extractor, clouds):
+    return extractor._align_parallel_lines(clouds)
+
+
+BENCHMARKS = {
+    'stitch_lines_by_endpoint_matching': _stitch_lines_by_endpoint_matching,
+    'align_parallel_lines': _align_parallel_lines,
+}
+
+
+def make_fragments(n, fragments_per_wire=10, fragment_min=8.0, fragment_max=30.0, gap=1.5, wire_angle_deg=3.0,
+                   fragment_angle_deg=1.0, bundle_size=3, bundle_spacing=6.0, bundle_separation=80.0,
+                   points_per_meter=2.0, noise=0.05, seed=0):
+    """
+    生成 n 个电力线碎片的点坐标列表
+
+    导线按 bundle_size 根一组平行排列（组内间距 bundle_spacing，组间间距 bundle_separation），
+    每根导线断成 fragments_per_wire 段，段长在 [fragment_min, fragment_max] 内均匀分布，段间留 gap 米间隙。
+    每根导线的方向相对X轴偏转至多 wire_angle_deg 度，每段再偏转至多 fragment_angle_deg 度。
+    每段的点沿导线方向排序。
+
+    :param n: 碎片数
+    :return: [(k, 3) float64 数组] 长度为 n 的列表
+    """
+    rng = np.random.default_rng(seed)
+    fragments = []
+    n_wires = math.ceil(n / fragments_per_wire)
+    for wire in range(n_wires):
+        bundle, slot = divmod(wire, bundle_size)
+        origin = np.array([0.0, bundle * bundle_separation + slot * bundle_spacing, 20.0])
+        heading = np.radians(rng.uniform(-wire_angle_deg, wire_angle_deg))
+        position = 0.0
+        for _ in range(min(fragments_per_wire, n - len(fragments))):
+            length = rng.uniform(fragment_min, fragment_max)
+            angle = heading + np.radians(rng.uniform(-fragment_angle_deg, fragment_angle_deg))
+            direction = np.array([np.cos(angle), np.sin(angle), 0.0])
+            start = origin + position * np.array([np.cos(heading), np.sin(heading), 0.0])
+            t = np.sort(rng.uniform(0.0, length, max(int(length * points_per_meter), 5)))
+            points = start + t[:, None] * direction + rng.normal(0.0, noise, (len(t), 3))
+            fragments.append(points)
+            position += length + gap
+    return fragments
+
+
+def _to_clouds(fragments):
+    import open3d as o3d
+
+    clouds = []
+    for points in fragments:
+        cloud = o3d.geometry.PointCloud()
+        cloud.points = o3d.utility.Vector3dVector(points)
+        clouds.append(cloud)
+    return clouds
+
+
+def time_call(extractor, fn, fragments, min_time=0.2, max_repeat=5):
+    """
+    计时一次合并调用；单次很短时重复至多 max_repeat 次取最短时间。每次调用前重新构造点云（不计时）
+
+    :return: (秒数, 输出线段数)
+    """
+    best = float('inf')
+    total = 0.0
+    result = []
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(max_repeat):
+            clouds = _to_clouds(fragments)
+            with contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                result = fn(extractor, clouds)
+                elapsed = time.perf_counter() - start
+            best = min(best, elapsed)
+            total += elapsed
+            if total >= min_time:
+                break
+    return best, len(result)
+
+
+def fit_exponent(sizes, seconds, min_fit_time=1e-3):
+    """
+    在 log-log 坐标中拟合 t = c·n^k，只使用耗时不低于 min_fit_time 的点（过短的计时噪声大）
+
+    :return: (指数 k, 决定系数 R²)；可用点少于3个时返回 (None, None)
+    """
+    sizes = np.asarray(sizes, dtype=np.float64)
+    seconds = np.asarray(seconds, dtype=np.float64)
+    mask = seconds >= min_fit_time
+    if mask.sum() < 3:
+        return None, None
+    x, y = np.log(sizes[mask]), np.log(seconds[mask])
+    slope, intercept = np.polyfit(x, y, 1)
+    residual = y - (slope * x + intercept)
+    total = np.sum((y - y.mean()) ** 2)
+    r_squared = 1 - np.sum(residual ** 2) / total if total > 0 else 1.0
+    return float(slope), float(r_squared)
+
+
+def bench_function(extractor, name, sizes, fragment_sets, max_seconds):
+    """
+    按规模从小到大计时一个合并函数；按已测得的增长外推，预计超过 max_seconds 的规模跳过
+    """
+    fn = BENCHMARKS[name]
+    # 预热一次（首次调用会触发延迟导入和缓存初始化），不计入结果
+    time_call(extractor, fn, fragment_sets[sizes[0]], min_time=0.0, max_repeat=1)
+    measured = []
+    for n in sizes:
+        if len(measured) >= 2:
+            (n0, t0), (n1, t1) = measured[-2][:2], measured[-1][:2]
+            growth = max(math.log(max(t1, 1e-6) / max(t0, 1e-6)) / math.log(n1 / n0), 1.0)
+            predicted = t1 * (n / n1) ** growth
+            if predicted > max_seconds:
+                print(f"  {name:<36}{n:>8}  跳过（预计 {predicted:.0f} 秒）")
+                continue
+        elif measured and measured[-1][1] * (n / measured[-1][0]) > max_seconds:
+            print(f"  {name:<36}{n:>8}  跳过")
+            continue
+        seconds, n_out = time_call(extractor, fn, fragment_sets[n])
+        measured.append((n, seconds, n_out))
+        print(f"  {name:<36}{n:>8}{seconds * 1000:>12.2f}{n_out:>8}")
+    exponent, r_squared = fit_exponent([m[0] for m in measured], [m[1] for m in measured])
+    return {
+        'sizes': [m[0] for m in measured],
+        'seconds': [round(m[1], 6) for m in measured],
+        'output_lines': [m[2] for m in measured],
+        'exponent': None if exponent is None else round(exponent, 3),
+        'r_squared': None if r_squared is None else round(r_squared, 4),
+    }
+
+
+def check_exponents(results, baseline, tolerance):
+    """
+    与基线指数比较；返回 {函数名: 检查结果}，指数超过 基线 + tolerance 的判为回归
+    """
+    checks = {}
+    for name, result in results.items():
+        base = baseline.get(name, {}).get('exponent')
+        exponent = result['exponent']
+        if base is None or exponent is None:
+            checks[name] = {'status': 'no_baseline' if base is None else 'no_fit', 'passed': True}
+            continue
+        passed = exponent <= base + tolerance
+        checks[name] = {'status': 'ok' if passed else 'regression', 'passed': passed,
+                        'baseline_exponent': base, 'change': round(exponent - base, 3)}
+    return checks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='线段合并函数微基准与复杂度指数门禁')
+    parser.add_argument('--sizes', nargs='+', default=list(DEFAULT_SIZES), help='碎片数规模，支持k/M后缀 (默认: 10 … 20k)')
+    parser.add_argument('--functions', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help='要测量的合并函数 (默认: 全部)')
+    parser.add_argument('--max_seconds', type=float, default=30.0,
+                        help='单次调用的预计耗时上限，超过的规模跳过 (默认: 30)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='指数基线文件 (默认: merge_bench_baseline.json)')
+    parser.add_argument('--exponent_tolerance', type=float, default=0.15,
+                        help='允许指数超过基线的幅度 (默认: 0.15)')
+    parser.add_argument('--update_baseline', action='store_true', help='把本次拟合的指数写为基线')
+    parser.add_argument('--output', default=None, help='结果JSON输出路径')
+    # 合成碎片参数
+    parser.add_argument('--fragments_per_wire', type=int, default=10, help='每根导线的碎片数 (默认: 10)')
+    parser.add_argument('--fragment_min', type=float, default=8.0, help='最短碎片长度（米） (默认: 8)')
+    parser.add_argument('--fragment_max', type=float, default=30.0, help='最长碎片长度（米） (默认: 30)')
+    parser.add_argument('--gap', type=float, default=1.5, help='碎片间隙（米） (默认: 1.5)')
+    parser.add_argument('--wire_angle_deg', type=float, default=3.0, help='导线方向最大偏角（度） (默认: 3)')
+    parser.add_argument('--fragment_angle_deg', type=float, default=1.0, help='碎片方向最大偏角（度） (默认: 1)')
+    parser.add_argument('--bundle_size', type=int, default=3, help='每束平行导线数 (默认: 3)')
+    parser.add_argument('--bundle_spacing', type=float, default=6.0, help='束内导线间距（米） (默认: 6)')
+    parser.add_argument('--points_per_meter', type=float, default=2.0, help='每米点数 (默认: 2)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+    args = parser.parse_args()
+
+    sys.path.insert(0, SCRIPT_DIR)
+    from Extractor4 import PowerLineExtractor
+    from progress import ProgressReporter
+    from synthetic_corridor import parse_count
+
+    sizes = sorted({parse_count(s) for s in args.sizes})
+    fragment_sets = {n: make_fragments(n, fragments_per_wire=args.fragments_per_wire, fragment_min=args.fragment_min,
+                                       fragment_max=args.fragment_max, gap=args.gap,
+                                       wire_angle_deg=args.wire_angle_deg, fragment_angle_deg=args.fragment_angle_deg,
+                                       bundle_size=args.bundle_size, bundle_spacing=args.bundle_spacing,
+                                       points_per_meter=args.points_per_meter, seed=args.seed)
+                     for n in sizes}
+
+    with open(os.devnull, 'w') as devnull:
+        extractor = PowerLineExtractor(enable_visualization=False, progress=ProgressReporter('jsonl', stream=devnull))
+        print(f"  {'函数':<36}{'碎片数':>8}{'耗时(ms)':>12}{'输出线':>8}")
+        results = {name: bench_function(extractor, name, sizes, fragment_sets, args.max_seconds)
+                   for name in args.functions}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    checks = check_exponents(results, baseline, args.exponent_tolerance)
+
+    print(f"\n{'函数':<36}{'指数':>8}{'R²':>8}{'基线':>8}  状态")
+    for name, result in results.items():
+        check = checks[name]
+        fmt = lambda v: '-' if v is None else f"{v:.2f}"
+        print(f"{name:<36}{fmt(result['exponent']):>8}{fmt(result['r_squared']):>8}"
+              f"{fmt(check.get('baseline_exponent')):>8}  {check['status']}")
+
+    if args.update_baseline:
+        for name, result in results.items():
+            if result['exponent'] is not None:
+                baseline[name] = {'exponent': result['exponent'], 'sizes': result['sizes'],
+                                  'created': time.strftime('%Y-%m-%d %H:%M:%S')}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已写入: {args.baseline}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'parameters': vars(args),
+                       'results': results, 'checks': checks}, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入: {args.output}")
+
+    sys.exit(0 if all(c['passed'] for c in checks.values()) else 1)
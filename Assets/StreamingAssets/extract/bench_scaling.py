@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+规模基准 - bench_scaling.py
+
+在一组规模（如 100k、1M、10M 点）的合成走廊上运行完整流程，记录速度与精度：
+1.  用 synthetic_corridor 生成（或复用数据目录中已有的）带真值的LAS文件；
+2.  每个规模、每个提取后端在独立子进程中运行：电力线提取（extract / tiled / bounded / two_pass）、
+    地面提取 extract_ground_ultra_fast 和电力塔坐标提取；
+3.  父进程测量子进程的常驻内存峰值，汇总各阶段的墙钟时间和内存（PerfTrace），
+    并按真值计算线级/点级精确率与召回率、地面精确率与覆盖率、塔数误差。
+
+使用方法:
+    python bench_scaling.py --scales 100k 1M --data_dir bench_data
+    python bench_scaling.py --scales 1M 10M --backends extract tiled bounded --output scaling.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BACKENDS = ('extract', 'tiled', 'bounded', 'two_pass')
+COMPONENTS = ('terrain', 'towers')
+
+# 合成数据参数（决定数据文件名中的哈希，参数不同的数据不会互相复用）
+GENERATOR_ARGS = ('spans', 'span_length', 'wires', 'wire_spacing', 'sag', 'tower_height', 'corridor_width',
+                  'heading_deg', 'terrain_relief', 'vegetation_density', 'max_tree_height', 'noise',
+                  'outlier_fraction', 'seed')
+
+
+def child_main(config_path):
+    """
+    子进程：按配置运行一次提取、地面提取和塔坐标提取，结果写入配置目录下的 result.json
+    """
+    sys.path.insert(0, SCRIPT_DIR)
+    from Extractor4 import PowerLineExtractor
+    from perf_trace import PerfTrace
+
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    input_file = config['input_file']
+    params = config['params']
+    backend = config['backend']
+    result = {'backend': backend}
+
+    trace = PerfTrace('bench', trace_malloc=False)
+    extractor = PowerLineExtractor(enable_visualization=False, **params)
+    extractor.show_final_result = False
+    common = dict(min_line_length=config['min_line_length'], trace=trace)
+    if backend == 'extract':
+        extractor.extract(input_file, visualize_steps=False, **common)
+    elif backend == 'tiled':
+        extractor.extract_tiled(input_file, tile_size=config['tile_size'], tile_workers=config['tile_workers'],
+                                **common)
+    elif backend == 'bounded':
+        extractor.extract_bounded(input_file, max_memory=config['max_memory'], **common)
+    else:
+        extractor.extract_two_pass(input_file, **common)
+    result['translation_vector'] = np.asarray(extractor.last_translation_vector, dtype=np.float64).tolist()
+
+    if 'terrain' in config['components']:
+        from terrain_generator import extract_ground_ultra_fast
+        ground = extract_ground_ultra_fast(input_file, trace=trace)
+        np.savez('ground.npz', xyz=np.asarray(ground.xyz), classification=np.asarray(ground.classification))
+
+    if 'towers' in config['components']:
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
+        trace.start('towers')
+        try:
+            from extract_tower_coordinates import extract_tower_coordinates
+        except ImportError as e:
+            result['towers'] = {'skipped': f"无法导入塔坐标提取: {e}"}
+            trace.stop('towers', skipped=True)
+        else:
+            info = extract_tower_coordinates(f"{base_name}_powerline_endpoints.json", 'towers.csv')
+            result['towers'] = info
+            trace.stop('towers', output_points=info['total_towers'])
+
+    result['trace'] = trace.to_dict()
+    with open('result.json', 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+def ensure_dataset(args, n_points):
+    """
+    返回规模 n_points 的合成数据路径；数据目录中没有同参数的文件时生成
+    """
+    from synthetic_corridor import generate_corridor, format_count, ground_truth_path
+    from progress import ProgressReporter
+
+    spec = {name: getattr(args, name) for name in GENERATOR_ARGS}
+    digest = hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+    os.makedirs(args.data_dir, exist_ok=True)
+    las_path = os.path.join(args.data_dir, f"corridor_{format_count(n_points)}_{digest}.las")
+    if os.path.exists(las_path) and os.path.exists(ground_truth_path(las_path)):
+        return las_path
+    print(f"生成合成走廊: {las_path}")
+    generate_corridor(
+        las_path, n_points=n_points, n_spans=args.spans, span_length=args.span_length, n_wires=args.wires,
+        wire_spacing=args.wire_spacing, sag=args.sag, tower_height=args.tower_height,
+        corridor_width=args.corridor_width, heading_deg=args.heading_deg, terrain_relief=args.terrain_relief,
+        vegetation_density=args.vegetation_density, max_tree_height=args.max_tree_height, noise=args.noise,
+        outlier_fraction=args.outlier_fraction, seed=args.seed, progress=ProgressReporter())
+    return las_path
+
+
+def _stage_summary(trace_dict):
+    return {s['stage']: {'wall_s': s['wall_s'], 'rss_mb': s.get('rss_mb'),
+                         'process_peak_rss_mb': s.get('process_peak_rss_mb')}
+            for s in trace_dict['stages']}
+
+
+def score_case(las_path, work_dir, child_result):
+    """
+    按真值评估子进程的输出
+    """
+    import laspy
+    import synthetic_corridor as sc
+
+    truth = sc.load_ground_truth(las_path)
+    base_name = os.path.splitext(os.path.basename(las_path))[0]
+    translation = np.asarray(child_result['translation_vector'], dtype=np.float64)
+    scores = {}
+
+    endpoints_path = os.path.join(work_dir, f"{base_name}_powerline_endpoints.json")
+    endpoints = []
+    if os.path.exists(endpoints_path):
+        with open(endpoints_path, 'r', encoding='utf-8') as f:
+            endpoints = json.load(f)
+    scores['lines'] = sc.score_lines(truth, endpoints, translation)
+
+    lines_las = os.path.join(work_dir, f"{base_name}_extracted_powerlines.las")
+    extracted = np.empty((0, 3))
+    if os.path.exists(lines_las):
+        extracted = np.asarray(laspy.read(lines_las).xyz, dtype=np.float64) + translation
+    scores['wire_points'] = sc.score_wire_points(las_path, extracted)
+
+    ground_path = os.path.join(work_dir, 'ground.npz')
+    if os.path.exists(ground_path):
+        with np.load(ground_path) as ground:
+            scores['ground'] = sc.score_ground(truth, ground['xyz'], ground['classification'])
+
+    towers = child_result.get('towers')
+    if towers is not None:
+        scores['towers'] = ({'skipped': towers['skipped']} if 'skipped' in towers
+                            else sc.score_towers(truth, towers['total_towers']))
+    return scores
+
+
+def run_case(args, las_path, backend):
+    """
+    在临时目录中以子进程运行一个 规模 x 后端 组合，返回结果字典
+    """
+    from bench_memory import run_measured
+
+    params = dict(threshold=args.threshold, radius=args.radius, height_min=args.height_min,
+                  height_max=args.height_max, eps=args.eps, min_samples=args.min_samples)
+    with tempfile.TemporaryDirectory() as work_dir:
+        config = {
+            'input_file': os.path.abspath(las_path), 'backend': backend, 'params': params,
+            'min_line_length': args.min_line_length, 'components': args.components,
+            'tile_size': args.tile_size, 'tile_workers': args.tile_workers, 'max_memory': args.max_memory,
+        }
+        config_path = os.path.join(work_dir, 'config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+        log_path = os.path.join(work_dir, 'bench.log')
+        with open(log_path, 'w', encoding='utf-8') as log_file:
+            code, peak, wall = run_measured([sys.executable, os.path.abspath(__file__), '--child', config_path],
+                                            work_dir, log_file)
+        result = {'backend': backend, 'exit_code': code, 'wall_s': round(wall, 2),
+                  'peak_rss_mb': round(peak / 2**20, 1)}
+        result_path = os.path.join(work_dir, 'result.json')
+        if code != 0 or not os.path.exists(result_path):
+            with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+                print(f.read()[-2000:])
+            return result
+        with open(result_path, 'r', encoding='utf-8') as f:
+            child_result = json.load(f)
+        result['stages'] = _stage_summary(child_result['trace'])
+        result['scores'] = score_case(las_path, work_dir, child_result)
+    return result
+
+
+def _fmt(value, pattern='{:.3f}'):
+    return '-' if value is None else pattern.format(value)
+
+
+def print_row(n_points, result):
+    scores = result.get('scores', {})
+    lines = scores.get('lines', {})
+    points = scores.get('wire_points', {})
+    ground = scores.get('ground', {})
+    towers = scores.get('towers', {})
+    tower_text = 'skip' if 'skipped' in towers else _fmt(towers.get('count_error'), '{:+d}')
+    print(f"{n_points:>11}  {result['backend']:<9}{result['wall_s']:>9.1f}{result['peak_rss_mb']:>10.0f}"
+          f"{_fmt(lines.get('precision')):>8}{_fmt(lines.get('recall')):>8}"
+          f"{_fmt(points.get('precision')):>8}{_fmt(points.get('recall')):>8}"
+          f"{_fmt(ground.get('precision')):>8}{_fmt(ground.get('coverage')):>8}{tower_text:>7}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='合成走廊上的规模基准（速度、内存、精确率与召回率）')
+    parser.add_argument('--scales', nargs='+', default=['100k', '1M'], help='点数规模，支持k/M/G后缀 (默认: 100k 1M)')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=['extract'],
+                        help='要测量的电力线提取后端 (默认: extract)')
+    parser.add_argument('--components', nargs='*', choices=COMPONENTS, default=list(COMPONENTS),
+                        help='同时运行的其他流程 (默认: terrain towers)')
+    parser.add_argument('--data_dir', default='bench_data', help='合成数据目录，已有的同参数数据直接复用 (默认: bench_data)')
+    parser.add_argument('--output', default=None, help='结果JSON输出路径')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    # 提取参数
+    parser.add_argument('--threshold', type=float, default=0.8, help='线特征阈值 (默认: 0.8)')
+    parser.add_argument('--radius', type=float, default=2.0, help='邻域搜索半径 (默认: 2.0)')
+    parser.add_argument('--height_min', type=float, default=0, help='最小高程 (默认: 0)')
+    parser.add_argument('--height_max', type=float, default=15, help='最大高程 (默认: 15)')
+    parser.add_argument('--eps', type=float, default=1.8, help='DBSCAN邻域半径 (默认: 1.8)')
+    parser.add_argument('--min_samples', type=int, default=7, help='DBSCAN最小样本数 (默认: 7)')
+    parser.add_argument('--min_line_length', type=float, default=30.0, help='最小长度阈值 (默认: 30.0)')
+    parser.add_argument('--tile_size', type=float, default=500.0, help='tiled 后端的分块边长（米） (默认: 500)')
+    parser.add_argument('--tile_workers', type=int, default=1, help='tiled 后端的进程数 (默认: 1)')
+    parser.add_argument('--max-memory', dest='max_memory', default='2G', help='bounded 后端的内存上限 (默认: 2G)')
+    # 合成数据参数
+    parser.add_argument('--spans', type=int, default=4, help='档数 (默认: 4)')
+    parser.add_argument('--span_length', type=float, default=300.0, help='档距（米） (默认: 300)')
+    parser.add_argument('--wires', type=int, default=3, help='每档导线相数 (默认: 3)')
+    parser.add_argument('--wire_spacing', type=float, default=6.0, help='相间距（米） (默认: 6)')
+    parser.add_argument('--sag', type=float, default=8.0, help='档中点弧垂（米） (默认: 8)')
+    parser.add_argument('--tower_height', type=float, default=30.0, help='挂点离地高度（米） (默认: 30)')
+    parser.add_argument('--corridor_width', type=float, default=100.0, help='走廊宽度（米） (默认: 100)')
+    parser.add_argument('--heading_deg', type=float, default=30.0, help='走廊方向与X轴夹角（度） (默认: 30)')
+    parser.add_argument('--terrain_relief', type=float, default=5.0, help='地形起伏幅度（米） (默认: 5)')
+    parser.add_argument('--vegetation_density', type=float, default=50.0, help='每公顷树木株数 (默认: 50)')
+    parser.add_argument('--max_tree_height', type=float, default=14.0, help='最高树高（米） (默认: 14)')
+    parser.add_argument('--noise', type=float, default=0.05, help='坐标噪声标准差（米） (默认: 0.05)')
+    parser.add_argument('--outlier_fraction', type=float, default=1e-4, help='空中离群点比例 (默认: 0.0001)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args.child)
+        sys.exit(0)
+
+    sys.path.insert(0, SCRIPT_DIR)
+    from synthetic_corridor import parse_count
+
+    results = []
+    print(f"{'点数':>11}  {'后端':<9}{'耗时(s)':>9}{'峰值(MB)':>10}{'线P':>8}{'线R':>8}{'点P':>8}{'点R':>8}"
+          f"{'地面P':>8}{'覆盖':>8}{'塔数差':>7}")
+    for scale in args.scales:
+        n_points = parse_count(scale)
+        las_path = ensure_dataset(args, n_points)
+        for backend in args.backends:
+            result = run_case(args, las_path, backend)
+            result.update({'scale': scale, 'n_points': n_points, 'input_file': os.path.abspath(las_path)})
+            results.append(result)
+            print_row(n_points, result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'parameters': {name: getattr(args, name) for name in GENERATOR_ARGS},
+                'results': results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.output}")
+
+    sys.exit(0 if all(r['exit_code'] == 0 for r in results) else 1)
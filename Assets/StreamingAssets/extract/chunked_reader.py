@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+分块LAS读取与高程滤波下推 - chunked_reader.py
+
+_read_point_cloud 用 laspy.read 一次解码全部点记录和全部字段，复制到open3d点云后，
+_pass_through 再按高程拆成两个点云，峰值时同时持有多份完整点云。本模块在读取时完成高程滤波：
+- 用 laspy.open(...).chunk_iterator 逐块读取点记录；
+- 每块先只解码高程（原始整数Z按比例因子和偏移换算），按存储后的局部高程判断是否在高程带内，
+  与 _height_band_indices 的结果逐点一致；
+- 只对保留下来的点解码 x/y 和所需的附加字段（如 classification、return_number），
+  按块收集，读完后一次拼接；内存与保留点数成正比，不按文件总点数预先分配
+  （Windows 会为整块分配提交全部内存，即使大部分从未写入）；
+- 同时记录保留点在文件中的原始序号，用于追溯输出点的来源。
+已读取的共享点云（las_io.LoadedCloud）用 filter_loaded、旁路缓存（point_sidecar）的局部坐标用
+filter_local 做同样的滤波，不再读取文件。
+
+使用方法（与整体读取后滤波的结果比较，并报告耗时和内存峰值）:
+    python chunked_reader.py input.las --height_max 15
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+import las_io
+
+DEFAULT_CHUNK_POINTS = 1000000
+EXTRA_FIELDS = ('classification', 'return_number')
+
+
+def _index_dtype(total):
+    return np.uint32 if total < 2 ** 32 else np.int64
+
+
+def read_filtered(file_path, height_min, height_max, origin=None, dtype=np.float64, fields=(),
+                  keep_band=False, chunk_points=DEFAULT_CHUNK_POINTS, progress=None):
+    """
+    分块读取LAS文件，读取时按高程滤波，只保留需要的点和字段
+
+    :param file_path: LAS文件路径
+    :param height_min: 高程带下限（局部坐标）
+    :param height_max: 高程带上限（局部坐标）
+    :param origin: 局部坐标原点 (3,)，None表示不平移
+    :param dtype: 坐标存储类型（float32 或 float64）
+    :param fields: 需要同时读取的附加字段名，如 ('classification', 'return_number')
+    :param keep_band: False 保留高程带之外的点（线性度计算所用的点），True 保留高程带内的点
+    :param chunk_points: 每块点数
+    :param progress: ProgressReporter（可选）
+    :return: (局部坐标 (M, 3), 原始序号 (M,), {字段名: (M,) 数组}, 文件总点数)
+    """
+    origin = np.zeros(3) if origin is None else np.asarray(origin, dtype=np.float64)
+    with las_io.open_las(file_path) as reader:
+        header = reader.header
+        total = int(header.point_count)
+        scales = np.asarray(header.scales, dtype=np.float64)
+        offsets = np.asarray(header.offsets, dtype=np.float64)
+        index_dtype = _index_dtype(total)
+        xyz_parts, index_parts = [], []
+        extra_parts = {name: [] for name in fields}
+        start = 0
+        chunks = reader.chunk_iterator(chunk_points)
+        if progress is not None:
+            chunks = progress.iter(chunks, 'read', total=-(-total // chunk_points), desc='分块读取')
+        for chunk in chunks:
+            # 与 _read_xyz + _height_band_indices 相同：换算为 laspy 的缩放坐标，减去原点后按存储类型取整，
+            # 再提升为 float64 与高程带比较
+            z = (np.asarray(chunk.Z) * scales[2] + offsets[2] - origin[2]).astype(dtype)
+            z64 = z.astype(np.float64)
+            in_band = (z64 >= height_min) & (z64 <= height_max)
+            keep = np.flatnonzero(in_band if keep_band else ~in_band)
+            if len(keep):
+                part = np.empty((len(keep), 3), dtype=dtype)
+                part[:, 0] = np.asarray(chunk.X)[keep] * scales[0] + offsets[0] - origin[0]
+                part[:, 1] = np.asarray(chunk.Y)[keep] * scales[1] + offsets[1] - origin[1]
+                part[:, 2] = z[keep]
+                xyz_parts.append(part)
+                index_parts.append((start + keep).astype(index_dtype))
+                for name in fields:
+                    extra_parts[name].append(np.asarray(chunk[name])[keep])
+            start += len(chunk)
+
+    if not xyz_parts:
+        return (np.empty((0, 3), dtype=dtype), np.empty(0, dtype=index_dtype),
+                {name: np.empty(0) for name in fields}, total)
+    xyz = np.concatenate(xyz_parts)
+    del xyz_parts
+    indices = np.concatenate(index_parts)
+    extra = {name: np.concatenate(parts) for name, parts in extra_parts.items()}
+    return xyz, indices, extra, total
+
+
+def filter_loaded(cloud, height_min, height_max, origin=None, dtype=np.float64, fields=(), keep_band=False):
+    """
+    对已读取的共享点云（las_io.LoadedCloud）做与 read_filtered 相同的高程滤波，结果逐点一致。
+    点云提供该局部坐标系下的坐标视图（如旁路缓存的内存映射）时直接在视图上筛选（filter_local）
+
+    :param cloud: las_io.LoadedCloud，附加字段取自 cloud.field
+    :param height_min: 高程带下限（局部坐标）
+    :param height_max: 高程带上限（局部坐标）
+    :param origin: 局部坐标原点 (3,)，None表示不平移
+    :param dtype: 坐标存储类型（float32 或 float64）
+    :param fields: 需要同时取出的附加字段名
+    :param keep_band: False 保留高程带之外的点，True 保留高程带内的点
+    :return: (局部坐标 (M, 3), 原始序号 (M,), {字段名: (M,) 数组}, 总点数)
+    """
+    origin = np.zeros(3) if origin is None else np.asarray(origin, dtype=np.float64)
+    view = cloud.local_view(origin, dtype)
+    if view is not None:
+        return filter_local(view, height_min, height_max, {name: cloud.field(name) for name in fields}, keep_band)
+    xyz = cloud.xyz
+    total = len(xyz)
+    z = (xyz[:, 2] - origin[2]).astype(dtype)
+    z64 = z.astype(np.float64)
+    in_band = (z64 >= height_min) & (z64 <= height_max)
+    keep = np.flatnonzero(in_band if keep_band else ~in_band).astype(_index_dtype(total))
+    points = np.empty((len(keep), 3), dtype=dtype)
+    points[:, 0] = xyz[keep, 0] - origin[0]
+    points[:, 1] = xyz[keep, 1] - origin[1]
+    points[:, 2] = z[keep]
+    extra = {name: cloud.field(name)[keep] for name in fields}
+    return points, keep, extra, total
+
+
+def filter_local(points, height_min, height_max, fields=None, keep_band=False):
+    """
+    对已换算好的局部坐标（如旁路缓存 point_sidecar 内存映射的 xyz）做与 read_filtered 相同的高程滤波
+
+    :param points: 局部坐标 (N, 3)，数组或memmap
+    :param height_min: 高程带下限（局部坐标）
+    :param height_max: 高程带上限（局部坐标）
+    :param fields: {字段名: (N,) 数组}，随保留点一并取出
+    :param keep_band: False 保留高程带之外的点，True 保留高程带内的点
+    :return: (局部坐标 (M, 3), 原始序号 (M,), {字段名: (M,) 数组}, 总点数)
+    """
+    total = len(points)
+    z64 = np.asarray(points[:, 2], dtype=np.float64)
+    in_band = (z64 >= height_min) & (z64 <= height_max)
+    keep = np.flatnonzero(in_band if keep_band else ~in_band).astype(_index_dtype(total))
+    extra = {name: np.asarray(values)[keep] for name, values in (fields or {}).items()}
+    return np.asarray(points)[keep], keep, extra, total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='分块读取与整体读取后滤波的一致性和性能比较')
+    parser.add_argument('input_file', help='输入的LAS文件路径')
+    parser.add_argument('--height_min', type=float, default=0, help='最小高程 (默认: 0)')
+    parser.add_argument('--height_max', type=float, default=60, help='最大高程 (默认: 60)')
+    parser.add_argument('--chunk_points', type=int, default=DEFAULT_CHUNK_POINTS,
+                        help=f'每块点数 (默认: {DEFAULT_CHUNK_POINTS})')
+    parser.add_argument('--coord_dtype', choices=['float32', 'float64'], default='float32',
+                        help='局部坐标存储类型 (默认: float32)')
+    parser.add_argument('--mode', choices=['compare', 'chunked', 'full'], default='compare',
+                        help='compare 比较两种读取结果；chunked/full 只运行一种（配合外部内存测量） (默认: compare)')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from Extractor4 import PowerLineExtractor
+    from perf_trace import peak_rss_bytes
+
+    extractor = PowerLineExtractor(height_min=args.height_min, height_max=args.height_max,
+                                   enable_visualization=False, coord_dtype=args.coord_dtype)
+    results = {}
+    if args.mode in ('compare', 'full'):
+        start = time.perf_counter()
+        cloud = extractor._read_point_cloud(args.input_file)
+        _, high = extractor._pass_through(cloud)
+        results['full'] = (np.asarray(high.points), time.perf_counter() - start)
+        del cloud
+        print(f"整体读取 + _pass_through: {len(results['full'][0])} 个高程带外点，"
+              f"耗时 {results['full'][1]:.2f} 秒")
+    if args.mode in ('compare', 'chunked'):
+        start = time.perf_counter()
+        high, source, _, total = extractor._load_high_points(args.input_file)
+        results['chunked'] = (high, time.perf_counter() - start)
+        print(f"分块读取: {len(high)}/{total} 个高程带外点，耗时 {results['chunked'][1]:.2f} 秒")
+    print(f"进程内存峰值: {peak_rss_bytes() / 2**20:.0f} MB")
+
+    if args.mode == 'compare':
+        same = np.array_equal(results['full'][0], np.asarray(results['chunked'][0], dtype=np.float64))
+        print(f"结果一致: {'是' if same else '否'}")
+        sys.exit(0 if same else 1)
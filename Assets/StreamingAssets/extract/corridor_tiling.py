@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+"""
+走廊分块 - corridor_tiling.py
+
+把整条输电走廊切成带重叠区的分块，逐块计算线性度和 DBSCAN，再在接缝处拼接，
+使结果与整体运行一致：
+- 布局：corridor 模式沿走廊主方向（XY 主成分）切段，横向不限；grid 模式为方形网格。
+  每个点按分块的核心区（左闭右开）唯一归属一个分块，最外侧分块的核心区延伸到无穷远。
+- 线性度：采样点仍按整体高程带外点的顺序统一定义，每个分块只计算其核心区内的采样点，
+  邻域取自 核心区+重叠区；重叠宽度不小于最大邻域半径时与整体计算的邻域相同。
+  插值和百分位阈值在全局进行，线点集合与整体运行一致。
+- 聚类：各分块在 核心区+重叠区 内的线点上独立 DBSCAN。重叠宽度不小于 2·eps 时，
+  核心区内的点的核心点判定与整体运行相同；同一个点在两个分块中都是核心点时，
+  两个分块中的对应聚类合并（并查集）。每个点取其归属分块的标签，
+  聚类按最小核心点序号重新编号，复现 sklearn 的标签顺序；
+  邻接多个聚类的边界点归入编号最小的聚类，与 sklearn 的扩展顺序一致。
+
+使用方法（比较分块与整体运行的端点输出）:
+    python corridor_tiling.py input.las --tile_size 200 --height_max 15
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+TILE_LAYOUTS = ('corridor', 'grid')
+
+
+class TileLayout:
+    """
+    分块布局：局部坐标系 (u, v) 下的核心区边界与重叠宽度
+    """
+
+    def __init__(self, mode, origin, axes, u_edges, v_edges, overlap):
+        """
+        :param mode: 'corridor' 或 'grid'
+        :param origin: 局部坐标原点 (2,)
+        :param axes: 2x2 矩阵，两行分别为 u、v 方向的单位向量
+        :param u_edges: u 方向相邻分块之间的内部分界
+        :param v_edges: v 方向相邻分块之间的内部分界（corridor 模式为空）
+        :param overlap: 重叠宽度（米）
+        """
+        self.mode = mode
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.axes = np.asarray(axes, dtype=np.float64)
+        self.u_edges = np.asarray(u_edges, dtype=np.float64)
+        self.v_edges = np.asarray(v_edges, dtype=np.float64)
+        self.overlap = float(overlap)
+
+    @property
+    def shape(self):
+        return len(self.u_edges) + 1, len(self.v_edges) + 1
+
+    @property
+    def n_tiles(self):
+        nu, nv = self.shape
+        return nu * nv
+
+    def to_frame(self, xy):
+        """
+        XY 坐标转换到分块局部坐标 (u, v)
+        """
+        return (np.asarray(xy)[:, :2] - self.origin) @ self.axes.T
+
+    def owner(self, uv):
+        """
+        每个点所属分块的编号（核心区左闭右开，编号 = iu * nv + iv）
+        """
+        iu = np.searchsorted(self.u_edges, uv[:, 0], side='right')
+        iv = np.searchsorted(self.v_edges, uv[:, 1], side='right')
+        return iu * self.shape[1] + iv
+
+    def bounds(self, tile):
+        """
+        分块的核心区边界 (u0, u1, v0, v1)，最外侧为无穷
+        """
+        iu, iv = divmod(tile, self.shape[1])
+        u = np.concatenate(([-np.inf], self.u_edges, [np.inf]))
+        v = np.concatenate(([-np.inf], self.v_edges, [np.inf]))
+        return u[iu], u[iu + 1], v[iv], v[iv + 1]
+
+    def extended_mask(self, uv, tile):
+        """
+        落在分块 核心区+重叠区 内的点掩码
+        """
+        u0, u1, v0, v1 = self.bounds(tile)
+        m = self.overlap
+        return ((uv[:, 0] >= u0 - m) & (uv[:, 0] <= u1 + m) &
+                (uv[:, 1] >= v0 - m) & (uv[:, 1] <= v1 + m))
+
+    def tile_id(self, tile):
+        """
+        与编号无关的分块标识（核心区边界）：布局扩展后编号会变，但未被切分的分块标识不变
+        """
+        return '_'.join(f"{b:.3f}" for b in self.bounds(tile))
+
+    def to_dict(self):
+        return {
+            'mode': self.mode,
+            'tiles': self.n_tiles,
+            'shape': list(self.shape),
+            'overlap': self.overlap,
+            'origin': self.origin.tolist(),
+            'axes': self.axes.tolist(),
+            'u_edges': self.u_edges.tolist(),
+            'v_edges': self.v_edges.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['mode'], data['origin'], data['axes'], data['u_edges'], data['v_edges'], data['overlap'])
+
+
+def _principal_axes(xy, max_samples=200000):
+    """
+    XY 点的主方向（按点数抽稀后做 PCA），返回两行分别为主、次方向的 2x2 矩阵
+    """
+    step = max(1, len(xy) // max_samples)
+    sample = xy[::step, :2]
+    cov = np.cov((sample - sample.mean(axis=0)).T)
+    eigenvalues, eigenvectors = np.linalg.eigh(cov)
+    u = eigenvectors[:, np.argmax(eigenvalues)]
+    # 固定方向符号，保证同一输入得到相同布局
+    if u[0] < 0 or (u[0] == 0 and u[1] < 0):
+        u = -u
+    return np.array([u, [-u[1], u[0]]])
+
+
+def build_layout(xy, tile_size, overlap, mode='corridor'):
+    """
+    根据点的XY范围构建分块布局
+
+    :param xy: (N, 2) 或 (N, 3) 坐标
+    :param tile_size: 分块核心区边长（米）
+    :param overlap: 重叠宽度（米）
+    :param mode: 'corridor' 沿走廊主方向切段，'grid' 为坐标轴对齐的方形网格
+    :return: TileLayout
+    """
+    if mode not in TILE_LAYOUTS:
+        raise ValueError(f"未知的分块布局: {mode}，可选: {TILE_LAYOUTS}")
+    if tile_size <= 0:
+        raise ValueError(f"分块大小必须为正数: {tile_size}")
+
+    xy = np.asarray(xy)[:, :2]
+    axes = _principal_axes(xy) if mode == 'corridor' else np.eye(2)
+    origin = xy.min(axis=0) if mode == 'grid' else np.zeros(2)
+    uv = (xy - origin) @ axes.T
+    lo, hi = uv.min(axis=0), uv.max(axis=0)
+
+    def inner_edges(low, high):
+        count = max(1, int(np.ceil((high - low) / tile_size)))
+        return low + tile_size * np.arange(1, count)
+
+    u_edges = inner_edges(lo[0], hi[0])
+    v_edges = inner_edges(lo[1], hi[1]) if mode == 'grid' else np.empty(0)
+    return TileLayout(mode, origin, axes, u_edges, v_edges, overlap)
+
+
+def extend_layout(layout, xy, tile_size):
+    """
+    在已有布局两端按 tile_size 追加分界，使新数据超出原范围的部分落入新的分块；
+    原有分块的边界保持不变（只有最外侧的无限分块被切分）
+
+    :param layout: 原布局
+    :param xy: 新数据的坐标
+    :param tile_size: 分块核心区边长（米）
+    :return: 新的 TileLayout（未超出范围时返回原布局）
+    """
+    uv = layout.to_frame(xy)
+    if len(uv) == 0:
+        return layout
+
+    def grow(edges, low, high):
+        edges = list(edges)
+        if not edges:
+            return np.asarray(edges)
+        while low < edges[0] - tile_size:
+            edges.insert(0, edges[0] - tile_size)
+        while high > edges[-1] + tile_size:
+            edges.append(edges[-1] + tile_size)
+        return np.asarray(edges)
+
+    lo, hi = uv.min(axis=0), uv.max(axis=0)
+    u_edges = grow(layout.u_edges, lo[0], hi[0])
+    v_edges = grow(layout.v_edges, lo[1], hi[1])
+    if len(u_edges) == len(layout.u_edges) and len(v_edges) == len(layout.v_edges):
+        return layout
+    return TileLayout(layout.mode, layout.origin, layout.axes, u_edges, v_edges, layout.overlap)
+
+
+def max_linearity_radius(radius, use_dynamic_params=True):
+    """
+    线性度计算可能用到的最大邻域半径（与 _calculate_dynamic_radius_by_terrain 的取值范围一致）
+    """
+    if not use_dynamic_params:
+        return radius
+    return max(radius, min(radius * 1.5, 3.0), 0.8)
+
+
+def default_overlap(radius, eps, use_dynamic_params=True, margin=1.0):
+    """
+    保证分块结果与整体一致所需的重叠宽度：覆盖线性度邻域和 DBSCAN 核心点判定（2·eps）
+    """
+    return max(max_linearity_radius(radius, use_dynamic_params), 2.0 * eps) + margin
+
+
+def _quiet_extractor(params):
+    """
+    在分块任务中创建不输出进度的提取器
+    """
+    from Extractor4 import PowerLineExtractor
+    from progress import ProgressReporter
+
+    devnull = open(os.devnull, 'w')
+    return PowerLineExtractor(enable_visualization=False,
+                              progress=ProgressReporter('jsonl', stream=devnull), **params), devnull
+
+
+def tile_linearity_task(params, tile_points, query_local, use_dynamic_params=True):
+    """
+    分块任务：在分块点集上建立 KD 树，计算 query_local 指定点的线性度
+
+    :param params: PowerLineExtractor 构造参数
+    :param tile_points: 分块 核心区+重叠区 内的高程带外点 (M, 3)
+    :param query_local: 需要计算的点在 tile_points 中的序号
+    :param use_dynamic_params: 是否使用动态半径
+    :return: 线性度数组
+    """
+    import open3d as o3d
+
+    # 传入的局部坐标可能是float32，计算前统一转为float64（与整体流程的open3d点云一致）
+    tile_points = np.asarray(tile_points, dtype=np.float64)
+    extractor, devnull = _quiet_extractor(params)
+    with devnull, contextlib.redirect_stdout(devnull):
+        cloud = o3d.geometry.PointCloud()
+        cloud.points = o3d.utility.Vector3dVector(tile_points)
+        kdtree = o3d.geometry.KDTreeFlann(cloud)
+        values = [extractor._point_linearity(tile_points[i], tile_points, kdtree, use_dynamic_params)
+                  for i in query_local]
+    return np.asarray(values, dtype=np.float64)
+
+
+def tile_dbscan_task(params, tile_points):
+    """
+    分块任务：对分块内的线点做 DBSCAN
+
+    :return: (标签, 核心点掩码)
+    """
+    tile_points = np.asarray(tile_points, dtype=np.float64)
+    extractor, devnull = _quiet_extractor(params)
+    with devnull, contextlib.redirect_stdout(devnull):
+        if len(tile_points) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+        return extractor._dbscan_clustering(tile_points, return_core=True)
+
+
+def run_tile_tasks(fn, task_args, workers=1, progress=None, stage='tiles'):
+    """
+    执行一组分块任务，workers > 1 时使用进程池。结果按任务顺序返回。
+    """
+    results = [None] * len(task_args)
+    if workers <= 1 or len(task_args) <= 1:
+        items = range(len(task_args))
+        if progress is not None:
+            items = progress.iter(items, stage, desc=stage)
+        for i in items:
+            results[i] = fn(*task_args[i])
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(task_args))) as pool:
+        futures = {pool.submit(fn, *args): i for i, args in enumerate(task_args)}
+        done = as_completed(futures)
+        if progress is not None:
+            done = progress.iter(done, stage, total=len(futures), desc=stage)
+        for future in done:
+            results[futures[future]] = future.result()
+    return results
+
+
+def stitch_tile_labels(points, tile_members, tile_labels, tile_core, owner, eps):
+    """
+    拼接各分块的 DBSCAN 结果，返回与整体运行编号一致的全局标签
+
+    :param points: 全局线点坐标 (N, 3)
+    :param tile_members: 每个分块内线点的全局序号（递增）
+    :param tile_labels: 每个分块的 DBSCAN 标签
+    :param tile_core: 每个分块的核心点掩码
+    :param owner: 每个线点所属分块编号
+    :param eps: DBSCAN邻域半径（用于确定边界点的归属）
+    :return: (全局标签数组, 跨接缝合并次数)
+    """
+    n_points = len(points)
+    offsets = np.cumsum([0] + [int(labels.max()) + 1 if len(labels) else 0 for labels in tile_labels])
+    parent = np.arange(offsets[-1])
+
+    def find(f):
+        while parent[f] != f:
+            parent[f] = parent[parent[f]]
+            f = parent[f]
+        return f
+
+    # 同一个点在多个分块中都是核心点：这些分块中的聚类在整体运行中属于同一聚类
+    core_points = np.concatenate([members[core] for members, core in zip(tile_members, tile_core)] or [[]])
+    core_frags = np.concatenate([offsets[k] + labels[core]
+                                 for k, (labels, core) in enumerate(zip(tile_labels, tile_core))] or [[]])
+    core_points = core_points.astype(np.int64)
+    core_frags = core_frags.astype(np.int64)
+    order = np.lexsort((core_frags, core_points))
+    core_points, core_frags = core_points[order], core_frags[order]
+    shared = np.flatnonzero(core_points[1:] == core_points[:-1])
+
+    unions = 0
+    for i in shared:
+        a, b = find(core_frags[i]), find(core_frags[i + 1])
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+            unions += 1
+    roots = np.array([find(f) for f in range(len(parent))], dtype=np.int64)
+
+    # 每个点取其归属分块中的标签
+    point_frag = np.full(n_points, -1, dtype=np.int64)
+    for k, (members, labels) in enumerate(zip(tile_members, tile_labels)):
+        own = owner[members] == k
+        point_frag[members[own]] = np.where(labels[own] >= 0, offsets[k] + labels[own], -1)
+    point_root = np.where(point_frag >= 0, roots[np.maximum(point_frag, 0)], -1)
+
+    # sklearn 按序号遍历核心点扩展聚类，聚类编号即按最小核心点序号排序
+    first_core = np.full(len(parent), np.iinfo(np.int64).max, dtype=np.int64)
+    if len(core_frags):
+        np.minimum.at(first_core, roots[core_frags], core_points)
+    clusters = np.unique(point_root[point_root >= 0])
+    ranked = clusters[np.argsort(first_core[clusters], kind='stable')]
+    relabel = np.full(len(parent), -1, dtype=np.int64)
+    relabel[ranked] = np.arange(len(ranked))
+    labels = np.where(point_root >= 0, relabel[np.maximum(point_root, 0)], -1)
+
+    # 边界点可能同时邻接多个聚类：sklearn 逐个聚类完整扩展，边界点归入编号最小的聚类
+    from scipy.spatial import cKDTree
+    for k, (members, tile_labels_k, core) in enumerate(zip(tile_members, tile_labels, tile_core)):
+        border = (owner[members] == k) & (tile_labels_k >= 0) & ~core
+        if not border.any():
+            continue
+        core_labels = relabel[roots[offsets[k] + tile_labels_k[core]]]
+        tree = cKDTree(points[members[core]])
+        border_points = members[border]
+        for point, neighbors in zip(border_points, tree.query_ball_point(points[border_points], eps)):
+            if neighbors:
+                labels[point] = core_labels[neighbors].min()
+    return labels, unions
+
+
+def compare_endpoints(reference, candidate, tolerance=0.5):
+    """
+    比较两份端点JSON（列表）：按最近端点配对，返回差异统计
+
+    :param reference: 整体运行的端点列表
+    :param candidate: 分块运行的端点列表
+    :param tolerance: 端点坐标允许的最大偏差（米）
+    :return: 结果字典
+    """
+    def endpoints(lines):
+        return [np.array([line['start'], line['end']], dtype=np.float64) for line in lines]
+
+    ref, cand = endpoints(reference), endpoints(candidate)
+    max_dev = 0.0
+    unmatched = 0
+    used = set()
+    for ends in ref:
+        best, best_dev = None, np.inf
+        for j, other in enumerate(cand):
+            if j in used:
+                continue
+            dev = min(np.abs(ends - other).max(), np.abs(ends - other[::-1]).max())
+            if dev < best_dev:
+                best, best_dev = j, dev
+        if best is None or best_dev > tolerance:
+            unmatched += 1
+            continue
+        used.add(best)
+        max_dev = max(max_dev, float(best_dev))
+    return {
+        'reference_lines': len(ref),
+        'tiled_lines': len(cand),
+        'unmatched': unmatched + len(cand) - len(used),
+        'max_endpoint_deviation': max_dev,
+        'match': len(ref) == len(cand) and unmatched == 0,
+    }
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    parser = argparse.ArgumentParser(description='比较分块提取与整体提取的结果')
+    parser.add_argument('input_file', help='输入的LAS文件路径')
+    parser.add_argument('--tile_size', type=float, default=200.0, help='分块核心区边长（米） (默认: 200)')
+    parser.add_argument('--tile_overlap', type=float, default=None, help='重叠宽度（米） (默认: 按半径和eps自动计算)')
+    parser.add_argument('--tile_layout', choices=TILE_LAYOUTS, default='corridor', help='分块布局 (默认: corridor)')
+    parser.add_argument('--tile_workers', type=int, default=1, help='分块并行进程数 (默认: 1)')
+    parser.add_argument('--threshold', type=float, default=0.8, help='线特征阈值 (默认: 0.8)')
+    parser.add_argument('--radius', type=float, default=2.0, help='邻域搜索半径 (默认: 2.0)')
+    parser.add_argument('--height_min', type=float, default=0, help='最小高程 (默认: 0)')
+    parser.add_argument('--height_max', type=float, default=60, help='最大高程 (默认: 60)')
+    parser.add_argument('--eps', type=float, default=1.8, help='DBSCAN邻域半径 (默认: 1.8)')
+    parser.add_argument('--min_samples', type=int, default=7, help='DBSCAN最小样本数 (默认: 7)')
+    parser.add_argument('--min_line_length', type=float, default=30.0, help='最小长度阈值 (默认: 30.0)')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='端点坐标允许偏差（米） (默认: 0.5)')
+    args = parser.parse_args()
+
+    from Extractor4 import PowerLineExtractor
+
+    input_file = os.path.abspath(args.input_file)
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    params = dict(threshold=args.threshold, radius=args.radius, height_min=args.height_min,
+                  height_max=args.height_max, eps=args.eps, min_samples=args.min_samples)
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        for mode in ('monolithic', 'tiled'):
+            run_dir = os.path.join(work_dir, mode)
+            os.makedirs(run_dir)
+            os.chdir(run_dir)
+            try:
+                extractor = PowerLineExtractor(enable_visualization=False, **params)
+                extractor.show_final_result = False
+                if mode == 'monolithic':
+                    extractor.extract(input_file, min_line_length=args.min_line_length, visualize_steps=False)
+                else:
+                    extractor.extract_tiled(input_file, tile_size=args.tile_size, tile_overlap=args.tile_overlap,
+                                            tile_layout=args.tile_layout, tile_workers=args.tile_workers,
+                                            min_line_length=args.min_line_length)
+                with open(f"{base_name}_powerline_endpoints.json", 'r', encoding='utf-8') as f:
+                    results[mode] = json.load(f)
+            finally:
+                os.chdir(cwd)
+
+    summary = compare_endpoints(results['monolithic'], results['tiled'], tolerance=args.tolerance)
+    print("\n" + "=" * 60)
+    print(f"整体运行: {summary['reference_lines']} 条电力线，分块运行: {summary['tiled_lines']} 条电力线")
+    print(f"未匹配: {summary['unmatched']}，端点最大偏差: {summary['max_endpoint_deviation']:.4f} 米")
+    print("结果一致" if summary['match'] else "结果不一致")
+    sys.exit(0 if summary['match'] else 1)
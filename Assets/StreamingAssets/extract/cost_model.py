@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+"""
+运行时成本模型与时间预算规划 - cost_model.py
+
+线性度的采样率原先只按点数分档（8000 / 500万 / 1000万 -> 20% / 15% / 10%），
+不考虑点密度、邻域半径、CPU核心数和用户可以等待的时间。本模块：
+1.  在当前机器上用一组小规模合成数据标定各阶段的成本系数（读取、KD树、单点线性度
+    = 固定开销 + 每个邻居的开销、DBSCAN、分离与分割、工作进程启动），
+    结果按主机指纹缓存到磁盘，之后的运行直接读取；
+2.  根据点数、估计的邻域点数和时间预算（--time-budget 120s）选择线性度采样步长、
+    计算后端（单进程整体 / 分块多进程）和进程数：在预算内选择最密的采样；
+3.  运行结束后比较预测与实际的各阶段耗时，打印并追加到规划日志（JSON Lines）。
+"""
+
+import json
+import os
+import platform
+import tempfile
+import time
+
+import numpy as np
+
+# 标定方法或系数含义变化时递增，使已缓存的标定失效
+CALIBRATION_VERSION = 1
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'powerline_extractor', 'cost_model.json')
+DEFAULT_PLAN_LOG = os.path.join(os.path.expanduser('~'), '.cache', 'powerline_extractor', 'plan_log.jsonl')
+
+# 可选的采样步长（1 为逐点计算，最稀为 5%）
+SAMPLE_STEPS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+
+# 动态阈值取线性度的第90百分位，再经高程与邻域筛选后线点约占高程带外点的5%
+LINE_FRACTION = 0.05
+
+# 预测误差的余量：预测耗时不超过预算的这一比例才视为满足预算
+BUDGET_SAFETY = 0.9
+
+# 每增加一个工作进程的并行效率
+PARALLEL_EFFICIENCY = 0.85
+
+_DURATION_UNITS = {'s': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def parse_duration(text):
+    """
+    解析时间预算：纯数字为秒，支持 s/m/h 后缀（如 '120s'、'2m'、'1.5h'）
+
+    :return: 秒数
+    """
+    value = str(text).strip().lower()
+    unit = 1.0
+    if value and value[-1] in _DURATION_UNITS:
+        unit = _DURATION_UNITS[value[-1]]
+        value = value[:-1]
+    try:
+        seconds = float(value) * unit
+    except ValueError:
+        raise ValueError(f"无法解析的时间预算: {text}")
+    if seconds <= 0:
+        raise ValueError(f"时间预算必须为正数: {text}")
+    return seconds
+
+
+def host_fingerprint():
+    """
+    标定结果的适用范围：同一台机器、同一Python版本
+    """
+    return {
+        'node': platform.node(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'calibration_version': CALIBRATION_VERSION,
+    }
+
+
+def estimate_neighbors(points, radius, samples=256, max_points=200000, seed=0):
+    """
+    估计半径邻域内的平均点数：随机抽取至多 max_points 个点建立KD树，
+    统计 samples 个点的邻居数后按抽样比例放大
+
+    :param points: (N, 3) 坐标
+    :param radius: 邻域半径
+    :return: 平均邻居数
+    """
+    from scipy.spatial import cKDTree
+
+    n = len(points)
+    if n == 0:
+        return 0.0
+    rng = np.random.default_rng(seed)
+    subset = points if n <= max_points else points[rng.choice(n, max_points, replace=False)]
+    subset = np.asarray(subset, dtype=np.float64)
+    tree = cKDTree(subset)
+    queries = subset[rng.choice(len(subset), min(samples, len(subset)), replace=False)]
+    counts = tree.query_ball_point(queries, radius, return_length=True)
+    return float(np.mean(counts)) * n / len(subset)
+
+
+def _synthetic_surface(density, n_points, rng):
+    """
+    标定用的合成地面：指定面密度（点/平方米）的平面加少量起伏
+    """
+    side = np.sqrt(n_points / density)
+    xy = rng.uniform(0, side, (n_points, 2))
+    z = 0.05 * np.sin(xy[:, 0]) + rng.normal(0, 0.05, n_points)
+    return np.column_stack([xy, z])
+
+
+def _synthetic_lines(n_lines, points_per_line, rng):
+    """
+    标定用的合成导线：间隔6米的平行悬链线
+    """
+    lines = []
+    for i in range(n_lines):
+        t = rng.uniform(0, 200, points_per_line)
+        z = 25 + 800 * (np.cosh((t - 100) / 800) - np.cosh(100 / 800))
+        lines.append(np.column_stack([t, np.full(points_per_line, 6.0 * i) + rng.normal(0, 0.05, points_per_line),
+                                      z + rng.normal(0, 0.05, points_per_line)]))
+    return np.vstack(lines)
+
+
+def _time_call(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def _startup_probe():
+    """
+    在子进程中导入提取器及其依赖，测量工作进程的启动开销
+    """
+    from lazy_imports import preload
+
+    preload()
+    return os.getpid()
+
+
+def calibrate(extractor, quick=True):
+    """
+    用合成数据标定成本系数（约数秒）
+
+    :param extractor: PowerLineExtractor 实例（使用其半径和DBSCAN参数）
+    :param quick: True 时使用较小的合成数据
+    :return: 系数字典（单位均为秒）
+    """
+    import laspy
+    import open3d as o3d
+    from concurrent.futures import ProcessPoolExecutor
+    from lazy_imports import preload
+
+    # 先导入按需加载的模块，避免把首次导入的耗时计入系数
+    preload()
+    rng = np.random.default_rng(0)
+    scale = 1 if quick else 4
+    coefficients = {}
+
+    # 单点线性度：两种密度下测量平均耗时和平均邻居数，拟合 耗时 = 固定开销 + 每邻居开销 * 邻居数
+    measurements = []
+    for density in (4.0, 32.0):
+        surface = _synthetic_surface(density, 20000 * scale, rng)
+        cloud = o3d.geometry.PointCloud()
+        cloud.points = o3d.utility.Vector3dVector(surface)
+        kdtree = o3d.geometry.KDTreeFlann(cloud)
+        queries = rng.choice(len(surface), 300 * scale, replace=False)
+        extractor._radius_cache.clear()
+        elapsed = _time_call(lambda: [extractor._point_linearity(surface[i], surface, kdtree, True) for i in queries])
+        neighbors = estimate_neighbors(surface, extractor.radius)
+        measurements.append((neighbors, elapsed / len(queries)))
+    extractor._radius_cache.clear()
+    (k1, t1), (k2, t2) = measurements
+    per_neighbor = max((t2 - t1) / max(k2 - k1, 1e-9), 0.0)
+    coefficients['linearity_per_neighbor_s'] = per_neighbor
+    coefficients['linearity_base_s'] = max(t1 - per_neighbor * k1, 0.0)
+
+    # KD树构建
+    surface = _synthetic_surface(16.0, 200000 * scale, rng)
+    cloud = o3d.geometry.PointCloud()
+    cloud.points = o3d.utility.Vector3dVector(surface)
+    coefficients['kdtree_per_point_s'] = _time_call(lambda: o3d.geometry.KDTreeFlann(cloud)) / len(surface)
+
+    # LAS读取（含局部坐标转换和open3d点云构建）
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'calibration.las')
+        header = laspy.LasHeader(point_format=3, version="1.2")
+        header.offsets = surface.min(axis=0)
+        header.scales = np.array([0.001, 0.001, 0.001])
+        las_data = laspy.LasData(header)
+        las_data.x, las_data.y, las_data.z = surface[:, 0], surface[:, 1], surface[:, 2]
+        las_data.write(path)
+        coefficients['read_per_point_s'] = _time_call(lambda: extractor._read_point_cloud(path)) / len(surface)
+
+    # DBSCAN 与 分离/分割（按线点计）
+    lines = _synthetic_lines(6, 800 * scale, rng)
+    labels = None
+
+    def run_dbscan():
+        nonlocal labels
+        labels = extractor._dbscan_clustering(lines)
+    coefficients['dbscan_per_point_s'] = _time_call(run_dbscan) / len(lines)
+    clusters = extractor._clusters_from_labels(lines, labels)
+    coefficients['post_per_point_s'] = _time_call(
+        lambda: extractor._split_all_by_peaks(extractor._separate_clusters(clusters))) / len(lines)
+
+    # 工作进程启动（进程池 + 子进程导入 open3d 等依赖）
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        coefficients['worker_startup_s'] = _time_call(lambda: pool.submit(_startup_probe).result())
+    return coefficients
+
+
+class CostModel:
+    """
+    各阶段耗时的线性模型
+    """
+
+    def __init__(self, coefficients, cpu_count=None):
+        """
+        :param coefficients: calibrate() 返回的系数字典
+        :param cpu_count: 可用核心数，None表示 os.cpu_count()
+        """
+        self.coefficients = dict(coefficients)
+        self.cpu_count = cpu_count or os.cpu_count() or 1
+
+    def speedup(self, workers):
+        """
+        workers 个进程相对单进程的加速比
+        """
+        workers = min(workers, self.cpu_count)
+        return 1.0 + (workers - 1) * PARALLEL_EFFICIENCY
+
+    def predict(self, n_points, n_high, neighbors, sample_step, workers=1):
+        """
+        预测各阶段耗时
+
+        :param n_points: 文件总点数
+        :param n_high: 高程带外参与线性度计算的点数
+        :param neighbors: 基础半径内的平均邻居数
+        :param sample_step: 线性度采样步长
+        :param workers: 线性度与DBSCAN的进程数（1表示单进程整体计算）
+        :return: {阶段: 秒}，含 'total'
+        """
+        c = self.coefficients
+        n_line = n_high * LINE_FRACTION
+        per_query = c['linearity_base_s'] + c['linearity_per_neighbor_s'] * neighbors
+        stages = {
+            'read': c['read_per_point_s'] * n_points,
+            'kdtree': c['kdtree_per_point_s'] * n_high,
+            'linearity': per_query * np.ceil(n_high / sample_step) / self.speedup(workers),
+            'dbscan': c['dbscan_per_point_s'] * n_line,
+            'post': c['post_per_point_s'] * n_line,
+            'startup': c['worker_startup_s'] * min(workers, self.cpu_count) if workers > 1 else 0.0,
+        }
+        stages = {name: float(value) for name, value in stages.items()}
+        stages['total'] = sum(stages.values())
+        return stages
+
+    def plan(self, n_points, n_high, neighbors, time_budget, max_workers=None):
+        """
+        在时间预算内（留出 BUDGET_SAFETY 的余量）选择最密的采样步长；同一步长下选择满足预算的最少进程数
+
+        :param time_budget: 时间预算（秒）
+        :param max_workers: 进程数上限，None表示CPU核心数
+        :return: 规划字典 {sample_step, workers, backend, predicted, within_budget, ...}
+        """
+        max_workers = max(1, min(max_workers or self.cpu_count, self.cpu_count))
+        worker_options = [1] + [w for w in (2, 4, 8, 16, 32, 64) if w < max_workers] + \
+                         ([max_workers] if max_workers > 1 else [])
+        choice = None
+        for step in SAMPLE_STEPS:
+            for workers in worker_options:
+                predicted = self.predict(n_points, n_high, neighbors, step, workers)
+                if predicted['total'] <= time_budget * BUDGET_SAFETY:
+                    choice = (step, workers, predicted)
+                    break
+            if choice is not None:
+                break
+        within_budget = choice is not None
+        if choice is None:
+            step, workers = SAMPLE_STEPS[-1], worker_options[-1]
+            choice = (step, workers, self.predict(n_points, n_high, neighbors, step, workers))
+        step, workers, predicted = choice
+        return {
+            'time_budget_s': float(time_budget),
+            'sample_step': int(step),
+            'sample_rate': round(1.0 / step, 4),
+            'workers': int(workers),
+            'backend': 'tiled' if workers > 1 else 'monolithic',
+            'n_points': int(n_points),
+            'n_high': int(n_high),
+            'neighbors': round(float(neighbors), 2),
+            'predicted': {name: round(value, 3) for name, value in predicted.items()},
+            'within_budget': within_budget,
+        }
+
+
+def load_or_calibrate(extractor, model_path=None, recalibrate=False):
+    """
+    读取与当前主机指纹匹配的缓存标定结果，没有时运行标定并写入缓存
+
+    :return: CostModel
+    """
+    model_path = model_path or DEFAULT_MODEL_PATH
+    fingerprint = host_fingerprint()
+    cached = {}
+    if os.path.exists(model_path):
+        try:
+            with open(model_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+    key = json.dumps(fingerprint, sort_keys=True)
+    entry = cached.get(key)
+    if entry is not None and not recalibrate:
+        return CostModel(entry['coefficients'])
+
+    print("正在标定本机的成本模型（结果会缓存，之后的运行不再重复）...")
+    start = time.perf_counter()
+    coefficients = calibrate(extractor)
+    print(f"标定完成，耗时 {time.perf_counter() - start:.2f} 秒")
+    cached[key] = {'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'fingerprint': fingerprint,
+                   'coefficients': coefficients}
+    os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+    tmp_path = model_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cached, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, model_path)
+    return CostModel(coefficients)
+
+
+# 预测阶段 -> 性能追踪中的实际阶段（整体 / 分块两种流程的阶段名）；规划本身（含首次标定）不在预测之内
+_ACTUAL_STAGES = {
+    'plan': ('plan',),
+    'read': ('read',),
+    'linearity': ('segmentation', 'tile_layout', 'tile_linearity', 'tile_threshold'),
+    'dbscan': ('dbscan', 'tile_dbscan', 'seam_stitch'),
+    'post': ('separate', 'split', 'merge', 'length_filter', 'transform', 'final_filter', 'write_outputs'),
+}
+
+
+def compare_plan(plan, trace_dict, log_path=None, input_file=None):
+    """
+    比较规划的预测耗时与实际耗时，打印对照表并追加到规划日志
+
+    :param plan: CostModel.plan() 的结果
+    :param trace_dict: PerfTrace.to_dict()
+    :param log_path: 规划日志路径，None表示默认路径
+    :return: 对照字典
+    """
+    actual = {name: 0.0 for name in _ACTUAL_STAGES}
+    for record in trace_dict.get('stages', []):
+        for name, stages in _ACTUAL_STAGES.items():
+            if record['stage'] in stages:
+                actual[name] += record['wall_s']
+    predicted = plan['predicted']
+    grouped = {
+        'plan': 0.0,
+        'read': predicted['read'],
+        'linearity': predicted['kdtree'] + predicted['linearity'] + predicted['startup'],
+        'dbscan': predicted['dbscan'],
+        'post': predicted['post'],
+    }
+    total = trace_dict.get('total_wall_s')
+    print("\n规划预测与实际耗时对照:")
+    print(f"  {'阶段':<10}{'预测(s)':>10}{'实际(s)':>10}")
+    for name in _ACTUAL_STAGES:
+        print(f"  {name:<10}{grouped[name]:>10.2f}{actual[name]:>10.2f}")
+    print(f"  {'total':<10}{predicted['total']:>10.2f}{total:>10.2f}   预算 {plan['time_budget_s']:.0f} 秒")
+
+    record = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'input_file': input_file,
+        'plan': plan,
+        'predicted_stages': {k: round(v, 3) for k, v in grouped.items()},
+        'actual_stages': {k: round(v, 3) for k, v in actual.items()},
+        'actual_total_s': total,
+    }
+    log_path = log_path or DEFAULT_PLAN_LOG
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+        with open(log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except OSError:
+        pass
+    return record
@@ -0,0 +1,498 @@
+# -*- coding: utf-8 -*-
+"""
+常驻提取服务 - extract_server.py
+
+每次在Unity中执行操作都会启动新的python进程，重复付出导入 open3d/sklearn/scipy/numba、
+读取LAS文件以及Numba JIT编译的开销。本服务常驻运行：
+1.  启动时一次性导入所有模块并预热 Numba 核函数；
+2.  在内存中按LRU预算保留最近读取的点云和阶段缓存，同一文件的第二次提取可直接从缓存阶段继续；
+3.  通过 JSON-RPC 2.0（每行一个JSON消息）接收请求，传输方式为 stdin/stdout 或本地TCP端口；
+4.  计算请求进入任务队列依次执行，支持取消排队中或正在运行的任务。
+
+请求方法：
+    extract   参数同 PowerLineExtractor 构造函数与 extract()，另有 input_file、cwd、compress_output（输出LAZ）、
+              sidecar_cache（经由二进制旁路缓存读取）、line_geometry（另外输出二进制几何容器 .plg）
+    worker    参数 args 为 worker.py 的命令行参数列表（或 {参数名: 值} 字典），另有 cwd
+    towers    参数同 extract_tower_coordinates()
+    cancel    {"id": 要取消的请求id}
+    status    查看队列与正在运行的任务
+    stats     查看内存缓存占用
+    clear_cache  清空内存缓存
+    ping / shutdown
+
+任务执行期间服务端发送 {"method": "progress", "params": {"id", "stage", "done", "total", "eta_s", "rss_mb"}} 通知。
+
+使用方法:
+    python extract_server.py                 # stdin/stdout
+    python extract_server.py --port 47800    # 监听 127.0.0.1:47800
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+_startup_begin = time.perf_counter()
+
+import numpy as np
+
+from Extractor4 import PowerLineExtractor
+from las_io import powerline_las_name
+from lazy_imports import preload
+from line_geometry import line_geometry_name
+from perf_trace import stop_active_profilers
+from progress import ProgressReporter
+from result_cache import ResultCache
+from stage_cache import MemoryStageCache
+from terrain_generator import warmup_numba_kernels
+from worker import NumpyEncoder, WorkerError, build_parser as build_worker_parser, run_worker
+
+# JSON-RPC 错误码
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+JOB_FAILED = -32000
+REQUEST_CANCELLED = -32800
+
+# PowerLineExtractor 构造参数与 extract() 参数中允许通过请求传入的部分
+EXTRACTOR_PARAMS = ('threshold', 'radius', 'height_min', 'height_max', 'eps', 'min_samples')
+EXTRACT_PARAMS = ('min_line_points', 'min_line_length', 'length_method', 'reference_point_method',
+                  'use_dynamic_params', 'use_cache', 'cache_dir', 'use_result_cache')
+
+
+class JobCancelled(BaseException):
+    """
+    任务被取消。继承 BaseException（同 KeyboardInterrupt），不会被提取器和 run_worker 中的
+    except Exception 包装为普通错误，可一直传到任务处理函数
+    """
+
+
+class PointCloudCache:
+    """
+    按内存预算LRU淘汰的点云坐标缓存，键为 (绝对路径, 文件大小, 修改时间)
+    """
+
+    def __init__(self, max_memory_mb=2048):
+        self.max_bytes = int(max_memory_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path, loader):
+        """
+        返回文件的 (N, 3) 局部坐标数组；未命中时调用 loader(file_path) 读取并缓存。
+        """
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            points = self._entries.get(key)
+            if points is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return points
+        points = loader(file_path)
+        with self._lock:
+            self.misses += 1
+            if points.nbytes <= self.max_bytes:
+                self._entries[key] = points
+                self._bytes += points.nbytes
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+        return points
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class JobProgress(ProgressReporter):
+    """
+    任务进度汇报器：进度事件转为 JSON-RPC 通知，并在每次汇报时检查取消标志
+    """
+
+    def __init__(self, job, send, interval_ms=250):
+        super().__init__('jsonl', interval_ms=interval_ms, stream=sys.stderr)
+        self.job = job
+        self.send = send
+
+    def _emit(self, payload):
+        params = {'id': self.job.request_id}
+        params.update({k: v for k, v in payload.items() if k != 'event'})
+        self.send({'jsonrpc': '2.0', 'method': 'progress', 'params': params})
+
+    def update(self, stage, done, total=None, force=False):
+        if self.job.cancel_event.is_set():
+            raise JobCancelled(f"任务 {self.job.request_id} 已取消")
+        super().update(stage, done, total, force)
+
+
+class Job:
+    """
+    队列中的一个计算任务
+    """
+
+    def __init__(self, request_id, method, params, send):
+        self.request_id = request_id
+        self.method = method
+        self.params = params
+        self.send = send
+        self.state = 'queued'
+        self.cancel_event = threading.Event()
+        self.submitted = time.time()
+        self.started = None
+
+    def describe(self):
+        return {'id': self.request_id, 'method': self.method, 'state': self.state,
+                'waited_s': round((self.started or time.time()) - self.submitted, 3)}
+
+
+class ExtractionServer:
+    """
+    JSON-RPC 请求分发与任务队列；计算任务在单个后台线程中依次执行
+    """
+
+    JOB_METHODS = ('extract', 'worker', 'towers')
+
+    def __init__(self, cloud_memory_mb=2048, stage_memory_mb=1024, cache_dir=None, progress_interval_ms=250,
+                 result_cache_dir=None):
+        self.cloud_cache = PointCloudCache(cloud_memory_mb)
+        self.stage_cache = MemoryStageCache(cache_dir, max_memory_mb=stage_memory_mb)
+        self.result_cache = ResultCache(result_cache_dir)
+        self.progress_interval_ms = progress_interval_ms
+        self.jobs = queue.Queue()
+        self.pending = OrderedDict()
+        self.current = None
+        self._lock = threading.Lock()
+        self.shutdown_event = threading.Event()
+        self._thread = threading.Thread(target=self._run_jobs, name='extract-jobs', daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    #  请求分发
+    # ------------------------------------------------------------------
+
+    def handle_line(self, line, send):
+        """
+        处理一行 JSON-RPC 消息；计算任务入队后由后台线程回复，其余请求立即回复。
+        """
+        line = line.strip()
+        if not line:
+            return
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            send(_error_response(None, PARSE_ERROR, f"JSON解析失败: {e}"))
+            return
+        if not isinstance(message, dict) or not isinstance(message.get('method'), str):
+            send(_error_response(message.get('id') if isinstance(message, dict) else None,
+                                 INVALID_REQUEST, "无效的JSON-RPC请求"))
+            return
+
+        request_id = message.get('id')
+        method = message['method']
+        params = message.get('params') or {}
+
+        if method in self.JOB_METHODS:
+            job = Job(request_id, method, params, send)
+            with self._lock:
+                if request_id is not None:
+                    self.pending[request_id] = job
+            self.jobs.put(job)
+            return
+
+        handler = getattr(self, f"_rpc_{method}", None)
+        if handler is None:
+            send(_error_response(request_id, METHOD_NOT_FOUND, f"未知的方法: {method}"))
+            return
+        try:
+            result = handler(params)
+        except (KeyError, TypeError, ValueError) as e:
+            send(_error_response(request_id, INVALID_PARAMS, str(e)))
+            return
+        if request_id is not None:
+            send({'jsonrpc': '2.0', 'id': request_id, 'result': result})
+
+    def _rpc_ping(self, params):
+        return {'pong': True, 'pid': os.getpid()}
+
+    def _rpc_status(self, params):
+        with self._lock:
+            return {
+                'running': self.current.describe() if self.current else None,
+                'queued': [job.describe() for job in self.pending.values() if job.state == 'queued'],
+            }
+
+    def _rpc_stats(self, params):
+        return {'point_clouds': self.cloud_cache.stats(), 'stages': self.stage_cache.memory_usage()}
+
+    def _rpc_clear_cache(self, params):
+        self.cloud_cache.clear()
+        self.stage_cache.clear_memory()
+        return {'cleared': True}
+
+    def _rpc_cancel(self, params):
+        target = params['id']
+        with self._lock:
+            job = self.pending.get(target)
+        if job is None:
+            return {'cancelled': False, 'reason': '任务不存在或已结束'}
+        job.cancel_event.set()
+        return {'cancelled': True, 'state': job.state}
+
+    def _rpc_shutdown(self, params):
+        self.shutdown_event.set()
+        with self._lock:
+            for job in self.pending.values():
+                job.cancel_event.set()
+        self.jobs.put(None)
+        return {'shutdown': True}
+
+    def wait(self):
+        """
+        等待队列中剩余任务执行完毕（输入流结束或收到 shutdown 后调用）。
+        """
+        self.jobs.put(None)
+        self._thread.join()
+
+    # ------------------------------------------------------------------
+    #  任务执行
+    # ------------------------------------------------------------------
+
+    def _run_jobs(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            with self._lock:
+                self.current = job
+            try:
+                self._execute(job)
+            finally:
+                with self._lock:
+                    self.current = None
+                    self.pending.pop(job.request_id, None)
+
+    def _execute(self, job):
+        if job.cancel_event.is_set():
+            job.state = 'cancelled'
+            job.send(_error_response(job.request_id, REQUEST_CANCELLED, "任务在开始前已取消"))
+            return
+
+        job.state = 'running'
+        job.started = time.time()
+        reporter = JobProgress(job, job.send, self.progress_interval_ms)
+        saved_cwd = os.getcwd()
+        try:
+            # 输出文件写在请求指定的目录中（任务串行执行，切换工作目录是安全的）
+            if job.params.get('cwd'):
+                os.chdir(job.params['cwd'])
+            result = getattr(self, f"_job_{job.method}")(job.params, reporter)
+        except JobCancelled as e:
+            job.state = 'cancelled'
+            job.send(_error_response(job.request_id, REQUEST_CANCELLED, str(e)))
+        except WorkerError as e:
+            job.state = 'failed'
+            job.send(_error_response(job.request_id, JOB_FAILED, e.payload['error'], e.payload))
+        except (KeyError, TypeError, ValueError) as e:
+            job.state = 'failed'
+            job.send(_error_response(job.request_id, INVALID_PARAMS, str(e), traceback.format_exc()))
+        except Exception as e:
+            job.state = 'failed'
+            job.send(_error_response(job.request_id, INTERNAL_ERROR, str(e), traceback.format_exc()))
+        else:
+            job.state = 'done'
+            result['elapsed_s'] = round(time.time() - job.started, 3)
+            if job.request_id is not None:
+                job.send({'jsonrpc': '2.0', 'id': job.request_id, 'result': result})
+        finally:
+            # 取消或失败时中断的阶段不会调用 trace.stop，关闭其仍在启用的 cProfile，否则后续任务无法再启用
+            stop_active_profilers()
+            os.chdir(saved_cwd)
+
+    def _job_extract(self, params, reporter):
+        input_file = params['input_file']
+        extractor = PowerLineExtractor(
+            enable_visualization=False,
+            progress=reporter,
+            **{k: params[k] for k in EXTRACTOR_PARAMS if k in params}
+        )
+        extractor.stage_cache = self.stage_cache
+        extractor.cloud_cache = self.cloud_cache
+        extractor.result_cache = self.result_cache
+        extractor.compress_output = bool(params.get('compress_output', False))
+        extractor.use_sidecar = bool(params.get('sidecar_cache', False))
+        extractor.line_geometry_output = bool(params.get('line_geometry', False))
+        kwargs = {k: params[k] for k in EXTRACT_PARAMS if k in params}
+        kwargs.setdefault('use_cache', True)
+        kwargs.setdefault('use_result_cache', True)
+        lines = extractor.extract(input_file, visualize_steps=False, **kwargs)
+
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
+        output_files = {
+            'endpoints_json': os.path.abspath(f"{base_name}_powerline_endpoints.json"),
+            'las': os.path.abspath(powerline_las_name(input_file, extractor.compress_output)),
+        }
+        if extractor.line_geometry_output:
+            output_files['line_geometry'] = os.path.abspath(line_geometry_name(input_file))
+        return {
+            'line_count': len(lines),
+            'output_files': output_files,
+            'translation_vector': np.asarray(extractor.last_translation_vector).tolist(),
+            'performance_trace': extractor.last_trace.to_dict(),
+        }
+
+    def _job_worker(self, params, reporter):
+        argv = params['args']
+        if isinstance(argv, dict):
+            argv = _dict_to_argv(argv)
+        try:
+            args = build_worker_parser().parse_args([str(a) for a in argv])
+        except SystemExit:
+            raise ValueError(f"无效的worker参数: {argv}")
+        args.visualize = False
+        metadata = run_worker(args, reporter, stage_cache=self.stage_cache, cloud_cache=self.cloud_cache,
+                              result_cache=self.result_cache)
+        return json.loads(json.dumps(metadata, cls=NumpyEncoder))
+
+    def _job_towers(self, params, reporter):
+        # networkx 只在电力塔步骤中使用，首次调用时再导入
+        from extract_tower_coordinates import extract_tower_coordinates_cached
+        reporter.begin_stage('towers')
+        stats = extract_tower_coordinates_cached(
+            params['input_json'], params['output_csv'],
+            eps=params.get('eps', 120.0),
+            min_samples=params.get('min_samples', 1),
+            target_z_mean=params.get('target_z_mean', 10.0),
+            cache=self.result_cache
+        )
+        reporter.end_stage('towers')
+        return stats
+
+
+def _error_response(request_id, code, message, data=None):
+    error = {'code': code, 'message': message}
+    if data is not None:
+        error['data'] = data
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': error}
+
+
+def _dict_to_argv(options):
+    """
+    {'input': 'a.las', 'no_cache': True} -> ['--input', 'a.las', '--no_cache']
+    """
+    argv = []
+    for name, value in options.items():
+        flag = f"--{name}"
+        if value is True:
+            argv.append(flag)
+        elif value is not False and value is not None:
+            argv.extend([flag, str(value)])
+    return argv
+
+
+def _make_sender(stream):
+    lock = threading.Lock()
+
+    def send(message):
+        data = json.dumps(message, ensure_ascii=False, cls=NumpyEncoder) + '\n'
+        with lock:
+            try:
+                stream.write(data)
+                stream.flush()
+            except (OSError, ValueError):
+                # 客户端已断开，丢弃消息
+                pass
+    return send
+
+
+def serve_stdio(server):
+    # 标准输出只用于协议消息，各模块的 print 重定向到 stderr
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    send = _make_sender(protocol_out)
+    send({'jsonrpc': '2.0', 'method': 'ready', 'params': _ready_params()})
+    for line in sys.stdin:
+        server.handle_line(line, send)
+        if server.shutdown_event.is_set():
+            break
+    server.wait()
+
+
+def serve_socket(server, host, port):
+    sys.stdout = sys.stderr
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen()
+    listener.settimeout(0.5)
+    print(f"提取服务监听于 {host}:{listener.getsockname()[1]}")
+
+    def handle_connection(conn):
+        with conn, conn.makefile('r', encoding='utf-8') as reader, \
+                conn.makefile('w', encoding='utf-8') as writer:
+            send = _make_sender(writer)
+            send({'jsonrpc': '2.0', 'method': 'ready', 'params': _ready_params()})
+            for line in reader:
+                server.handle_line(line, send)
+                if server.shutdown_event.is_set():
+                    break
+
+    with listener:
+        while not server.shutdown_event.is_set():
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                continue
+            threading.Thread(target=handle_connection, args=(conn,), daemon=True).start()
+    server.wait()
+
+
+def _ready_params():
+    return {'pid': os.getpid(), 'startup_s': round(time.perf_counter() - _startup_begin, 3)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='常驻电力线提取服务（JSON-RPC）')
+    parser.add_argument('--port', type=int, default=None, help='监听本地TCP端口；不指定则使用stdin/stdout')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--cloud_memory_mb', type=float, default=2048, help='点云内存缓存上限MB (默认: 2048)')
+    parser.add_argument('--stage_memory_mb', type=float, default=1024, help='阶段结果内存缓存上限MB (默认: 1024)')
+    parser.add_argument('--cache_dir', default=None, help='阶段检查点磁盘缓存目录 (默认: ~/.cache/powerline_extractor/stages)')
+    parser.add_argument('--result_cache_dir', default=None, help='结果缓存目录 (默认: ~/.cache/powerline_extractor/results)')
+    parser.add_argument('--progress-interval-ms', dest='progress_interval_ms', type=int, default=250,
+                        help='进度通知的最小间隔毫秒数 (默认: 250)')
+    args = parser.parse_args()
+
+    warmup_start = time.perf_counter()
+    preload()
+    warmup_numba_kernels()
+    print(f"模块导入与 Numba 核函数预热完成，耗时 {time.perf_counter() - warmup_start:.2f} 秒", file=sys.stderr)
+
+    server = ExtractionServer(
+        cloud_memory_mb=args.cloud_memory_mb,
+        stage_memory_mb=args.stage_memory_mb,
+        cache_dir=args.cache_dir,
+        progress_interval_ms=args.progress_interval_ms,
+        result_cache_dir=args.result_cache_dir
+    )
+    if args.port is None:
+        serve_stdio(server)
+    else:
+        serve_socket(server, args.host, args.port)
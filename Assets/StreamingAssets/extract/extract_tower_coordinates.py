@@ -23,6 +23,9 @@ import networkx as nx
 import sys
 import os
 
+# 结果缓存键的一部分：塔坐标算法或CSV格式变化时递增
+TOWERS_VERSION = 1
+
 def normalize_coordinates_to_target_z_mean(coordinates, target_z_mean=10.0):
     """
     将坐标的z平均值归一化到目标值，并相应缩放xy坐标
@@ -212,6 +215,37 @@ def extract_tower_coordinates(input_json_path, output_csv_path, eps=120.0, min_s
         'total_lines': len(endpoints_data)
     }
 
+def extract_tower_coordinates_cached(input_json_path, output_csv_path, eps=120.0, min_samples=1,
+                                     target_z_mean=10.0, cache=None):
+    """
+    带结果缓存的电力塔坐标提取：键由端点JSON的全文内容和参数派生，
+    命中时直接复制缓存的CSV，任何文件名的输入都能复用
+
+    Args:
+        input_json_path: 输入的JSON文件路径
+        output_csv_path: 输出的CSV文件路径
+        eps, min_samples, target_z_mean: 同 extract_tower_coordinates()
+        cache: ResultCache实例，None时使用默认缓存目录
+    """
+    from result_cache import ResultCache, content_hash
+
+    if not os.path.exists(input_json_path):
+        raise FileNotFoundError(f"输入文件不存在: {input_json_path}")
+
+    cache = cache or ResultCache()
+    # 端点JSON很小，总是做全文件哈希
+    key = cache.key(input_json_path, 'towers', TOWERS_VERSION, {
+        'content': content_hash(input_json_path, full=True),
+        'eps': eps, 'min_samples': min_samples, 'target_z_mean': target_z_mean})
+    manifest = cache.restore(key, {'tower_csv': output_csv_path})
+    if manifest is not None:
+        print(f"结果缓存命中 ({key[:12]})，已复制电力塔CSV: {output_csv_path}")
+        return manifest['metadata']
+
+    stats = extract_tower_coordinates(input_json_path, output_csv_path, eps, min_samples, target_z_mean)
+    cache.store(key, {'tower_csv': output_csv_path}, stats)
+    return stats
+
 def main():
     """主函数"""
     if len(sys.argv) < 3:
@@ -250,7 +284,7 @@ def main():
             print(f"警告：无效的target_z_mean参数，使用默认值 {target_z_mean}")
     
     try:
-        stats = extract_tower_coordinates(input_json_path, output_csv_path, eps, min_samples, target_z_mean)
+        stats = extract_tower_coordinates_cached(input_json_path, output_csv_path, eps, min_samples, target_z_mean)
         print(f"\n统计信息: {stats['total_lines']}条电力线, {stats['total_towers']}个电力塔, {stats['total_groups']}个连通组")
     except Exception as e:
         print(f"错误: {str(e)}")
@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+"""
+参考结果回归与性能门禁 - golden_check.py
+
+Assets/PyPLineExtractor 中的 A.json、A_result.json、B线路平坦部分_result.json 等是 Generator
+在参考数据上的输出（端点、点数、悬链线参数）。本脚本用于确认新的实现或更快的后端仍能复现这些结果：
+1.  在独立子进程中用 Generator（原提取器）或 Extractor4 的某个后端重新处理参考输入，
+    按 Generator.dump 的格式输出电力线端点与悬链线拟合；
+2.  按端点距离把每条输出线与参考线一一配对，检查线数、端点偏差和悬链线曲线偏差是否在容差内；
+3.  记录提取耗时和常驻内存峰值，与同一台机器上保存的基线比较，超过回归阈值即判为失败。
+逐线配对结果写入差异报告JSON；任一参考文件未通过时以非零状态码退出。
+
+参考数据（LAS）不在仓库中：默认按参考JSON中 file_path 的文件名在 --data_dir 中查找，
+也可以用 --input 名称=路径 逐个指定。
+
+使用方法:
+    python golden_check.py --data_dir D:/data --producer extract --update_baseline
+    python golden_check.py --data_dir D:/data --producer tiled --tile_workers 4 --max_regression 0.1
+    python golden_check.py --golden ../../PyPLineExtractor/A_result.json --input A_result=A.las
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+GENERATOR_DIR = os.path.normpath(os.path.join(SCRIPT_DIR, '..', '..', 'PyPLineExtractor'))
+DEFAULT_BASELINES = os.path.join(SCRIPT_DIR, 'golden_baselines.json')
+
+PRODUCERS = ('generator', 'extract', 'tiled', 'bounded', 'two_pass')
+
+# 参考结果的生成方式（见 Generator.py 与 simple_extract.py）
+GENERATE_KWARGS = dict(min_line_points=50, min_line_length=200.0, length_method='path',
+                       reference_point_method='center')
+FIT_METHOD = 'catenary'
+
+
+def _catenary(x, a, h, v):
+    return a * np.cosh((x - h) / a) + v
+
+
+def child_main(config_path):
+    """
+    子进程：按配置重新处理一个参考输入，以 Generator.dump 的格式写出结果，耗时写入 timing.json
+    """
+    sys.path.insert(0, SCRIPT_DIR)
+    sys.path.insert(1, GENERATOR_DIR)
+    from Generator import Generator
+
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    input_file = config['input_file']
+    producer = config['producer']
+    kwargs = dict(GENERATE_KWARGS, min_line_length=config['min_line_length'])
+
+    generator = Generator(input_file, config['output_json'], **config['params'])
+    start = time.perf_counter()
+    if producer == 'generator':
+        generator.generate(**kwargs)
+    else:
+        from Extractor4 import PowerLineExtractor
+        from perf_trace import PerfTrace
+
+        extractor = PowerLineExtractor(enable_visualization=False, **config['params'])
+        extractor.show_final_result = False
+        trace = PerfTrace('golden', trace_malloc=False)
+        common = dict(min_line_length=kwargs['min_line_length'], length_method=kwargs['length_method'],
+                      reference_point_method=kwargs['reference_point_method'], trace=trace)
+        if producer == 'extract':
+            lines = extractor.extract(input_file, min_line_points=kwargs['min_line_points'],
+                                      visualize_steps=False, **common)
+        elif producer == 'tiled':
+            lines = extractor.extract_tiled(input_file, tile_size=config['tile_size'],
+                                            tile_workers=config['tile_workers'], **common)
+        elif producer == 'bounded':
+            lines = extractor.extract_bounded(input_file, max_memory=config['max_memory'], **common)
+        else:
+            lines = extractor.extract_two_pass(input_file, **common)
+        generator.individual_power_lines = lines
+    extract_s = time.perf_counter() - start
+
+    generator.dump(fit_method=FIT_METHOD)
+    with open('timing.json', 'w', encoding='utf-8') as f:
+        json.dump({'extract_s': extract_s}, f)
+
+
+def load_golden(path):
+    """
+    读取 Generator 格式的参考JSON；不是该格式（没有 power_lines）时返回 None
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except ValueError:
+            return None
+    if not isinstance(data, dict) or 'power_lines' not in data:
+        return None
+    return data
+
+
+def resolve_input(case, golden, data_dir, overrides):
+    """
+    参考输入的路径：--input 指定的优先，其次是 data_dir 下与参考 file_path 同名的文件
+    """
+    if case in overrides:
+        return overrides[case]
+    name = re.split(r'[\\/]', golden.get('file_path', ''))[-1]
+    if data_dir and name:
+        path = os.path.join(data_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _endpoints(line):
+    return np.array([[line[key]['x'], line[key]['y'], line[key]['z']] for key in ('endpoint1', 'endpoint2')],
+                    dtype=np.float64)
+
+
+def endpoint_deviation(ends_a, ends_b):
+    """
+    两条线端点的偏差：两种端点对应方式中较小的那个最大端点距离
+    """
+    direct = np.max(np.linalg.norm(ends_a - ends_b, axis=1))
+    swapped = np.max(np.linalg.norm(ends_a - ends_b[::-1], axis=1))
+    return float(min(direct, swapped))
+
+
+def catenary_deviation(fit_a, fit_b, half_span, samples=64):
+    """
+    两条悬链线在参考线跨度内的最大高度差（米）
+
+    拟合的横坐标是相对质心沿主方向的投影，主方向的符号不确定，因此同时比较镜像后的曲线取较小值。
+    参数 a、v 高度相关（v 约为最低点高度减 a），直接比较参数不稳定，故比较曲线本身。
+    """
+    if not (fit_a and fit_b and fit_a.get('success') and fit_b.get('success')):
+        return None
+    pa, pb = fit_a['parameters'], fit_b['parameters']
+    x = np.linspace(-half_span, half_span, samples)
+    with np.errstate(over='ignore', invalid='ignore'):
+        za = _catenary(x, pa['a'], pa['h'], pa['v'])
+        zb = _catenary(x, pb['a'], pb['h'], pb['v'])
+        zb_mirror = _catenary(-x, pb['a'], pb['h'], pb['v'])
+        deviation = min(np.max(np.abs(za - zb)), np.max(np.abs(za - zb_mirror)))
+    return float(deviation) if np.isfinite(deviation) else float('inf')
+
+
+def _relative(a, b):
+    return abs(a - b) / abs(b) if b else abs(a - b)
+
+
+def pair_lines(output, golden, pair_radius):
+    """
+    按端点偏差做最优一一配对（匈牙利算法），偏差超过 pair_radius 的不配对
+
+    :return: [(输出序号, 参考序号, 端点偏差)]、未配对的输出序号、未配对的参考序号
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    out_ends = [_endpoints(line) for line in output]
+    gold_ends = [_endpoints(line) for line in golden]
+    pairs = []
+    if out_ends and gold_ends:
+        cost = np.array([[endpoint_deviation(a, b) for b in gold_ends] for a in out_ends])
+        rows, cols = linear_sum_assignment(np.minimum(cost, pair_radius * 10))
+        pairs = [(int(r), int(c), float(cost[r, c])) for r, c in zip(rows, cols) if cost[r, c] <= pair_radius]
+    paired_out = {p[0] for p in pairs}
+    paired_gold = {p[1] for p in pairs}
+    return (pairs, [i for i in range(len(output)) if i not in paired_out],
+            [j for j in range(len(golden)) if j not in paired_gold])
+
+
+def compare_results(output, golden, endpoint_tolerance, curve_tolerance, pair_radius, count_tolerance):
+    """
+    比较一次输出与参考结果，返回逐线配对的差异报告
+    """
+    out_lines = output['power_lines']
+    gold_lines = golden['power_lines']
+    pairs, extra, missing = pair_lines(out_lines, gold_lines, pair_radius)
+
+    rows = []
+    for i, j, deviation in pairs:
+        out_line, gold_line = out_lines[i], gold_lines[j]
+        gold_ends = _endpoints(gold_line)
+        half_span = np.linalg.norm(gold_ends[1] - gold_ends[0]) / 2
+        out_fit = out_line.get('fits', {}).get(FIT_METHOD)
+        gold_fit = gold_line.get('fits', {}).get(FIT_METHOD)
+        curve = catenary_deviation(out_fit, gold_fit, half_span)
+        row = {
+            'output_id': out_line['id'], 'golden_id': gold_line['id'],
+            'endpoint_deviation': round(deviation, 4),
+            'catenary_deviation': None if curve is None else round(curve, 4),
+            'point_count': out_line['point_count'], 'golden_point_count': gold_line['point_count'],
+        }
+        if out_fit and gold_fit and out_fit.get('success') and gold_fit.get('success'):
+            row['a_relative_diff'] = round(_relative(out_fit['parameters']['a'], gold_fit['parameters']['a']), 4)
+        if deviation > endpoint_tolerance:
+            row['status'] = 'endpoint'
+        elif curve is not None and curve > curve_tolerance:
+            row['status'] = 'catenary'
+        elif curve is None and bool(out_fit and out_fit.get('success')) != bool(gold_fit and gold_fit.get('success')):
+            row['status'] = 'catenary'  # 一方拟合失败
+        else:
+            row['status'] = 'ok'
+        rows.append(row)
+    for i in extra:
+        rows.append({'output_id': out_lines[i]['id'], 'golden_id': None, 'status': 'extra',
+                     'point_count': out_lines[i]['point_count']})
+    for j in missing:
+        rows.append({'output_id': None, 'golden_id': gold_lines[j]['id'], 'status': 'missing',
+                     'golden_point_count': gold_lines[j]['point_count']})
+    rows.sort(key=lambda r: (r['golden_id'] is None, r['golden_id'] if r['golden_id'] is not None else r['output_id']))
+
+    count_diff = len(out_lines) - len(gold_lines)
+    mismatched = sum(1 for r in rows if r['status'] in ('endpoint', 'catenary'))
+    unmatched = len(extra) + len(missing)
+    deviations = [r['endpoint_deviation'] for r in rows if 'endpoint_deviation' in r]
+    return {
+        'passed': abs(count_diff) <= count_tolerance and mismatched == 0 and unmatched <= count_tolerance,
+        'line_count': len(out_lines), 'golden_line_count': len(gold_lines), 'count_diff': count_diff,
+        'paired': len(pairs), 'mismatched': mismatched, 'extra': len(extra), 'missing': len(missing),
+        'max_endpoint_deviation': max(deviations) if deviations else None,
+        'tower_count': output.get('total_towers'), 'golden_tower_count': golden.get('total_towers'),
+        'lines': rows,
+    }
+
+
+def host_key():
+    """
+    基线按机器区分：耗时和内存只与同一台机器、同一Python版本上的基线比较
+    """
+    return f"{platform.node()}/{platform.machine()}/{os.cpu_count()}cpu/py{platform.python_version()}"
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_performance(measured, baseline, max_regression):
+    """
+    与基线比较提取耗时和内存峰值；任一项超过 (1 + max_regression) 倍即为回归
+    """
+    if baseline is None:
+        return {'passed': True, 'status': 'no_baseline'}
+    result = {'passed': True, 'status': 'ok', 'baseline': baseline}
+    for key in ('extract_s', 'peak_rss_mb'):
+        if not baseline.get(key):
+            continue
+        change = measured[key] / baseline[key] - 1
+        result[f"{key}_change"] = round(change, 4)
+        if change > max_regression:
+            result['passed'] = False
+            result['status'] = 'regression'
+    return result
+
+
+def run_case(args, case, golden_path, input_file):
+    """
+    以子进程重新处理一个参考输入并与参考结果比较，返回该参考文件的报告
+    """
+    from bench_memory import run_measured
+
+    golden = load_golden(golden_path)
+    params = {name: getattr(args, name) for name in ('threshold', 'radius', 'height_min', 'height_max',
+                                                     'eps', 'min_samples') if getattr(args, name) is not None}
+    with tempfile.TemporaryDirectory() as work_dir:
+        output_json = os.path.join(work_dir, f"{case}_{args.producer}.json")
+        config = {
+            'input_file': os.path.abspath(input_file), 'producer': args.producer, 'params': params,
+            'output_json': output_json, 'min_line_length': args.min_line_length,
+            'tile_size': args.tile_size, 'tile_workers': args.tile_workers, 'max_memory': args.max_memory,
+        }
+        config_path = os.path.join(work_dir, 'config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+        log_path = os.path.join(work_dir, 'golden.log')
+        with open(log_path, 'w', encoding='utf-8') as log_file:
+            code, peak, wall = run_measured([sys.executable, os.path.abspath(__file__), '--child', config_path],
+                                            work_dir, log_file)
+        report = {'case': case, 'golden': golden_path, 'input_file': input_file, 'producer': args.producer,
+                  'exit_code': code, 'wall_s': round(wall, 2), 'peak_rss_mb': round(peak / 2**20, 1)}
+        if code != 0 or not os.path.exists(output_json):
+            with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+                print(f.read()[-2000:])
+            report['passed'] = False
+            return report
+        with open(output_json, 'r', encoding='utf-8') as f:
+            output = json.load(f)
+        with open(os.path.join(work_dir, 'timing.json'), 'r', encoding='utf-8') as f:
+            report['extract_s'] = round(json.load(f)['extract_s'], 2)
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            with open(os.path.join(args.output_dir, os.path.basename(output_json)), 'w', encoding='utf-8') as f:
+                json.dump(output, f, ensure_ascii=False, indent=2)
+
+    report['accuracy'] = compare_results(output, golden, args.endpoint_tolerance, args.curve_tolerance,
+                                         args.pair_radius, args.count_tolerance)
+    return report
+
+
+def print_case(report):
+    accuracy = report.get('accuracy')
+    if accuracy is None:
+        print(f"\n[{report['case']}] 运行失败（退出码 {report['exit_code']}）")
+        return
+    print(f"\n[{report['case']}] {report['producer']}: 线数 {accuracy['line_count']}/{accuracy['golden_line_count']}，"
+          f"配对 {accuracy['paired']}，超差 {accuracy['mismatched']}，多出 {accuracy['extra']}，缺失 {accuracy['missing']}；"
+          f"提取 {report['extract_s']:.1f} 秒，峰值 {report['peak_rss_mb']:.0f} MB")
+    print(f"{'输出':>6}{'参考':>6}{'端点偏差':>10}{'曲线偏差':>10}{'a相对差':>9}{'点数':>8}{'参考点数':>9}  状态")
+    for row in accuracy['lines']:
+        if row['status'] == 'ok' and not report['verbose']:
+            continue
+        fmt = lambda v, p='{:.3f}': '-' if v is None else p.format(v)
+        print(f"{fmt(row['output_id'], '{:d}'):>6}{fmt(row['golden_id'], '{:d}'):>6}"
+              f"{fmt(row.get('endpoint_deviation')):>10}{fmt(row.get('catenary_deviation')):>10}"
+              f"{fmt(row.get('a_relative_diff')):>9}{fmt(row.get('point_count'), '{:d}'):>8}"
+              f"{fmt(row.get('golden_point_count'), '{:d}'):>9}  {row['status']}")
+    performance = report['performance']
+    if performance['status'] == 'no_baseline':
+        print("性能: 本机没有基线（使用 --update_baseline 记录）")
+    else:
+        base = performance['baseline']
+        print(f"性能: 提取 {report['extract_s']:.1f} 秒（基线 {base['extract_s']:.1f}，"
+              f"{performance.get('extract_s_change', 0):+.1%}），峰值 {report['peak_rss_mb']:.0f} MB"
+              f"（基线 {base['peak_rss_mb']:.0f}，{performance.get('peak_rss_mb_change', 0):+.1%}） -> "
+              f"{'通过' if performance['passed'] else '回归'}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='参考结果回归与性能门禁')
+    parser.add_argument('--golden', nargs='+', default=None,
+                        help='参考JSON文件 (默认: Assets/PyPLineExtractor 下所有 Generator 格式的JSON)')
+    parser.add_argument('--data_dir', default=None, help='参考输入LAS所在目录，按参考JSON中的文件名查找')
+    parser.add_argument('--input', nargs='*', default=[], metavar='名称=路径',
+                        help='逐个指定参考输入，名称为参考JSON的文件名（不含扩展名）')
+    parser.add_argument('--producer', choices=PRODUCERS, default='extract',
+                        help='重新处理所用的实现：generator（原提取器）或 Extractor4 的后端 (默认: extract)')
+    parser.add_argument('--report', default='golden_report.json', help='差异报告输出路径 (默认: golden_report.json)')
+    parser.add_argument('--output_dir', default=None, help='保留每次运行输出的JSON的目录（可选）')
+    parser.add_argument('--verbose', action='store_true', help='差异表中也列出通过的线')
+    # 容差
+    parser.add_argument('--endpoint_tolerance', type=float, default=0.5, help='端点偏差容差（米） (默认: 0.5)')
+    parser.add_argument('--curve_tolerance', type=float, default=0.3, help='悬链线曲线偏差容差（米） (默认: 0.3)')
+    parser.add_argument('--pair_radius', type=float, default=20.0,
+                        help='端点偏差超过该值的线不配对，记为多出/缺失 (默认: 20)')
+    parser.add_argument('--count_tolerance', type=int, default=0, help='允许的线数差和未配对线数 (默认: 0)')
+    # 性能门禁
+    parser.add_argument('--baselines', default=DEFAULT_BASELINES, help='性能基线文件 (默认: golden_baselines.json)')
+    parser.add_argument('--max_regression', type=float, default=0.2,
+                        help='耗时或内存峰值超过基线的比例上限 (默认: 0.2)')
+    parser.add_argument('--update_baseline', action='store_true', help='精度通过后把本次耗时和内存写为本机基线')
+    # 提取参数（默认与参考结果的生成参数一致）
+    parser.add_argument('--threshold', type=float, default=None, help='线特征阈值 (默认: 提取器默认值)')
+    parser.add_argument('--radius', type=float, default=None, help='邻域搜索半径 (默认: 提取器默认值)')
+    parser.add_argument('--height_min', type=float, default=None, help='最小高程 (默认: 提取器默认值)')
+    parser.add_argument('--height_max', type=float, default=None, help='最大高程 (默认: 提取器默认值)')
+    parser.add_argument('--eps', type=float, default=None, help='DBSCAN邻域半径 (默认: 提取器默认值)')
+    parser.add_argument('--min_samples', type=int, default=None, help='DBSCAN最小样本数 (默认: 提取器默认值)')
+    parser.add_argument('--min_line_length', type=float, default=GENERATE_KWARGS['min_line_length'],
+                        help='最小长度阈值 (默认: 200.0)')
+    parser.add_argument('--tile_size', type=float, default=500.0, help='tiled 后端的分块边长（米） (默认: 500)')
+    parser.add_argument('--tile_workers', type=int, default=1, help='tiled 后端的进程数 (默认: 1)')
+    parser.add_argument('--max-memory', dest='max_memory', default='2G', help='bounded 后端的内存上限 (默认: 2G)')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args.child)
+        sys.exit(0)
+
+    sys.path.insert(0, SCRIPT_DIR)
+    overrides = dict(item.split('=', 1) for item in args.input)
+    golden_paths = args.golden or sorted(glob.glob(os.path.join(GENERATOR_DIR, '*.json')))
+
+    baselines = load_baselines(args.baselines)
+    host = host_key()
+    host_baselines = baselines.setdefault(host, {})
+    reports = []
+    for golden_path in golden_paths:
+        golden = load_golden(golden_path)
+        if golden is None:
+            continue
+        case = os.path.splitext(os.path.basename(golden_path))[0]
+        input_file = resolve_input(case, golden, args.data_dir, overrides)
+        if input_file is None:
+            print(f"\n[{case}] 跳过：找不到参考输入 {golden.get('file_path')}（使用 --data_dir 或 --input {case}=路径）")
+            reports.append({'case': case, 'golden': golden_path, 'skipped': True, 'passed': True})
+            continue
+
+        report = run_case(args, case, golden_path, input_file)
+        if 'accuracy' in report:
+            key = f"{case}/{args.producer}"
+            report['performance'] = check_performance(report, host_baselines.get(key), args.max_regression)
+            report['passed'] = report['accuracy']['passed'] and report['performance']['passed']
+            if args.update_baseline and report['accuracy']['passed']:
+                host_baselines[key] = {'extract_s': report['extract_s'], 'peak_rss_mb': report['peak_rss_mb'],
+                                       'created': time.strftime('%Y-%m-%d %H:%M:%S')}
+        report['verbose'] = args.verbose
+        print_case(report)
+        del report['verbose']
+        reports.append(report)
+
+    if args.update_baseline:
+        with open(args.baselines, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已写入: {args.baselines}")
+
+    checked = [r for r in reports if not r.get('skipped')]
+    passed = all(r['passed'] for r in reports)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump({'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'host': host, 'producer': args.producer,
+                   'passed': passed, 'checked': len(checked), 'cases': reports}, f, ensure_ascii=False, indent=2)
+    print(f"\n差异报告已写入: {args.report}")
+    if not checked:
+        print("没有可检查的参考文件")
+        sys.exit(1)
+    print(f"{len(checked)} 个参考文件，{'全部通过' if passed else '存在未通过项'}")
+    sys.exit(0 if passed else 1)
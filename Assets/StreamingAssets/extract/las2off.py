@@ -1,20 +1,39 @@
 ﻿#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-LAS点云文件转换为OFF格式的Python脚本
-简化版本 - 直接运行即可
+LAS/LAZ点云文件转换为OFF格式的Python脚本（LAZ需要 lazrs，使用其多线程后端并行解压）
+
+按块流式转换，内存占用与点数无关：
+- 逐块读取（laspy 的 chunk_iterator；输入旁有有效的旁路缓存时按块内存映射还原坐标）；
+- 每块用一次 % 格式化生成整块文本，与逐点 f"{v:.6f}" 的输出逐字节相同；
+- 以大缓冲区写出，结束时报告吞吐量（点/秒）；
+- --binary 输出 Geomview 的二进制OFF（"OFF BINARY"：大端 int32 计数 + 大端 float32 坐标），
+  供 LasToOffConverter.cs 不经文本解析直接读取。float32 在约 3e6 米的绝对坐标上只有 0.25 米的分辨率，
+  因此坐标写为相对原点（XY最小值向下取整到米，Z为0，同 las_io.local_frame）的值，
+  原点记录在文件头之后的一行注释 "# origin x y z" 中（在 Geomview 格式上的扩展），读取时加回。
+
+使用方法:
+    python las2off.py                                  # 使用下方配置区域中的文件名
+    python las2off.py B线路1.las                        # 输出 B线路1.off
+    python las2off.py B线路1.laz -o out.off --precision 3 --chunk_size 2000000
+    python las2off.py B线路1.las --binary              # 二进制OFF
 """
 
+import argparse
 import os
 import sys
+import time
 import numpy as np
 
 # =============================================================================
-# 配置区域 - 修改这里的文件名
+# 配置区域 - 未给出命令行参数时使用这里的文件名
 # =============================================================================
-INPUT_FILE = "B线路1.las"      # 输入LAS文件名
+INPUT_FILE = "B线路1.las"      # 输入LAS/LAZ文件名
 OUTPUT_FILE = "B线路1.off"     # 输出OFF文件名
 PRECISION = 6                 # 坐标精度（小数位数）
+USE_SIDECAR = True            # 输入文件旁有有效的旁路缓存（point_sidecar 生成的 .sidecar 目录）时直接内存映射
+CHUNK_SIZE = 1000000          # 每块点数
+WRITE_BUFFER = 16 * 1024 * 1024  # 写出缓冲区字节数
 # =============================================================================
 
 try:
@@ -24,61 +43,142 @@ except ImportError:
     print("请运行: pip install laspy")
     sys.exit(1)
 
+try:
+    import point_sidecar
+except ImportError:
+    point_sidecar = None
+
+
+def laz_backend():
+    """选择可用的LAZ后端，优先多线程的 lazrs；均不可用时返回 None"""
+    for backend in (laspy.LazBackend.LazrsParallel, laspy.LazBackend.Lazrs, laspy.LazBackend.Laszip):
+        if backend.is_available():
+            return backend
+    return None
+
+
+def open_source(input_file, chunk_size, use_sidecar=True):
+    """
+    打开输入点云，返回 (点数, 坐标最小值, 坐标最大值, 按块产生绝对坐标 (n, 3) float64 的迭代器)
+    """
+    sidecar = point_sidecar.open_sidecar(input_file) if use_sidecar and point_sidecar is not None else None
+    if sidecar is not None:
+        print(f"正在读取旁路缓存: {sidecar.directory}")
+        chunks = (sidecar.absolute_xyz(start, start + chunk_size) for start in range(0, len(sidecar), chunk_size))
+        return len(sidecar), sidecar.mins, sidecar.maxs, chunks
+
+    kwargs = {}
+    if input_file.lower().endswith('.laz'):
+        backend = laz_backend()
+        if backend is None:
+            print("错误: 读取LAZ文件需要LAZ后端")
+            print("请运行: pip install lazrs")
+            sys.exit(1)
+        kwargs['laz_backend'] = backend
+    reader = laspy.open(input_file, **kwargs)
+
+    def chunks():
+        with reader:
+            for chunk in reader.chunk_iterator(chunk_size):
+                yield np.column_stack([np.asarray(chunk.x, dtype=np.float64),
+                                       np.asarray(chunk.y, dtype=np.float64),
+                                       np.asarray(chunk.z, dtype=np.float64)])
+
+    header = reader.header
+    return header.point_count, np.asarray(header.mins), np.asarray(header.maxs), chunks()
+
 
-def convert_las_to_off():
-    """将LAS文件转换为OFF格式"""
+def format_chunk(points, precision):
+    """
+    将一块点格式化为OFF顶点文本：一次 % 运算生成整块，与逐点 f"{v:.{precision}f}" 逐字节相同
+    """
+    line = f"%.{precision}f %.{precision}f %.{precision}f\n"
+    return ((line * len(points)) % tuple(points.ravel().tolist())).encode('ascii')
+
+
+def convert_las_to_off(input_file, output_file, precision=PRECISION, binary=False, chunk_size=CHUNK_SIZE,
+                       use_sidecar=USE_SIDECAR):
+    """
+    将LAS/LAZ文件按块转换为OFF格式
+
+    :param input_file: 输入LAS/LAZ文件路径
+    :param output_file: 输出OFF文件路径
+    :param precision: 文本OFF的坐标小数位数
+    :param binary: 是否输出二进制OFF（相对原点的float32坐标，忽略 precision）
+    :param chunk_size: 每块点数
+    :param use_sidecar: 有有效的旁路缓存时是否经由旁路缓存读取
+    :return: 吞吐量（点/秒）
+    """
     print("=== LAS点云文件转OFF格式转换工具 ===")
-    print(f"输入文件: {INPUT_FILE}")
-    print(f"输出文件: {OUTPUT_FILE}")
-    
+    print(f"输入文件: {input_file}")
+    print(f"输出文件: {output_file}{'（二进制）' if binary else ''}")
+
     # 检查输入文件
-    if not os.path.exists(INPUT_FILE):
-        print(f"错误: 输入文件不存在: {INPUT_FILE}")
-        print("请将LAS文件放在脚本同一目录下")
+    if not os.path.exists(input_file):
+        print(f"错误: 输入文件不存在: {input_file}")
         sys.exit(1)
-    
+
+    start_time = time.perf_counter()
     try:
-        # 读取LAS文件
-        print("正在读取LAS文件...")
-        las = laspy.read(INPUT_FILE)
-        
-        # 提取坐标 (保持原始精度)
-        x = np.array(las.x, dtype=np.float64)
-        y = np.array(las.y, dtype=np.float64) 
-        z = np.array(las.z, dtype=np.float64)
-        
-        points = np.column_stack([x, y, z])
-        
-        print(f"成功读取LAS文件: {len(points)} 个点")
-        print(f"坐标范围: X[{x.min():.6f}, {x.max():.6f}], "
-              f"Y[{y.min():.6f}, {y.max():.6f}], "
-              f"Z[{z.min():.6f}, {z.max():.6f}]")
-        
-        # 写入OFF文件
+        point_count, mins, maxs, chunks = open_source(input_file, chunk_size, use_sidecar)
+        print(f"成功打开LAS文件: {point_count} 个点")
+        print(f"坐标范围: X[{mins[0]:.6f}, {maxs[0]:.6f}], "
+              f"Y[{mins[1]:.6f}, {maxs[1]:.6f}], "
+              f"Z[{mins[2]:.6f}, {maxs[2]:.6f}]")
+
+        # 点数由文件头给出，先写OFF文件头，再逐块写出顶点
         print("正在写入OFF文件...")
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            # 写入OFF文件头
-            f.write("OFF\n")
-            f.write(f"{len(points)} 0 0\n")
-            
-            # 写入顶点坐标
-            for i, point in enumerate(points):
-                f.write(f"{point[0]:.{PRECISION}f} "
-                       f"{point[1]:.{PRECISION}f} "
-                       f"{point[2]:.{PRECISION}f}\n")
-                
-                # 显示进度
-                if (i + 1) % 10000 == 0:
-                    print(f"已写入 {i + 1}/{len(points)} 个顶点")
-        
+        written = 0
+        with open(output_file, 'wb', buffering=WRITE_BUFFER) as f:
+            if binary:
+                origin = np.array([np.floor(mins[0]), np.floor(mins[1]), 0.0])
+                f.write(b"OFF BINARY\n")
+                f.write(f"# origin {origin[0]:.6f} {origin[1]:.6f} {origin[2]:.6f}\n".encode('ascii'))
+                f.write(np.array([point_count, 0, 0], dtype='>i4').tobytes())
+            else:
+                f.write(f"OFF\n{point_count} 0 0\n".encode('ascii'))
+
+            for points in chunks:
+                if binary:
+                    f.write((points - origin).astype('>f4').tobytes())
+                else:
+                    f.write(format_chunk(points, precision))
+                written += len(points)
+                elapsed = time.perf_counter() - start_time
+                print(f"已写入 {written}/{point_count} 个顶点 ({written / max(elapsed, 1e-9):,.0f} 点/秒)")
+
+        if written != point_count:
+            raise ValueError(f"读取的点数 {written} 与文件头中的点数 {point_count} 不一致")
+
+        elapsed = time.perf_counter() - start_time
+        throughput = written / max(elapsed, 1e-9)
         print(f"[成功] 转换完成！")
-        print(f"输出文件: {OUTPUT_FILE}")
-        print(f"文件大小: {os.path.getsize(OUTPUT_FILE) / (1024*1024):.2f} MB")
-        
+        print(f"输出文件: {output_file}")
+        print(f"文件大小: {os.path.getsize(output_file) / (1024*1024):.2f} MB")
+        print(f"耗时: {elapsed:.2f} 秒，吞吐量: {throughput:,.0f} 点/秒")
+        return throughput
+
     except Exception as e:
         print(f"[错误] 转换失败: {e}")
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    convert_las_to_off() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='LAS/LAZ点云文件按块转换为OFF格式')
+    parser.add_argument('input_file', nargs='?', default=None, help=f'输入LAS/LAZ文件 (默认: {INPUT_FILE})')
+    parser.add_argument('-o', '--output', default=None,
+                        help=f'输出OFF文件 (默认: 与输入同名的 .off；未给出输入时为 {OUTPUT_FILE})')
+    parser.add_argument('--precision', type=int, default=PRECISION, help=f'坐标小数位数 (默认: {PRECISION})')
+    parser.add_argument('--binary', action='store_true',
+                        help='输出二进制OFF（OFF BINARY，相对原点的大端float32坐标），供Unity直接读取')
+    parser.add_argument('--chunk_size', type=int, default=CHUNK_SIZE, help=f'每块点数 (默认: {CHUNK_SIZE})')
+    parser.add_argument('--no_sidecar', action='store_true', help='不使用旁路缓存，直接读取LAS/LAZ')
+    args = parser.parse_args()
+
+    if args.input_file is None:
+        input_file, output_file = INPUT_FILE, args.output or OUTPUT_FILE
+    else:
+        input_file = args.input_file
+        output_file = args.output or os.path.splitext(input_file)[0] + '.off'
+    convert_las_to_off(input_file, output_file, precision=args.precision, binary=args.binary,
+                       chunk_size=args.chunk_size, use_sidecar=USE_SIDECAR and not args.no_sidecar)
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+LAS/LAZ 统一读写 - las_io.py
+
+各模块原先直接调用 laspy.read / laspy.open / LasData.write，只能可靠处理未压缩的LAS。
+本模块集中选择LAZ后端并按扩展名决定是否压缩：
+- 读取LAZ时优先使用 lazrs 的多线程后端（LazrsParallel），按块并行解压，
+  线程数由 rayon 决定，可用环境变量 RAYON_NUM_THREADS 限制；
+  不可用时依次退回单线程 lazrs 和 laszip；均未安装时给出安装提示；
+- 写出时路径以 .laz 结尾则压缩（同样优先多线程后端），否则写出普通LAS；
+- powerline_las_name 统一提取结果文件名，compress=True 时输出 .laz；
+- LoadedCloud 是只读取一次、由多个处理阶段共享的点云（worker 中电力线提取与地形提取共用）。
+
+未压缩的LAS不经过LAZ后端，行为与原先一致。读取吞吐量的比较见 bench_laz.py。
+"""
+
+import os
+
+import numpy as np
+
+DEFAULT_SCALE = 0.001
+
+LAS_EXTENSIONS = ('.las', '.laz')
+
+
+def is_laz(file_path):
+    """
+    按扩展名判断是否为LAZ文件
+
+    :param file_path: 文件路径
+    :return: 是否为LAZ
+    """
+    return os.fspath(file_path).lower().endswith('.laz')
+
+
+def laz_backend():
+    """
+    选择可用的LAZ后端，优先多线程的 lazrs
+
+    :return: laspy.LazBackend，均不可用时返回 None
+    """
+    import laspy
+
+    for backend in (laspy.LazBackend.LazrsParallel, laspy.LazBackend.Lazrs, laspy.LazBackend.Laszip):
+        if backend.is_available():
+            return backend
+    return None
+
+
+def _require_backend(file_path):
+    backend = laz_backend()
+    if backend is None:
+        raise RuntimeError(f"处理LAZ文件 {file_path} 需要LAZ后端，请安装: pip install lazrs")
+    return backend
+
+
+def open_las(file_path, mode='r', **kwargs):
+    """
+    打开LAS/LAZ文件（laspy.open），LAZ使用 laz_backend 选择的后端
+
+    :param file_path: 文件路径
+    :param mode: 'r' 读取，'w' 写出（写出时按扩展名决定是否压缩）
+    :param kwargs: 传给 laspy.open 的其他参数（如写出时的 header）
+    :return: laspy 的 LasReader / LasWriter
+    """
+    import laspy
+
+    if is_laz(file_path):
+        kwargs.setdefault('laz_backend', _require_backend(file_path))
+        if mode == 'w':
+            kwargs.setdefault('do_compress', True)
+    elif mode == 'w':
+        kwargs.setdefault('do_compress', False)
+    return laspy.open(file_path, mode=mode, **kwargs)
+
+
+def read_las(file_path):
+    """
+    读取完整的LAS/LAZ文件（laspy.read），LAZ使用 laz_backend 选择的后端
+
+    :param file_path: 文件路径
+    :return: laspy.LasData
+    """
+    import laspy
+
+    if is_laz(file_path):
+        return laspy.read(file_path, laz_backend=_require_backend(file_path))
+    return laspy.read(file_path)
+
+
+def write_las(las_data, file_path):
+    """
+    写出LasData，路径以 .laz 结尾时压缩
+
+    :param las_data: laspy.LasData
+    :param file_path: 输出路径
+    """
+    if is_laz(file_path):
+        las_data.write(file_path, do_compress=True, laz_backend=_require_backend(file_path))
+    else:
+        las_data.write(file_path, do_compress=False)
+
+
+def local_frame(header, coord_dtype='float32'):
+    """
+    根据文件头确定局部坐标系：原点为XY最小值向下取整到米（Z为0），
+    并检查float32在该范围内的分辨率是否不低于LAS坐标精度，不满足时退回float64
+
+    :param header: 提供 mins/maxs/scales 的文件头（laspy.LasHeader 或 LoadedCloud）
+    :param coord_dtype: 期望的存储类型 'float32' 或 'float64'
+    :return: (原点 (3,), 坐标存储类型)
+    """
+    origin = np.array([np.floor(header.mins[0]), np.floor(header.mins[1]), 0.0])
+    if coord_dtype == 'float64':
+        return origin, np.float64
+
+    # float32 的舍入误差为半个ulp，ulp 不超过LAS比例因子时误差不超过半个LAS刻度
+    extent = np.max(np.abs(np.vstack([header.mins, header.maxs]) - origin))
+    ulp = float(np.spacing(np.float32(extent)))
+    if ulp > float(np.min(header.scales)):
+        print(f"坐标范围 {extent:.1f} 米内float32分辨率 {ulp:.2e} 米低于LAS精度 "
+              f"{np.min(header.scales)}，改用float64")
+        return origin, np.float64
+    return origin, np.float32
+
+
+def powerline_las_name(input_file, compress=False):
+    """
+    提取结果点云的文件名（写到当前目录）
+
+    :param input_file: 输入点云文件路径
+    :param compress: 是否输出压缩的LAZ
+    :return: '<输入文件名>_extracted_powerlines.las' 或 '.laz'
+    """
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    return f"{base_name}_extracted_powerlines{'.laz' if compress else '.las'}"
+
+
+class LoadedCloud:
+    """
+    读取一次、由多个处理阶段共享的点云：绝对坐标 (N, 3) float64 数组（也可以是memmap），
+    以及可选的原始点记录视图（laspy 的 PointRecord）和文件头。
+
+    只给出 file_path 时在第一次访问 xyz 时读取文件（read_las；给出 loader 时调用 loader），
+    各阶段拿到的都是同一份数组的视图；直接给出 xyz 时不读取文件，
+    没有文件头时按坐标计算范围、比例因子取 DEFAULT_SCALE。
+    """
+
+    def __init__(self, file_path, xyz=None, records=None, header=None, loader=None):
+        """
+        :param file_path: 点云对应的输入文件路径（用于匹配各阶段的输入）
+        :param xyz: 已读取的绝对坐标 (N, 3)，None表示首次访问时读取文件
+        :param records: 原始点记录视图（可选），与 xyz 逐点对应
+        :param header: laspy.LasHeader（可选）
+        :param loader: 代替 read_las 的读取函数 loader(file_path) -> (xyz, 点记录或None, 文件头或None)
+        """
+        self.file_path = os.path.abspath(file_path)
+        self._xyz = xyz
+        self.records = records
+        self.header = header
+        self._loader = loader
+
+    @classmethod
+    def from_las_data(cls, file_path, las_data):
+        """
+        由已读取的 LasData 构造：坐标解码一次，点记录与文件头直接引用
+        """
+        return cls(file_path, xyz=las_data.xyz, records=las_data.points, header=las_data.header)
+
+    @property
+    def loaded(self):
+        return self._xyz is not None
+
+    def load(self):
+        """
+        读取文件（已读取时直接返回）
+
+        :return: self
+        """
+        if self._xyz is None and self._loader is not None:
+            self._xyz, self.records, self.header = self._loader(self.file_path)
+        elif self._xyz is None:
+            las_data = read_las(self.file_path)
+            self._xyz = las_data.xyz
+            self.records = las_data.points
+            self.header = las_data.header
+        return self
+
+    @property
+    def xyz(self):
+        return self.load()._xyz
+
+    def __len__(self):
+        return len(self.xyz)
+
+    def matches(self, file_path):
+        """
+        是否为该输入文件的点云
+        """
+        return os.path.abspath(file_path) == self.file_path
+
+    def local_view(self, origin, dtype):
+        """
+        已按该局部坐标系（原点与存储类型）换算好的坐标 (N, 3)，无需复制即可使用；没有时返回None，
+        由调用方从 xyz 换算
+
+        :param origin: 局部坐标原点 (3,)
+        :param dtype: 坐标存储类型
+        """
+        return None
+
+    def field(self, name):
+        """
+        附加字段 name 的逐点数组（取自原始点记录）
+        """
+        return np.asarray(self.records[name])
+
+    @property
+    def mins(self):
+        return np.asarray(self.header.mins) if self.header is not None else self.xyz.min(axis=0)
+
+    @property
+    def maxs(self):
+        return np.asarray(self.header.maxs) if self.header is not None else self.xyz.max(axis=0)
+
+    @property
+    def scales(self):
+        return np.asarray(self.header.scales) if self.header is not None else np.full(3, DEFAULT_SCALE)
+
+    @property
+    def offsets(self):
+        return np.asarray(self.header.offsets) if self.header is not None else np.floor(self.mins)
+
+    def subset(self, indices):
+        """
+        按序号取出部分点，返回 laspy.LasData；有原始点记录时保留全部字段，否则只写坐标
+
+        :param indices: 点序号数组
+        """
+        import laspy
+
+        if self.records is not None:
+            las_data = laspy.LasData(self.header)
+            las_data.points = self.records[indices]
+            return las_data
+        points = self.xyz[indices]
+        header = laspy.LasHeader(point_format=0, version="1.2")
+        header.offsets = self.offsets
+        header.scales = self.scales
+        las_data = laspy.LasData(header, points=laspy.ScaleAwarePointRecord.zeros(len(points), header=header))
+        las_data.xyz = points
+        return las_data
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+延迟导入 - lazy_imports.py
+
+open3d、matplotlib、cv2 等重量级依赖的导入耗时可达数秒，而无界面流程（worker.py、
+Unity 的环境检查）往往只用到其中一小部分。lazy_module() 返回一个模块代理，
+直到第一次访问其属性时才真正导入。
+"""
+
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    首次访问属性时才导入的模块代理
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._lazy_name = name
+        self._lazy_module = None
+
+    def _load(self):
+        if self._lazy_module is None:
+            self._lazy_module = importlib.import_module(self._lazy_name)
+        return self._lazy_module
+
+    def __getattr__(self, attr):
+        # 只有在代理自身没有该属性时才会调用，此时加载真实模块
+        if attr.startswith('_lazy_'):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self._lazy_module is not None else 'not loaded'
+        return f"<lazy module '{self._lazy_name}' ({state})>"
+
+
+def lazy_module(name):
+    """
+    返回模块 name 的延迟导入代理；若模块已被导入则直接返回该模块。
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+# 提取核心按需导入的重量级模块；常驻进程（服务、批处理工作进程）在启动时预先导入
+CORE_HEAVY_MODULES = ('open3d', 'sklearn.cluster', 'sklearn.decomposition', 'scipy.spatial',
+                      'scipy.signal', 'scipy.optimize', 'scipy.ndimage')
+
+
+def preload(names=CORE_HEAVY_MODULES):
+    """
+    立即导入给定模块，供常驻进程预热。
+    """
+    for name in names:
+        importlib.import_module(name)
+
+
+def is_loaded(name):
+    """
+    模块是否已被真正导入。
+    """
+    return name in sys.modules
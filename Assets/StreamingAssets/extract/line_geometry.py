@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+紧凑二进制电力线几何容器 - line_geometry.py
+
+提取结果原先以文本/逐点格式交给Unity：电力线点云为带RGB的LAS（点格式2，每点26字节），
+首尾端点为 indent=2 的JSON，Generator 的拟合参数也是缩进的JSON（A_result.json 约8千行）。
+本模块定义一个小端二进制容器（扩展名 .plg），Unity 端按固定偏移直接读取（见
+Scripts/PointCloud/PowerlineGeometryReader.cs），Python 端用 numpy 零拷贝读取：
+
+    文件头 HEADER_DTYPE（88字节）  魔数 'PLGB'、版本、线/拟合/点的数量、坐标原点 (float64×3)、
+                                   各数据段的字节偏移
+    线表   LINE_DTYPE × 线数      id、原始点数、点块偏移与点数、拟合记录范围、RGB颜色、首尾端点 (float64×3)
+    拟合表 FIT_DTYPE × 拟合数      所属线、方法编码（FIT_METHODS）、是否成功、参数 (float64×4)、rmse、r²
+    点块   float32 × 3 × 点数     各线的点依次连续存放，坐标相对文件头中的原点，按16字节对齐
+    附加   UTF-8 紧凑JSON          其他少量信息（源文件路径、拟合方法、电力塔等），可为空
+
+拟合只保存参数与拟合质量：公式文本、顶点和极值可由参数推出，不再重复存储。
+
+使用方法:
+    python line_geometry.py convert ../../PyPLineExtractor/A_result.json            # Generator JSON -> .plg
+    python line_geometry.py info A_result.plg
+    python line_geometry.py compare --binary A_result.plg --json ../../PyPLineExtractor/A_result.json
+    python line_geometry.py compare --binary x_powerlines.plg --json x_powerline_endpoints.json \\
+        --las x_extracted_powerlines.las --repeat 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+MAGIC = b'PLGB'
+FORMAT_VERSION = 1
+POINT_ALIGNMENT = 16
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'), ('version', '<u2'), ('header_size', '<u2'),
+    ('line_count', '<u4'), ('fit_count', '<u4'), ('point_count', '<u8'),
+    ('origin', '<f8', (3,)),
+    ('lines_offset', '<u8'), ('fits_offset', '<u8'), ('points_offset', '<u8'),
+    ('extras_offset', '<u8'), ('extras_length', '<u8'),
+])
+
+LINE_DTYPE = np.dtype([
+    ('id', '<i4'), ('point_count', '<u4'),
+    ('point_offset', '<u8'), ('stored_points', '<u4'),
+    ('fit_first', '<u4'), ('fit_count', '<u4'),
+    ('color', 'u1', (3,)), ('reserved', 'u1'),
+    ('endpoint1', '<f8', (3,)), ('endpoint2', '<f8', (3,)),
+])
+
+FIT_DTYPE = np.dtype([
+    ('method', 'u1'), ('success', 'u1'), ('param_count', 'u1'), ('reserved', 'u1'), ('line_index', '<u4'),
+    ('params', '<f8', (4,)), ('rmse', '<f8'), ('r_squared', '<f8'),
+])
+
+# 方法编码从1开始（0保留）；每种方法的参数顺序与 Generator 输出的 parameters 一致
+FIT_METHODS = ('catenary', 'parabola', 'polynomial_3', 'linear')
+FIT_PARAMS = {
+    'catenary': ('a', 'h', 'v'),
+    'parabola': ('a', 'b', 'c'),
+    'linear': ('slope', 'intercept'),
+}
+
+
+def line_geometry_name(input_file):
+    """
+    提取结果几何容器的文件名（写到当前目录）：'<输入文件名>_powerlines.plg'
+    """
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    return f"{base_name}_powerlines.plg"
+
+
+def _align(offset, alignment=8):
+    return -(-offset // alignment) * alignment
+
+
+def _fit_record(line_index, name, fit):
+    record = np.zeros(1, dtype=FIT_DTYPE)[0]
+    record['method'] = FIT_METHODS.index(name) + 1
+    record['line_index'] = line_index
+    record['success'] = bool(fit.get('success'))
+    parameters = fit.get('parameters') or {}
+    if name == 'polynomial_3':
+        values = list(parameters.get('coefficients', []))
+    else:
+        values = [parameters[key] for key in FIT_PARAMS[name] if key in parameters]
+    record['param_count'] = len(values)
+    record['params'][:len(values)] = values
+    quality = fit.get('fit_quality') or {}
+    record['rmse'] = quality.get('rmse', np.nan)
+    record['r_squared'] = quality.get('r_squared', np.nan)
+    return record
+
+
+def write_line_geometry(path, lines, endpoints=None, ids=None, point_counts=None, colors=None, fits=None,
+                        origin=None, extras=None):
+    """
+    写出二进制几何容器
+
+    :param path: 输出路径
+    :param lines: 每条线的点数组 (Ni, 3) 列表；为None时不写点块（如由拟合JSON转换）
+    :param endpoints: 每条线的 (首端点, 尾端点)，None表示取各线第一个和最后一个点
+    :param ids: 每条线的id，None表示 0..L-1
+    :param point_counts: 每条线的原始点数，None表示与写入的点数相同
+    :param colors: 每条线的RGB颜色 (L, 3)，取值0-1，None表示不记录（全0）
+    :param fits: 每条线的拟合结果 {方法名: Generator 的拟合字典}，None表示无拟合
+    :param origin: 点块坐标原点 (3,)，None表示取全部点最小值向下取整
+    :param extras: 写入附加JSON段的字典（可选）
+    :return: 写出的字节数
+    """
+    count = len(lines) if lines is not None else len(endpoints)
+    stored = [np.asarray(p, dtype=np.float64).reshape(-1, 3) for p in lines] if lines is not None else \
+        [np.zeros((0, 3))] * count
+    stored_counts = np.array([len(p) for p in stored], dtype=np.int64)
+    all_points = np.vstack(stored) if stored_counts.sum() else np.zeros((0, 3))
+    if origin is None:
+        origin = np.floor(all_points.min(axis=0)) if len(all_points) else np.zeros(3)
+    origin = np.asarray(origin, dtype=np.float64)
+
+    line_table = np.zeros(count, dtype=LINE_DTYPE)
+    line_table['id'] = np.arange(count) if ids is None else ids
+    line_table['stored_points'] = stored_counts
+    line_table['point_count'] = stored_counts if point_counts is None else point_counts
+    line_table['point_offset'] = np.concatenate(([0], np.cumsum(stored_counts)[:-1])) if count else []
+    if colors is not None:
+        line_table['color'] = np.clip(np.rint(np.asarray(colors, dtype=np.float64) * 255), 0, 255)
+    for i in range(count):
+        if endpoints is not None:
+            line_table['endpoint1'][i], line_table['endpoint2'][i] = endpoints[i]
+        elif len(stored[i]):
+            line_table['endpoint1'][i], line_table['endpoint2'][i] = stored[i][0], stored[i][-1]
+
+    fit_records = []
+    for i in range(count):
+        line_fits = (fits[i] or {}) if fits is not None else {}
+        line_table['fit_first'][i] = len(fit_records)
+        for name, fit in line_fits.items():
+            if name in FIT_METHODS:
+                fit_records.append(_fit_record(i, name, fit))
+        line_table['fit_count'][i] = len(fit_records) - line_table['fit_first'][i]
+    fit_table = np.array(fit_records, dtype=FIT_DTYPE)
+
+    extras_bytes = json.dumps(extras, ensure_ascii=False, separators=(',', ':')).encode('utf-8') if extras else b''
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'] = MAGIC
+    header['version'] = FORMAT_VERSION
+    header['header_size'] = HEADER_DTYPE.itemsize
+    header['line_count'] = count
+    header['fit_count'] = len(fit_table)
+    header['point_count'] = len(all_points)
+    header['origin'] = origin
+    header['lines_offset'] = lines_offset = _align(HEADER_DTYPE.itemsize)
+    header['fits_offset'] = fits_offset = _align(lines_offset + line_table.nbytes)
+    header['points_offset'] = points_offset = _align(fits_offset + fit_table.nbytes, POINT_ALIGNMENT)
+    header['extras_offset'] = extras_offset = points_offset + len(all_points) * 12
+    header['extras_length'] = len(extras_bytes)
+
+    points = (all_points - origin).astype('<f4')
+    with open(path, 'wb') as f:
+        for offset, data in ((0, header.tobytes()), (lines_offset, line_table.tobytes()),
+                             (fits_offset, fit_table.tobytes()), (points_offset, points.tobytes()),
+                             (extras_offset, extras_bytes)):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(data)
+        return f.tell()
+
+
+class LineGeometry:
+    """
+    读取后的几何容器：header（结构化标量）、lines（线表）、fits（拟合表）、points（相对原点的 float32 点块）
+    """
+
+    def __init__(self, header, lines, fits, points, extras):
+        self.header = header
+        self.lines = lines
+        self.fits = fits
+        self.points = points
+        self.extras = extras
+        self.origin = np.asarray(header['origin'], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def line_points(self, index, absolute=True):
+        """
+        第 index 条线的点；absolute=True 时加回原点得到 float64 坐标，否则返回 float32 视图
+        """
+        record = self.lines[index]
+        start = int(record['point_offset'])
+        block = self.points[start:start + int(record['stored_points'])]
+        return block + self.origin if absolute else block
+
+    def line_fits(self, index):
+        """
+        第 index 条线的拟合结果 {方法名: {'parameters', 'fit_quality', 'success'}}（参数名同 Generator）
+        """
+        record = self.lines[index]
+        result = {}
+        for fit in self.fits[int(record['fit_first']):int(record['fit_first']) + int(record['fit_count'])]:
+            name = FIT_METHODS[int(fit['method']) - 1]
+            values = [float(v) for v in fit['params'][:int(fit['param_count'])]]
+            if name == 'polynomial_3':
+                parameters = {'coefficients': values, 'degree': 3}
+            else:
+                parameters = dict(zip(FIT_PARAMS[name], values))
+            success = bool(fit['success'])
+            result[name] = {
+                'method': name,
+                'parameters': parameters if success else None,
+                'fit_quality': {'rmse': float(fit['rmse']), 'r_squared': float(fit['r_squared'])} if success else None,
+                'success': success,
+            }
+        return result
+
+
+def read_line_geometry(path, mmap=True):
+    """
+    读取二进制几何容器；mmap=True 时点块为内存映射，不整体读入
+
+    :param path: .plg 文件路径
+    :param mmap: 是否内存映射
+    :return: LineGeometry
+    """
+    data = np.memmap(path, dtype=np.uint8, mode='r') if mmap else np.fromfile(path, dtype=np.uint8)
+    header = data[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+    if bytes(header['magic']) != MAGIC:
+        raise ValueError(f"{path} 不是电力线几何容器（魔数不符）")
+    if int(header['version']) > FORMAT_VERSION:
+        raise ValueError(f"{path} 的格式版本 {int(header['version'])} 高于支持的版本 {FORMAT_VERSION}")
+
+    def section(offset, dtype, count):
+        offset = int(offset)
+        return data[offset:offset + dtype.itemsize * int(count)].view(dtype)
+
+    lines = section(header['lines_offset'], LINE_DTYPE, header['line_count'])
+    fits = section(header['fits_offset'], FIT_DTYPE, header['fit_count'])
+    points = section(header['points_offset'], np.dtype('<f4'), int(header['point_count']) * 3).reshape(-1, 3)
+    extras_offset, extras_length = int(header['extras_offset']), int(header['extras_length'])
+    extras = json.loads(bytes(data[extras_offset:extras_offset + extras_length]).decode('utf-8')) \
+        if extras_length else {}
+    return LineGeometry(header, lines, fits, points, extras)
+
+
+def from_generator_json(json_path, output_path=None):
+    """
+    把 Generator.dump 输出的拟合JSON转换为几何容器（JSON中没有线上的点，只写线表、拟合表和附加信息）
+
+    :param json_path: Generator 的结果JSON（如 A_result.json）
+    :param output_path: 输出路径，None表示同名 .plg
+    :return: 输出路径
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    records = data['power_lines']
+    endpoints = [([line['endpoint1'][k] for k in 'xyz'], [line['endpoint2'][k] for k in 'xyz']) for line in records]
+    output_path = output_path or os.path.splitext(json_path)[0] + '.plg'
+    write_line_geometry(output_path, None, endpoints=endpoints, ids=[line['id'] for line in records],
+                        point_counts=[line['point_count'] for line in records],
+                        fits=[line.get('fits') for line in records],
+                        extras={key: data[key] for key in ('file_path', 'fit_method', 'towers') if key in data})
+    return output_path
+
+
+def _best_time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare(binary_path, json_paths=(), las_path=None, repeat=5):
+    """
+    比较二进制容器与现有JSON/LAS输出的文件大小和解析时间（各取 repeat 次中的最短时间）
+
+    :return: [{'format', 'path', 'bytes', 'parse_s'}]
+    """
+    def parse_json(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def parse_las():
+        import las_io
+        las_data = las_io.read_las(las_path)
+        return las_data.xyz, las_data.red, las_data.green, las_data.blue
+
+    def parse_binary():
+        geometry = read_line_geometry(binary_path, mmap=False)
+        # 与JSON/LAS一样把全部内容转换为可用的数组和字典
+        return geometry.lines.copy(), geometry.fits.copy(), geometry.points + geometry.origin
+
+    rows = []
+    legacy_bytes = legacy_s = 0
+    for path in json_paths:
+        rows.append({'format': 'json', 'path': path, 'bytes': os.path.getsize(path),
+                     'parse_s': _best_time(lambda: parse_json(path), repeat)})
+    if las_path:
+        rows.append({'format': 'las', 'path': las_path, 'bytes': os.path.getsize(las_path),
+                     'parse_s': _best_time(parse_las, repeat)})
+    for row in rows:
+        legacy_bytes += row['bytes']
+        legacy_s += row['parse_s']
+    if rows:
+        rows.append({'format': 'json+las' if las_path else 'json', 'path': '(合计)', 'bytes': legacy_bytes,
+                     'parse_s': legacy_s})
+    rows.append({'format': 'plg', 'path': binary_path, 'bytes': os.path.getsize(binary_path),
+                 'parse_s': _best_time(parse_binary, repeat)})
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='电力线二进制几何容器：转换、查看与大小/解析时间比较')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_convert = sub.add_parser('convert', help='把 Generator 的拟合JSON转换为 .plg')
+    p_convert.add_argument('json_file', help='Generator 输出的结果JSON')
+    p_convert.add_argument('-o', '--output', default=None, help='输出路径 (默认: 同名 .plg)')
+    p_info = sub.add_parser('info', help='显示 .plg 的内容摘要')
+    p_info.add_argument('binary_file', help='.plg 文件')
+    p_compare = sub.add_parser('compare', help='与现有JSON/LAS输出比较文件大小和解析时间')
+    p_compare.add_argument('--binary', required=True, help='.plg 文件')
+    p_compare.add_argument('--json', nargs='*', default=[], help='对应的JSON输出（端点JSON或 Generator 结果JSON）')
+    p_compare.add_argument('--las', default=None, help='对应的电力线LAS输出（可选）')
+    p_compare.add_argument('--repeat', type=int, default=5, help='重复次数，取最短时间 (默认: 5)')
+    p_compare.add_argument('--output', default=None, help='比较结果JSON路径（可选）')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if args.command == 'convert':
+        output = from_generator_json(args.json_file, args.output)
+        print(f"已写出: {output}（{os.path.getsize(output)} 字节，JSON {os.path.getsize(args.json_file)} 字节）")
+    elif args.command == 'info':
+        geometry = read_line_geometry(args.binary_file)
+        print(f"{args.binary_file}: 版本 {int(geometry.header['version'])}，{len(geometry)} 条线，"
+              f"{int(geometry.header['fit_count'])} 个拟合，{len(geometry.points)} 个点，原点 {geometry.origin.tolist()}")
+        for i in range(min(len(geometry), 5)):
+            record = geometry.lines[i]
+            print(f"  线 {int(record['id'])}: {int(record['point_count'])} 点（存储 {int(record['stored_points'])}），"
+                  f"端点 {record['endpoint1'].tolist()} -> {record['endpoint2'].tolist()}，"
+                  f"拟合 {list(geometry.line_fits(i))}")
+        if geometry.extras:
+            print(f"  附加信息: {list(geometry.extras)}")
+    else:
+        rows = compare(args.binary, args.json, args.las, args.repeat)
+        print(f"{'格式':<10}{'大小(KB)':>12}{'解析(ms)':>12}  文件")
+        for row in rows:
+            print(f"{row['format']:<10}{row['bytes'] / 1024:>12.1f}{row['parse_s'] * 1000:>12.2f}  {row['path']}")
+        if len(rows) > 1:
+            legacy, binary = rows[-2], rows[-1]
+            print(f"二进制容器: 大小为原输出的 {binary['bytes'] / legacy['bytes']:.1%}，"
+                  f"解析快 {legacy['parse_s'] / binary['parse_s']:.1f} 倍")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+            print(f"结果已保存到: {args.output}")
@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+有界内存模式 - out_of_core.py
+
+laspy.read → np.column_stack → Vector3dVector → select_by_index 会同时持有多份完整点云，
+大文件容易耗尽内存。本模块提供按内存预算执行的各个步骤：
+- 分块读取 LAS（laspy chunk_iterator），只把高程带外的点写入磁盘暂存数组（np.memmap）；
+- 按走廊主方向的点数直方图切分空间块，每块（含重叠区）的点数由预算决定，
+  并把暂存点重排为按块连续存放；
+- 逐块计算线性度，插值、百分位阈值和线点选择按序号分段流式完成（百分位为精确值）；
+- 暂存数组只在使用时映射需要的窗口，用完即解除映射，避免文件页计入常驻内存。
+
+线点之后的阶段（DBSCAN、分离、合并）只处理线点，规模远小于输入，仍在内存中完成。
+"""
+
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+
+import las_io
+from perf_trace import current_rss_bytes
+from prefetch import Prefetcher, BackgroundWriter
+
+# 各阶段每个点的内存估计（字节）
+READ_BYTES_PER_POINT = 120      # laspy 原始记录 + 缩放后的 x/y/z + 掩码
+SCRATCH_BYTES_PER_POINT = 32    # 暂存窗口：xyz（按float64估计）+ 序号 int64
+BLOCK_BYTES_PER_POINT = 200     # 块计算：坐标副本、open3d点云、KD树、局部坐标与掩码
+# 预算中留给线点、采样值和解释器波动的比例
+BUDGET_SAFETY = 0.7
+# 走廊方向点数直方图的分箱宽度（米），决定块边界的精度
+PLAN_BIN_SIZE = 1.0
+# 线性度取值 (0.1, 1] 的直方图分箱数，用于流式精确百分位
+PERCENTILE_BINS = 4096
+
+
+def parse_memory_size(text):
+    """
+    解析内存大小：纯数字为MB，支持 K/M/G/T 后缀（如 '4096'、'512M'、'8G'），返回字节数
+    """
+    match = re.fullmatch(r'\s*([0-9]*\.?[0-9]+)\s*([KMGT]?)i?B?\s*', str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"无法解析内存大小: {text}")
+    value, unit = float(match.group(1)), match.group(2).upper() or 'M'
+    return int(value * 1024 ** 'KMGT'.index(unit) * 1024)
+
+
+class MemoryBudget:
+    """
+    内存预算：扣除进程当前占用后按比例分配给各阶段
+    """
+
+    def __init__(self, max_bytes, safety=BUDGET_SAFETY):
+        """
+        :param max_bytes: 进程常驻内存上限（字节）
+        :param safety: 可分配给按点数缩放的数据的比例
+        """
+        self.max_bytes = int(max_bytes)
+        self.baseline = current_rss_bytes() or 0
+        self.safety = safety
+        if self.available <= 0:
+            raise ValueError(f"内存预算 {self.max_bytes / 2**20:.0f} MB 不足以覆盖进程基础占用 "
+                             f"{self.baseline / 2**20:.0f} MB")
+
+    @property
+    def available(self):
+        return int((self.max_bytes - self.baseline) * self.safety)
+
+    def points(self, bytes_per_point, share=1.0, minimum=10000, maximum=None):
+        """
+        预算份额内可容纳的点数
+        """
+        count = max(minimum, int(self.available * share // bytes_per_point))
+        return count if maximum is None else min(count, maximum)
+
+    def to_dict(self):
+        return {
+            'max_mb': round(self.max_bytes / 2**20, 1),
+            'baseline_mb': round(self.baseline / 2**20, 1),
+            'available_mb': round(self.available / 2**20, 1),
+        }
+
+
+class ScratchArray:
+    """
+    磁盘上的二维暂存数组，按窗口映射读写
+    """
+
+    def __init__(self, path, rows, columns, dtype):
+        self.path = path
+        self.rows = int(rows)
+        self.columns = columns
+        self.dtype = np.dtype(dtype)
+        self._row_bytes = self.dtype.itemsize * columns
+        # 预先分配为稀疏文件，只有写入过的部分占用磁盘
+        with open(path, 'wb') as f:
+            f.truncate(max(1, self.rows * self._row_bytes))
+
+    def _map(self, start, stop, mode):
+        return np.memmap(self.path, dtype=self.dtype, mode=mode, offset=start * self._row_bytes,
+                         shape=(stop - start, self.columns))
+
+    def read(self, start, stop):
+        """
+        读取 [start, stop) 行的副本（解除映射后不占常驻内存）
+        """
+        if stop <= start:
+            return np.empty((0, self.columns), dtype=self.dtype)
+        window = self._map(start, stop, 'r')
+        data = np.array(window)
+        del window
+        return data
+
+    def write(self, start, values):
+        """
+        从第 start 行起写入 values
+        """
+        values = np.asarray(values, dtype=self.dtype).reshape(-1, self.columns)
+        if len(values) == 0:
+            return
+        window = self._map(start, start + len(values), 'r+')
+        window[:] = values
+        window.flush()
+        del window
+
+    def scatter(self, rows, values):
+        """
+        写入任意行（按行号范围映射一次窗口）
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0:
+            return
+        start, stop = int(rows.min()), int(rows.max()) + 1
+        window = self._map(start, stop, 'r+')
+        window[rows - start] = np.asarray(values, dtype=self.dtype).reshape(-1, self.columns)
+        window.flush()
+        del window
+
+
+class ScratchSpace:
+    """
+    暂存目录：退出时删除其中的所有暂存文件
+    """
+
+    def __init__(self, root=None):
+        if root:
+            os.makedirs(root, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix='powerline_ooc_', dir=root)
+
+    def array(self, name, rows, columns, dtype):
+        return ScratchArray(os.path.join(self.path, f"{name}.bin"), rows, columns, dtype)
+
+    def close(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_ranges(total, size):
+    for start in range(0, total, size):
+        yield start, min(start + size, total)
+
+
+def _decode_chunks(reader, chunk_points, origin, dtype):
+    """
+    逐块解码LAS记录并减去原点（在预读线程中运行）
+    """
+    for chunk in reader.chunk_iterator(chunk_points):
+        points = np.empty((len(chunk), 3), dtype=dtype)
+        points[:, 0] = chunk.x - origin[0]
+        points[:, 1] = chunk.y - origin[1]
+        points[:, 2] = chunk.z - origin[2]
+        yield points
+
+
+def spool_high_points(input_file, height_min, height_max, scratch, chunk_points, origin=None,
+                      dtype=np.float64, progress=None, prefetch_depth=0):
+    """
+    分块读取LAS，减去原点后把高程带 [height_min, height_max] 之外的点按文件顺序写入暂存数组
+
+    :param origin: 局部坐标原点 (3,)，None表示不平移
+    :param dtype: 暂存坐标类型（float32 或 float64）
+    :param prefetch_depth: 预读与后台写出的队列长度，0表示串行读取、筛选和写出
+    :return: (暂存xyz数组, 高程带外点数, 输入总点数, 统计信息字典)；
+             统计信息的 'pipeline' 为 [(PipelineStats, I/O一侧)]
+    """
+    origin = np.zeros(3) if origin is None else np.asarray(origin, dtype=np.float64)
+    with las_io.open_las(input_file) as reader:
+        total = int(reader.header.point_count)
+        xyz = scratch.array('xyz', total, 3, dtype)
+        n_high = 0
+        shift = None
+        sums = np.zeros(5)  # dx, dy, dx², dxdy, dy²
+        xy_min = np.full(2, np.inf)
+        xy_max = np.full(2, -np.inf)
+
+        # 读取线程解码下一块的同时筛选当前块，写出线程把上一块写入暂存数组
+        prefetcher = Prefetcher(_decode_chunks(reader, chunk_points, origin, dtype), prefetch_depth, 'read')
+        writer = BackgroundWriter(prefetch_depth, 'spool_write')
+        chunks = prefetcher
+        if progress is not None:
+            chunks = progress.iter(chunks, 'read', total=-(-total // chunk_points), desc='分块读取')
+        try:
+            for points in chunks:
+                # 与 _height_band_indices 相同：按存储后的高程判断
+                z = points[:, 2].astype(np.float64)
+                high = ~((z >= height_min) & (z <= height_max))
+                if not high.any():
+                    continue
+                points = points[high]
+                del z, high
+                writer.submit(xyz.write, n_high, points)
+                n_high += len(points)
+
+                # 平移后累加二阶矩，用于走廊主方向（避免大坐标的精度损失）
+                xy = points[:, :2].astype(np.float64)
+                if shift is None:
+                    shift = xy.mean(axis=0)
+                d = xy - shift
+                sums += [d[:, 0].sum(), d[:, 1].sum(), (d[:, 0] ** 2).sum(),
+                         (d[:, 0] * d[:, 1]).sum(), (d[:, 1] ** 2).sum()]
+                xy_min = np.minimum(xy_min, xy.min(axis=0))
+                xy_max = np.maximum(xy_max, xy.max(axis=0))
+            writer.close()
+        finally:
+            prefetcher.close()
+            writer.abort()
+
+    stats = {'shift': shift if shift is not None else np.zeros(2), 'sums': sums,
+             'xy_min': xy_min, 'xy_max': xy_max,
+             'pipeline': [(prefetcher.stats, 'consumer'), (writer.stats, 'producer')]}
+    return xyz, n_high, total, stats
+
+
+def corridor_axes(stats, n_points):
+    """
+    由累加的二阶矩计算走廊主方向，返回两行分别为主、次方向的 2x2 矩阵
+    """
+    if n_points < 2:
+        return np.eye(2)
+    sx, sy, sxx, sxy, syy = stats['sums']
+    mx, my = sx / n_points, sy / n_points
+    cov = np.array([[sxx / n_points - mx * mx, sxy / n_points - mx * my],
+                    [sxy / n_points - mx * my, syy / n_points - my * my]])
+    eigenvalues, eigenvectors = np.linalg.eigh(cov)
+    u = eigenvectors[:, np.argmax(eigenvalues)]
+    if u[0] < 0 or (u[0] == 0 and u[1] < 0):
+        u = -u
+    return np.array([u, [-u[1], u[0]]])
+
+
+def plan_blocks(xyz, n_high, stats, overlap, block_points, chunk_points):
+    """
+    按走廊主方向的点数直方图切分空间块，使每块的点数不超过 block_points
+
+    :return: corridor_tiling.TileLayout
+    """
+    from corridor_tiling import TileLayout
+
+    axes = corridor_axes(stats, n_high)
+    corners = np.array([[stats['xy_min'][0], stats['xy_min'][1]], [stats['xy_min'][0], stats['xy_max'][1]],
+                        [stats['xy_max'][0], stats['xy_min'][1]], [stats['xy_max'][0], stats['xy_max'][1]]])
+    if n_high == 0:
+        return TileLayout('corridor', np.zeros(2), axes, [], [], overlap)
+    u_corners = corners @ axes[0]
+    u_lo = np.floor(u_corners.min())
+    n_bins = int(np.ceil((u_corners.max() - u_lo) / PLAN_BIN_SIZE)) + 1
+
+    counts = np.zeros(n_bins, dtype=np.int64)
+    for start, stop in iter_ranges(n_high, chunk_points):
+        u = xyz.read(start, stop)[:, :2] @ axes[0]
+        bins = np.clip(((u - u_lo) // PLAN_BIN_SIZE).astype(np.int64), 0, n_bins - 1)
+        counts += np.bincount(bins, minlength=n_bins)
+
+    # 贪心切分：累计点数超过预算时在箱边界处分块
+    edges = []
+    filled = 0
+    for b in np.flatnonzero(counts):
+        if filled and filled + counts[b] > block_points:
+            edges.append(u_lo + b * PLAN_BIN_SIZE)
+            filled = 0
+        filled += counts[b]
+    return TileLayout('corridor', np.zeros(2), axes, edges, [], overlap)
+
+
+def sort_into_blocks(xyz, n_high, layout, scratch, chunk_points):
+    """
+    把暂存点重排为按块连续存放（块内保持原有顺序），同时保存每个点的序号
+
+    :return: (重排后的xyz, 重排后的序号, 各块起始偏移 (n_tiles + 1,))
+    """
+    counts = np.zeros(layout.n_tiles, dtype=np.int64)
+    for start, stop in iter_ranges(n_high, chunk_points):
+        counts += np.bincount(layout.owner(layout.to_frame(xyz.read(start, stop))), minlength=layout.n_tiles)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    blocked_xyz = scratch.array('blocked_xyz', max(n_high, 1), 3, xyz.dtype)
+    blocked_rank = scratch.array('blocked_rank', max(n_high, 1), 1, np.int64)
+    cursor = offsets[:-1].copy()
+    for start, stop in iter_ranges(n_high, chunk_points):
+        points = xyz.read(start, stop)
+        owner = layout.owner(layout.to_frame(points))
+        order = np.argsort(owner, kind='stable')
+        owner_sorted = owner[order]
+        for tile in np.unique(owner_sorted):
+            lo, hi = np.searchsorted(owner_sorted, [tile, tile + 1])
+            run = order[lo:hi]
+            blocked_xyz.write(cursor[tile], points[run])
+            blocked_rank.write(cursor[tile], start + run)
+            cursor[tile] += len(run)
+    return blocked_xyz, blocked_rank, offsets
+
+
+def load_block_region(blocked_xyz, blocked_rank, offsets, layout, tile):
+    """
+    读取分块 核心区+重叠区 内的点（按序号排序）
+
+    :return: (坐标, 序号)
+    """
+    u0, u1, _, _ = layout.bounds(tile)
+    first = int(np.searchsorted(layout.u_edges, u0 - layout.overlap, side='right'))
+    last = int(np.searchsorted(layout.u_edges, u1 + layout.overlap, side='right'))
+    points = blocked_xyz.read(offsets[first], offsets[last + 1])
+    ranks = blocked_rank.read(offsets[first], offsets[last + 1])[:, 0]
+    inside = layout.extended_mask(layout.to_frame(points), tile)
+    points, ranks = points[inside], ranks[inside]
+    order = np.argsort(ranks)
+    return points[order], ranks[order]
+
+
+def interpolate_chunk(samples, n_samples, sample_step, start, stop):
+    """
+    计算序号 [start, stop) 的线性度（与 PowerLineExtractor._interpolate_linearity 的算式相同）
+    """
+    j = np.arange(start, stop)
+    last_idx = (n_samples - 1) * sample_step
+    seg = np.minimum(j // sample_step, n_samples - 1)
+    seg_lo, seg_hi = int(seg.min()), min(int(seg.max()) + 2, n_samples)
+    values = samples.read(seg_lo, seg_hi)[:, 0]
+
+    linear = np.empty(len(j))
+    tail = j >= last_idx
+    linear[tail] = values[n_samples - 1 - seg_lo] if tail.any() else 0.0
+    head = ~tail
+    if head.any():
+        s = seg[head] - seg_lo
+        start_idx = seg[head] * sample_step
+        t = (j[head] - start_idx) / ((seg[head] + 1) * sample_step - start_idx)
+        linear[head] = values[s] * (1 - t) + values[s + 1] * t
+    return linear
+
+
+def streaming_percentile(chunks, percentile, lower=0.1):
+    """
+    对大于 lower 的值流式计算精确百分位数（与 np.percentile 的 linear 方法一致）。
+    chunks 为可重复调用、每次返回新迭代器的函数。
+
+    :return: (百分位数, 参与计算的值个数)
+    """
+    n_bins = PERCENTILE_BINS
+    counts = np.zeros(n_bins, dtype=np.int64)
+
+    def bin_of(values):
+        return np.clip(((values - lower) / (1.0 - lower) * n_bins).astype(np.int64), 0, n_bins - 1)
+
+    for values in chunks():
+        valid = values[values > lower]
+        counts += np.bincount(bin_of(valid), minlength=n_bins)
+    n = int(counts.sum())
+    if n == 0:
+        return None, 0
+
+    virtual = (n - 1) * (percentile / 100)
+    lo_rank = int(np.floor(virtual))
+    hi_rank = min(lo_rank + 1, n - 1)
+    cumulative = np.cumsum(counts)
+    lo_bin, hi_bin = np.searchsorted(cumulative, [lo_rank + 1, hi_rank + 1])
+    below = int(cumulative[lo_bin - 1]) if lo_bin > 0 else 0
+
+    selected = []
+    for values in chunks():
+        valid = values[values > lower]
+        b = bin_of(valid)
+        selected.append(valid[(b >= lo_bin) & (b <= hi_bin)])
+    selected = np.sort(np.concatenate(selected))
+    a, b = selected[lo_rank - below], selected[hi_rank - below]
+    gamma = virtual - lo_rank
+    if gamma >= 0.5:
+        return b - (b - a) * (1 - gamma), n
+    return a + (b - a) * gamma, n
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+参数扫描 - param_sweep.py
+
+compare_dynamic_vs_fixed_params 对比两组设置时从头运行两次 _power_line_segmentation；
+调参需要在 threshold、radius、eps、min_samples 的网格上比较，逐组完整运行的开销与组数成正比。
+本模块让各组配置共享计算：
+1.  读取与高程滤波只做一次；采样点的邻域在所有半径中最大的那个（动态半径取可能的最大值）
+    下用KD树一次求出，每个半径的线性度由同一批邻域按距离筛选后批量计算协方差得到，
+    与 _point_linearity 逐点计算的结果一致；
+2.  每个半径下，所有阈值的线点都是最低阈值线点的子集：在该超集上按最大 eps 建一次
+    稀疏距离图，每个阈值取子图，每组 (eps, min_samples) 用预计算距离图运行 DBSCAN，
+    标签与 _dbscan_clustering 相同；
+3.  各 (半径, 阈值) 组的聚类相互独立，workers > 1 时用进程池并行。
+结果为每组配置一行的表格：线点数、聚类数、噪声点数、保留聚类数（可选分离后的线数）以及耗时。
+
+使用方法:
+    python param_sweep.py input.las --radii 1.5 2 2.5 --eps_values 1.5 1.8 2.1 --min_samples_values 5 7
+    python param_sweep.py input.las --fixed_params --thresholds 0.7 0.75 0.8 0.85 0.9 --output sweep.csv
+"""
+
+import argparse
+import contextlib
+import csv
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+# 动态半径的取值范围（与 _calculate_dynamic_radius_by_terrain 的默认参数一致）
+DYNAMIC_MIN_RADIUS = 0.8
+DYNAMIC_MAX_RADIUS = 3.0
+# 每批采样点的邻域点对数上限（决定邻域计算的峰值内存）
+CHUNK_PAIRS = 2000000
+
+COLUMNS = ('radius', 'threshold', 'threshold_used', 'eps', 'min_samples', 'line_points', 'clusters',
+           'clustered_points', 'noise_points', 'kept_clusters', 'lines', 'features_s', 'cluster_s')
+
+
+def dynamic_radius(counts, z_ranges, base_radius):
+    """
+    _calculate_dynamic_radius_by_terrain 的向量化版本：按基础半径邻域的点数和高差确定每个点的半径
+    """
+    radius = np.full(len(counts), float(base_radius))
+    radius[z_ranges > 5.0] = max(base_radius * 0.6, DYNAMIC_MIN_RADIUS)
+    radius[z_ranges < 1.0] = min(base_radius * 1.2, DYNAMIC_MAX_RADIUS)
+    radius[counts < 5] = min(base_radius * 1.5, DYNAMIC_MAX_RADIUS)
+    return radius
+
+
+def _search_radius(radius, use_dynamic_params):
+    if not use_dynamic_params:
+        return radius
+    return max(radius, min(radius * 1.5, DYNAMIC_MAX_RADIUS), max(radius * 0.6, DYNAMIC_MIN_RADIUS))
+
+
+def _chunk_linearity(points, queries, pairs, radii, use_dynamic_params):
+    """
+    一批采样点在各半径下的线性度
+
+    :param pairs: 按查询点序号排序的邻域点对 (i, j, v)，半径不小于所有需要的半径
+    :return: {半径: 线性度数组}
+    """
+    i, j, v = pairs['i'], pairs['j'], pairs['v']
+    starts = np.searchsorted(i, np.arange(len(queries)))
+    offsets = points[j] - queries[i]   # 以查询点为原点，避免大坐标下的协方差抵消误差
+    products = np.stack([offsets[:, 0] * offsets[:, 0], offsets[:, 0] * offsets[:, 1],
+                         offsets[:, 0] * offsets[:, 2], offsets[:, 1] * offsets[:, 1],
+                         offsets[:, 1] * offsets[:, 2], offsets[:, 2] * offsets[:, 2]], axis=1)
+    result = {}
+    for radius in radii:
+        if use_dynamic_params:
+            base = v < radius
+            counts = np.add.reduceat(base.astype(np.int64), starts)
+            z = points[j, 2]
+            z_ranges = (np.maximum.reduceat(np.where(base, z, -np.inf), starts)
+                        - np.minimum.reduceat(np.where(base, z, np.inf), starts))
+            point_radius = dynamic_radius(counts, z_ranges, radius)
+            mask = v < point_radius[i]
+        else:
+            mask = v < radius
+        n = np.add.reduceat(mask.astype(np.float64), starts)
+        sums = np.add.reduceat(offsets * mask[:, None], starts)
+        second = np.add.reduceat(products * mask[:, None], starts)
+
+        safe_n = np.maximum(n, 1.0)
+        mean = sums / safe_n[:, None]
+        cov = np.empty((len(queries), 3, 3))
+        for k, (a, b) in enumerate(((0, 0), (0, 1), (0, 2), (1, 1), (1, 2), (2, 2))):
+            cov[:, a, b] = cov[:, b, a] = second[:, k] / safe_n - mean[:, a] * mean[:, b]
+        eigenvalues = np.linalg.eigvalsh(cov)
+        l1, l2 = eigenvalues[:, 2], eigenvalues[:, 1]
+        linear = np.divide(l1 - l2, l1, out=np.zeros(len(queries)), where=l1 > 0)
+        linear[n < 3] = 0.0
+        result[radius] = linear
+    return result
+
+
+def sample_linearity(points, sample_indices, radii, use_dynamic_params=True, chunk_pairs=CHUNK_PAIRS,
+                     progress=None):
+    """
+    在所有半径下计算采样点的线性度，邻域只搜索一次
+
+    :param points: 参与计算的点 (N, 3)
+    :param sample_indices: 采样点序号
+    :param radii: 邻域半径列表
+    :param use_dynamic_params: 是否按地形使用动态半径
+    :param chunk_pairs: 每批邻域点对数上限
+    :return: {半径: 采样点线性度数组}
+    """
+    from scipy.spatial import cKDTree
+    from cost_model import estimate_neighbors
+
+    points = np.asarray(points, dtype=np.float64)
+    search = max(_search_radius(r, use_dynamic_params) for r in radii)
+    tree = cKDTree(points)
+    neighbors = max(estimate_neighbors(points, search), 1.0)
+    chunk = max(1, int(chunk_pairs / neighbors))
+    values = {r: np.zeros(len(sample_indices)) for r in radii}
+    chunks = range(0, len(sample_indices), chunk)
+    if progress is not None:
+        chunks = progress.iter(chunks, 'sweep_linearity', desc='共享邻域线性度')
+    for begin in chunks:
+        queries = points[sample_indices[begin:begin + chunk]]
+        pairs = cKDTree(queries).sparse_distance_matrix(tree, search, output_type='ndarray')
+        pairs = pairs[np.argsort(pairs['i'], kind='stable')]
+        for radius, linear in _chunk_linearity(points, queries, pairs, radii, use_dynamic_params).items():
+            values[radius][begin:begin + len(queries)] = linear
+    return values
+
+
+def cluster_configs_task(params, graph, points, pairs, min_line_points=50, separate=False):
+    """
+    聚类任务：在同一张预计算距离图上运行一组 (eps, min_samples) 的 DBSCAN
+
+    :param params: PowerLineExtractor 构造参数（separate 为 True 时用于分离与分割）
+    :param graph: 线点的稀疏距离图（CSR，只存最大 eps 以内的距离）
+    :param points: 线点坐标 (N, 3)
+    :param pairs: [(eps, min_samples)]
+    :return: 每组一个指标字典
+    """
+    from sklearn.cluster import DBSCAN
+
+    rows = []
+    for eps, min_samples in pairs:
+        start = time.perf_counter()
+        row = {'eps': eps, 'min_samples': min_samples, 'line_points': len(points)}
+        if len(points) == 0:
+            labels = np.empty(0, dtype=np.int64)
+        else:
+            labels = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit(graph).labels_
+        clustered = labels >= 0
+        sizes = np.bincount(labels[clustered]) if clustered.any() else np.empty(0, dtype=np.int64)
+        row.update(clusters=len(sizes), clustered_points=int(clustered.sum()),
+                   noise_points=int(len(labels) - clustered.sum()),
+                   kept_clusters=int(np.count_nonzero(sizes > min_line_points)))
+        if separate:
+            from corridor_tiling import _quiet_extractor
+
+            extractor, devnull = _quiet_extractor(params)
+            with devnull, contextlib.redirect_stdout(devnull):
+                clusters = extractor._clusters_from_labels(points, labels)
+                row['lines'] = len(extractor._split_all_by_peaks(extractor._separate_clusters(clusters)))
+        row['cluster_s'] = round(time.perf_counter() - start, 4)
+        rows.append(row)
+    return rows
+
+
+def sweep(extractor, input_file, thresholds=None, radii=None, eps_values=None, min_samples_values=None,
+          use_dynamic_params=True, workers=1, min_line_points=50, separate=False, trace=None):
+    """
+    在参数网格上评估线特征提取与聚类，邻域、线性度和距离图在配置之间共享
+
+    动态参数模式下阈值由线性度分布的百分位数决定（与 _select_line_points 相同），
+    thresholds 不起作用，每个半径只有一个阈值。
+
+    :param extractor: PowerLineExtractor 对象（提供高程带、采样步长、插值等设置）
+    :param input_file: 输入文件路径
+    :param thresholds: 线特征阈值列表，None表示 [extractor.threshold]
+    :param radii: 邻域半径列表，None表示 [extractor.radius]
+    :param eps_values: DBSCAN邻域半径列表，None表示 [extractor.eps]
+    :param min_samples_values: DBSCAN最小样本数列表，None表示 [extractor.min_samples]
+    :param use_dynamic_params: 是否使用动态半径和动态阈值
+    :param workers: 聚类并行进程数
+    :param min_line_points: 统计保留聚类数时的最小点数
+    :param separate: 是否对每组配置继续做分离和峰值分割并统计线数（耗时明显增加）
+    :param trace: PerfTrace对象（可选），记录共享阶段的耗时
+    :return: (每组配置一行的字典列表, 汇总字典)
+    """
+    from sklearn.neighbors import NearestNeighbors
+    from corridor_tiling import run_tile_tasks
+
+    thresholds = sorted(thresholds or [extractor.threshold])
+    radii = sorted(radii or [extractor.radius])
+    eps_values = sorted(eps_values or [extractor.eps])
+    min_samples_values = sorted(min_samples_values or [extractor.min_samples])
+    cluster_pairs = list(itertools.product(eps_values, min_samples_values))
+    params = dict(threshold=extractor.threshold, radius=extractor.radius, height_min=extractor.height_min,
+                  height_max=extractor.height_max, eps=extractor.eps, min_samples=extractor.min_samples)
+    summary = {'configurations': len(radii) * (1 if use_dynamic_params else len(thresholds)) * len(cluster_pairs)}
+    wall_start = time.perf_counter()
+
+    def stage(name, fn, **extra):
+        if trace is not None:
+            trace.start(name)
+        start = time.perf_counter()
+        result = fn()
+        summary[f"{name}_s"] = round(time.perf_counter() - start, 3)
+        if trace is not None:
+            trace.stop(name, **extra)
+        return result
+
+    def read():
+        return np.asarray(extractor._load_high_points(input_file)[0], dtype=np.float64)
+
+    high = stage('read', read)
+    num_points = len(high)
+    summary['high_points'] = num_points
+    sample_step = extractor._linearity_sample_step(num_points, use_dynamic_params)
+    summary['sample_step'] = sample_step
+
+    if sample_step is None:
+        linear_by_radius = {r: np.zeros(num_points) for r in radii}
+        summary['features_s'] = 0.0
+    else:
+        sample_indices = np.arange(0, num_points, sample_step)
+
+        def features():
+            values = sample_linearity(high, sample_indices, radii, use_dynamic_params, progress=extractor.progress)
+            if sample_step == 1:
+                return values
+            return {r: extractor._interpolate_linearity(num_points, sample_indices, v) for r, v in values.items()}
+
+        linear_by_radius = stage('features', features)
+
+    # 每个 (半径, 阈值) 组一个聚类任务，同一半径的各阈值共用一张距离图
+    tasks, groups = [], []
+    graph_s = 0.0
+    for radius in radii:
+        linear = linear_by_radius[radius]
+        if use_dynamic_params:
+            levels = [('dynamic', float(extractor._calculate_dynamic_threshold_by_percentile(linear)))]
+        else:
+            levels = [(t, t) for t in thresholds]
+        superset = np.where(linear > min(level[1] for level in levels))[0]
+        start = time.perf_counter()
+        points = high[superset]
+        graph = None
+        if len(points):
+            graph = NearestNeighbors(radius=max(eps_values), algorithm='kd_tree', leaf_size=50).fit(points) \
+                .radius_neighbors_graph(mode='distance')
+        graph_s += time.perf_counter() - start
+        for label, used in levels:
+            select = np.where(linear[superset] > used)[0]
+            sub_graph = graph[select][:, select] if graph is not None else None
+            tasks.append((params, sub_graph, points[select], cluster_pairs, min_line_points, separate))
+            groups.append({'radius': radius, 'threshold': label, 'threshold_used': round(used, 4)})
+    summary['graph_s'] = round(graph_s, 3)
+
+    def cluster():
+        return run_tile_tasks(cluster_configs_task, tasks, workers=workers, progress=extractor.progress,
+                              stage='sweep_cluster')
+
+    results = stage('cluster', cluster, configurations=summary['configurations'])
+    rows = []
+    for group, group_rows in zip(groups, results):
+        for row in group_rows:
+            row.update(group, features_s=summary['features_s'])
+            rows.append({column: row.get(column) for column in COLUMNS})
+    summary['wall_s'] = round(time.perf_counter() - wall_start, 3)
+    return rows, summary
+
+
+def write_table(rows, path):
+    """
+    把扫描结果写成CSV（每组配置一行）
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_table(rows):
+    print(f"{'radius':>7}{'thresh':>8}{'used':>7}{'eps':>6}{'min_s':>6}{'线点':>9}{'聚类':>6}{'噪声':>8}"
+          f"{'保留':>6}{'线数':>6}{'聚类耗时':>9}")
+    for row in rows:
+        threshold = row['threshold'] if isinstance(row['threshold'], str) else f"{row['threshold']:.3f}"
+        lines = '-' if row['lines'] is None else str(row['lines'])
+        print(f"{row['radius']:>7.2f}{threshold:>8}{row['threshold_used']:>7.3f}{row['eps']:>6.2f}"
+              f"{row['min_samples']:>6d}{row['line_points']:>9d}{row['clusters']:>6d}{row['noise_points']:>8d}"
+              f"{row['kept_clusters']:>6d}{lines:>6}{row['cluster_s']:>9.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='共享邻域与距离图的参数网格扫描')
+    parser.add_argument('input_file', help='输入的LAS文件路径')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.8], help='线特征阈值列表（仅固定参数模式） (默认: 0.8)')
+    parser.add_argument('--radii', type=float, nargs='+', default=[2.0], help='邻域半径列表 (默认: 2.0)')
+    parser.add_argument('--eps_values', type=float, nargs='+', default=[1.8], help='DBSCAN邻域半径列表 (默认: 1.8)')
+    parser.add_argument('--min_samples_values', type=int, nargs='+', default=[7], help='DBSCAN最小样本数列表 (默认: 7)')
+    parser.add_argument('--height_min', type=float, default=0, help='最小高程 (默认: 0)')
+    parser.add_argument('--height_max', type=float, default=60, help='最大高程 (默认: 60)')
+    parser.add_argument('--fixed_params', action='store_true', help='使用固定半径和固定阈值（否则阈值由百分位数决定）')
+    parser.add_argument('--min_line_points', type=int, default=50, help='统计保留聚类的最小点数 (默认: 50)')
+    parser.add_argument('--separate', action='store_true', help='每组配置继续做分离和峰值分割并统计线数')
+    parser.add_argument('--workers', type=int, default=1, help='聚类并行进程数 (默认: 1)')
+    parser.add_argument('--output', default=None, help='结果CSV输出路径')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from Extractor4 import PowerLineExtractor
+
+    extractor = PowerLineExtractor(threshold=args.thresholds[0], radius=args.radii[0], height_min=args.height_min,
+                                   height_max=args.height_max, eps=args.eps_values[0],
+                                   min_samples=args.min_samples_values[0], enable_visualization=False)
+    rows, summary = extractor.sweep_params(args.input_file, thresholds=args.thresholds, radii=args.radii,
+                                           eps_values=args.eps_values, min_samples_values=args.min_samples_values,
+                                           use_dynamic_params=not args.fixed_params, workers=args.workers,
+                                           min_line_points=args.min_line_points, separate=args.separate)
+    print()
+    print_table(rows)
+    print(f"\n{summary['configurations']} 组配置，总耗时 {summary['wall_s']:.2f} 秒（读取 {summary['read_s']:.2f}，"
+          f"线性度 {summary['features_s']:.2f}，距离图 {summary['graph_s']:.2f}，聚类 {summary['cluster_s']:.2f}）")
+    if args.output:
+        write_table(rows, args.output)
+        print(f"结果已写入: {args.output}")
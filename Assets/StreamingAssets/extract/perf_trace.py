@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+分阶段性能追踪 - perf_trace.py
+
+为流水线的每个阶段记录机器可读的性能数据：
+- 墙钟时间与CPU时间
+- 进程常驻内存：阶段结束时的RSS，以及截至该阶段结束的进程生命周期RSS峰值（不是单个阶段的峰值）
+- 可选的Python分配峰值(tracemalloc)：会拦截每次Python内存分配、拖慢整个运行，只在诊断时开启
+- 输入/输出点数与线数
+
+结果可写为JSON文件，也可嵌入worker.py的元数据；可选地对指定阶段启用cProfile并导出.prof文件。
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def current_rss_bytes():
+    """
+    返回当前进程的常驻内存（字节），无法获取时返回None。
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes():
+    """
+    返回进程生命周期内的常驻内存峰值（字节），无法获取时返回None。
+    """
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        # Windows 提供 peak_wset；其他平台退回到 resource
+        if hasattr(info, 'peak_wset'):
+            return info.peak_wset
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为KB，macOS 单位为字节
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+# 正在运行的 cProfile：同一时刻只能启用一个，调用方因异常放弃追踪时需要关闭
+_active_profilers = set()
+
+
+def stop_active_profilers():
+    """
+    关闭所有仍在启用的阶段 cProfile（阶段因异常或取消未能正常结束时使用），返回关闭的个数。
+    """
+    count = 0
+    while _active_profilers:
+        _active_profilers.pop().disable()
+        count += 1
+    return count
+
+
+def _to_mb(value):
+    return None if value is None else round(value / (1024 * 1024), 2)
+
+
+class PerfTrace:
+    """
+    流水线分阶段性能追踪器
+
+    用法：
+        trace = PerfTrace('extract')
+        trace.start('read')
+        ...
+        trace.stop('read', output_points=n)
+        trace.write('xxx_perf_trace.json')
+    """
+
+    def __init__(self, name, trace_malloc=False, profile_stages=None, profile_dir='.', progress=None):
+        """
+        :param name: 追踪名称（通常为入口脚本名）
+        :param trace_malloc: 是否使用tracemalloc统计各阶段的Python分配峰值（开销较大，默认关闭）
+        :param profile_stages: 需要用cProfile包裹的阶段名集合，'all'表示全部阶段
+        :param profile_dir: .prof文件的输出目录
+        :param progress: 可选的 ProgressReporter，阶段开始/结束时同步汇报进度
+        """
+        self.name = name
+        self.progress = progress
+        self.trace_malloc = trace_malloc
+        if isinstance(profile_stages, str):
+            profile_stages = [s.strip() for s in profile_stages.split(',') if s.strip()]
+        self.profile_stages = set(profile_stages or [])
+        self.profile_dir = profile_dir
+        self.stages = []
+        self._open = {}
+        self._created = time.time()
+        self._started_malloc = False
+        if self.trace_malloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_malloc = True
+
+    def _should_profile(self, stage):
+        return 'all' in self.profile_stages or stage in self.profile_stages
+
+    def start(self, stage, input_points=None):
+        """
+        开始一个阶段的计时。
+        """
+        record = {
+            'stage': stage,
+            'input_points': input_points,
+        }
+        if self.trace_malloc and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        profiler = None
+        if self._should_profile(stage):
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            _active_profilers.add(profiler)
+        self._open[stage] = (record, time.perf_counter(), time.process_time(), profiler)
+        if self.progress is not None:
+            self.progress.begin_stage(stage)
+        return record
+
+    def stop(self, stage, output_points=None, lines=None, **extra):
+        """
+        结束一个阶段并记录性能数据。
+
+        :param stage: 阶段名，与start一致
+        :param output_points: 输出点数
+        :param lines: 输出线数
+        :param extra: 其他需要记录的计数
+        :return: 该阶段的记录字典
+        """
+        record, wall_start, cpu_start, profiler = self._open.pop(stage)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        if profiler is not None:
+            profiler.disable()
+            _active_profilers.discard(profiler)
+            os.makedirs(self.profile_dir, exist_ok=True)
+            prof_path = os.path.join(self.profile_dir, f"{self.name}_{stage}.prof")
+            profiler.dump_stats(prof_path)
+            record['profile'] = prof_path
+
+        record.update({
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            'output_points': output_points,
+            'lines': lines,
+            'rss_mb': _to_mb(current_rss_bytes()),
+            # ru_maxrss / peak_wset 是进程生命周期的峰值，只能说明截至本阶段结束时的最高值
+            'process_peak_rss_mb': _to_mb(peak_rss_bytes()),
+        })
+        if self.trace_malloc and tracemalloc.is_tracing():
+            record['py_alloc_peak_mb'] = _to_mb(tracemalloc.get_traced_memory()[1])
+        record.update(extra)
+        self.stages.append(record)
+        if self.progress is not None:
+            self.progress.end_stage(stage)
+        return record
+
+    def to_dict(self):
+        """
+        返回可序列化的追踪结果。
+        """
+        return {
+            'name': self.name,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._created)),
+            'host': {
+                'platform': platform.platform(),
+                'python': platform.python_version(),
+                'cpu_count': os.cpu_count(),
+            },
+            'total_wall_s': round(sum(s['wall_s'] for s in self.stages), 4),
+            'process_peak_rss_mb': _to_mb(peak_rss_bytes()),
+            'stages': list(self.stages),
+        }
+
+    def write(self, path):
+        """
+        将追踪结果写入JSON文件。
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def close(self):
+        """
+        关闭仍未结束的阶段的 cProfile（不写出.prof），并停止由本追踪器启动的tracemalloc。
+        """
+        for _, _, _, profiler in self._open.values():
+            if profiler is not None:
+                profiler.disable()
+                _active_profilers.discard(profiler)
+        self._open.clear()
+        if self._started_malloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._started_malloc = False
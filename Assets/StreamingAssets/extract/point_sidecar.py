@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+点云二进制旁路缓存 - point_sidecar.py
+
+同一个LAS/LAZ文件在多次运行中反复打开，每次都要完整解码点记录并换算坐标。
+旁路缓存把解码结果保存在输入文件旁边的 <文件名>.sidecar/ 目录中，之后的运行直接内存映射：
+- xyz.npy        局部坐标 (N, 3)，原点与存储类型同 PowerLineExtractor 的局部坐标系（las_io.local_frame），
+                 通常为 float32，与提取器自己读取换算出的局部坐标逐点一致；
+- <字段名>.npy   可选的附加字段（如 classification、intensity、red/green/blue）；
+- header.json    源文件的大小、修改时间和内容哈希（result_cache.content_hash 抽样哈希），
+                 以及原点、LAS比例因子与偏移、范围和字段类型。
+
+校验：大小和修改时间一致时直接使用；只有修改时间变化（复制、重新下载）时比较内容哈希，
+一致则更新记录的修改时间后继续使用；否则重新生成。生成时先写临时目录再整体重命名，
+中断的写入不会留下不完整的缓存；输入目录不可写时给出提示并退回普通读取。
+
+absolute_xyz 由局部坐标按LAS比例因子和偏移取整还原绝对坐标，与 laspy 解码的坐标逐位相同
+（float32 局部坐标的误差不超过半个LAS刻度，见 las_io.local_frame）。
+
+使用方法（生成/校验旁路缓存，并比较冷读取与内存映射读取的耗时）:
+    python point_sidecar.py input.las
+    python point_sidecar.py input.las --fields classification intensity --rebuild
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+import las_io
+
+# 旁路缓存格式变化时递增，使旧缓存全部失效
+SIDECAR_VERSION = 1
+
+HEADER_NAME = 'header.json'
+
+# 还原绝对坐标时每块的点数
+RESTORE_CHUNK = 1000000
+
+
+def sidecar_dir(file_path):
+    """
+    旁路缓存目录：<输入文件路径>.sidecar
+    """
+    return os.path.abspath(file_path) + '.sidecar'
+
+
+class PointSidecar:
+    """
+    内存映射的旁路缓存：局部坐标 xyz、附加字段 fields 与 header.json 中的元数据
+    """
+
+    def __init__(self, directory, header):
+        self.directory = directory
+        self.header = header
+        self.origin = np.asarray(header['origin'], dtype=np.float64)
+        self.scales = np.asarray(header['scales'], dtype=np.float64)
+        self.offsets = np.asarray(header['offsets'], dtype=np.float64)
+        self.mins = np.asarray(header['mins'], dtype=np.float64)
+        self.maxs = np.asarray(header['maxs'], dtype=np.float64)
+        self.xyz = np.load(os.path.join(directory, 'xyz.npy'), mmap_mode='r')
+        self.fields = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+                       for name in header['fields']}
+
+    def __len__(self):
+        return len(self.xyz)
+
+    def absolute_xyz(self, start=0, stop=None):
+        """
+        还原绝对坐标 (N, 3) float64：局部坐标加回原点后按LAS刻度取整，与 laspy 解码结果逐位相同
+
+        :param start: 起始点序号（分块还原时使用）
+        :param stop: 结束点序号（不含），None表示到末尾
+        """
+        local = self.xyz[start:stop]
+        points = np.empty((len(local), 3), dtype=np.float64)
+        # 逐块换算，临时数组只有一块大小
+        for begin in range(0, len(local), RESTORE_CHUNK):
+            block = slice(begin, begin + RESTORE_CHUNK)
+            for axis in range(3):
+                ticks = np.rint((local[block, axis] + self.origin[axis] - self.offsets[axis]) / self.scales[axis])
+                points[block, axis] = ticks * self.scales[axis] + self.offsets[axis]
+        return points
+
+
+def _source_signature(file_path):
+    stat = os.stat(file_path)
+    return {'size_bytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _content_hash(file_path):
+    from result_cache import content_hash
+    return content_hash(file_path)
+
+
+def _read_header(directory):
+    try:
+        with open(os.path.join(directory, HEADER_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def open_sidecar(file_path, origin=None, dtype=None, fields=()):
+    """
+    打开有效的旁路缓存；不存在、源文件已变化、原点/存储类型不同或缺少所需字段时返回None
+
+    :param file_path: 输入LAS/LAZ文件路径
+    :param origin: 要求的局部坐标原点，None表示不限
+    :param dtype: 要求的坐标存储类型，None表示不限
+    :param fields: 要求包含的附加字段
+    :return: PointSidecar 或 None
+    """
+    directory = sidecar_dir(file_path)
+    header = _read_header(directory)
+    if header is None or header.get('version') != SIDECAR_VERSION:
+        return None
+    if origin is not None and not np.array_equal(np.asarray(header['origin']), np.asarray(origin, dtype=np.float64)):
+        return None
+    if dtype is not None and header['dtype'] != np.dtype(dtype).name:
+        return None
+    if any(name not in header['fields'] for name in fields):
+        return None
+
+    source = _source_signature(file_path)
+    recorded = header['source']
+    if source['size_bytes'] != recorded['size_bytes']:
+        return None
+    if source['mtime_ns'] != recorded['mtime_ns']:
+        # 只有修改时间变化（复制、重新下载）时比较内容哈希，一致则继续使用
+        if _content_hash(file_path) != recorded['content_hash']:
+            return None
+        recorded['mtime_ns'] = source['mtime_ns']
+        try:
+            _write_header(directory, header)
+        except OSError:
+            pass
+    try:
+        return PointSidecar(directory, header)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_header(directory, header):
+    tmp_path = os.path.join(directory, HEADER_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(header, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(directory, HEADER_NAME))
+
+
+def build_sidecar(file_path, origin=None, dtype=None, fields=(), chunk_points=1000000):
+    """
+    分块读取输入文件并生成旁路缓存（覆盖已有缓存）
+
+    :param file_path: 输入LAS/LAZ文件路径
+    :param origin: 局部坐标原点，None表示按 las_io.local_frame 确定
+    :param dtype: 坐标存储类型，None表示按 las_io.local_frame 确定
+    :param fields: 需要同时保存的附加字段（文件中没有的字段忽略）
+    :param chunk_points: 每块点数
+    :return: PointSidecar
+    """
+    import laspy
+
+    directory = sidecar_dir(file_path)
+    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    source = _source_signature(file_path)
+    try:
+        with las_io.open_las(file_path) as reader:
+            las_header = reader.header
+            if origin is None or dtype is None:
+                frame_origin, frame_dtype = las_io.local_frame(las_header)
+                origin = frame_origin if origin is None else origin
+                dtype = frame_dtype if dtype is None else dtype
+            origin = np.asarray(origin, dtype=np.float64)
+            scales = np.asarray(las_header.scales, dtype=np.float64)
+            offsets = np.asarray(las_header.offsets, dtype=np.float64)
+            total = int(las_header.point_count)
+            available = set(las_header.point_format.dimension_names)
+            fields = [name for name in fields if name in available]
+
+            xyz = np.lib.format.open_memmap(os.path.join(tmp_dir, 'xyz.npy'), mode='w+',
+                                            dtype=dtype, shape=(total, 3))
+            extra = {}
+            start = 0
+            for chunk in reader.chunk_iterator(chunk_points):
+                stop = start + len(chunk)
+                # 与 PowerLineExtractor._read_xyz 相同：laspy 缩放坐标减去原点后按存储类型取整
+                for axis, name in enumerate('XYZ'):
+                    xyz[start:stop, axis] = np.asarray(chunk[name]) * scales[axis] + offsets[axis] - origin[axis]
+                for name in fields:
+                    values = np.asarray(chunk[name])
+                    if name not in extra:
+                        extra[name] = np.lib.format.open_memmap(os.path.join(tmp_dir, f"{name}.npy"), mode='w+',
+                                                                dtype=values.dtype, shape=(total,))
+                    extra[name][start:stop] = values
+                start = stop
+            for name in fields:
+                if name not in extra:
+                    # 空文件没有数据块，按字段的记录类型保存空数组
+                    np.save(os.path.join(tmp_dir, f"{name}.npy"), np.asarray(laspy.ScaleAwarePointRecord.zeros(0, header=las_header)[name]))
+            xyz.flush()
+            del xyz
+            for array in extra.values():
+                array.flush()
+            extra.clear()
+
+        header = {
+            'version': SIDECAR_VERSION,
+            'source': dict(source, file_name=os.path.basename(file_path), content_hash=_content_hash(file_path)),
+            'count': total,
+            'dtype': np.dtype(dtype).name,
+            'origin': origin.tolist(),
+            'scales': scales.tolist(),
+            'offsets': offsets.tolist(),
+            'mins': np.asarray(las_header.mins, dtype=np.float64).tolist(),
+            'maxs': np.asarray(las_header.maxs, dtype=np.float64).tolist(),
+            'fields': list(fields),
+        }
+        _write_header(tmp_dir, header)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return PointSidecar(directory, header)
+
+
+def load_sidecar(file_path, origin=None, dtype=None, fields=()):
+    """
+    打开有效的旁路缓存，无效时重新生成（已有缓存中的字段一并保留）；无法生成时返回None
+
+    :param file_path: 输入LAS/LAZ文件路径
+    :param origin: 局部坐标原点，None表示按 las_io.local_frame 确定
+    :param dtype: 坐标存储类型，None表示按 las_io.local_frame 确定
+    :param fields: 需要的附加字段
+    :return: PointSidecar 或 None
+    """
+    sidecar = open_sidecar(file_path, origin, dtype, fields)
+    if sidecar is not None:
+        return sidecar
+    previous = _read_header(sidecar_dir(file_path))
+    if previous is not None and previous.get('version') == SIDECAR_VERSION:
+        fields = list(dict.fromkeys(list(previous['fields']) + list(fields)))
+    print(f"[旁路缓存] 生成 {sidecar_dir(file_path)}")
+    try:
+        return build_sidecar(file_path, origin, dtype, fields)
+    except OSError as e:
+        print(f"[旁路缓存] 无法写入旁路缓存，改为直接读取: {e}")
+        return None
+
+
+class SidecarCloud(las_io.LoadedCloud):
+    """
+    以旁路缓存为数据源的共享点云（las_io.LoadedCloud）：第一次使用时打开或生成旁路缓存，
+    无法生成时退回直接读取文件（此后与 LoadedCloud 相同）。
+
+    - 提取器按旁路缓存的局部坐标系取坐标时（local_view）直接使用内存映射的局部坐标，不复制；
+    - 绝对坐标 xyz 只在有阶段需要时（地形提取）才逐块还原为 float64；
+    - 旁路缓存不保存原始点记录，subset 输出的点云为点格式0：坐标加上旁路缓存中已有、
+      且点格式0包含的附加字段（如 classification、intensity），其余字段为0。
+    """
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self.sidecar = None
+        self._opened = False
+
+    def _open(self):
+        if not self._opened:
+            self._opened = True
+            self.sidecar = load_sidecar(self.file_path)
+            if self.sidecar is not None:
+                self.header = self.sidecar
+        return self.sidecar
+
+    @property
+    def loaded(self):
+        return self._xyz is not None or self.sidecar is not None
+
+    def load(self):
+        if self._open() is None:
+            return super().load()
+        return self
+
+    @property
+    def xyz(self):
+        if self._xyz is None and self._open() is not None:
+            self._xyz = self.sidecar.absolute_xyz()
+        return super().xyz
+
+    def __len__(self):
+        if self._open() is not None:
+            return len(self.sidecar)
+        return super().__len__()
+
+    def local_view(self, origin, dtype):
+        if self._open() is None:
+            return None
+        if np.array_equal(self.sidecar.origin, np.asarray(origin, dtype=np.float64)) \
+                and self.sidecar.xyz.dtype == np.dtype(dtype):
+            return self.sidecar.xyz
+        return None
+
+    def field(self, name):
+        if self._open() is not None:
+            if name not in self.sidecar.fields:
+                # 缺少的字段补充进旁路缓存（重新生成）
+                sidecar = load_sidecar(self.file_path, fields=list(self.sidecar.fields) + [name])
+                if sidecar is None:
+                    raise KeyError(f"旁路缓存中没有字段 {name}，且无法重新生成")
+                self.sidecar = self.header = sidecar
+            return self.sidecar.fields[name]
+        return super().field(name)
+
+    def subset(self, indices):
+        las_data = super().subset(indices)
+        if self.records is None and self.sidecar is not None:
+            dimensions = set(las_data.point_format.dimension_names)
+            for name, values in self.sidecar.fields.items():
+                if name in dimensions:
+                    las_data[name] = values[indices]
+        return las_data
+
+
+def loaded_cloud(file_path):
+    """
+    以旁路缓存为数据源的共享点云，见 SidecarCloud
+
+    :param file_path: 输入LAS/LAZ文件路径
+    """
+    return SidecarCloud(file_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='生成/校验点云旁路缓存，并比较直接读取与内存映射读取的耗时')
+    parser.add_argument('input_file', help='输入的LAS/LAZ文件路径')
+    parser.add_argument('--fields', nargs='*', default=[], help='同时保存的附加字段，如 classification intensity')
+    parser.add_argument('--coord_dtype', choices=['float32', 'float64'], default='float32',
+                        help='局部坐标存储类型，float32在精度不足时自动退回float64 (默认: float32)')
+    parser.add_argument('--rebuild', action='store_true', help='忽略已有缓存，重新生成')
+    args = parser.parse_args()
+
+    with las_io.open_las(args.input_file) as reader:
+        frame_origin, frame_dtype = las_io.local_frame(reader.header, args.coord_dtype)
+
+    start = time.perf_counter()
+    las_data = las_io.read_las(args.input_file)
+    decoded = las_data.xyz
+    read_s = time.perf_counter() - start
+    print(f"直接读取并解码: {len(decoded)} 个点，耗时 {read_s:.3f} 秒")
+
+    if args.rebuild:
+        start = time.perf_counter()
+        sidecar = build_sidecar(args.input_file, frame_origin, frame_dtype, args.fields)
+        print(f"生成旁路缓存: 耗时 {time.perf_counter() - start:.3f} 秒")
+    else:
+        sidecar = load_sidecar(args.input_file, frame_origin, frame_dtype, args.fields)
+    if sidecar is None:
+        sys.exit(1)
+
+    start = time.perf_counter()
+    sidecar = open_sidecar(args.input_file, frame_origin, frame_dtype, args.fields)
+    local = np.array(sidecar.xyz)
+    open_s = time.perf_counter() - start
+    start = time.perf_counter()
+    restored = sidecar.absolute_xyz()
+    restore_s = time.perf_counter() - start
+    size_mb = sum(os.path.getsize(os.path.join(sidecar.directory, name))
+                  for name in os.listdir(sidecar.directory)) / 2 ** 20
+    print(f"旁路缓存 {sidecar.directory}: {size_mb:.1f} MB，{local.dtype.name}，字段 {list(sidecar.fields)}")
+    print(f"内存映射读取全部局部坐标: 耗时 {open_s:.3f} 秒（直接读取的 {open_s / read_s:.1%}）")
+    print(f"还原绝对坐标: 耗时 {restore_s:.3f} 秒")
+
+    same = np.array_equal(restored, decoded)
+    expected = np.empty_like(local)
+    for axis in range(3):
+        expected[:, axis] = decoded[:, axis] - frame_origin[axis]
+    same_local = np.array_equal(local, expected)
+    for name, values in sidecar.fields.items():
+        same = same and np.array_equal(values, np.asarray(las_data[name]))
+    print(f"与直接读取一致: 局部坐标 {'是' if same_local else '否'}，绝对坐标与字段 {'是' if same else '否'}")
+    sys.exit(0 if same and same_local else 1)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+局部坐标精度校验 - precision_check.py
+
+提取器读取时减去文件原点，并以 float32 存储局部坐标。本脚本校验两点：
+1. 读取往返：局部坐标加回原点后与 laspy 读出的原始坐标之差不超过半个LAS刻度；
+2. 端到端：分别以 float64 和 float32 局部坐标运行整体提取，端点JSON坐标与
+   平移向量之差不超过一个LAS刻度。
+任一项不满足时以非零状态码退出。
+
+使用方法:
+    python precision_check.py input.las --height_max 15
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+
+def roundtrip_error(extractor, input_file):
+    """
+    局部坐标加回原点后与原始坐标的最大偏差（每个坐标轴），以及所用的存储类型和LAS刻度
+    """
+    import laspy
+
+    las_data = laspy.read(input_file)
+    local = extractor._read_xyz(input_file)
+    origin, dtype = extractor._file_frame(input_file)
+    error = np.zeros(3)
+    for axis, values in enumerate((las_data.x, las_data.y, las_data.z)):
+        error[axis] = np.max(np.abs(local[:, axis].astype(np.float64) + origin[axis] - np.asarray(values)))
+    return error, np.dtype(dtype).name, np.asarray(las_data.header.scales, dtype=np.float64)
+
+
+def run_extraction(params, coord_dtype, input_file, min_line_length):
+    """
+    在临时目录中以给定坐标类型运行整体提取，返回 (端点列表, 平移向量)
+    """
+    from Extractor4 import PowerLineExtractor
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            extractor = PowerLineExtractor(enable_visualization=False, coord_dtype=coord_dtype, **params)
+            extractor.show_final_result = False
+            extractor.extract(input_file, min_line_length=min_line_length, visualize_steps=False)
+            base_name = os.path.splitext(os.path.basename(input_file))[0]
+            with open(f"{base_name}_powerline_endpoints.json", 'r', encoding='utf-8') as f:
+                endpoints = json.load(f)
+        finally:
+            os.chdir(cwd)
+    return endpoints, np.asarray(extractor.last_translation_vector, dtype=np.float64)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='校验float32局部坐标的输出精度')
+    parser.add_argument('input_file', help='输入的LAS文件路径')
+    parser.add_argument('--threshold', type=float, default=0.8, help='线特征阈值 (默认: 0.8)')
+    parser.add_argument('--radius', type=float, default=2.0, help='邻域搜索半径 (默认: 2.0)')
+    parser.add_argument('--height_min', type=float, default=0, help='最小高程 (默认: 0)')
+    parser.add_argument('--height_max', type=float, default=60, help='最大高程 (默认: 60)')
+    parser.add_argument('--eps', type=float, default=1.8, help='DBSCAN邻域半径 (默认: 1.8)')
+    parser.add_argument('--min_samples', type=int, default=7, help='DBSCAN最小样本数 (默认: 7)')
+    parser.add_argument('--min_line_length', type=float, default=30.0, help='最小长度阈值 (默认: 30.0)')
+    parser.add_argument('--roundtrip_only', action='store_true', help='只校验读取往返，不运行提取')
+    args = parser.parse_args()
+
+    from Extractor4 import PowerLineExtractor
+    from corridor_tiling import compare_endpoints
+
+    input_file = os.path.abspath(args.input_file)
+    params = dict(threshold=args.threshold, radius=args.radius, height_min=args.height_min,
+                  height_max=args.height_max, eps=args.eps, min_samples=args.min_samples)
+
+    error, dtype_name, scales = roundtrip_error(PowerLineExtractor(enable_visualization=False, **params), input_file)
+    roundtrip_ok = bool(np.all(error <= scales / 2 + 1e-9))
+    print(f"读取往返: 存储类型 {dtype_name}，最大偏差 "
+          f"[{error[0]:.2e}, {error[1]:.2e}, {error[2]:.2e}] 米，LAS刻度 {scales.tolist()} -> "
+          f"{'通过' if roundtrip_ok else '失败'}")
+    passed = roundtrip_ok
+
+    if not args.roundtrip_only:
+        tolerance = float(np.max(scales))
+        reference, reference_translation = run_extraction(params, 'float64', input_file, args.min_line_length)
+        compact, compact_translation = run_extraction(params, 'float32', input_file, args.min_line_length)
+        summary = compare_endpoints(reference, compact, tolerance=tolerance)
+        translation_error = float(np.max(np.abs(reference_translation - compact_translation)))
+        end_to_end_ok = summary['match'] and translation_error <= tolerance
+        print(f"端到端: float64 {summary['reference_lines']} 条 / float32 {summary['tiled_lines']} 条电力线，"
+              f"端点最大偏差 {summary['max_endpoint_deviation']:.2e} 米，平移向量偏差 {translation_error:.2e} 米，"
+              f"容差 {tolerance} 米 -> {'通过' if end_to_end_ok else '失败'}")
+        passed = passed and end_to_end_ok
+
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+读取/计算/写出重叠流水线 - prefetch.py
+
+有界内存模式逐块处理时，原先读取（解码LAS块、映射暂存窗口）、计算和写出严格串行，
+任何一方工作时另两方都在空等。本模块提供两个基于线程的环节：
+- Prefetcher：读取线程提前生成后续若干项放入有界队列，消费方（计算）取用当前项；
+- BackgroundWriter：写出线程按提交顺序执行写出任务，计算方提交后立即继续。
+
+文件读写和numpy/open3d的大部分操作会释放GIL，因此线程即可让I/O与计算重叠，
+且不需要在进程间复制点数据。队列长度决定额外驻留内存的块数。
+
+每个环节记录队列深度和双方的等待时间：消费方等待多说明受I/O限制，
+生产方（队列满）等待多说明受计算限制。
+"""
+
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class PipelineStats:
+    """
+    一个流水线环节的队列深度与等待时间统计
+    """
+
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.items = 0
+        self.producer_stall = 0.0   # 队列满时生产方的等待时间
+        self.consumer_stall = 0.0   # 队列空时消费方的等待时间
+        self.busy = 0.0             # 后台线程实际工作的时间
+        self._depth_sum = 0
+        self._depth_max = 0
+
+    def sample_depth(self, depth):
+        self._depth_sum += depth
+        self._depth_max = max(self._depth_max, depth)
+
+    def bound(self, io_side):
+        """
+        判断瓶颈：io_side 为 'consumer' 表示消费方等待即为等I/O（预读），'producer' 表示生产方等待即为等I/O（写出）
+        """
+        io_wait = self.consumer_stall if io_side == 'consumer' else self.producer_stall
+        compute_wait = self.producer_stall if io_side == 'consumer' else self.consumer_stall
+        if self.depth == 0:
+            return 'sequential'
+        return 'io' if io_wait > compute_wait else 'compute'
+
+    def to_dict(self, io_side='consumer'):
+        return {
+            'queue_size': self.depth,
+            'items': self.items,
+            'queue_depth_max': self._depth_max,
+            'queue_depth_mean': round(self._depth_sum / self.items, 2) if self.items else 0.0,
+            'producer_stall_s': round(self.producer_stall, 4),
+            'consumer_stall_s': round(self.consumer_stall, 4),
+            'busy_s': round(self.busy, 4),
+            'bound': self.bound(io_side),
+        }
+
+
+class Prefetcher:
+    """
+    在后台线程中迭代生产函数，把结果放入有界队列；本对象按顺序产出这些结果
+
+    depth 为0时在当前线程中按需生成（即原先的串行方式），仍记录生产耗时。
+    生产方抛出的异常在消费方取到该位置时重新抛出。
+    """
+
+    def __init__(self, producer, depth=2, name='prefetch'):
+        """
+        :param producer: 可迭代对象（通常是生成器），在读取线程中迭代
+        :param depth: 队列容量（预读的项数）
+        :param name: 环节名称（用于统计和线程名）
+        """
+        self.stats = PipelineStats(name, depth)
+        self._producer = producer
+        self._queue = None
+        self._stop = threading.Event()
+        self._thread = None
+        if depth > 0:
+            self._queue = queue.Queue(maxsize=depth)
+            self._thread = threading.Thread(target=self._run, name=f"{name}-reader", daemon=True)
+            self._thread.start()
+
+    def _put(self, item):
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.stats.producer_stall += time.perf_counter() - start
+
+    def _run(self):
+        try:
+            iterator = iter(self._producer)
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                self.stats.busy += time.perf_counter() - start
+                self._put((True, item))
+        except BaseException as error:  # 交给消费方重新抛出
+            self._put((False, error))
+            return
+        self._put((True, _DONE))
+
+    def __iter__(self):
+        if self._queue is None:
+            iterator = iter(self._producer)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                elapsed = time.perf_counter() - start
+                self.stats.busy += elapsed
+                self.stats.consumer_stall += elapsed
+                self.stats.items += 1
+                yield item
+            return
+        try:
+            while True:
+                self.stats.sample_depth(self._queue.qsize())
+                start = time.perf_counter()
+                ok, item = self._queue.get()
+                self.stats.consumer_stall += time.perf_counter() - start
+                if not ok:
+                    raise item
+                if item is _DONE:
+                    return
+                self.stats.items += 1
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        停止读取线程（消费方提前退出时丢弃剩余项）
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        while self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._thread = None
+
+
+class BackgroundWriter:
+    """
+    后台写出线程：按提交顺序执行写出任务，队列满时提交方等待
+
+    depth 为0时在当前线程中立即执行。写出任务抛出的异常在下一次 submit 或 close 时重新抛出。
+    """
+
+    def __init__(self, depth=2, name='writer'):
+        """
+        :param depth: 队列容量（待写出的任务数）
+        :param name: 环节名称（用于统计和线程名）
+        """
+        self.stats = PipelineStats(name, depth)
+        self._error = None
+        self._queue = None
+        self._thread = None
+        if depth > 0:
+            self._queue = queue.Queue(maxsize=depth)
+            self._thread = threading.Thread(target=self._run, name=f"{name}-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            start = time.perf_counter()
+            task = self._queue.get()
+            self.stats.consumer_stall += time.perf_counter() - start
+            if task is _DONE:
+                return
+            if self._error is not None:
+                continue
+            fn, args = task
+            start = time.perf_counter()
+            try:
+                fn(*args)
+            except BaseException as error:
+                self._error = error
+            self.stats.busy += time.perf_counter() - start
+
+    def _raise_pending(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def submit(self, fn, *args):
+        """
+        提交写出任务 fn(*args)；参数在写出完成前不应再被修改
+        """
+        self._raise_pending()
+        self.stats.items += 1
+        if self._queue is None:
+            start = time.perf_counter()
+            fn(*args)
+            elapsed = time.perf_counter() - start
+            self.stats.busy += elapsed
+            self.stats.producer_stall += elapsed
+            return
+        self.stats.sample_depth(self._queue.qsize())
+        start = time.perf_counter()
+        self._queue.put((fn, args))
+        self.stats.producer_stall += time.perf_counter() - start
+
+    def close(self):
+        """
+        等待所有已提交的任务写出完成
+        """
+        if self._thread is not None:
+            self._queue.put(_DONE)
+            self._thread.join()
+            self._thread = None
+        self._raise_pending()
+
+    def abort(self):
+        """
+        出错退出时停止写出线程（不再抛出写出任务的异常）；已经 close 时不做任何事
+        """
+        if self._thread is not None:
+            self._error = self._error or RuntimeError('写出已中止')
+            self._queue.put(_DONE)
+            self._thread.join()
+            self._thread = None
+        self._error = None
+
+
+def summarize(stats_list):
+    """
+    汇总若干环节的统计，返回 {环节名: 统计字典} 与一行文字说明
+    """
+    result = {}
+    parts = []
+    for stats, io_side in stats_list:
+        info = stats.to_dict(io_side)
+        result[stats.name] = info
+        label = {'io': 'I/O受限', 'compute': '计算受限', 'sequential': '串行'}[info['bound']]
+        parts.append(f"{stats.name}: 队列最大深度 {info['queue_depth_max']}/{info['queue_size']}，"
+                     f"生产方等待 {info['producer_stall_s']:.2f} 秒，消费方等待 {info['consumer_stall_s']:.2f} 秒 -> {label}")
+    return result, '；'.join(parts)
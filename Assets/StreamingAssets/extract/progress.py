@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+进度输出协议 - progress.py
+
+支持两种进度输出格式：
+- text : 原有行为，使用 tqdm 进度条和自由格式的 print 文本。
+- jsonl: 面向 Unity 宿主的结构化协议，每行一个JSON事件：
+         {"event": "progress", "stage": ..., "done": ..., "total": ..., "eta_s": ..., "rss_mb": ...}
+         进度事件按时间间隔节流；两遍提取的预览结果写出后输出一条
+         {"event": "preview", ...} 事件；运行结束时输出一条
+         {"event": "result", "success": ..., ...} 终止事件。
+         该模式下 tqdm 和普通 print 输出会被屏蔽，避免热点循环中的控制台开销。
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+
+from perf_trace import current_rss_bytes
+
+PROGRESS_FORMATS = ('text', 'jsonl')
+
+
+class _NullWriter:
+    """
+    丢弃所有写入的输出流，用于屏蔽 jsonl 模式下的自由文本输出。
+    """
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class ProgressReporter:
+    """
+    进度汇报器：text 模式下包装 tqdm，jsonl 模式下输出节流的JSON事件
+    """
+
+    def __init__(self, fmt='text', interval_ms=250, stream=None):
+        """
+        :param fmt: 输出格式，'text' 或 'jsonl'
+        :param interval_ms: jsonl 模式下同一阶段两次进度事件的最小间隔（毫秒）
+        :param stream: 事件输出流，None表示进程启动时的标准输出
+        """
+        if fmt not in PROGRESS_FORMATS:
+            raise ValueError(f"未知的进度格式: {fmt}，可选: {PROGRESS_FORMATS}")
+        self.fmt = fmt
+        self.interval = interval_ms / 1000.0
+        self.stream = stream or sys.stdout
+        self._stage_start = {}
+        self._last_emit = {}
+
+    @property
+    def structured(self):
+        return self.fmt == 'jsonl'
+
+    def _emit(self, payload):
+        self.stream.write(json.dumps(payload, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+    def update(self, stage, done, total=None, force=False):
+        """
+        汇报某阶段的进度；jsonl 模式下按间隔节流，完成时总会输出。
+        """
+        if not self.structured:
+            return
+        now = time.perf_counter()
+        start = self._stage_start.setdefault(stage, now)
+        finished = total is not None and done >= total
+        if not (force or finished) and now - self._last_emit.get(stage, 0.0) < self.interval:
+            return
+        self._last_emit[stage] = now
+
+        eta = None
+        if total and done > 0:
+            eta = round((now - start) / done * (total - done), 2)
+        rss = current_rss_bytes()
+        self._emit({
+            'event': 'progress',
+            'stage': stage,
+            'done': int(done),
+            'total': None if total is None else int(total),
+            'eta_s': eta,
+            'rss_mb': None if rss is None else round(rss / (1024 * 1024), 1),
+        })
+
+    def begin_stage(self, stage):
+        """
+        标记阶段开始（jsonl 模式下立即输出一条 done=0 的事件）。
+        """
+        self._stage_start[stage] = time.perf_counter()
+        self.update(stage, 0, None, force=True)
+
+    def end_stage(self, stage):
+        """
+        标记阶段结束（jsonl 模式下输出一条 done=total=1 的事件）。
+        """
+        self.update(stage, 1, 1, force=True)
+        self._stage_start.pop(stage, None)
+
+    def iter(self, iterable, stage, total=None, desc=None, **tqdm_kwargs):
+        """
+        包装一个可迭代对象：text 模式返回 tqdm 进度条，jsonl 模式按节流输出进度事件。
+        """
+        if not self.structured:
+            from tqdm import tqdm
+            tqdm_kwargs.setdefault('ncols', 100)
+            return tqdm(iterable, desc=desc or stage, total=total, **tqdm_kwargs)
+        if total is None and hasattr(iterable, '__len__'):
+            total = len(iterable)
+        return self._iter_events(iterable, stage, total)
+
+    def _iter_events(self, iterable, stage, total):
+        self._stage_start[stage] = time.perf_counter()
+        done = 0
+        for item in iterable:
+            yield item
+            done += 1
+            self.update(stage, done, total)
+        # 迭代次数少于 total（或 total 未知）时补发最终进度；正常完成时 update 已输出
+        if total is None or done < total:
+            self.update(stage, done, total, force=True)
+
+    def preview(self, **fields):
+        """
+        输出预览事件（jsonl 模式）：预览文件已写出，宿主可以先行加载；之后仍会有进度和终止事件。
+        """
+        if self.structured:
+            payload = {'event': 'preview'}
+            payload.update(fields)
+            self._emit(payload)
+
+    def result(self, success=True, **fields):
+        """
+        输出终止事件（jsonl 模式）；text 模式下不输出，由调用方自行打印结果。
+        """
+        if self.structured:
+            payload = {'event': 'result', 'success': success}
+            payload.update(fields)
+            self._emit(payload)
+
+    @contextlib.contextmanager
+    def quiet(self):
+        """
+        jsonl 模式下屏蔽 print 和 tqdm 的自由文本输出，事件仍写入原始标准输出。
+        """
+        if not self.structured:
+            yield
+            return
+        saved_stdout = sys.stdout
+        sys.stdout = _NullWriter()
+        # stderr 保留给异常回溯；第三方代码中的 tqdm 通过环境变量关闭，退出时恢复原值，
+        # 同一进程中之后的调用（常驻服务、批处理）仍有进度条
+        saved_disable = os.environ.get('TQDM_DISABLE')
+        os.environ['TQDM_DISABLE'] = '1'
+        try:
+            yield
+        finally:
+            sys.stdout = saved_stdout
+            if saved_disable is None:
+                os.environ.pop('TQDM_DISABLE', None)
+            else:
+                os.environ['TQDM_DISABLE'] = saved_disable
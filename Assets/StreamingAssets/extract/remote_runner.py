@@ -7,6 +7,7 @@ from tqdm import tqdm
 import laspy
 import open3d as o3d
 import numpy as np
+import point_sidecar
 
 # SSH连接信息
 # 将这些信息放在脚本顶部，方便管理
@@ -152,16 +153,26 @@ def download_with_rsync(remote_path, local_dir):
         raise subprocess.CalledProcessError(process.returncode, command)
 
 
-def visualize_las_file(las_file_path):
-    """使用laspy读取las文件并用open3d可视化"""
+# 可视化用到的附加字段，旁路缓存中一并保存（文件中没有的字段忽略）
+VISUALIZE_FIELDS = ('red', 'green', 'blue', 'intensity')
+
+
+def visualize_las_file(las_file_path, use_sidecar=False):
+    """使用laspy读取las文件并用open3d可视化；use_sidecar 时经由旁路缓存读取（内容未变时重复下载也可复用）"""
     print(f"正在读取LAS文件: {las_file_path}")
     
     try:
-        # 使用laspy读取las文件
-        las = laspy.read(las_file_path)
-        
-        # 提取xyz坐标
-        points = np.vstack((las.x, las.y, las.z)).transpose()
+        sidecar = point_sidecar.load_sidecar(las_file_path, fields=VISUALIZE_FIELDS) if use_sidecar else None
+        if sidecar is not None:
+            # 旁路缓存：坐标由内存映射的局部坐标还原，字段按属性访问
+            las = argparse.Namespace(**sidecar.fields)
+            points = sidecar.absolute_xyz()
+        else:
+            # 使用laspy读取las文件
+            las = laspy.read(las_file_path)
+            
+            # 提取xyz坐标
+            points = np.vstack((las.x, las.y, las.z)).transpose()
         
         print(f"点云包含 {len(points)} 个点")
         print(f"点云范围:")
@@ -220,6 +231,8 @@ def main():
     parser.add_argument("--input", required=True, help="Local input LAS file path.")
     parser.add_argument("--output", required=True, help="Local output LAS file path.")
     parser.add_argument("--visualize", action='store_true', help="Visualize the output file automatically after download.")
+    parser.add_argument("--sidecar_cache", action='store_true',
+                        help="Read the downloaded file through a binary sidecar cache (<file>.sidecar) for visualization.")
     args = parser.parse_args()
 
     local_input_path = args.input
@@ -285,7 +298,7 @@ def main():
         
         # 步骤 4: 可视化下载的文件
         if args.visualize or input("Do you want to visualize the downloaded LAS file? (y/N): ").lower().startswith('y'):
-            visualize_las_file(local_output_path)
+            visualize_las_file(local_output_path, use_sidecar=args.sidecar_cache)
 
     except Exception as e:
         print(f"\nAn error occurred: {e}")
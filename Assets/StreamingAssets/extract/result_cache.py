@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+提取结果缓存 - result_cache.py
+
+以内容寻址的方式缓存整次提取的输出文件（端点JSON、电力线LAS、塔坐标CSV、高度图等）：
+1.  键由输入文件内容哈希 + 提取器版本 + 参数派生，与文件名和路径无关，
+    同一份数据换个名字或换个目录仍然命中；
+2.  内容哈希默认只读取LAS头部（含VLR）和均匀抽样的若干数据块，GB级文件也只需读取几MB；
+    需要严格校验时可改用全文件哈希（两种哈希得到的键互不相同）；
+3.  每个条目是缓存目录下以键命名的子目录，包含输出文件和 manifest.json，
+    先写临时目录再原子重命名，中断的写入不会留下半个条目；
+4.  按缓存目录总大小进行LRU淘汰（以 manifest.json 的修改时间作为最近访问时间）。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+import time
+
+# 条目格式变化时递增，使旧缓存全部失效
+RESULT_CACHE_VERSION = 1
+
+DEFAULT_RESULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'powerline_extractor', 'results')
+
+MANIFEST_NAME = 'manifest.json'
+
+# 抽样哈希：头部最多读取的字节数、抽样块数和块大小
+HEADER_BYTES_LIMIT = 1024 * 1024
+SAMPLE_CHUNKS = 16
+SAMPLE_CHUNK_SIZE = 64 * 1024
+
+
+def _las_header_size(f):
+    """
+    读取LAS公共头中的点数据偏移（字节96处的uint32），即头部与VLR的总长度；非LAS文件返回0
+    """
+    f.seek(0)
+    head = f.read(100)
+    if len(head) < 100 or head[:4] != b'LASF':
+        return 0
+    return struct.unpack('<I', head[96:100])[0]
+
+
+def content_hash(file_path, full=False, chunk_size=8 * 1024 * 1024):
+    """
+    计算文件内容哈希
+
+    :param file_path: 文件路径
+    :param full: True 读取全文件；False 只读取头部和均匀抽样的数据块
+    :param chunk_size: 全文件哈希时每次读取的字节数
+    :return: 带前缀的十六进制摘要（'full:' 或 'sampled:'）
+    """
+    size = os.path.getsize(file_path)
+    h = hashlib.sha1()
+    h.update(str(size).encode('ascii'))
+    with open(file_path, 'rb') as f:
+        if full:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                h.update(chunk)
+            return f"full:{h.hexdigest()}"
+
+        # 头部（公共头 + VLR）完整参与哈希，点数、范围、刻度和坐标系的任何变化都会改变键
+        header_bytes = min(max(_las_header_size(f), 4096), HEADER_BYTES_LIMIT, size)
+        f.seek(0)
+        h.update(f.read(header_bytes))
+
+        # 数据区均匀抽样，最后一块对齐到文件末尾
+        body = size - header_bytes
+        if body > 0:
+            count = min(SAMPLE_CHUNKS, max(1, body // SAMPLE_CHUNK_SIZE))
+            step = max(body - SAMPLE_CHUNK_SIZE, 0) / max(count - 1, 1)
+            for i in range(count):
+                f.seek(header_bytes + int(round(i * step)))
+                h.update(f.read(SAMPLE_CHUNK_SIZE))
+    return f"sampled:{h.hexdigest()}"
+
+
+class ResultCache:
+    """
+    内容寻址的提取结果缓存：键 -> 一组输出文件 + 元数据
+    """
+
+    def __init__(self, cache_dir=None, max_size_mb=4096, full_hash=False):
+        """
+        :param cache_dir: 缓存目录，None则使用用户缓存目录
+        :param max_size_mb: 缓存目录最大容量（MB），超出后按最久未使用淘汰
+        :param full_hash: 是否对输入文件做全文件哈希（默认抽样哈希）
+        """
+        self.cache_dir = cache_dir or DEFAULT_RESULT_CACHE_DIR
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.full_hash = full_hash
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._hashes = {}
+
+    def file_hash(self, file_path):
+        """
+        输入文件的内容哈希；进程内按 (路径, 大小, 修改时间) 记忆
+        """
+        stat = os.stat(file_path)
+        ident = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, self.full_hash)
+        if ident not in self._hashes:
+            self._hashes[ident] = content_hash(file_path, full=self.full_hash)
+        return self._hashes[ident]
+
+    def key(self, input_file, kind, version, params):
+        """
+        派生缓存键：sha1(缓存版本 + 条目类型 + 提取器版本 + 内容哈希 + 参数)
+
+        :param input_file: 输入文件路径
+        :param kind: 条目类型（如 'extract'、'worker'、'towers'），不同入口的输出互不混用
+        :param version: 产生输出的程序版本，算法变化时由调用方递增
+        :param params: 影响输出的参数字典
+        """
+        payload = json.dumps(params, sort_keys=True, default=str)
+        text = f"v{RESULT_CACHE_VERSION}|{kind}|{version}|{self.file_hash(input_file)}|{payload}"
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def lookup(self, key):
+        """
+        查找条目，命中返回 manifest 字典（并刷新访问时间），未命中或条目不完整返回None
+        """
+        entry_dir = self._entry_dir(key)
+        manifest_path = os.path.join(entry_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not all(os.path.exists(os.path.join(entry_dir, name)) for name in manifest.get('files', {}).values()):
+            return None
+        now = time.time()
+        os.utime(manifest_path, (now, now))
+        return manifest
+
+    def file_path(self, key, name):
+        """
+        返回条目中某个输出文件在缓存目录内的路径
+        """
+        manifest = self.lookup(key)
+        if manifest is None or name not in manifest['files']:
+            return None
+        return os.path.join(self._entry_dir(key), manifest['files'][name])
+
+    def restore(self, key, targets):
+        """
+        将条目中的输出文件复制到目标路径
+
+        :param key: 缓存键
+        :param targets: {输出名: 目标路径}，条目中没有的输出名会被忽略
+        :return: manifest 字典；未命中返回None（不复制任何文件）
+        """
+        manifest = self.lookup(key)
+        if manifest is None:
+            return None
+        for name, target in targets.items():
+            stored = manifest['files'].get(name)
+            if stored is None:
+                continue
+            target_dir = os.path.dirname(os.path.abspath(target))
+            os.makedirs(target_dir, exist_ok=True)
+            shutil.copyfile(os.path.join(self._entry_dir(key), stored), target)
+        return manifest
+
+    def store(self, key, files, metadata=None):
+        """
+        保存一组输出文件（先写临时目录再原子重命名），然后执行容量淘汰
+
+        :param key: 缓存键
+        :param files: {输出名: 源文件路径}，不存在的源文件会被跳过
+        :param metadata: 附加的JSON元数据（如平移向量、线数）
+        :return: 写入的 manifest 字典
+        """
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        stored = {}
+        for name, source in files.items():
+            if source is None or not os.path.exists(source):
+                continue
+            stored_name = f"{name}{os.path.splitext(source)[1]}"
+            shutil.copyfile(source, os.path.join(tmp_dir, stored_name))
+            stored[name] = stored_name
+        manifest = {
+            'key': key,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'files': stored,
+            'metadata': metadata or {},
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # 并发写入同一个键时保留先完成的那份；没有 manifest 的残留目录直接替换
+        if not os.path.exists(os.path.join(entry_dir, MANIFEST_NAME)):
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+        return manifest
+
+    def evict(self):
+        """
+        缓存总大小超过上限时，按最久未使用顺序删除条目。
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            manifest_path = os.path.join(entry_dir, MANIFEST_NAME)
+            if '.tmp-' in name or not os.path.exists(manifest_path):
+                continue
+            size = 0
+            for file_name in os.listdir(entry_dir):
+                try:
+                    size += os.path.getsize(os.path.join(entry_dir, file_name))
+                except OSError:
+                    pass
+            entries.append((os.path.getmtime(manifest_path), size, entry_dir))
+            total += size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+阶段检查点缓存 - stage_cache.py
+
+为 PowerLineExtractor.extract() 的各个阶段提供磁盘缓存：
+1.  键由输入文件内容哈希 + 各阶段参数逐级链式派生，任一阶段参数变化只会让
+    该阶段及其后续阶段失效，前面的阶段仍可复用。
+2.  每个阶段的输出以 .npz 文件保存（线段列表打包为连续点数组 + 偏移量）。
+    高程滤波在读取时完成（chunked_reader），不单独缓存，续算最早从线性特征之后开始；
+    高程带参数计入线性特征阶段的键。
+3.  按缓存目录总大小进行LRU淘汰（以文件修改时间作为最近访问时间）。
+4.  MemoryStageCache 在磁盘缓存之上增加进程内的LRU层，供常驻服务跨请求复用。
+
+使用方法（在临时缓存目录中先完整提取一次，再从缓存续算一次，比较线数和平移向量）:
+    python stage_cache.py input.las --min_line_length 50
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# 阶段输出格式或算法变化时递增，使旧缓存全部失效
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'powerline_extractor', 'stages')
+
+# extract() 中可缓存的阶段，按执行顺序排列
+STAGES = ('linearity', 'dbscan', 'separate', 'split', 'merge')
+
+
+def pack_lines(lines):
+    """
+    将若干条线的点数组打包为连续数组 + 偏移量，便于存入npz。
+    """
+    if not lines:
+        return {'points': np.zeros((0, 3)), 'offsets': np.zeros(1, dtype=np.int64)}
+    counts = np.array([len(p) for p in lines], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    return {'points': np.vstack(lines), 'offsets': offsets}
+
+
+def unpack_lines(arrays):
+    """
+    pack_lines 的逆操作，返回点数组列表（视图，不复制）。
+    """
+    points, offsets = arrays['points'], arrays['offsets']
+    return [points[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+class StageCache:
+    """
+    基于输入内容哈希和阶段参数的阶段检查点缓存
+    """
+
+    def __init__(self, cache_dir=None, max_size_mb=2048):
+        """
+        :param cache_dir: 缓存目录，None则使用用户缓存目录
+        :param max_size_mb: 缓存目录最大容量（MB），超出后按最久未使用淘汰
+        """
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._hash_index_path = os.path.join(self.cache_dir, 'hash_index.json')
+
+    def file_hash(self, file_path, chunk_size=8 * 1024 * 1024):
+        """
+        计算输入文件的内容哈希；按 (路径, 大小, 修改时间) 记忆，文件未变化时不重复读取。
+        """
+        stat = os.stat(file_path)
+        ident = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        index = {}
+        if os.path.exists(self._hash_index_path):
+            try:
+                with open(self._hash_index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                index = {}
+        if ident in index:
+            return index[ident]
+
+        h = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                h.update(chunk)
+        digest = h.hexdigest()
+
+        index[ident] = digest
+        try:
+            with open(self._hash_index_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+        except OSError:
+            pass
+        return digest
+
+    def chain_keys(self, input_file, stage_params):
+        """
+        逐级派生各阶段的缓存键：key_i = sha1(key_{i-1} + 阶段名 + 参数)
+
+        :param input_file: 输入文件路径
+        :param stage_params: [(阶段名, 参数字典), ...]，按执行顺序
+        :return: {阶段名: 键}
+        """
+        parent = f"v{CACHE_VERSION}:{self.file_hash(input_file)}"
+        keys = {}
+        for stage, params in stage_params:
+            payload = json.dumps(params, sort_keys=True, default=str)
+            parent = hashlib.sha1(f"{parent}|{stage}|{payload}".encode('utf-8')).hexdigest()
+            keys[stage] = parent
+        return keys
+
+    def _path(self, stage, key):
+        return os.path.join(self.cache_dir, f"{stage}_{key}.npz")
+
+    def has(self, stage, key):
+        return os.path.exists(self._path(stage, key))
+
+    def load_latest(self, keys):
+        """
+        读取能成功读取的最深阶段（由于键链式派生，其之前的前缀一定有效）。
+        最深的缓存文件损坏或在读取前被其他进程淘汰时退回更浅的阶段，保证续算的起点确实有数据。
+
+        :return: (阶段名, {名称: 数组})，无可用缓存返回 (None, None)
+        """
+        for stage in reversed(list(keys)):
+            if self.has(stage, keys[stage]):
+                arrays = self.load(stage, keys[stage])
+                if arrays is not None:
+                    return stage, arrays
+        return None, None
+
+    def load(self, stage, key):
+        """
+        读取阶段输出，返回 {名称: 数组}；未命中或文件损坏返回None。
+        """
+        path = self._path(stage, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            return None
+        # 更新访问时间，供LRU淘汰使用
+        now = time.time()
+        os.utime(path, (now, now))
+        return arrays
+
+    def save(self, stage, key, arrays):
+        """
+        保存阶段输出（先写临时文件再原子替换），然后执行容量淘汰。
+        """
+        path = self._path(stage, key)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """
+        缓存总大小超过上限时，按最久未使用顺序删除文件。
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npz'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+class MemoryStageCache(StageCache):
+    """
+    带进程内LRU层的阶段缓存：命中时直接返回内存中的数组，未命中时回退到磁盘缓存
+    """
+
+    def __init__(self, cache_dir=None, max_size_mb=2048, max_memory_mb=1024):
+        """
+        :param cache_dir: 磁盘缓存目录
+        :param max_size_mb: 磁盘缓存最大容量（MB）
+        :param max_memory_mb: 内存层最大容量（MB）
+        """
+        super().__init__(cache_dir, max_size_mb)
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._hashes = {}
+
+    def file_hash(self, file_path, chunk_size=8 * 1024 * 1024):
+        stat = os.stat(file_path)
+        ident = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        if ident not in self._hashes:
+            self._hashes[ident] = super().file_hash(file_path, chunk_size)
+        return self._hashes[ident]
+
+    def has(self, stage, key):
+        return (stage, key) in self._entries or super().has(stage, key)
+
+    def _remember(self, stage, key, arrays):
+        nbytes = sum(np.asarray(a).nbytes for a in arrays.values())
+        if nbytes > self.max_memory_bytes:
+            return
+        old = self._entries.pop((stage, key), None)
+        if old is not None:
+            self._memory_bytes -= old[1]
+        self._entries[(stage, key)] = (arrays, nbytes)
+        self._memory_bytes += nbytes
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._memory_bytes -= size
+
+    def load(self, stage, key):
+        entry = self._entries.get((stage, key))
+        if entry is not None:
+            self._entries.move_to_end((stage, key))
+            return entry[0]
+        arrays = super().load(stage, key)
+        if arrays is not None:
+            self._remember(stage, key, arrays)
+        return arrays
+
+    def save(self, stage, key, arrays):
+        super().save(stage, key, arrays)
+        self._remember(stage, key, {name: np.asarray(a) for name, a in arrays.items()})
+
+    def memory_usage(self):
+        """
+        返回内存层的条目数与占用字节数。
+        """
+        return {'entries': len(self._entries), 'bytes': self._memory_bytes}
+
+    def clear_memory(self):
+        self._entries.clear()
+        self._memory_bytes = 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='阶段缓存续算与完整提取的一致性检查')
+    parser.add_argument('input_file', help='输入的LAS文件路径')
+    parser.add_argument('--min_line_length', type=float, default=30.0,
+                        help='续算时使用的最小长度阈值，可与完整提取不同 (默认: 30.0)')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from Extractor4 import PowerLineExtractor
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        runs = {}
+        for name, min_line_length in (('cold', 30.0), ('resumed', args.min_line_length)):
+            extractor = PowerLineExtractor(enable_visualization=False)
+            lines = extractor.extract(args.input_file, use_cache=True, cache_dir=cache_dir,
+                                      use_result_cache=False, min_line_length=min_line_length)
+            runs[name] = (len(lines), getattr(extractor, 'last_translation_vector', None))
+
+    for name, (count, vector) in runs.items():
+        vector_text = '无' if vector is None else f"[{vector[0]:.3f}, {vector[1]:.3f}, {vector[2]:.3f}]"
+        print(f"{name}: {count} 条电力线，平移向量 {vector_text}")
+    # 没有提取到电力线时没有平移向量，无法比较
+    vectors = [vector for _, vector in runs.values()]
+    same = all(vector is not None for vector in vectors) and np.allclose(vectors[0], vectors[1])
+    print(f"平移向量一致: {'是' if same else '否'}")
+    sys.exit(0 if same else 1)
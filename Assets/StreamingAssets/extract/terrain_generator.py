@@ -22,13 +22,20 @@
 import laspy
 import numpy as np
 import scipy.ndimage
-import open3d as o3d
 import os
 import numba
 import time
 import json
 import argparse
 
+import las_io
+import point_sidecar
+from perf_trace import PerfTrace
+from lazy_imports import lazy_module
+
+# open3d 仅用于可视化，首次使用时再导入
+o3d = lazy_module('open3d')
+
 
 # ==============================================================================
 #  核心算法函数
@@ -75,24 +82,37 @@ def grow_ground_from_grid_numba(
 
 
 def extract_ground_ultra_fast(
-    input_las_path: str,
+    input_las_path: str = None,
     thinning_resolution: float = 0.5,
     initial_grid_size: float = 15.0,
-    iteration_thresholds: list = None
+    iteration_thresholds: list = None,
+    trace: PerfTrace = None,
+    cloud: las_io.LoadedCloud = None
 ) -> laspy.LasData:
     """
     终极速度优化版地面提取：数据精简 + 无KD-Tree格网增长。
+    传入 trace 时记录各步骤的时间、内存与点数。
+    传入 cloud（las_io.LoadedCloud）时直接使用其坐标与点记录，不再读取 input_las_path；
+    cloud 尚未读取时在 'ground_read' 阶段读取，已读取时不记录读取阶段。
     """
     if iteration_thresholds is None:
         iteration_thresholds = [0.25, 0.5, 1.0, 1.5]
+    if trace is None:
+        trace = PerfTrace('terrain', trace_malloc=False)
     
     print("--- 开始地面点提取 (终极速度版) ---")
-    las = laspy.read(input_las_path)
-    all_points_xyz = np.vstack((las.x, las.y, las.z)).transpose()
+    if cloud is None:
+        cloud = las_io.LoadedCloud(input_las_path)
+    if not cloud.loaded:
+        trace.start('ground_read')
+        cloud.load()
+        trace.stop('ground_read', output_points=len(cloud))
+    all_points_xyz = cloud.xyz
     print(f"原始点云数量: {len(all_points_xyz)}")
 
     print(f"\n步骤 1: 执行数据精简 (格网分辨率: {thinning_resolution}m)...")
     start_time = time.time()
+    trace.start('ground_thinning', input_points=len(all_points_xyz))
 
     x_min, y_min = np.min(all_points_xyz[:, 0]), np.min(all_points_xyz[:, 1])
     x_max, y_max = np.max(all_points_xyz[:, 0]), np.max(all_points_xyz[:, 1])
@@ -108,8 +128,8 @@ def extract_ground_ultra_fast(
     thinned_indices = sorted_indices[first_indices]
 
     points = all_points_xyz[thinned_indices]
-    original_points_subset = las.points[thinned_indices]
     n_points = len(points)
+    trace.stop('ground_thinning', output_points=n_points)
 
     print(f"数据精简完成，耗时: {time.time() - start_time:.4f} 秒。")
     print(f"精简后点云数量: {n_points} (减少了 {len(all_points_xyz) - n_points} 个点)")
@@ -117,6 +137,7 @@ def extract_ground_ultra_fast(
     is_ground = np.zeros(n_points, dtype=bool)
     print("\n步骤 2: (向量化) 在粗糙网格中寻找最低点作为初始地面种子...")
     start_time = time.time()
+    trace.start('ground_seeds', input_points=n_points)
 
     seed_cell_x = ((points[:, 0] - x_min) / initial_grid_size).astype(np.int32)
     seed_cell_y = ((points[:, 1] - y_min) / initial_grid_size).astype(np.int32)
@@ -128,9 +149,11 @@ def extract_ground_ultra_fast(
     initial_ground_indices = sorted_indices_seed[first_indices_seed]
 
     is_ground[initial_ground_indices] = True
+    trace.stop('ground_seeds', output_points=len(initial_ground_indices))
     print(f"提取完成，耗时: {time.time() - start_time:.4f} 秒。找到 {len(initial_ground_indices)} 个种子点。")
 
     print("\n步骤 3: 执行无KD-Tree的格网增长迭代...")
+    trace.start('ground_growth', input_points=n_points)
     grid_h = int((y_max - y_min) / thinning_resolution) + 1
     grid_w = num_cells_x
     ground_elevation_grid = np.full((grid_h, grid_w), np.nan, dtype=np.float32)
@@ -163,8 +186,8 @@ def extract_ground_ultra_fast(
     print("\n所有迭代完成，正在创建结果对象...")
     final_ground_indices = np.where(is_ground)[0]
 
-    ground_las = laspy.LasData(las.header)
-    ground_las.points = original_points_subset[final_ground_indices]
+    ground_las = cloud.subset(thinned_indices[final_ground_indices])
+    trace.stop('ground_growth', output_points=len(final_ground_indices))
 
     return ground_las
 
@@ -206,6 +229,19 @@ def fill_holes_fast(grid_z: np.ndarray) -> np.ndarray:
     return filled_grid
 
 
+def warmup_numba_kernels() -> None:
+    """
+    用极小的输入触发 Numba 核函数的JIT编译（参数类型与实际调用一致），供常驻进程启动时预热。
+    """
+    points = np.zeros((4, 3), dtype=np.float64)
+    grid = np.full((3, 3), np.nan, dtype=np.float32)
+    grow_ground_from_grid_numba(
+        np.arange(4, dtype=np.int64), points, grid, np.zeros(4, dtype=bool),
+        np.float64(0.0), np.float64(0.0), 1.0, 3, 3, 0.5
+    )
+    grid_lowest_point_numba(points, 1.0, np.float64(0.0), np.float64(0.0), 3, 3)
+
+
 # ==============================================================================
 #  作为独立脚本运行时的示例入口 (用于测试)
 # ==============================================================================
@@ -214,18 +250,27 @@ if __name__ == '__main__':
     parser.add_argument('--input', type=str, required=True, help="输入的.las或.laz文件路径。")
     parser.add_argument('--output_raw', type=str, required=True, help="输出的.raw高度图文件路径。")
     parser.add_argument('--thinning_res', type=float, default=0.5, help="数据精简的格网分辨率(米)。")
+    parser.add_argument('--sidecar_cache', action='store_true',
+                        help="经由输入文件旁的二进制旁路缓存(<文件名>.sidecar)读取，缓存无效时生成。")
     parser.add_argument('--grid_size', type=float, default=15.0, help="提取初始种子的粗糙格网大小(米)。")
     parser.add_argument('--terrain_res', type=float, default=1.0, help="最终高度图的分辨率(米)。")
     parser.add_argument('--visualize', action='store_true', help="如果设置此项，则在脚本结束前显示提取出的地面点云。")
+    parser.add_argument('--profile_stages', type=str, default=None, help="用cProfile包裹的阶段，逗号分隔或all。")
+    parser.add_argument('--profile_dir', type=str, default='.', help=".prof文件输出目录。")
+    parser.add_argument('--trace_malloc', action='store_true', help="用tracemalloc记录各阶段的Python分配峰值（仅用于诊断）。")
 
     args = parser.parse_args()
+    trace = PerfTrace('terrain', trace_malloc=args.trace_malloc, profile_stages=args.profile_stages,
+                      profile_dir=args.profile_dir)
 
     # 1. 提取地面点
     ground_data = extract_ground_ultra_fast(
         input_las_path=args.input,
         thinning_resolution=args.thinning_res,
         initial_grid_size=args.grid_size,
-        iteration_thresholds=[0.25, 0.5, 1.0, 1.5]
+        iteration_thresholds=[0.25, 0.5, 1.0, 1.5],
+        trace=trace,
+        cloud=point_sidecar.loaded_cloud(args.input) if args.sidecar_cache else None
     )
     if not (ground_data and len(ground_data.points) > 0):
         print(json.dumps({"error": "未能提取任何地面点。"}))
@@ -247,14 +292,18 @@ if __name__ == '__main__':
 
     # 2. 生成稀疏高程格网
     ground_xyz = ground_data.xyz
+    trace.start('heightmap_grid', input_points=len(ground_xyz))
     x_min, y_min, _ = np.min(ground_xyz, axis=0)
     x_max, y_max, _ = np.max(ground_xyz, axis=0)
     grid_w = int(np.ceil((x_max - x_min) / args.terrain_res))
     grid_h = int(np.ceil((y_max - y_min) / args.terrain_res))
     sparse_grid_z = grid_lowest_point_numba(ground_xyz, args.terrain_res, x_min, y_min, grid_w, grid_h)
+    trace.stop('heightmap_grid', output_points=int(np.count_nonzero(~np.isnan(sparse_grid_z))))
 
     # 3. 填充空洞
+    trace.start('heightmap_fill')
     filled_grid_z = fill_holes_fast(sparse_grid_z)
+    trace.stop('heightmap_fill', output_points=int(filled_grid_z.size))
 
     # 4. 准备导出高度图
     min_h, max_h = np.min(filled_grid_z), np.max(filled_grid_z)
@@ -265,8 +314,12 @@ if __name__ == '__main__':
         normalized_h = np.zeros_like(filled_grid_z)
     heightmap_16bit = (normalized_h * 65535).astype(np.uint16)
 
+    trace.start('write_heightmap')
     with open(args.output_raw, 'wb') as f:
         f.write(heightmap_16bit.T.tobytes())
+    trace.stop('write_heightmap')
+    trace_path = trace.write(os.path.splitext(args.output_raw)[0] + "_perf_trace.json")
+    trace.close()
 
     # 5. 打印元数据
     metadata = {
@@ -276,6 +329,7 @@ if __name__ == '__main__':
         "terrainWorldWidth": x_max - x_min,
         "terrainWorldLength": y_max - y_min,
         "terrainWorldHeight": height_range,
+        "perf_trace": trace_path,
         "message": "高度图生成成功！"
     }
     print("\n--- 最终元数据 ---")
@@ -4,7 +4,6 @@ import numpy as np
 import json
 import argparse
 import os
-import open3d as o3d
 import time
 
 # Import json.JSONEncoder to create a custom encoder
@@ -13,7 +12,14 @@ from json import JSONEncoder
 # --- 模块化导入 ---
 try:
     from terrain_generator import extract_ground_ultra_fast, grid_lowest_point_numba, fill_holes_fast
-    from Extractor4 import PowerLineExtractor
+    from Extractor4 import PowerLineExtractor, EXTRACTOR_VERSION
+    from result_cache import ResultCache
+    from las_io import LoadedCloud, powerline_las_name
+    from point_sidecar import loaded_cloud as sidecar_cloud
+    from line_geometry import line_geometry_name
+    from perf_trace import PerfTrace
+    from progress import ProgressReporter, PROGRESS_FORMATS
+    from lazy_imports import lazy_module
 except ImportError as e:
     print(json.dumps({
         "success": False,
@@ -22,6 +28,12 @@ except ImportError as e:
     }))
     exit(1)
 
+# open3d 仅用于 --visualize，首次使用时再导入
+o3d = lazy_module('open3d')
+
+# 结果缓存键的一部分：地形/高度图算法或元数据格式变化时递增
+TERRAIN_VERSION = 1
+
 # Create a custom JSON encoder to handle NumPy data types
 class NumpyEncoder(JSONEncoder):
     """ Special json encoder for numpy types """
@@ -35,15 +47,29 @@ class NumpyEncoder(JSONEncoder):
         return JSONEncoder.default(self, obj)
 
 
-if __name__ == '__main__':
+class WorkerError(Exception):
+    """ worker 流程中的可预期失败，payload 为返回给调用方的错误JSON """
+    def __init__(self, error, details=None):
+        super().__init__(error)
+        self.payload = {"success": False, "error": error}
+        if details is not None:
+            self.payload["details"] = details
+
+
+def build_parser():
     parser = argparse.ArgumentParser(description="从LiDAR数据统一生成地形高度图和提取电力线。")
-    
+
     # --- 文件输入输出参数 ---
     io_group = parser.add_argument_group('文件输入输出')
     io_group.add_argument('--input', type=str, required=True, help="输入的.las或.laz文件路径。")
     io_group.add_argument('--output_raw', type=str, required=True, help="输出的.raw高度图文件路径。")
     # NEW: 添加用于指定JSON输出路径的参数
     io_group.add_argument('--output_json', type=str, help="输出的.json元数据文件路径。如果未提供，将基于输入文件名自动生成。")
+    io_group.add_argument('--sidecar_cache', action='store_true',
+                          help="经由输入文件旁的二进制旁路缓存(<文件名>.sidecar)读取，缓存无效时生成。")
+    io_group.add_argument('--compress_output', action='store_true', help="电力线点云输出为压缩的.laz（需要 lazrs）。")
+    io_group.add_argument('--line_geometry', action='store_true',
+                          help="另外输出电力线二进制几何容器<文件名>_powerlines.plg，供Unity直接读取。")
 
 
     # --- 地形提取参数 ---
@@ -58,14 +84,138 @@ if __name__ == '__main__':
     pl_group.add_argument('--pl_eps', type=float, default=1.8, help='DBSCAN邻域半径 (默认: 1.8)')
     pl_group.add_argument('--pl_min_samples', type=int, default=7, help='DBSCAN最小样本数 (默认: 7)')
     pl_group.add_argument('--pl_min_line_length', type=float, default=30.0, help='电力线最小长度阈值 (默认: 30.0)')
-    
+    pl_group.add_argument('--no_cache', action='store_true', help='不使用阶段检查点缓存，全部重新计算')
+    pl_group.add_argument('--cache_dir', type=str, default=None, help='阶段检查点缓存目录 (默认: ~/.cache/powerline_extractor/stages)')
+
+    # --- 结果缓存参数 ---
+    cache_group = parser.add_argument_group('结果缓存')
+    cache_group.add_argument('--no_result_cache', action='store_true', help='不使用结果缓存，即使输入与参数完全相同也重新计算')
+    cache_group.add_argument('--result_cache_dir', type=str, default=None, help='结果缓存目录 (默认: ~/.cache/powerline_extractor/results)')
+    cache_group.add_argument('--full_hash', action='store_true', help='结果缓存键使用全文件哈希（默认只哈希LAS头部和抽样数据块）')
+
     # --- 调试与显示参数 ---
     debug_group = parser.add_argument_group('调试与显示')
     debug_group.add_argument('--visualize', action='store_true', help="如果设置，则在结束前显示对齐后的地形和电力线。")
-    
-    args = parser.parse_args()
-    
+    debug_group.add_argument('--profile_stages', type=str, default=None, help="用cProfile包裹的阶段，逗号分隔或all。")
+    debug_group.add_argument('--profile_dir', type=str, default='.', help=".prof文件输出目录。")
+    debug_group.add_argument('--trace_malloc', action='store_true',
+                             help="用tracemalloc记录各阶段的Python分配峰值（明显变慢，仅用于诊断）。")
+    debug_group.add_argument('--progress-format', dest='progress_format', choices=PROGRESS_FORMATS, default='text',
+                             help="进度输出格式：text为进度条和文本，jsonl为每行一个JSON事件。")
+    debug_group.add_argument('--progress-interval-ms', dest='progress_interval_ms', type=int, default=250,
+                             help="jsonl模式下进度事件的最小间隔毫秒数。")
+    return parser
+
+
+def result_cache_key(cache, args):
+    """
+    worker 结果缓存键：输入内容哈希 + 提取器与地形算法版本 + 所有影响输出的参数（不含输出路径）
+    """
+    params = {
+        'terrain_res': args.terrain_res,
+        'thinning_res': args.thinning_res,
+        'pl_height_min': args.pl_height_min,
+        'pl_height_max': args.pl_height_max,
+        'pl_eps': args.pl_eps,
+        'pl_min_samples': args.pl_min_samples,
+        'pl_min_line_length': args.pl_min_line_length,
+    }
+    # 只在输出LAZ时加入，已有的LAS结果缓存键保持不变
+    if args.compress_output:
+        params['compress_output'] = True
+    if args.line_geometry:
+        params['line_geometry'] = True
+    return cache.key(args.input, 'worker', f"{EXTRACTOR_VERSION}/terrain-{TERRAIN_VERSION}", params)
+
+
+def write_metadata(metadata, output_json_path, trace, trace_json_path):
+    """
+    写出元数据JSON与性能追踪JSON
+    """
+    try:
+        with open(output_json_path, 'w', encoding='utf-8') as f:
+            # 使用 ensure_ascii=False 以正确显示中文字符
+            json.dump(metadata, f, indent=4, cls=NumpyEncoder, ensure_ascii=False)
+        trace.write(trace_json_path)
+    except Exception as e:
+        raise WorkerError("无法写入输出的JSON文件。", str(e)) from e
+
+
+def run_worker(args, reporter=None, stage_cache=None, cloud_cache=None, result_cache=None):
+    """
+    执行完整的 地形 + 电力线 流程并写出所有文件，返回最终元数据字典。
+    失败时抛出 WorkerError。stage_cache / cloud_cache / result_cache 由常驻服务传入，用于跨请求复用缓存。
+    """
     start_time = time.time()
+    reporter = reporter or ProgressReporter()
+
+    # 电力线、地形和高度图各阶段共用一个性能追踪
+    trace = PerfTrace('worker', trace_malloc=args.trace_malloc, profile_stages=args.profile_stages,
+                      profile_dir=args.profile_dir, progress=reporter)
+    try:
+        return _run_worker_stages(args, reporter, trace, start_time, stage_cache, cloud_cache, result_cache)
+    finally:
+        # 失败或被取消时阶段可能仍在进行，关闭仍启用的 cProfile
+        trace.close()
+
+
+def _run_worker_stages(args, reporter, trace, start_time, stage_cache, cloud_cache, result_cache):
+    """
+    run_worker 的各处理阶段，参数见 run_worker
+    """
+    base_name = os.path.splitext(os.path.basename(args.input))[0]
+    powerlines_las_path = powerline_las_name(args.input, args.compress_output)
+    powerlines_json_path = f"{base_name}_powerline_endpoints.json"
+
+    # 决定输出JSON文件的最终路径
+    if args.output_json:
+        output_json_path = args.output_json
+    else:
+        output_json_path = f"metadata.json"
+    trace_json_path = os.path.splitext(output_json_path)[0] + "_perf_trace.json"
+    output_files = {
+        "metadata": os.path.basename(output_json_path),
+        "heightmap": os.path.basename(args.output_raw),
+        "powerline_las": powerlines_las_path,
+        "powerline_endpoints": powerlines_json_path,
+        "perf_trace": os.path.basename(trace_json_path)
+    }
+    cached_outputs = {
+        "heightmap": args.output_raw,
+        "powerline_las": powerlines_las_path,
+        "powerline_endpoints": powerlines_json_path,
+    }
+    if args.line_geometry:
+        output_files["line_geometry"] = cached_outputs["line_geometry"] = line_geometry_name(args.input)
+
+    # --- 步骤 0: 结果缓存，命中时复制高度图、电力线LAS、端点JSON（及几何容器），直接返回缓存的元数据 ---
+    cache, cache_key = None, None
+    if not args.no_result_cache:
+        trace.start('result_cache_lookup')
+        cache = result_cache or ResultCache(args.result_cache_dir, full_hash=args.full_hash)
+        cache_key = result_cache_key(cache, args)
+        manifest = cache.restore(cache_key, cached_outputs)
+        trace.stop('result_cache_lookup', hit=manifest is not None, key=cache_key)
+        if manifest is not None:
+            final_metadata = dict(manifest['metadata'])
+            final_metadata.update({
+                "processing_time_seconds": round(time.time() - start_time, 2),
+                "input_file": os.path.basename(args.input),
+                "output_files": output_files,
+                "result_cache": {"hit": True, "key": cache_key},
+                "performance_trace": trace.to_dict()
+            })
+            write_metadata(final_metadata, output_json_path, trace, trace_json_path)
+            print(f"结果缓存命中 ({cache_key[:12]})。元数据已保存到: {output_json_path}")
+            if args.visualize:
+                print("结果缓存命中时没有地面点，跳过可视化")
+            return final_metadata
+
+    # 输入文件只读取一次：电力线提取需要坐标时读取（其 'read' 阶段），地形提取复用同一份坐标与点记录；
+    # 电力线部分命中缓存而未读取时，由地形提取在 'ground_read' 阶段读取；
+    # 启用旁路缓存时不再解码LAS：提取器直接使用内存映射的局部坐标，地形提取时才逐块还原绝对坐标
+    # （旁路缓存没有原始点记录，地面点云只含坐标和缓存中已有的字段，见 point_sidecar.SidecarCloud）
+    shared_cloud = sidecar_cloud(args.input) if args.sidecar_cache else LoadedCloud(args.input)
 
     # --- 步骤 1: 执行电力线提取 ---
     try:
@@ -73,92 +223,94 @@ if __name__ == '__main__':
             height_min=args.pl_height_min,
             height_max=args.pl_height_max,
             eps=args.pl_eps,
-            min_samples=args.pl_min_samples
+            min_samples=args.pl_min_samples,
+            progress=reporter
         )
+        powerline_extractor.compress_output = args.compress_output
+        powerline_extractor.line_geometry_output = args.line_geometry
+        powerline_extractor.shared_cloud = shared_cloud
+        powerline_extractor.stage_cache = stage_cache
+        powerline_extractor.cloud_cache = cloud_cache
+        powerline_extractor.result_cache = cache
+        # 只改了地形参数时，电力线部分仍可命中提取器自己的结果缓存
         transformed_powerlines = powerline_extractor.extract(
             input_file=args.input,
             min_line_length=args.pl_min_line_length,
-            visualize_steps=False 
+            visualize_steps=False,
+            use_cache=not args.no_cache,
+            cache_dir=args.cache_dir,
+            trace=trace,
+            use_result_cache=cache is not None
         )
     except Exception as e:
-        # 如果出错，直接打印JSON错误信息并退出
-        print(json.dumps({"success": False, "error": "电力线提取过程中发生错误。", "details": str(e)}))
-        exit(1)
+        raise WorkerError("电力线提取过程中发生错误。", str(e)) from e
 
     # --- 步骤 2: 【核心】从实例中获取坐标变换信息 ---
     if hasattr(powerline_extractor, 'last_translation_vector'):
         translation_vector = powerline_extractor.last_translation_vector
     else:
-        print(json.dumps({"success": False, "error": "无法从PowerLineExtractor获取坐标变换信息(last_translation_vector)。请检查Extractor4.py的实现。"}))
-        exit(1)
+        raise WorkerError("无法从PowerLineExtractor获取坐标变换信息(last_translation_vector)。请检查Extractor4.py的实现。")
 
     # --- 步骤 3: 执行地形提取 ---
     try:
         ground_data_original_coord = extract_ground_ultra_fast(
-            input_las_path=args.input,
             thinning_resolution=args.thinning_res,
-            initial_grid_size=15.0
+            initial_grid_size=15.0,
+            trace=trace,
+            cloud=shared_cloud
         )
-        if not (ground_data_original_coord and len(ground_data_original_coord.points) > 0):
-            print(json.dumps({"success": False, "error": "未能提取到任何地面点。"}))
-            exit(1)
     except Exception as e:
-        print(json.dumps({"success": False, "error": "地形提取过程中发生错误。", "details": str(e)}))
-        exit(1)
+        raise WorkerError("地形提取过程中发生错误。", str(e)) from e
+    finally:
+        # 地面点已复制出来，释放完整点云
+        powerline_extractor.shared_cloud = None
+        del shared_cloud
+    if not (ground_data_original_coord and len(ground_data_original_coord.points) > 0):
+        raise WorkerError("未能提取到任何地面点。")
 
     # --- 步骤 4: 对地面点应用相同的平移向量 ---
+    trace.start('heightmap_grid', input_points=len(ground_data_original_coord.points))
     ground_xyz_original = ground_data_original_coord.xyz
     ground_xyz_transformed = ground_xyz_original - translation_vector
 
     # --- 步骤 5: 使用变换后的地面点生成高度图 ---
     x_min_t, y_min_t, z_min_t = np.min(ground_xyz_transformed, axis=0)
     x_max_t, y_max_t, z_max_t = np.max(ground_xyz_transformed, axis=0)
-    
+
     grid_w = int(np.ceil((x_max_t - x_min_t) / args.terrain_res))
     grid_h = int(np.ceil((y_max_t - y_min_t) / args.terrain_res))
-    
+
     if grid_w <= 0 or grid_h <= 0:
-        print(json.dumps({"success": False, "error": f"计算出的地形网格维度无效: W={grid_w}, H={grid_h}"}))
-        exit(1)
-        
+        raise WorkerError(f"计算出的地形网格维度无效: W={grid_w}, H={grid_h}")
+
     sparse_grid_z = grid_lowest_point_numba(ground_xyz_transformed, args.terrain_res, x_min_t, y_min_t, grid_w, grid_h)
+    trace.stop('heightmap_grid', output_points=int(np.count_nonzero(~np.isnan(sparse_grid_z))))
+    trace.start('heightmap_fill')
     filled_grid_z = fill_holes_fast(sparse_grid_z)
-    
+    trace.stop('heightmap_fill', output_points=int(filled_grid_z.size))
+
     min_h, max_h = np.min(filled_grid_z), np.max(filled_grid_z)
     height_range = max_h - min_h
-    
-    dtype = '<u2' 
+
+    dtype = '<u2'
     if height_range > 0:
         heightmap_16bit = ((filled_grid_z - min_h) / height_range * 65535).astype(dtype)
     else:
         heightmap_16bit = np.zeros_like(filled_grid_z, dtype=dtype)
 
+    trace.start('write_heightmap')
     with open(args.output_raw, 'wb') as f:
         f.write(heightmap_16bit.T.tobytes())
+    trace.stop('write_heightmap')
 
     # --- 步骤 6: 【最终输出】生成统一的元数据JSON ---
-    base_name = os.path.splitext(os.path.basename(args.input))[0]
-    powerlines_las_path = f"{base_name}_extracted_powerlines.las"
-    powerlines_json_path = f"{base_name}_powerline_endpoints.json"
-    
-    # 决定输出JSON文件的最终路径
-    if args.output_json:
-        output_json_path = args.output_json
-    else:
-        output_json_path = f"metadata.json"
-
     total_time = time.time() - start_time
 
     final_metadata = {
         "success": True,
         "processing_time_seconds": round(total_time, 2),
         "input_file": os.path.basename(args.input),
-        "output_files": {
-            "metadata": os.path.basename(output_json_path),
-            "heightmap": os.path.basename(args.output_raw),
-            "powerline_las": powerlines_las_path,
-            "powerline_endpoints": powerlines_json_path
-        },
+        "output_files": output_files,
         "terrain_metadata": {
             "heightmapWidth": filled_grid_z.shape[0],
             "heightmapHeight": filled_grid_z.shape[1],
@@ -175,22 +327,19 @@ if __name__ == '__main__':
         "transform_info": {
             "translation_vector": translation_vector.tolist(),
             "comment": "这是从原始坐标系到当前新坐标系的平移向量。原始坐标 = 新坐标 + 平移向量"
-        }
+        },
+        "result_cache": {"hit": False, "key": cache_key},
+        "performance_trace": trace.to_dict()
     }
-    
-    # --- 步骤 7: 将元数据写入文件 ---
-    try:
-        with open(output_json_path, 'w', encoding='utf-8') as f:
-            # 使用 ensure_ascii=False 以正确显示中文字符
-            json.dump(final_metadata, f, indent=4, cls=NumpyEncoder, ensure_ascii=False)
-        
-        # 在屏幕上打印一条成功消息，而不是整个JSON
-        print(f"处理成功完成。元数据已保存到: {output_json_path}")
 
-    except Exception as e:
-        # 如果写入文件失败，则打印错误
-        print(json.dumps({"success": False, "error": "无法写入输出的JSON文件。", "details": str(e)}))
-        exit(1)
+    # --- 步骤 7: 将元数据写入文件，并把全部输出存入结果缓存 ---
+    write_metadata(final_metadata, output_json_path, trace, trace_json_path)
+    if cache is not None:
+        cached_metadata = {k: v for k, v in final_metadata.items() if k not in ("performance_trace", "result_cache")}
+        cache.store(cache_key, cached_outputs, json.loads(json.dumps(cached_metadata, cls=NumpyEncoder)))
+
+    # 在屏幕上打印一条成功消息，而不是整个JSON
+    print(f"处理成功完成。元数据已保存到: {output_json_path}")
 
     # --- 步骤 8: 可选的可视化对齐结果 ---
     if args.visualize:
@@ -201,4 +350,30 @@ if __name__ == '__main__':
          colored_powerlines = powerline_extractor._visualize_separate_power_lines(transformed_powerlines)
 
          o3d.visualization.draw_geometries([ground_pcd] + colored_powerlines,
-                                           window_name="对齐后的地形与电力线 (Aligned Terrain & Power Lines)")
\ No newline at end of file
+                                           window_name="对齐后的地形与电力线 (Aligned Terrain & Power Lines)")
+
+    return final_metadata
+
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    reporter = ProgressReporter(args.progress_format, interval_ms=args.progress_interval_ms)
+
+    # jsonl 模式下屏蔽各模块的自由文本输出
+    try:
+        with reporter.quiet():
+            metadata = run_worker(args, reporter)
+    except WorkerError as e:
+        # 如果出错，输出JSON错误信息并退出：text 模式直接打印，jsonl 模式作为终止事件输出
+        if reporter.structured:
+            reporter.result(False, **{k: v for k, v in e.payload.items() if k != "success"})
+        else:
+            print(json.dumps(e.payload))
+        exit(1)
+
+    reporter.result(
+        True,
+        processing_time_seconds=metadata["processing_time_seconds"],
+        line_count=metadata["powerline_metadata"]["line_count"],
+        metadata=os.path.abspath(args.output_json or "metadata.json")
+    )